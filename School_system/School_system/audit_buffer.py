@@ -0,0 +1,178 @@
+"""
+Buffered audit log writer for AuditMiddleware.
+
+Mirrors the Go gateway's AuditLogger: requests append entries to an
+in-process buffer and a background thread persists them with bulk_create,
+so audit writes are no longer on the latency path of the endpoints being
+audited.
+
+    from School_system.audit_buffer import audit_log_buffer
+    audit_log_buffer.log({...AuditLog field values...})
+    audit_log_buffer.stats()   # {'pending', 'written', 'dropped', 'failed'}
+
+The writer flushes every AUDIT_LOG_FLUSH_INTERVAL seconds, or as soon as
+AUDIT_LOG_BATCH_SIZE entries are pending. At most AUDIT_LOG_MAX_PENDING
+entries are held in memory; further entries are dropped and counted.
+A batch that fails to insert is retried once and then written row by row, so
+a single bad entry is logged and dropped without losing the rest. Pending
+entries are flushed on interpreter shutdown (atexit). Set
+AUDIT_LOG_ASYNC=False to write synchronously instead.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLogBuffer:
+    """Bounded in-process queue of AuditLog rows with a background bulk writer."""
+
+    def __init__(self):
+        """Initialize instance state."""
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending = deque()
+        self._thread = None
+        self._pid = None
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    @staticmethod
+    def _setting(name, default):
+        return getattr(settings, name, default)
+
+    def log(self, entry):
+        """Queue one AuditLog row (a dict of model field values)."""
+        if not self._setting('AUDIT_LOG_ASYNC', True):
+            self._write([entry])
+            return
+
+        max_pending = self._setting('AUDIT_LOG_MAX_PENDING', 10000)
+        batch_size = self._setting('AUDIT_LOG_BATCH_SIZE', 100)
+        with self._lock:
+            if len(self._pending) >= max_pending:
+                self.dropped += 1
+                if self.dropped == 1 or self.dropped % 1000 == 0:
+                    logger.warning('Audit log buffer full (%s pending); %s entries dropped', max_pending, self.dropped)
+                return
+            self._pending.append(entry)
+            pending = len(self._pending)
+        self._ensure_writer()
+        if pending >= batch_size:
+            self._wake.set()
+
+    def flush(self):
+        """Persist everything pending. Safe to call from any thread."""
+        with self._lock:
+            if not self._pending:
+                return 0
+            entries = list(self._pending)
+            self._pending.clear()
+        return self._write(entries)
+
+    def stats(self):
+        """Counters for the system health endpoint."""
+        with self._lock:
+            pending = len(self._pending)
+        return {'pending': pending, 'written': self.written, 'dropped': self.dropped, 'failed': self.failed}
+
+    def _write(self, entries):
+        from users.models import AuditLog
+
+        batch_size = self._setting('AUDIT_LOG_BATCH_SIZE', 100)
+        error = None
+        # One retry for transient errors (dropped connection, lock timeout) before
+        # falling back to row-by-row inserts.
+        for attempt in range(2):
+            try:
+                AuditLog.objects.bulk_create([AuditLog(**entry) for entry in entries], batch_size=batch_size)
+            except Exception as exc:
+                error = exc
+                logger.warning('Audit log batch insert failed (%s entries, attempt %s): %s',
+                               len(entries), attempt + 1, exc)
+                if connection.in_atomic_block:
+                    # The caller's transaction is broken now; nothing more can be written in it.
+                    break
+                close_old_connections()
+                continue
+            with self._lock:
+                self.written += len(entries)
+            return len(entries)
+
+        if connection.in_atomic_block or len(entries) == 1:
+            with self._lock:
+                self.failed += len(entries)
+            if len(entries) == 1:
+                self._log_failed_entry(entries[0], error)
+            return 0
+        return self._write_rows(entries)
+
+    def _write_rows(self, entries):
+        """Insert one row at a time so a bad entry only loses itself."""
+        from users.models import AuditLog
+
+        written = failed = 0
+        for entry in entries:
+            try:
+                with transaction.atomic():
+                    AuditLog(**entry).save(force_insert=True)
+            except Exception as exc:
+                failed += 1
+                self._log_failed_entry(entry, exc)
+            else:
+                written += 1
+        with self._lock:
+            self.written += written
+            self.failed += failed
+        return written
+
+    @staticmethod
+    def _log_failed_entry(entry, exc):
+        logger.error(
+            'Audit log entry dropped (action=%s model=%s object_id=%s user_id=%s school_id=%s): %s',
+            entry.get('action'), entry.get('model_name'), entry.get('object_id'),
+            entry.get('user_id'), entry.get('school_id'), exc,
+        )
+
+    def _ensure_writer(self):
+        # Started lazily and restarted after fork, since threads do not survive fork().
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self._setting('AUDIT_LOG_FLUSH_INTERVAL', 2.0))
+            self._wake.clear()
+            try:
+                close_old_connections()
+                self.flush()
+            except Exception as exc:
+                logger.warning('Audit log writer error: %s', exc)
+            finally:
+                # Don't hold an idle session per process between flushes (CONN_MAX_AGE applies otherwise).
+                connection.close()
+
+    def shutdown(self):
+        """Flush remaining entries; registered with atexit."""
+        try:
+            self.flush()
+        except Exception as exc:
+            logger.warning('Audit log flush on shutdown failed: %s', exc)
+
+
+audit_log_buffer = AuditLogBuffer()
+atexit.register(audit_log_buffer.shutdown)
@@ -0,0 +1,349 @@
+"""
+Query-count, latency and memory benchmarks for the hot endpoints.
+
+A deterministic generator seeds a school of a given size (students, classes,
+teachers, results, attendance, fee structures, payment records) and each
+scenario drives one hot endpoint through its real URL, with caches cleared so
+the cold path is measured:
+
+    bench = seed_benchmark_school('small')          # 200 / 2,000 / 10,000 learners
+    measurements = run_scenarios(bench, repeat=3)   # {name: {'queries', 'wall_ms', 'peak_kib'}}
+    regressions = compare_to_baselines(measurements, baselines['sqlite']['small'])
+
+Every scenario iteration runs inside a savepoint that is rolled back, so
+writes (attendance marking, bulk import) see the same data on every run.
+Query counts are exact; wall time is the median of `repeat` runs and peak
+memory is the tracemalloc high-water mark of one extra run. Baselines are
+stored per database vendor and profile in benchmark_baselines.json and
+maintained with `manage.py benchmark_hot_endpoints --update-baselines`.
+"""
+
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+BASELINE_FILE = Path(__file__).resolve().parent / 'benchmark_baselines.json'
+
+PROFILES = {
+    'small': {'students': 200, 'classes': 8, 'teachers': 12, 'subjects': 10},
+    'medium': {'students': 2000, 'classes': 40, 'teachers': 60, 'subjects': 15},
+    'large': {'students': 10000, 'classes': 200, 'teachers': 250, 'subjects': 15},
+}
+
+# Differences below these floors are treated as noise, whatever the tolerance.
+MIN_WALL_MS_DELTA = 5.0
+MIN_PEAK_KIB_DELTA = 256.0
+
+ACADEMIC_YEAR = '2026'
+BENCHMARK_TERM = 'Term 1'
+
+
+def seed_large_school(students=2000, classes=40, teachers=60, subjects=15, results_per_student=10, days=30):
+    """Bulk-create a school with the given volumes and return it."""
+    from academics.attendance_rollups import rebuild_attendance_rollups
+    from academics.models import Attendance, Class, Result, Student, Subject, Teacher
+    from finances.models import StudentPaymentRecord
+    from users.models import CustomUser, School
+
+    rng = random.Random(42)
+    school = School.objects.create(name='Benchmark High School', code=School.generate_school_code())
+    tag = school.code
+
+    class_objs = Class.objects.bulk_create([
+        Class(name=f'Form {i // 8 + 1}{chr(65 + i % 8)}', grade_level=i // 8 + 1, academic_year='2026', school=school)
+        for i in range(classes)
+    ])
+    subject_objs = Subject.objects.bulk_create([
+        Subject(name=f'Subject {i + 1}', code=f'{tag}S{i + 1}', school=school) for i in range(subjects)
+    ])
+
+    teacher_users = CustomUser.objects.bulk_create([
+        CustomUser(
+            username=f'{tag}_t{i}', email=f'{tag}_t{i}@bench.local', first_name='Teacher', last_name=str(i),
+            role='teacher', school=school, password='!',
+        )
+        for i in range(teachers)
+    ])
+    teacher_objs = Teacher.objects.bulk_create([Teacher(user=u, hire_date=date(2020, 1, 1)) for u in teacher_users])
+
+    student_users = CustomUser.objects.bulk_create([
+        CustomUser(
+            username=f'{tag}_s{i}', email=f'{tag}_s{i}@bench.local', first_name='Student', last_name=str(i),
+            role='student', school=school, student_number=f'{tag}{i:06d}', password='!',
+        )
+        for i in range(students)
+    ], batch_size=1000)
+    student_objs = Student.objects.bulk_create([
+        Student(
+            user=u, student_class=class_objs[i % classes], admission_date=date(2026, 1, 10),
+            residence_type='boarding' if i % 3 == 0 else 'day',
+        )
+        for i, u in enumerate(student_users)
+    ], batch_size=1000)
+
+    Result.objects.bulk_create((
+        Result(
+            student=student, subject=subject_objs[(i + j) % subjects], teacher=teacher_objs[j % teachers],
+            exam_type='Test', score=rng.uniform(20, 100), max_score=100,
+            academic_year='2026', academic_term=f'Term {j % 3 + 1}',
+        )
+        for i, student in enumerate(student_objs)
+        for j in range(results_per_student)
+    ), batch_size=2000)
+
+    today = timezone.now().date()
+    Attendance.objects.bulk_create((
+        Attendance(
+            student=student, class_assigned_id=student.student_class_id, date=today - timedelta(days=d),
+            status=rng.choices(['present', 'late', 'absent'], weights=[85, 5, 10])[0],
+        )
+        for d in range(days)
+        for student in student_objs
+    ), batch_size=2000)
+    rebuild_attendance_rollups(school=school, kind='class')
+
+    StudentPaymentRecord.objects.bulk_create([
+        StudentPaymentRecord(
+            student=student, school=school, academic_year='2026', academic_term='Term 1',
+            total_amount_due=500, amount_paid=rng.choice([0, 250, 500]),
+        )
+        for student in student_objs
+    ], batch_size=1000)
+    return school
+
+
+class BenchmarkSchool:
+    """A seeded school plus the users and rows the scenarios act on."""
+
+    def __init__(self, profile, school, admin, target_class, class_teacher, students, import_rows):
+        self.profile = profile
+        self.school = school
+        self.admin = admin
+        self.target_class = target_class
+        self.class_teacher = class_teacher
+        self.students = students
+        self.import_rows = import_rows
+
+
+def seed_benchmark_school(profile='small', **overrides):
+    """
+    Seed a school for `profile` (see PROFILES; keyword overrides adjust the
+    volumes) with class teachers, school settings, fee structures and
+    additional fees on top of seed_large_school(), and return a BenchmarkSchool.
+    """
+    from academics.models import Class, Student
+    from finances.models import AdditionalFee, SchoolFees
+    from users.models import CustomUser, SchoolSettings
+
+    volumes = {**PROFILES[profile], **overrides}
+    school = seed_large_school(**volumes)
+    SchoolSettings.objects.update_or_create(
+        school=school, defaults={'current_academic_year': ACADEMIC_YEAR, 'current_term': BENCHMARK_TERM},
+    )
+    admin = CustomUser.objects.create(
+        username=f'{school.code}_admin', email=f'{school.code}_admin@bench.local', first_name='Bench',
+        last_name='Admin', role='admin', school=school, password='!',
+    )
+
+    classes = list(Class.objects.filter(school=school).order_by('id'))
+    teacher_users = list(CustomUser.objects.filter(school=school, role='teacher').order_by('id'))
+    for cls, teacher_user in zip(classes, teacher_users):
+        cls.class_teacher = teacher_user
+    Class.objects.bulk_update(classes, ['class_teacher'])
+
+    grade_levels = sorted({cls.grade_level for cls in classes})
+    SchoolFees.objects.bulk_create([
+        SchoolFees(
+            school=school, grade_level=grade, grade_name=f'Form {grade}', tuition_fee=400, levy_fee=50,
+            sports_fee=25, boarding_fee=300, academic_year=ACADEMIC_YEAR, academic_term=term,
+        )
+        for grade in grade_levels
+        for term in ('term_1', 'term_2', 'term_3')
+    ])
+    AdditionalFee.objects.bulk_create([
+        AdditionalFee(
+            school=school, student_class=cls, fee_name='Trip levy', amount=20,
+            academic_year=ACADEMIC_YEAR, academic_term=BENCHMARK_TERM,
+        )
+        for cls in classes
+    ])
+
+    target_class = classes[0]
+    import_rows = max(20, volumes['students'] // 100)
+    return BenchmarkSchool(
+        profile=profile,
+        school=school,
+        admin=admin,
+        target_class=target_class,
+        class_teacher=target_class.class_teacher,
+        students=list(Student.objects.filter(student_class=target_class).order_by('id')),
+        import_rows=import_rows,
+    )
+
+
+_factory = APIRequestFactory()
+
+
+def _call(user, method, path, data=None, format=None):
+    """Dispatch `path` to its view the way a request would and render the response."""
+    match = resolve(path.split('?', 1)[0])
+    if method == 'get':
+        request = _factory.get(path, data)
+    else:
+        request = _factory.post(path, data, format=format)
+    force_authenticate(request, user=user)
+    response = match.func(request, *match.args, **match.kwargs)
+    if hasattr(response, 'render'):
+        response.render()
+    if response.status_code >= 400:
+        raise RuntimeError(f'{method.upper()} {path} returned {response.status_code}: {response.content[:300]!r}')
+    return response
+
+
+def _dashboard_stats(bench):
+    return _call(bench.admin, 'get', '/api/v1/auth/dashboard/stats/')
+
+
+def _at_risk_students(bench):
+    return _call(bench.admin, 'get', '/api/v1/academics/admin/at-risk-students/')
+
+
+def _class_fees_report(bench):
+    return _call(bench.admin, 'get', '/api/v1/finances/payment-records/class-report/', {
+        'class_id': bench.target_class.id, 'academic_year': ACADEMIC_YEAR, 'academic_term': BENCHMARK_TERM,
+    })
+
+
+def _report_card(bench):
+    return _call(bench.admin, 'get', f'/api/v1/academics/students/{bench.students[0].id}/report-card/', {
+        'year': ACADEMIC_YEAR, 'term': BENCHMARK_TERM,
+    })
+
+
+def _mark_attendance(bench):
+    entries = [
+        {'student_id': student.id, 'status': 'absent' if i % 10 == 0 else 'present'}
+        for i, student in enumerate(bench.students)
+    ]
+    day = timezone.now().date() + timedelta(days=1)
+    return _call(bench.class_teacher, 'post', '/api/v1/teachers/attendance/class/mark/', {
+        'date': day.isoformat(), 'attendance': entries,
+    }, format='json')
+
+
+def _bulk_import(bench):
+    lines = ['name,code,description']
+    lines += [f'Imported Subject {i},BI{i:04d},Benchmark import row {i}' for i in range(bench.import_rows)]
+    upload = SimpleUploadedFile('subjects.csv', '\n'.join(lines).encode('utf-8'), content_type='text/csv')
+    return _call(bench.admin, 'post', '/api/v1/academics/bulk-import/commit/', {
+        'import_type': 'subjects', 'file': upload,
+    }, format='multipart')
+
+
+SCENARIOS = {
+    'dashboard_stats': _dashboard_stats,
+    'at_risk_students': _at_risk_students,
+    'class_fees_report': _class_fees_report,
+    'report_card': _report_card,
+    'mark_class_attendance': _mark_attendance,
+    'bulk_import_subjects': _bulk_import,
+}
+
+
+def _isolated(scenario, bench):
+    """Run one scenario cold, inside a savepoint that is rolled back afterwards."""
+    cache.clear()
+    sid = transaction.savepoint()
+    try:
+        scenario(bench)
+    finally:
+        transaction.savepoint_rollback(sid)
+
+
+def measure_scenario(scenario, bench, repeat=3):
+    """{'queries', 'wall_ms', 'peak_kib'} for one scenario. Must run inside a transaction."""
+    queries = None
+    timings = []
+    for _ in range(max(1, repeat)):
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            _isolated(scenario, bench)
+            timings.append((time.perf_counter() - started) * 1000)
+        # The savepoint statements are harness overhead, not the endpoint's.
+        count = sum(1 for q in ctx.captured_queries if 'SAVEPOINT' not in q['sql'].upper())
+        queries = count if queries is None else max(queries, count)
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline_kib = tracemalloc.get_traced_memory()[0] / 1024
+    try:
+        _isolated(scenario, bench)
+        peak_kib = tracemalloc.get_traced_memory()[1] / 1024 - baseline_kib
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+    return {
+        'queries': queries,
+        'wall_ms': round(statistics.median(timings), 1),
+        'peak_kib': round(peak_kib, 1),
+    }
+
+
+def run_scenarios(bench, names=None, repeat=3):
+    """Measure the named scenarios (default: all) against `bench`, in SCENARIOS order."""
+    return {
+        name: measure_scenario(scenario, bench, repeat=repeat)
+        for name, scenario in SCENARIOS.items()
+        if not names or name in names
+    }
+
+
+def compare_to_baselines(measurements, baselines, time_tolerance=0.5, memory_tolerance=0.25, query_slack=0,
+                         check_time=True):
+    """
+    Regression messages for measurements that exceed their baseline. Query
+    counts may grow by at most `query_slack`; wall time and peak memory by the
+    given fraction (and always by MIN_WALL_MS_DELTA / MIN_PEAK_KIB_DELTA).
+    Scenarios without a baseline are skipped.
+    """
+    regressions = []
+    for name, current in measurements.items():
+        baseline = baselines.get(name)
+        if not baseline:
+            continue
+        if current['queries'] > baseline['queries'] + query_slack:
+            regressions.append(f"{name}: {current['queries']} queries (baseline {baseline['queries']})")
+        wall_limit = max(baseline['wall_ms'] * (1 + time_tolerance), baseline['wall_ms'] + MIN_WALL_MS_DELTA)
+        if check_time and current['wall_ms'] > wall_limit:
+            regressions.append(f"{name}: {current['wall_ms']} ms (baseline {baseline['wall_ms']} ms)")
+        memory_limit = max(baseline['peak_kib'] * (1 + memory_tolerance), baseline['peak_kib'] + MIN_PEAK_KIB_DELTA)
+        if current['peak_kib'] > memory_limit:
+            regressions.append(f"{name}: {current['peak_kib']} KiB peak (baseline {baseline['peak_kib']} KiB)")
+    return regressions
+
+
+def load_baselines(path=BASELINE_FILE):
+    """{vendor: {profile: {scenario: measurement}}}; empty when the file does not exist."""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def save_baselines(baselines, path=BASELINE_FILE):
+    Path(path).write_text(json.dumps(baselines, indent=2, sort_keys=True) + '\n')
@@ -1,6 +1,10 @@
 import json
 import logging
 
+from django.utils import timezone
+
+from .audit_buffer import audit_log_buffer
+
 logger = logging.getLogger(__name__)
 
 AUDIT_METHODS = {'POST', 'PUT', 'PATCH', 'DELETE'}
@@ -75,7 +79,8 @@ def _get_client_ip(request):
 class AuditMiddleware:
     """
     Logs write operations (POST/PUT/PATCH/DELETE) to the AuditLog model.
-    Skipped for admin UI, schema, and static/media paths.
+    Skipped for admin UI, schema, and static/media paths. Rows are queued on
+    audit_log_buffer and written in batches off the request path.
     """
 
     def __init__(self, get_response):
@@ -134,18 +139,18 @@ class AuditMiddleware:
                     object_id = segment
                     break
 
-            from users.models import AuditLog
-            AuditLog.objects.create(
-                user=user,
-                school=getattr(user, 'school', None),
-                action=action,
-                model_name=model_name,
-                object_id=object_id,
-                object_repr=path,
-                changes=changes,
-                ip_address=_get_client_ip(request),
-                response_status=response.status_code,
-            )
+            audit_log_buffer.log({
+                'user_id': user.pk,
+                'school_id': getattr(user, 'school_id', None),
+                'action': action,
+                'model_name': model_name,
+                'object_id': object_id,
+                'object_repr': path,
+                'changes': changes,
+                'ip_address': _get_client_ip(request),
+                'response_status': response.status_code,
+                'timestamp': timezone.now(),
+            })
         except Exception as exc:
             logger.warning('AuditMiddleware failed: %s', exc)
 
@@ -209,10 +214,11 @@ class HRAccessControlMiddleware:
             return self.get_response(request)
 
         # Lazy import to avoid app loading side effects.
-        from users.models import HRPermissionProfile, HRPagePermission
+        from users.auth_cache import get_staff_permissions
 
-        profile = HRPermissionProfile.objects.filter(user=user).first()
-        if profile and profile.is_root_boss:
+        # Profile + page grants come from the short-TTL auth cache.
+        perms = get_staff_permissions('hr', user.id)
+        if perms and perms['is_root']:
             # Root HR acts as admin for permission checks in this request lifecycle.
             request.user._original_role = 'hr'
             request.user.role = 'admin'
@@ -223,17 +229,15 @@ class HRAccessControlMiddleware:
         if not page_key:
             return self._deny()
 
-        permission = HRPagePermission.objects.filter(
-            profile__user=user,
-            page_key=page_key,
-        ).first()
+        permission = perms['pages'].get(page_key) if perms else None
         if not permission:
             return self._deny()
 
+        can_read, can_write = permission
         is_read_method = request.method in ('GET', 'HEAD', 'OPTIONS')
-        if is_read_method and permission.can_read:
+        if is_read_method and can_read:
             return self.get_response(request)
-        if (not is_read_method) and permission.can_write:
+        if (not is_read_method) and can_write:
             return self.get_response(request)
         return self._deny()
 
@@ -276,10 +280,10 @@ class AccountantAccessControlMiddleware:
         if any(path.startswith(prefix) for prefix in ACCOUNTANT_ALWAYS_ALLOWED_PREFIXES):
             return self.get_response(request)
 
-        from users.models import AccountantPermissionProfile, AccountantPagePermission
+        from users.auth_cache import get_staff_permissions
 
-        profile = AccountantPermissionProfile.objects.filter(user=user).first()
-        if profile and profile.is_root_head:
+        perms = get_staff_permissions('accountant', user.id)
+        if perms and perms['is_root']:
             request.is_accountant_head = True
             return self.get_response(request)
 
@@ -288,17 +292,15 @@ class AccountantAccessControlMiddleware:
             # Paths outside the accountant page map are denied for non-head accountants.
             return self._deny()
 
-        permission = AccountantPagePermission.objects.filter(
-            profile__user=user,
-            page_key=page_key,
-        ).first()
+        permission = perms['pages'].get(page_key) if perms else None
         if not permission:
             return self._deny()
 
+        can_read, can_write = permission
         is_read_method = request.method in ('GET', 'HEAD', 'OPTIONS')
-        if is_read_method and permission.can_read:
+        if is_read_method and can_read:
             return self.get_response(request)
-        if (not is_read_method) and permission.can_write:
+        if (not is_read_method) and can_write:
             return self.get_response(request)
         return self._deny()
 
@@ -0,0 +1,204 @@
+"""
+Shared outbound HTTP transport for third-party and internal service calls.
+
+Every integration (Resend, the Go services, the Go bulk workers, Meta's
+WhatsApp API) used to call bare `requests.post`, paying a new TCP/TLS
+handshake per message and waiting out the full timeout on every call while
+a dependency was down. Calls now go through one transport that keeps:
+
+    - a pooled, keep-alive requests.Session per host
+    - a per-host concurrency limit (OUTBOUND_HTTP_MAX_CONCURRENCY)
+    - a per-host circuit breaker: after OUTBOUND_HTTP_BREAKER_THRESHOLD
+      consecutive failures (connection errors, timeouts, 5xx) the host is
+      short-circuited for OUTBOUND_HTTP_BREAKER_COOLDOWN seconds, then one
+      trial request decides whether it closes again
+    - latency/error counters per host for the system health endpoint
+
+    from School_system.outbound_http import CircuitOpenError, outbound
+    resp = outbound.post(url, json=payload, timeout=5)
+    results = outbound.map(send_one, items)   # bounded thread fan-out
+    outbound.stats()                          # {host: {...}}
+
+CircuitOpenError subclasses requests.ConnectionError, so existing
+`except Exception` fallbacks (Go service -> Resend) take effect immediately
+instead of after a timeout.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+LATENCY_SAMPLES = 200
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """The target host's circuit breaker is open; the request was not sent."""
+
+
+class _Host:
+    """Pool, limiter, breaker and metrics for one scheme://host:port."""
+
+    def __init__(self, name, pool_size, max_concurrency):
+        """Initialize instance state."""
+        self.name = name
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.limiter = threading.BoundedSemaphore(max_concurrency)
+        self.lock = threading.Lock()
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.requests = 0
+        self.failures = 0
+        self.short_circuited = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def admit(self, cooldown):
+        """Return True if a request may be sent now."""
+        with self.lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= cooldown:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            self.short_circuited += 1
+            return False
+
+    def record(self, ok, elapsed_ms, threshold):
+        with self.lock:
+            self.requests += 1
+            self.latencies.append(elapsed_ms)
+            self.trial_in_flight = False
+            if ok:
+                if self.state != 'closed':
+                    logger.info("Outbound circuit for %s closed", self.name)
+                self.state = 'closed'
+                self.consecutive_failures = 0
+                return
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.state == 'half_open' or self.consecutive_failures >= threshold:
+                if self.state != 'open':
+                    logger.warning(
+                        "Outbound circuit for %s opened after %s consecutive failures",
+                        self.name, self.consecutive_failures,
+                    )
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+    def snapshot(self):
+        with self.lock:
+            samples = sorted(self.latencies)
+            state = self.state
+            counters = (self.requests, self.failures, self.short_circuited)
+
+        def percentile(p):
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(len(samples) * p))], 1)
+
+        return {
+            'state': state,
+            'requests': counters[0],
+            'failures': counters[1],
+            'short_circuited': counters[2],
+            'latency_ms_p50': percentile(0.5),
+            'latency_ms_p95': percentile(0.95),
+        }
+
+
+class OutboundHTTP:
+    """Process-wide registry of per-host pools and breakers."""
+
+    def __init__(self):
+        """Initialize instance state."""
+        self._lock = threading.Lock()
+        self._hosts = {}
+        self._pid = os.getpid()
+
+    @staticmethod
+    def _setting(name, default):
+        return getattr(settings, name, default)
+
+    def _host(self, url):
+        parts = urlsplit(url)
+        key = f"{parts.scheme}://{parts.netloc}".lower()
+        with self._lock:
+            # Pooled sockets must not be shared with a forked child.
+            if self._pid != os.getpid():
+                self._hosts = {}
+                self._pid = os.getpid()
+            host = self._hosts.get(key)
+            if host is None:
+                host = _Host(
+                    key,
+                    pool_size=int(self._setting('OUTBOUND_HTTP_POOL_SIZE', 20)),
+                    max_concurrency=int(self._setting('OUTBOUND_HTTP_MAX_CONCURRENCY', 10)),
+                )
+                self._hosts[key] = host
+            return host
+
+    def request(self, method, url, **kwargs):
+        """Send a request through the host's pool; raises CircuitOpenError when short-circuited."""
+        host = self._host(url)
+        if not host.admit(float(self._setting('OUTBOUND_HTTP_BREAKER_COOLDOWN', 30))):
+            raise CircuitOpenError(f"Circuit open for {host.name}")
+
+        threshold = int(self._setting('OUTBOUND_HTTP_BREAKER_THRESHOLD', 5))
+        started = time.perf_counter()
+        try:
+            with host.limiter:
+                response = host.session.request(method, url, **kwargs)
+        except Exception:
+            host.record(False, (time.perf_counter() - started) * 1000, threshold)
+            raise
+        host.record(response.status_code < 500, (time.perf_counter() - started) * 1000, threshold)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def map(self, func, items, max_workers=None):
+        """Call func(item) for every item on a bounded thread pool; returns results in order."""
+        items = list(items)
+        if not items:
+            return []
+        workers = max_workers or int(self._setting('OUTBOUND_HTTP_MAX_CONCURRENCY', 10))
+        if workers <= 1 or len(items) == 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(workers, len(items))) as pool:
+            return list(pool.map(func, items))
+
+    def stats(self):
+        """Per-host breaker state, counters and latency percentiles."""
+        with self._lock:
+            hosts = list(self._hosts.values())
+        return {host.name: host.snapshot() for host in hosts}
+
+    def reset(self):
+        """Drop all pools and breaker state (tests, config reloads)."""
+        with self._lock:
+            hosts, self._hosts = list(self._hosts.values()), {}
+        for host in hosts:
+            host.session.close()
+
+
+outbound = OutboundHTTP()
@@ -0,0 +1,148 @@
+"""
+Keyset (cursor) pagination for the large list endpoints.
+
+Page-number pagination runs COUNT(*) over the whole filtered queryset on
+every page and an OFFSET that grows with the page number, so deep pages of
+audit logs, results and payment records get slower the further you go.
+Keyset pagination instead orders on indexed columns ending in the primary
+key and continues from the last row seen:
+
+    rows, meta = paginate_keyset(request, qs, ('-timestamp', '-id'))
+    # meta = {'page_size', 'next_cursor', 'has_next'[, 'total', 'total_is_estimate']}
+
+    class AuditLogListView(generics.ListAPIView):
+        pagination_class = KeysetPagination
+        keyset_ordering = ('-timestamp', '-id')
+
+Endpoints opt in per request with `?cursor=` (empty for the first page, then
+the `next_cursor` from the previous response); without it they keep their
+existing page-number behaviour so current clients are unaffected. Cursors are
+opaque URL-safe tokens. `?with_total=1` adds a total counted up to
+KEYSET_TOTAL_CAP rows; `total_is_estimate` is true when the cap was hit.
+"""
+
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+MAX_PAGE_SIZE = 200
+
+
+def _page_size(request, default_page_size):
+    try:
+        page_size = int(request.query_params.get('page_size', default_page_size))
+    except (TypeError, ValueError):
+        page_size = default_page_size
+    return max(1, min(MAX_PAGE_SIZE, page_size))
+
+
+def _cursor_value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, (int, float, str, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':'), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, model, ordering):
+    """Cursor token -> list of field values (converted by the model fields), or ValidationError."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise ValueError('cursor does not match ordering')
+        return [
+            None if value is None else model._meta.get_field(field.lstrip('-')).to_python(value)
+            for field, value in zip(ordering, values)
+        ]
+    except Exception:
+        raise ValidationError({'cursor': 'Invalid cursor.'})
+
+
+def _after(ordering, values):
+    """Q for rows strictly after `values` in `ordering` (a row-value comparison spelled out)."""
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= equal & Q(**{f'{name}__{lookup}': value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def approximate_total(qs):
+    """(count, is_estimate): the row count, capped at KEYSET_TOTAL_CAP."""
+    cap = int(getattr(settings, 'KEYSET_TOTAL_CAP', 10000) or 0)
+    if cap <= 0:
+        return qs.order_by().count(), False
+    count = qs.order_by()[:cap + 1].count()
+    return min(count, cap), count > cap
+
+
+def paginate_keyset(request, qs, ordering, default_page_size=50):
+    """
+    Return (rows, meta) for one keyset page of `qs` ordered by `ordering`,
+    which must end in a unique column (normally '-id' or 'id').
+    """
+    ordering = tuple(ordering)
+    page_size = _page_size(request, default_page_size)
+    token = (request.query_params.get('cursor') or '').strip()
+
+    page_qs = qs.order_by(*ordering)
+    if token:
+        page_qs = page_qs.filter(_after(ordering, decode_cursor(token, qs.model, ordering)))
+    rows = list(page_qs[:page_size + 1])
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+
+    next_cursor = None
+    if has_next and rows:
+        last = rows[-1]
+        next_cursor = encode_cursor([
+            _cursor_value(getattr(last, qs.model._meta.get_field(field.lstrip('-')).attname))
+            for field in ordering
+        ])
+    meta = {'page_size': page_size, 'next_cursor': next_cursor, 'has_next': has_next}
+    if str(request.query_params.get('with_total', '')).lower() in ('1', 'true', 'yes'):
+        meta['total'], meta['total_is_estimate'] = approximate_total(qs)
+    return rows, meta
+
+
+def wants_keyset(request):
+    return 'cursor' in request.query_params
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination that switches to keyset mode when the request
+    carries `?cursor=`. The view declares `keyset_ordering`.
+    """
+
+    default_keyset_ordering = ('-id',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset_meta = None
+        if not wants_keyset(request):
+            return super().paginate_queryset(queryset, request, view=view)
+        ordering = getattr(view, 'keyset_ordering', None) or self.default_keyset_ordering
+        self.request = request
+        rows, self.keyset_meta = paginate_keyset(request, queryset, ordering, default_page_size=self.page_size)
+        return rows
+
+    def get_paginated_response(self, data):
+        if self.keyset_meta is None:
+            return super().get_paginated_response(data)
+        meta = dict(self.keyset_meta)
+        if 'total' in meta:
+            meta['count'] = meta.pop('total')
+        return Response({**meta, 'results': data})
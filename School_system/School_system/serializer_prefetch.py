@@ -0,0 +1,158 @@
+"""
+Prefetch-aware serializers for list endpoints.
+
+Method fields that query per row (`obj.parents.first()`, a filter per class,
+an invoice lookup per payment record) made list endpoints cost one or more
+queries per row even when the view prefetched. Serializers now declare what
+they read and resolve it from loaded data:
+
+    class StudentSerializer(PrefetchPlanMixin, serializers.ModelSerializer):
+        user = UserSerializer(read_only=True)          # its plan is nested under 'user'
+        select_related_plan = ('user', 'student_class')
+        prefetch_related_plan = ('parents__user',)
+
+        def get_parent_email(self, obj):
+            parent = prefetched_first(obj, 'parents')  # no query when prefetched
+
+    class StudentListView(PrefetchPlanViewMixin, generics.ListAPIView):
+        ...                                            # GETs apply the plan
+
+Values that cannot be expressed as a prefetch are loaded for the whole page
+at once with @batched(loader), where loader(objs) returns {pk: value}.
+
+Tests use School_system.testing.QueryCountAssertionsMixin to check that a
+list endpoint issues the same number of queries however many rows it returns.
+"""
+
+import functools
+
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _nest_lookup(prefix, lookup):
+    if isinstance(lookup, Prefetch):
+        return Prefetch(
+            f'{prefix}__{lookup.prefetch_through}',
+            queryset=lookup.queryset,
+            to_attr=lookup.to_attr,
+        )
+    return f'{prefix}__{lookup}'
+
+
+class PrefetchPlanMixin:
+    """
+    Serializer mixin declaring the select_related / prefetch_related lookups
+    its fields read. Plans of nested PrefetchPlanMixin serializers are folded
+    in under the nested field's source.
+    """
+
+    select_related_plan = ()
+    prefetch_related_plan = ()
+
+    @classmethod
+    def get_prefetch_plan(cls):
+        select = list(cls.select_related_plan)
+        prefetch = list(cls.prefetch_related_plan)
+        for name, field in cls._declared_fields.items():
+            many = isinstance(field, serializers.ListSerializer)
+            nested = field.child if many else field
+            if not isinstance(nested, PrefetchPlanMixin):
+                continue
+            source = field.source or name
+            if source == '*':
+                continue
+            source = source.replace('.', '__')
+            child_select, child_prefetch = type(nested).get_prefetch_plan()
+            if many:
+                prefetch.append(source)
+                prefetch.extend(_nest_lookup(source, lookup) for lookup in child_select)
+            else:
+                select.append(source)
+                select.extend(_nest_lookup(source, lookup) for lookup in child_select)
+            prefetch.extend(_nest_lookup(source, lookup) for lookup in child_prefetch)
+        return select, prefetch
+
+    @classmethod
+    def setup_queryset(cls, queryset):
+        select, prefetch = cls.get_prefetch_plan()
+        if select:
+            queryset = queryset.select_related(*dict.fromkeys(select))
+        if prefetch:
+            seen = set()
+            lookups = []
+            for lookup in prefetch:
+                key = lookup.prefetch_to if isinstance(lookup, Prefetch) else lookup
+                if key not in seen:
+                    seen.add(key)
+                    lookups.append(lookup)
+            queryset = queryset.prefetch_related(*lookups)
+        return queryset
+
+
+class PrefetchPlanViewMixin:
+    """Generic view mixin applying the read serializer's plan to GET querysets."""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if self.request.method in SAFE_METHODS and issubclass(serializer_class, PrefetchPlanMixin):
+            queryset = serializer_class.setup_queryset(queryset)
+        return queryset
+
+
+def prefetched_all(obj, relation):
+    """Rows of a to-many relation; served from the prefetch cache when loaded."""
+    return list(getattr(obj, relation).all())
+
+
+def prefetched_first(obj, relation):
+    """
+    Same row as `getattr(obj, relation).first()`, taken from the prefetch
+    cache when the relation was prefetched instead of issuing a query.
+    """
+    manager = getattr(obj, relation)
+    cache = getattr(obj, '_prefetched_objects_cache', {})
+    if relation not in cache:
+        return manager.first()
+    rows = list(cache[relation])
+    if not rows:
+        return None
+    if manager.model._meta.ordering:
+        return rows[0]
+    return min(rows, key=lambda row: row.pk)
+
+
+def batched(loader):
+    """
+    Decorator for SerializerMethodField getters backed by a page-wide loader.
+
+    loader(objs) -> {obj.pk: value} runs once for every object the enclosing
+    list serializer renders; single-object serializers load just that object.
+    Objects the loader leaves out resolve to None.
+    """
+
+    def decorator(method):
+        key = method.__name__
+
+        @functools.wraps(method)
+        def wrapper(self, obj):
+            owner = self.parent if isinstance(self.parent, serializers.ListSerializer) else self
+            objs = getattr(owner, 'instance', None)
+            if objs is None or isinstance(objs, dict) or not hasattr(objs, '__iter__'):
+                objs = [obj]
+            cache = owner.__dict__.setdefault('_batched_values', {})
+            values = cache.get(key)
+            if values is None or obj.pk not in values:
+                loaded = list(objs)
+                if all(row.pk != obj.pk for row in loaded):
+                    loaded = [obj]
+                values = {**(values or {}), **loader(loaded)}
+                values.setdefault(obj.pk, None)
+                cache[key] = values
+            return method(self, obj, values[obj.pk])
+
+        return wrapper
+
+    return decorator
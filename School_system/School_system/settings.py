@@ -1,6 +1,8 @@
+import sys
 from pathlib import Path
 from decouple import config, Csv
 import dj_database_url
+from celery.schedules import crontab
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -59,6 +61,26 @@ MIDDLEWARE = [
 if not config('USE_GO_GATEWAY', default=False, cast=bool):
     MIDDLEWARE.append('School_system.middleware.AuditMiddleware')
 
+# AuditMiddleware queues rows and a background thread bulk-inserts them
+# (see School_system/audit_buffer.py). Entries beyond AUDIT_LOG_MAX_PENDING
+# are dropped and counted in the superadmin system health endpoint.
+# `manage.py test` writes synchronously: the writer thread's own connection
+# cannot see (or would lock against) the uncommitted test transaction.
+RUNNING_TESTS = len(sys.argv) > 1 and sys.argv[1] == 'test'
+AUDIT_LOG_ASYNC = config('AUDIT_LOG_ASYNC', default=not RUNNING_TESTS, cast=bool)
+AUDIT_LOG_BATCH_SIZE = config('AUDIT_LOG_BATCH_SIZE', default=100, cast=int)
+AUDIT_LOG_FLUSH_INTERVAL = config('AUDIT_LOG_FLUSH_INTERVAL', default=2.0, cast=float)
+AUDIT_LOG_MAX_PENDING = config('AUDIT_LOG_MAX_PENDING', default=10000, cast=int)
+
+# Outbound HTTP (Resend, Go services, Go workers, WhatsApp) shares pooled
+# sessions per host (see School_system/outbound_http.py). A host that fails
+# OUTBOUND_HTTP_BREAKER_THRESHOLD times in a row is skipped for
+# OUTBOUND_HTTP_BREAKER_COOLDOWN seconds.
+OUTBOUND_HTTP_POOL_SIZE = config('OUTBOUND_HTTP_POOL_SIZE', default=20, cast=int)
+OUTBOUND_HTTP_MAX_CONCURRENCY = config('OUTBOUND_HTTP_MAX_CONCURRENCY', default=10, cast=int)
+OUTBOUND_HTTP_BREAKER_THRESHOLD = config('OUTBOUND_HTTP_BREAKER_THRESHOLD', default=5, cast=int)
+OUTBOUND_HTTP_BREAKER_COOLDOWN = config('OUTBOUND_HTTP_BREAKER_COOLDOWN', default=30.0, cast=float)
+
 ROOT_URLCONF = 'School_system.urls'
 
 TEMPLATES = [
@@ -138,6 +160,23 @@ REST_FRAMEWORK = {
 # JWT token lifetimes (security hardening defaults)
 JWT_ACCESS_TOKEN_HOURS = config('JWT_ACCESS_TOKEN_HOURS', default=24, cast=int)
 JWT_REFRESH_TOKEN_HOURS = config('JWT_REFRESH_TOKEN_HOURS', default=72, cast=int)
+# Seconds to cache per-user auth context (user row, token blacklist verdicts,
+# school auth flags, HR/accountant page permissions). 0 disables.
+AUTH_CONTEXT_CACHE_SECONDS = config('AUTH_CONTEXT_CACHE_SECONDS', default=60, cast=int)
+# Seconds to cache per-school admin dashboard counters (users/school_stats.py).
+# Model saves invalidate them; the TTL bounds staleness from bulk updates. 0 disables.
+SCHOOL_STATS_CACHE_SECONDS = config('SCHOOL_STATS_CACHE_SECONDS', default=60, cast=int)
+# Seconds to cache the admin analytics payload per school (users/analytics.py). 0 disables.
+ADMIN_ANALYTICS_CACHE_SECONDS = config('ADMIN_ANALYTICS_CACHE_SECONDS', default=300, cast=int)
+# Seconds to cache each user's announcement feed (academics/announcement_feed.py).
+# New announcements, dismissals and class changes invalidate it. 0 disables.
+ANNOUNCEMENT_FEED_CACHE_SECONDS = config('ANNOUNCEMENT_FEED_CACHE_SECONDS', default=300, cast=int)
+# Seconds to cache each school's timetable index (academics/timetable_index.py).
+# Timetable writes invalidate it. 0 rebuilds it on every lookup.
+TIMETABLE_INDEX_CACHE_SECONDS = config('TIMETABLE_INDEX_CACHE_SECONDS', default=3600, cast=int)
+# Seconds mark entries are coalesced before one batched at-risk alert evaluation
+# runs (academics/at_risk_alerts.py). 0 evaluates inline after each write.
+AT_RISK_EVALUATION_DELAY = config('AT_RISK_EVALUATION_DELAY', default=60, cast=int)
 
 # ---------------------------------------------------------------
 # drf-spectacular (Swagger / OpenAPI)
@@ -297,6 +336,53 @@ CELERY_TASK_DEFAULT_RETRY_DELAY = 30
 CELERY_TASK_SOFT_TIME_LIMIT = 300
 CELERY_TASK_TIME_LIMIT = 600
 
+# Periodic tasks (picked up by `celery beat`, incl. the django_celery_beat DatabaseScheduler)
+CELERY_BEAT_SCHEDULE = {
+    'warm-prediction-cache-nightly': {
+        'task': 'academics.tasks.warm_prediction_cache_task',
+        'schedule': crontab(hour=2, minute=30),
+    },
+}
+
+# Class-wide report card batches render PDFs in this many worker processes.
+# Keep at 1 under Celery's default prefork pool (daemonic workers cannot fork).
+REPORT_CARD_RENDER_PROCESSES = config('REPORT_CARD_RENDER_PROCESSES', default=1, cast=int)
+
+# Timetable generation (academics/timetable_generator.py): 'solver' runs
+# TIMETABLE_SOLVER_RESTARTS randomized restarts of the annealing solver, each
+# for TIMETABLE_SOLVER_ITERATIONS moves, across TIMETABLE_SOLVER_PROCESSES
+# forked workers (same fork caveat as report cards); 'greedy' is the legacy scheduler.
+TIMETABLE_GENERATOR_MODE = config('TIMETABLE_GENERATOR_MODE', default='solver')
+TIMETABLE_SOLVER_RESTARTS = config('TIMETABLE_SOLVER_RESTARTS', default=8, cast=int)
+TIMETABLE_SOLVER_ITERATIONS = config('TIMETABLE_SOLVER_ITERATIONS', default=20000, cast=int)
+TIMETABLE_SOLVER_PROCESSES = config('TIMETABLE_SOLVER_PROCESSES', default=1, cast=int)
+# A queued/running job with no progress for this long is treated as dead (lost
+# enqueue, worker killed); matches generate_timetable_task's hard time_limit.
+TIMETABLE_JOB_STALE_SECONDS = config('TIMETABLE_JOB_STALE_SECONDS', default=2100, cast=int)
+
+# Announcement parent emails: messages per provider batch (Resend max 100),
+# batches in flight, and per-batch retries with exponential backoff (seconds).
+ANNOUNCEMENT_EMAIL_BATCH_SIZE = config('ANNOUNCEMENT_EMAIL_BATCH_SIZE', default=100, cast=int)
+ANNOUNCEMENT_EMAIL_CONCURRENCY = config('ANNOUNCEMENT_EMAIL_CONCURRENCY', default=4, cast=int)
+ANNOUNCEMENT_EMAIL_RETRIES = config('ANNOUNCEMENT_EMAIL_RETRIES', default=3, cast=int)
+ANNOUNCEMENT_EMAIL_RETRY_DELAY = config('ANNOUNCEMENT_EMAIL_RETRY_DELAY', default=2.0, cast=float)
+
+# School-wide three-term invoicing (finances/billing_service.py) diffs and
+# writes this many students per transaction.
+BILLING_CHUNK_SIZE = config('BILLING_CHUNK_SIZE', default=500, cast=int)
+
+# Stored finance report snapshots (finances/report_snapshot.py) are served for
+# at most this many seconds; finance writes expire them sooner. 0 disables.
+FINANCE_SNAPSHOT_MAX_AGE_SECONDS = config('FINANCE_SNAPSHOT_MAX_AGE_SECONDS', default=900, cast=int)
+
+# Student/parent dashboard summaries (academics/dashboard_summary.py) are
+# recomputed after this many seconds even if no write invalidated them. 0 disables.
+DASHBOARD_SUMMARY_MAX_AGE_SECONDS = config('DASHBOARD_SUMMARY_MAX_AGE_SECONDS', default=3600, cast=int)
+
+# Keyset-paginated lists (School_system/pagination.py) count at most this many
+# rows for ?with_total=1 and flag the total as an estimate beyond it.
+KEYSET_TOTAL_CAP = config('KEYSET_TOTAL_CAP', default=10000, cast=int)
+
 # ---------------------------------------------------------------
 # Logging
 # ---------------------------------------------------------------
@@ -0,0 +1,32 @@
+"""
+Shared helpers for the apps' test suites. Imported by tests only, never by
+application code.
+"""
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryCountAssertionsMixin:
+    """TestCase mixin for list endpoints whose query count must not grow with rows."""
+
+    def assertQueryCountStable(self, fetch, grow):
+        """
+        Call fetch(), add rows with grow(), call fetch() again and assert both
+        calls ran the same number of queries. Returns that number.
+
+        Each counted fetch is preceded by an uncounted one so per-process
+        caches and one-off writes for new rows (invoice snapshots) settle first.
+        """
+        fetch()
+        with CaptureQueriesContext(connection) as before:
+            fetch()
+        grow()
+        fetch()
+        with CaptureQueriesContext(connection) as after:
+            fetch()
+        self.assertEqual(
+            len(before), len(after),
+            'Query count grew with the row count:\n' + '\n'.join(q['sql'] for q in after.captured_queries),
+        )
+        return len(after)
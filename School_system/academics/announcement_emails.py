@@ -0,0 +1,161 @@
+"""
+Background parent email fan-out for announcements.
+
+Posting a parent-facing announcement used to send one email per parent from
+the admin's request thread. The view now records an AnnouncementEmailDelivery
+and enqueues one Celery job, which:
+
+    1. resolves every recipient with a single query (one email per parent)
+    2. renders the branded email once and fills in the per-parent names
+    3. ships batches of ANNOUNCEMENT_EMAIL_BATCH_SIZE through
+       email_service._send_batch (Go batch endpoint or Resend /emails/batch),
+       at most ANNOUNCEMENT_EMAIL_CONCURRENCY batches in flight, each retried
+       ANNOUNCEMENT_EMAIL_RETRIES times with exponential backoff
+    4. records sent/failed counts on the delivery after every batch
+
+    delivery = queue_announcement_emails(announcement, school, posted_by)
+    run_announcement_delivery(delivery)   # usually via tasks.send_announcement_emails_task
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import AnnouncementEmailDelivery, ParentChildLink
+
+logger = logging.getLogger(__name__)
+
+PARENT_AUDIENCES = {'all', 'parent', 'parents'}
+
+
+def announcement_targets_parents(announcement):
+    audiences = set(announcement.target_audiences or [announcement.target_audience])
+    return bool(PARENT_AUDIENCES.intersection(audiences))
+
+
+def announcement_email_recipients(school):
+    """One dict per parent email with the first confirmed child's name and class."""
+    rows = ParentChildLink.objects.filter(
+        is_confirmed=True,
+        student__user__school=school,
+    ).order_by('parent_id', 'id').values_list(
+        'parent__user__email', 'parent__user__first_name', 'parent__user__last_name',
+        'student__user__first_name', 'student__user__last_name', 'student__student_class__name',
+    )
+    recipients, seen = [], set()
+    for email, parent_first, parent_last, student_first, student_last, class_name in rows.iterator():
+        if not email or email in seen:
+            continue
+        seen.add(email)
+        recipients.append({
+            'email': email,
+            'parent_name': f"{parent_first} {parent_last}".strip(),
+            'student_name': f"{student_first} {student_last}".strip(),
+            'class_name': class_name or "N/A",
+        })
+    return recipients
+
+
+def queue_announcement_emails(announcement, school, posted_by):
+    """Create the delivery record and enqueue the fan-out once the announcement is committed."""
+    from .tasks import send_announcement_emails_task
+
+    delivery = AnnouncementEmailDelivery.objects.create(
+        announcement=announcement, school=school, posted_by=posted_by[:255],
+    )
+    transaction.on_commit(lambda: send_announcement_emails_task.delay(delivery.id))
+    return delivery
+
+
+def _ship(batch, send_batch, retries, delay):
+    """Send one batch, retrying with exponential backoff. Returns (ok, error)."""
+    error = ''
+    for attempt in range(retries + 1):
+        try:
+            if send_batch(batch):
+                return True, ''
+            error = 'Email provider rejected the batch'
+        except Exception as exc:
+            error = str(exc)
+        if attempt < retries:
+            time.sleep(delay * (2 ** attempt))
+    return False, error
+
+
+def run_announcement_delivery(delivery, send_batch=None):
+    """Render and send all emails for a delivery, recording progress as batches finish."""
+    from email_service import (
+        RESEND_BATCH_LIMIT, _send_batch, personalize_announcement_email, render_announcement_email,
+    )
+
+    send_batch = send_batch or _send_batch
+    batch_size = max(1, min(int(getattr(settings, 'ANNOUNCEMENT_EMAIL_BATCH_SIZE', 100)), RESEND_BATCH_LIMIT))
+    concurrency = max(1, int(getattr(settings, 'ANNOUNCEMENT_EMAIL_CONCURRENCY', 4)))
+    retries = max(0, int(getattr(settings, 'ANNOUNCEMENT_EMAIL_RETRIES', 3)))
+    delay = float(getattr(settings, 'ANNOUNCEMENT_EMAIL_RETRY_DELAY', 2.0))
+
+    announcement = delivery.announcement
+    school = delivery.school
+    recipients = announcement_email_recipients(school)
+    subject, template_html = render_announcement_email(
+        school_name=school.name,
+        announcement_title=announcement.title,
+        announcement_body=announcement.content,
+        posted_by=delivery.posted_by,
+    )
+    batches = [
+        [
+            {
+                'to': [r['email']],
+                'subject': subject,
+                'html': personalize_announcement_email(template_html, **r),
+            }
+            for r in recipients[i:i + batch_size]
+        ]
+        for i in range(0, len(recipients), batch_size)
+    ]
+
+    delivery.status = 'running'
+    delivery.started_at = timezone.now()
+    delivery.total_recipients = len(recipients)
+    delivery.total_batches = len(batches)
+    delivery.sent_count = delivery.failed_count = delivery.completed_batches = 0
+    delivery.errors = []
+    delivery.save(update_fields=[
+        'status', 'started_at', 'total_recipients', 'total_batches',
+        'sent_count', 'failed_count', 'completed_batches', 'errors',
+    ])
+
+    errors = []
+    # Worker threads only talk to the email provider; progress is written
+    # from this thread as each batch completes.
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(batches) or 1)) as pool:
+        futures = {pool.submit(_ship, batch, send_batch, retries, delay): batch for batch in batches}
+        for future in as_completed(futures):
+            batch = futures[future]
+            ok, error = future.result()
+            if ok:
+                progress = {'sent_count': F('sent_count') + len(batch)}
+            else:
+                progress = {'failed_count': F('failed_count') + len(batch)}
+                errors.append({'recipients': [m['to'][0] for m in batch], 'error': error})
+                logger.error("Announcement %s email batch failed: %s", announcement.id, error)
+            AnnouncementEmailDelivery.objects.filter(id=delivery.id).update(
+                completed_batches=F('completed_batches') + 1, **progress,
+            )
+
+    delivery.refresh_from_db(fields=['sent_count', 'failed_count', 'completed_batches'])
+    delivery.errors = errors[:100]
+    delivery.status = 'failed' if recipients and not delivery.sent_count else 'done'
+    delivery.completed_at = timezone.now()
+    delivery.save(update_fields=['errors', 'status', 'completed_at'])
+    logger.info(
+        "Announcement %s emails: %s sent, %s failed in %s batches",
+        announcement.id, delivery.sent_count, delivery.failed_count, len(batches),
+    )
+    return delivery
@@ -0,0 +1,190 @@
+"""
+Announcement feed built from a precomputed audience index.
+
+The feed query used to OR together JSON `__contains` lookups for every
+audience alias, look up the user's classes (timetable scan for teachers,
+confirmed links for parents) and exclude dismissals, on every app open.
+Instead:
+
+    AnnouncementAudience    (announcement, school, role, target_class)
+
+holds one row per normalized audience role ('all', 'student', 'parent',
+'teacher', 'hr', ...) and is rewritten by Announcement.save(). The ordered
+list of visible announcement IDs is cached per user, so a warm feed read is
+one cache read plus one in_bulk:
+
+    announcements = announcement_feed(user)          # list, newest first
+    qs = announcement_feed_queryset(user)            # uncached queryset form
+
+Cached feeds are keyed by a per-school version. New, edited or deleted
+announcements and class membership changes (students, classes, parent links,
+generated timetables) bump the version; a dismissal drops only that user's
+entry. ANNOUNCEMENT_FEED_CACHE_SECONDS bounds staleness from anything else.
+"""
+
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+FULL_FEED_ROLES = ('admin', 'hr', 'superadmin')
+
+
+def normalize_audience(audience):
+    """'students' -> 'student'; the feed matches a role against either spelling."""
+    audience = (audience or '').strip().lower()
+    return audience[:-1] if audience.endswith('s') else audience
+
+
+def announcement_roles(announcement):
+    audiences = set(announcement.target_audiences or []) | {announcement.target_audience}
+    return {normalize_audience(a) for a in audiences if a}
+
+
+def sync_announcement_audience(announcement):
+    """Rewrite the audience index rows for one announcement."""
+    from .models import AnnouncementAudience
+
+    school_id = announcement.author.school_id
+    AnnouncementAudience.objects.filter(announcement=announcement).delete()
+    AnnouncementAudience.objects.bulk_create([
+        AnnouncementAudience(
+            announcement=announcement,
+            school_id=school_id,
+            role=role,
+            target_class_id=announcement.target_class_id,
+        )
+        for role in sorted(announcement_roles(announcement))
+    ])
+    invalidate_school_feeds(school_id)
+
+
+def _version_key(school_id):
+    return f'announcement_feed_version:{school_id}'
+
+
+def _feed_key(user, version):
+    return f'announcement_feed:{user.pk}:{version}'
+
+
+def invalidate_school_feeds(school_id):
+    """Expire every cached feed in a school."""
+    if not school_id:
+        return
+    try:
+        cache.set(_version_key(school_id), time.time_ns(), None)
+    except Exception as exc:
+        logger.warning("Announcement feed version bump failed for school %s: %s", school_id, exc)
+
+
+def invalidate_user_feed(user):
+    """Expire one user's cached feed (after a dismissal)."""
+    if not user.school_id:
+        return
+    try:
+        version = cache.get(_version_key(user.school_id), 0)
+        cache.delete(_feed_key(user, version))
+    except Exception as exc:
+        logger.warning("Announcement feed cache delete failed for user %s: %s", user.pk, exc)
+
+
+def _user_class_ids(user):
+    """Classes whose class-targeted announcements this user sees (None for everyone)."""
+    from .models import Class, ParentChildLink, Student, Teacher
+    from .timetable_index import timetable_index
+
+    if user.role == 'student':
+        try:
+            return [user.student.student_class_id]
+        except Student.DoesNotExist:
+            return []
+    if user.role == 'parent':
+        return list(
+            ParentChildLink.objects.filter(parent__user=user, is_confirmed=True)
+            .values_list('student__student_class_id', flat=True)
+        )
+    if user.role == 'teacher':
+        try:
+            teacher = user.teacher
+        except Teacher.DoesNotExist:
+            return []
+        return list(
+            set(Class.objects.filter(class_teacher=user).values_list('id', flat=True))
+            | timetable_index(user.school_id).classes_for_teacher(teacher.id)
+        )
+    return None
+
+
+def announcement_feed_queryset(user, include_dismissed=False):
+    """Announcements visible to a user, newest first."""
+    from .models import Announcement, AnnouncementAudience, AnnouncementDismissal
+
+    if not user.school_id:
+        return Announcement.objects.none()
+
+    queryset = Announcement.objects.filter(
+        is_active=True, author__school_id=user.school_id,
+    ).filter(
+        Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now())
+    ).select_related('author', 'target_class')
+
+    if user.role not in FULL_FEED_ROLES:
+        queryset = queryset.filter(id__in=AnnouncementAudience.objects.filter(
+            school_id=user.school_id, role__in=['all', normalize_audience(user.role)],
+        ).values('announcement_id'))
+
+    class_ids = _user_class_ids(user)
+    if class_ids is not None:
+        class_ids = [cid for cid in class_ids if cid]
+        if class_ids:
+            queryset = queryset.filter(Q(target_class__isnull=True) | Q(target_class_id__in=class_ids))
+        else:
+            queryset = queryset.filter(target_class__isnull=True)
+
+    if not include_dismissed:
+        queryset = queryset.exclude(
+            id__in=AnnouncementDismissal.objects.filter(user=user).values_list('announcement_id', flat=True)
+        )
+    return queryset.order_by('-date_posted')
+
+
+def announcement_feed_ids(user):
+    """Cached, ordered IDs of the announcements in a user's feed."""
+    ttl = int(getattr(settings, 'ANNOUNCEMENT_FEED_CACHE_SECONDS', 300) or 0)
+    if not ttl or not user.school_id:
+        return list(announcement_feed_queryset(user).values_list('id', flat=True))
+    try:
+        version = cache.get(_version_key(user.school_id), 0)
+        ids = cache.get(_feed_key(user, version))
+    except Exception as exc:
+        logger.warning("Announcement feed cache read failed for user %s: %s", user.pk, exc)
+        version, ids = None, None
+    if ids is None:
+        ids = list(announcement_feed_queryset(user).values_list('id', flat=True))
+        if version is not None:
+            try:
+                cache.set(_feed_key(user, version), ids, ttl)
+            except Exception as exc:
+                logger.warning("Announcement feed cache write failed for user %s: %s", user.pk, exc)
+    return ids
+
+
+def announcement_feed(user):
+    """The user's feed as Announcement objects, newest first."""
+    from .models import Announcement
+
+    ids = announcement_feed_ids(user)
+    if not ids:
+        return []
+    by_id = Announcement.objects.select_related('author', 'target_class').in_bulk(ids)
+    now = timezone.now()
+    # Expiry and deactivation are re-checked since the ID list may be cached.
+    return [
+        by_id[pk] for pk in ids
+        if pk in by_id and by_id[pk].is_active and (by_id[pk].expires_at is None or by_id[pk].expires_at > now)
+    ]
@@ -5,3 +5,6 @@ class AcademicsConfig(AppConfig):
     """Represents AcademicsConfig."""
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'academics'
+
+    def ready(self):
+        from . import signals  # noqa: F401
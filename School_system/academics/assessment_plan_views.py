@@ -11,6 +11,7 @@ from django.utils import timezone
 
 from .models import AssessmentPlan, Subject, Student, Parent, ParentChildLink, Teacher, Timetable, Class
 from .serializers import AssessmentPlanSerializer
+from .timetable_index import timetable_index
 from users.models import SchoolSettings
 
 
@@ -251,7 +252,7 @@ def plan_for_teacher(request):
 
     teaches_subject = (
         teacher.subjects_taught.filter(id=subject_id).exists()
-        or Timetable.objects.filter(teacher=teacher, subject_id=subject_id).exists()
+        or timetable_index(user.school_id).teaches_subject(teacher.id, subject_id)
     )
     if not teaches_subject:
         return Response({'error': 'You do not teach this subject'}, status=status.HTTP_403_FORBIDDEN)
@@ -262,9 +263,7 @@ def plan_for_teacher(request):
             class_id_int = int(class_id)
         except ValueError:
             return Response({'error': 'class_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
-        authorised_ids = set(
-            Timetable.objects.filter(teacher=teacher, subject_id=subject_id).values_list('class_assigned_id', flat=True)
-        )
+        authorised_ids = timetable_index(user.school_id).classes_for_teacher(teacher.id, subject_id)
         authorised_ids.update(Class.objects.filter(class_teacher=user).values_list('id', flat=True))
         authorised_ids.update(teacher.teaching_classes.values_list('id', flat=True))
         if class_id_int not in authorised_ids:
@@ -4,17 +4,41 @@ At-risk alert detection and notification service.
 Usage:
     from .at_risk_alerts import check_and_alert_at_risk
     check_and_alert_at_risk(student, subject=subject_obj)
+
+    # Whole class / school: one prediction pass and one alert lookup
+    from .at_risk_alerts import check_and_alert_at_risk_for_students
+    check_and_alert_at_risk_for_students(students)
+
+    # Result write paths: queue the touched student/subject pairs. Marks
+    # entered within AT_RISK_EVALUATION_DELAY seconds are coalesced into one
+    # evaluate_at_risk_task run per school (drain_at_risk_queue), which
+    # predicts only the queued pairs, reads their alerts in one query, writes
+    # alerts with bulk_create/bulk_update and sends one notification burst.
+    from .at_risk_alerts import queue_at_risk_evaluation
+    queue_at_risk_evaluation([(result.student_id, result.subject_id)], school_id)
 """
 
 import logging
-from django.utils import timezone
-from django.core.mail import send_mail
+from collections import defaultdict
+
 from django.conf import settings
-from .models import AtRiskAlert, Result, Student
-from .ml_predictions import predict_student_grades
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection, send_mail
+from django.db import transaction
+from django.utils import timezone
+
+from .ml_predictions import predict_grades_for_students
+from .models import AtRiskAlert, PendingAtRiskEvaluation, Result, Student
+from .prediction_cache import get_cached_predictions, get_cached_student_predictions
 
 logger = logging.getLogger(__name__)
 
+ACTIVE_ALERT_STATUSES = ('new', 'acknowledged', 'intervention_scheduled')
+ALERT_UPDATE_FIELDS = [
+    'current_grade', 'predicted_grade', 'predicted_percentage', 'trend', 'confidence',
+    'intervention_plan', 'status', 'resolved_at', 'updated_at',
+]
+
 
 def check_and_alert_at_risk(student, subject=None):
     """
@@ -28,67 +52,304 @@ def check_and_alert_at_risk(student, subject=None):
     if not isinstance(student, Student):
         logger.error(f"check_and_alert_at_risk: Invalid student type {type(student)}")
         return
-    
+    check_and_alert_at_risk_for_students([student], subject=subject)
+
+
+def check_and_alert_at_risk_for_students(students, subject=None):
+    """
+    Batch form of check_and_alert_at_risk.
+
+    Predictions come from the prediction cache (stale students recomputed in
+    one vectorized pass) and existing active alerts from one query.
+
+    Args:
+        students: iterable of Student instances (select_related('user') recommended)
+        subject: Optional Subject instance to check only one subject
+    """
+    students = list(students)
+    if not students:
+        return
     try:
-        predictions = predict_student_grades(student)
-        
-        if subject:
-            predictions = [p for p in predictions if p['subject_id'] == subject.id]
-        
-        for pred in predictions:
-            current_at_risk = pred['at_risk']
-            subject_id = pred['subject_id']
-            
-            # Check for existing active alert
-            existing_alert = AtRiskAlert.objects.filter(
-                student=student,
-                subject_id=subject_id,
-                status__in=['new', 'acknowledged', 'intervention_scheduled']
-            ).first()
-            
-            if current_at_risk:
-                # Student is at risk
-                if not existing_alert:
-                    # Create new alert
-                    trigger_type = 'current_failing' if pred['current_percentage'] < 50 else 'prediction_fail'
-                    if pred['predicted_at_risk']:
-                        trigger_type = 'prediction_fail'
-                    
-                    alert = AtRiskAlert.objects.create(
-                        student=student,
-                        subject_id=subject_id,
-                        triggered_by=trigger_type,
-                        current_grade=pred['current_grade'],
-                        predicted_grade=pred['predicted_grade'],
-                        predicted_percentage=pred['predicted_percentage'],
-                        trend=pred['trend'],
-                        confidence=pred['confidence'],
-                        intervention_plan=pred['intervention'],
-                        school=student.user.school
-                    )
-                    logger.info(f"Created new at-risk alert for {student.user.full_name} in {pred['subject']}")
-                    notify_at_risk(alert, student, pred)
-                else:
-                    # Update existing alert
-                    existing_alert.current_grade = pred['current_grade']
-                    existing_alert.predicted_grade = pred['predicted_grade']
-                    existing_alert.predicted_percentage = pred['predicted_percentage']
-                    existing_alert.trend = pred['trend']
-                    existing_alert.confidence = pred['confidence']
-                    existing_alert.intervention_plan = pred['intervention']
-                    existing_alert.updated_at = timezone.now()
-                    existing_alert.save()
-                    logger.info(f"Updated at-risk alert for {student.user.full_name} in {pred['subject']}")
+        subject_id = subject.id if subject else None
+        predictions_by_student = get_cached_predictions(students)
+
+        active_alerts = AtRiskAlert.objects.filter(
+            student__in=students,
+            status__in=ACTIVE_ALERT_STATUSES,
+        )
+        if subject_id is not None:
+            active_alerts = active_alerts.filter(subject_id=subject_id)
+        existing = {}
+        for alert in active_alerts:
+            existing.setdefault((alert.student_id, alert.subject_id), alert)
+
+        for student in students:
+            for pred in predictions_by_student.get(student.id, []):
+                if subject_id is not None and pred['subject_id'] != subject_id:
+                    continue
+                _apply_prediction(student, pred, existing.get((student.id, pred['subject_id'])))
+
+    except Exception as e:
+        logger.error(f"Error in check_and_alert_at_risk for students {[s.id for s in students][:20]}: {str(e)}")
+
+
+def _trigger_type(pred):
+    if pred['predicted_at_risk'] or pred['current_percentage'] >= 50:
+        return 'prediction_fail'
+    return 'current_failing'
+
+
+def _refresh_alert(alert, pred):
+    alert.current_grade = pred['current_grade']
+    alert.predicted_grade = pred['predicted_grade']
+    alert.predicted_percentage = pred['predicted_percentage']
+    alert.trend = pred['trend']
+    alert.confidence = pred['confidence']
+    alert.intervention_plan = pred['intervention']
+    alert.updated_at = timezone.now()
+
+
+def _new_alert(student_id, school_id, pred):
+    return AtRiskAlert(
+        student_id=student_id,
+        subject_id=pred['subject_id'],
+        triggered_by=_trigger_type(pred),
+        current_grade=pred['current_grade'],
+        predicted_grade=pred['predicted_grade'],
+        predicted_percentage=pred['predicted_percentage'],
+        trend=pred['trend'],
+        confidence=pred['confidence'],
+        intervention_plan=pred['intervention'],
+        school_id=school_id,
+    )
+
+
+def _apply_prediction(student, pred, existing_alert):
+    """Create, update, or resolve the alert for one student/subject prediction."""
+    if pred['at_risk']:
+        if not existing_alert:
+            alert = _new_alert(student.id, student.user.school_id, pred)
+            alert.save()
+            logger.info(f"Created new at-risk alert for {student.user.full_name} in {pred['subject']}")
+            notify_at_risk(alert, student, pred)
+        else:
+            _refresh_alert(existing_alert, pred)
+            existing_alert.save()
+            logger.info(f"Updated at-risk alert for {student.user.full_name} in {pred['subject']}")
+    else:
+        # Student recovered
+        if existing_alert and existing_alert.status != 'resolved':
+            existing_alert.status = 'resolved'
+            existing_alert.resolved_at = timezone.now()
+            existing_alert.save()
+            logger.info(f"Resolved at-risk alert for {student.user.full_name} in {pred['subject']}")
+
+
+def _scheduled_key(school_id):
+    return f'at_risk_evaluation_scheduled:{school_id}'
+
+
+def queue_at_risk_evaluation(pairs, school_id):
+    """
+    Queue (student_id, subject_id) pairs touched by a Result write for a
+    coalesced at-risk evaluation. The first write in a window schedules
+    evaluate_at_risk_task; later ones only add rows to the queue.
+    """
+    pairs = {(student_id, subject_id) for student_id, subject_id in pairs if student_id and subject_id}
+    if not pairs:
+        return
+    PendingAtRiskEvaluation.objects.bulk_create(
+        [PendingAtRiskEvaluation(school_id=school_id, student_id=st, subject_id=su) for st, su in pairs],
+        ignore_conflicts=True,
+    )
+    transaction.on_commit(lambda: _schedule_evaluation(school_id))
+
+
+def _schedule_evaluation(school_id):
+    delay = int(getattr(settings, 'AT_RISK_EVALUATION_DELAY', 60) or 0)
+    if delay <= 0:
+        drain_at_risk_queue(school_id)
+        return
+    try:
+        if not cache.add(_scheduled_key(school_id), 1, delay * 2):
+            return
+        from .tasks import evaluate_at_risk_task
+        evaluate_at_risk_task.apply_async(args=[school_id], countdown=delay)
+    except Exception as exc:
+        # The pairs stay queued; the next mark entry schedules them again.
+        logger.warning("Could not schedule at-risk evaluation for school %s: %s", school_id, exc)
+
+
+def drain_at_risk_queue(school_id):
+    """Evaluate every queued pair for a school in one batch. Returns the number of pairs."""
+    # Cleared first so marks entered while this run evaluates schedule a new one.
+    cache.delete(_scheduled_key(school_id))
+    with transaction.atomic():
+        rows = list(
+            PendingAtRiskEvaluation.objects.select_for_update()
+            .filter(school_id=school_id)
+            .values_list('id', 'student_id', 'subject_id')
+        )
+        if not rows:
+            return 0
+        PendingAtRiskEvaluation.objects.filter(id__in=[row[0] for row in rows]).delete()
+        created = evaluate_at_risk_pairs({(student_id, subject_id) for _, student_id, subject_id in rows})
+    notify_at_risk_batch(created)
+    return len(rows)
+
+
+def evaluate_at_risk_pairs(pairs):
+    """
+    Re-evaluate alerts for specific (student_id, subject_id) pairs.
+
+    One prediction query per subject, one alert query and one student query
+    for the whole batch; alerts are written with bulk_create/bulk_update.
+    Returns [(alert, prediction), ...] for newly created alerts so the caller
+    can notify once the batch is committed.
+    """
+    pairs = set(pairs)
+    student_ids_by_subject = defaultdict(set)
+    for student_id, subject_id in pairs:
+        student_ids_by_subject[subject_id].add(student_id)
+
+    predictions = {}
+    for subject_id, student_ids in student_ids_by_subject.items():
+        for student_id, preds in predict_grades_for_students(list(student_ids), subject_id=subject_id).items():
+            predictions[(student_id, subject_id)] = preds[0]
+
+    school_of = dict(
+        Student.objects.filter(id__in={student_id for student_id, _ in pairs})
+        .values_list('id', 'user__school_id')
+    )
+    existing = {}
+    for alert in AtRiskAlert.objects.filter(
+        student_id__in=school_of,
+        subject_id__in=student_ids_by_subject,
+        status__in=ACTIVE_ALERT_STATUSES,
+    ):
+        existing.setdefault((alert.student_id, alert.subject_id), alert)
+
+    created, changed = [], []
+    now = timezone.now()
+    for pair in pairs:
+        pred = predictions.get(pair)
+        if pred is None or pair[0] not in school_of:
+            continue
+        alert = existing.get(pair)
+        if pred['at_risk']:
+            if alert:
+                _refresh_alert(alert, pred)
+                changed.append(alert)
             else:
-                # Student recovered
-                if existing_alert and existing_alert.status != 'resolved':
-                    existing_alert.status = 'resolved'
-                    existing_alert.resolved_at = timezone.now()
-                    existing_alert.save()
-                    logger.info(f"Resolved at-risk alert for {student.user.full_name} in {pred['subject']}")
-    
+                created.append((_new_alert(pair[0], school_of[pair[0]], pred), pred))
+        elif alert:
+            alert.status = 'resolved'
+            alert.resolved_at = now
+            alert.updated_at = now
+            changed.append(alert)
+
+    AtRiskAlert.objects.bulk_create([alert for alert, _ in created], batch_size=500)
+    AtRiskAlert.objects.bulk_update(changed, ALERT_UPDATE_FIELDS, batch_size=500)
+    logger.info(
+        "At-risk evaluation of %s pairs: %s created, %s updated/resolved",
+        len(pairs), len(created), len(changed),
+    )
+    return created
+
+
+def _alert_message(student, subject_name, prediction):
+    return f"""
+Alert: {student.user.full_name} ({student.user.student_number})
+Subject: {subject_name}
+
+Current Performance:
+  Grade: {prediction['current_grade']}
+  Percentage: {prediction['current_percentage']:.1f}%
+  
+Predicted Performance:
+  Grade: {prediction['predicted_grade']}
+  Percentage: {prediction['predicted_percentage']:.1f}%
+
+Trend: {prediction['trend'].title()}
+Confidence: {prediction['confidence'].title()}
+
+Recommendation:
+{prediction['intervention']}
+
+Please take action immediately.
+        """
+
+
+def notify_at_risk_batch(created):
+    """
+    Notify teachers, parents and admins about newly created alerts.
+
+    Recipients for the whole batch come from three queries and every email
+    goes out over a single mail connection; notification flags are saved
+    with one bulk_update.
+    """
+    created = [(alert, pred) for alert, pred in created if alert.pk]
+    if not created:
+        return
+    try:
+        from academics.models import Parent, Teacher
+        from users.models import CustomUser
+
+        students = Student.objects.select_related('user').in_bulk({alert.student_id for alert, _ in created})
+        subject_ids = {alert.subject_id for alert, _ in created}
+
+        teacher_email = {}
+        for subject_id, email in (
+            Teacher.subjects_taught.through.objects.filter(subject_id__in=subject_ids)
+            .order_by('teacher_id').values_list('subject_id', 'teacher__user__email')
+        ):
+            teacher_email.setdefault(subject_id, email)
+        parent_emails = defaultdict(list)
+        for student_id, email in (
+            Parent.children.through.objects.filter(student_id__in=students)
+            .values_list('student_id', 'parent__user__email')
+        ):
+            if email:
+                parent_emails[student_id].append(email)
+        admin_email = {}
+        for school_id, email in (
+            CustomUser.objects.filter(school_id__in={alert.school_id for alert, _ in created}, role='admin')
+            .order_by('id').values_list('school_id', 'email')
+        ):
+            admin_email.setdefault(school_id, email)
+
+        outgoing = []
+        for alert, pred in created:
+            student = students.get(alert.student_id)
+            if student is None:
+                continue
+            message = _alert_message(student, pred['subject'], pred)
+            staff_subject = f"At-Risk Alert: {student.user.full_name} - {pred['subject']}"
+            if teacher_email.get(alert.subject_id):
+                outgoing.append((alert, 'notified_teacher', staff_subject, message, [teacher_email[alert.subject_id]]))
+            if parent_emails.get(student.id):
+                outgoing.append((alert, 'notified_parent', f"Academic Alert: {student.user.full_name}", message, parent_emails[student.id]))
+            if admin_email.get(alert.school_id):
+                outgoing.append((alert, 'notified_admin', staff_subject, message, [admin_email[alert.school_id]]))
+
+        connection = get_connection(fail_silently=False)
+        with connection:
+            for alert, flag, subject, body, recipients in outgoing:
+                try:
+                    connection.send_messages([
+                        EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, recipients, connection=connection)
+                    ])
+                    setattr(alert, flag, True)
+                except Exception as e:
+                    logger.error(f"Failed to send at-risk notification for alert {alert.id}: {str(e)}")
+
+        AtRiskAlert.objects.bulk_update(
+            [alert for alert, _ in created], ['notified_teacher', 'notified_parent', 'notified_admin'],
+        )
+        logger.info("Sent %s at-risk notifications for %s new alerts", len(outgoing), len(created))
+
     except Exception as e:
-        logger.error(f"Error in check_and_alert_at_risk for student {student.id}: {str(e)}")
+        logger.error(f"Error in notify_at_risk_batch: {str(e)}")
 
 
 def notify_at_risk(alert, student, prediction):
@@ -124,26 +385,7 @@ def notify_at_risk(alert, student, prediction):
         # Get admin
         admin = CustomUser.objects.filter(school=school, role='admin').first()
         
-        message = f"""
-Alert: {student.user.full_name} ({student.student_number})
-Subject: {subject_obj.name if subject_obj else 'Overall'}
-
-Current Performance:
-  Grade: {prediction['current_grade']}
-  Percentage: {prediction['current_percentage']:.1f}%
-  
-Predicted Performance:
-  Grade: {prediction['predicted_grade']}
-  Percentage: {prediction['predicted_percentage']:.1f}%
-
-Trend: {prediction['trend'].title()}
-Confidence: {prediction['confidence'].title()}
-
-Recommendation:
-{prediction['intervention']}
-
-Please take action immediately.
-        """
+        message = _alert_message(student, subject_obj.name if subject_obj else 'Overall', prediction)
         
         # Notify teacher
         if teacher_user and teacher_user.email and not alert.notified_teacher:
@@ -198,6 +440,33 @@ Please take action immediately.
         logger.error(f"Error in notify_at_risk: {str(e)}")
 
 
+def risk_score_from_predictions(predictions):
+    """
+    Overall at-risk score (0-100) from a student's prediction list.
+    Higher score = more at risk.
+    """
+    if not predictions:
+        return 0.0
+
+    at_risk_count = sum(1 for p in predictions if p['at_risk'])
+    total_subjects = len(predictions)
+
+    # Base score: % of subjects where student is at risk
+    base_score = (at_risk_count / total_subjects * 100) if total_subjects > 0 else 0
+
+    # Factor in confidence: lower confidence = lower risk weight
+    confidence_weights = {'high': 1.0, 'medium': 0.7, 'low': 0.4}
+    weighted_score = 0
+
+    for pred in predictions:
+        if pred['at_risk']:
+            weight = confidence_weights.get(pred['confidence'], 0.5)
+            weighted_score += weight * (100 / total_subjects)
+
+    # Average base and weighted score
+    return (base_score + weighted_score) / 2
+
+
 def get_student_risk_score(student):
     """
     Calculate overall at-risk score (0-100) for a student across all subjects.
@@ -207,28 +476,8 @@ def get_student_risk_score(student):
         float: Risk score 0-100
     """
     try:
-        predictions = predict_student_grades(student)
-        
-        if not predictions:
-            return 0.0
-        
-        at_risk_count = sum(1 for p in predictions if p['at_risk'])
-        total_subjects = len(predictions)
-        
-        # Base score: % of subjects where student is at risk
-        base_score = (at_risk_count / total_subjects * 100) if total_subjects > 0 else 0
-        
-        # Factor in confidence: lower confidence = lower risk weight
-        confidence_weights = {'high': 1.0, 'medium': 0.7, 'low': 0.4}
-        weighted_score = 0
-        
-        for pred in predictions:
-            if pred['at_risk']:
-                weight = confidence_weights.get(pred['confidence'], 0.5)
-                weighted_score += weight * (100 / total_subjects)
-        
-        # Average base and weighted score
-        return (base_score + weighted_score) / 2
+        predictions = get_cached_student_predictions(student)
+        return risk_score_from_predictions(predictions)
     
     except Exception as e:
         logger.error(f"Error calculating risk score for student {student.id}: {str(e)}")
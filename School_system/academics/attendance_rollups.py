@@ -0,0 +1,253 @@
+"""
+Materialized attendance rollups.
+
+Attendance rates used to be computed by scanning ClassAttendance /
+SubjectAttendance rows on every request. Two summary tables are kept instead:
+
+    AttendanceDailyRollup       (class, date, kind)    -> present/absent/late/excused
+    StudentAttendanceMonthly    (student, month, kind) -> present/absent/late/excused/bunked
+
+kind is 'class' for daily class attendance and 'subject' for period
+attendance. Write paths call refresh_rollups_for_records() inside the same
+transaction as the raw writes; the affected rows are recomputed from the raw
+tables (a handful of grouped queries) and upserted, so repeated or concurrent
+refreshes converge on the same counts. Refreshed students' dashboard
+summaries are marked stale:
+
+    with transaction.atomic():
+        ...create/update ClassAttendance rows...
+        refresh_rollups_for_records('class', records)
+
+    summary = student_attendance_summary([student.id])[student.id]
+    by_day = school_daily_attendance(school, start_date, end_date)
+
+`python manage.py backfill_attendance_rollups` rebuilds the tables from the
+raw records.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import (
+    AttendanceDailyRollup,
+    Class,
+    ClassAttendance,
+    StudentAttendanceMonthly,
+    StudentDashboardSummary,
+    SubjectAttendance,
+)
+from .dashboard_summary import invalidate_school_summaries, invalidate_student_summaries
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ('present', 'absent', 'late', 'excused')
+KINDS = ('class', 'subject')
+BATCH_SIZE = 1000
+
+
+def _source(kind):
+    return ClassAttendance if kind == 'class' else SubjectAttendance
+
+
+def _status_counts(kind):
+    counts = {name: Count('id', filter=Q(status=name)) for name in STATUSES}
+    if kind == 'subject':
+        counts['bunked'] = Count('id', filter=Q(bunk_flag=True))
+    return counts
+
+
+def _month_start(day):
+    return day.replace(day=1)
+
+
+def _next_month(month):
+    return date(month.year + 1, 1, 1) if month.month == 12 else date(month.year, month.month + 1, 1)
+
+
+def _upsert_daily(kind, rows, school_by_class):
+    objs = [
+        AttendanceDailyRollup(
+            school_id=school_by_class.get(row['class_assigned_id']),
+            class_assigned_id=row['class_assigned_id'],
+            date=row['date'],
+            kind=kind,
+            **{name: row.get(name, 0) for name in STATUSES},
+        )
+        for row in rows
+    ]
+    AttendanceDailyRollup.objects.bulk_create(
+        objs, batch_size=BATCH_SIZE, update_conflicts=True,
+        unique_fields=['class_assigned', 'date', 'kind'],
+        update_fields=['school', *STATUSES, 'updated_at'],
+    )
+
+
+def _upsert_monthly(kind, rows):
+    objs = [
+        StudentAttendanceMonthly(
+            student_id=row['student_id'],
+            month=row['month'],
+            kind=kind,
+            bunked=row.get('bunked', 0),
+            **{name: row.get(name, 0) for name in STATUSES},
+        )
+        for row in rows
+    ]
+    StudentAttendanceMonthly.objects.bulk_create(
+        objs, batch_size=BATCH_SIZE, update_conflicts=True,
+        unique_fields=['student', 'month', 'kind'],
+        update_fields=[*STATUSES, 'bunked', 'updated_at'],
+    )
+
+
+def refresh_attendance_rollups(kind, class_days=(), student_days=()):
+    """
+    Recompute rollups from the raw records.
+
+    class_days: iterable of (class_id, date) whose daily rollup changed.
+    student_days: iterable of (student_id, date) whose month counters changed.
+    """
+    source = _source(kind)
+
+    classes_by_day = defaultdict(set)
+    for class_id, day in class_days:
+        if class_id and day:
+            classes_by_day[day].add(class_id)
+    if classes_by_day:
+        all_class_ids = set().union(*classes_by_day.values())
+        school_by_class = dict(Class.objects.filter(id__in=all_class_ids).values_list('id', 'school_id'))
+        rows = []
+        for day, class_ids in classes_by_day.items():
+            counted = {
+                row['class_assigned_id']: row
+                for row in source.objects.filter(date=day, class_assigned_id__in=class_ids)
+                .order_by().values('class_assigned_id').annotate(**_status_counts('class'))
+            }
+            # Classes with no remaining records are written as zero rows.
+            rows += [counted.get(cid, {'class_assigned_id': cid}) | {'date': day} for cid in class_ids]
+        _upsert_daily(kind, rows, school_by_class)
+
+    students_by_month = defaultdict(set)
+    for student_id, day in student_days:
+        if student_id and day:
+            students_by_month[_month_start(day)].add(student_id)
+    rows = []
+    for month, student_ids in students_by_month.items():
+        counted = {
+            row['student_id']: row
+            for row in source.objects.filter(
+                student_id__in=student_ids, date__gte=month, date__lt=_next_month(month),
+            ).order_by().values('student_id').annotate(**_status_counts(kind))
+        }
+        rows += [counted.get(sid, {'student_id': sid}) | {'month': month} for sid in student_ids]
+    if rows:
+        _upsert_monthly(kind, rows)
+        invalidate_student_summaries({row['student_id'] for row in rows})
+
+
+def refresh_rollups_for_records(kind, records, extra_class_days=()):
+    """Refresh the rollups touched by these ClassAttendance/SubjectAttendance rows."""
+    records = list(records)
+    refresh_attendance_rollups(
+        kind,
+        class_days={(r.class_assigned_id, r.date) for r in records} | set(extra_class_days),
+        student_days={(r.student_id, r.date) for r in records},
+    )
+
+
+def rebuild_attendance_rollups(school=None, kind=None, start=None, end=None):
+    """
+    Rebuild rollups from scratch for a school (or all schools), optionally
+    limited to a date range. Month counters are rebuilt for whole months.
+    Returns {'daily': rows, 'monthly': rows}.
+    """
+    written = {'daily': 0, 'monthly': 0}
+    for current in ([kind] if kind else KINDS):
+        source = _source(current)
+        month_from = _month_start(start) if start else None
+        month_to = _next_month(_month_start(end)) if end else None
+
+        daily_raw = monthly_raw = source.objects.all()
+        daily_existing = AttendanceDailyRollup.objects.filter(kind=current)
+        monthly_existing = StudentAttendanceMonthly.objects.filter(kind=current)
+        if school is not None:
+            daily_raw = daily_raw.filter(class_assigned__school=school)
+            daily_existing = daily_existing.filter(class_assigned__school=school)
+            monthly_raw = monthly_raw.filter(student__user__school=school)
+            monthly_existing = monthly_existing.filter(student__user__school=school)
+
+        if start:
+            daily_raw = daily_raw.filter(date__gte=start)
+            daily_existing = daily_existing.filter(date__gte=start)
+            monthly_raw = monthly_raw.filter(date__gte=month_from)
+            monthly_existing = monthly_existing.filter(month__gte=month_from)
+        if end:
+            daily_raw = daily_raw.filter(date__lte=end)
+            daily_existing = daily_existing.filter(date__lte=end)
+            monthly_raw = monthly_raw.filter(date__lt=month_to)
+            monthly_existing = monthly_existing.filter(month__lt=month_to)
+
+        with transaction.atomic():
+            daily_existing.delete()
+            monthly_existing.delete()
+
+            daily_rows = list(
+                daily_raw.order_by().values('class_assigned_id', 'class_assigned__school_id', 'date')
+                .annotate(**_status_counts('class'))
+            )
+            school_by_class = {row['class_assigned_id']: row['class_assigned__school_id'] for row in daily_rows}
+            _upsert_daily(current, daily_rows, school_by_class)
+
+            monthly_rows = list(
+                monthly_raw.order_by().annotate(month=TruncMonth('date'))
+                .values('student_id', 'month').annotate(**_status_counts(current))
+            )
+            _upsert_monthly(current, monthly_rows)
+
+        written['daily'] += len(daily_rows)
+        written['monthly'] += len(monthly_rows)
+    if school is not None:
+        invalidate_school_summaries(school.id)
+    else:
+        StudentDashboardSummary.objects.update(version=F('version') + 1)
+    return written
+
+
+def student_attendance_summary(student_ids, kind='class'):
+    """
+    Return {student_id: {'present', 'absent', 'late', 'excused', 'bunked', 'total'}}
+    summed over all months. Students without attendance get zeros.
+    """
+    student_ids = list(student_ids)
+    summary = {
+        sid: {name: 0 for name in (*STATUSES, 'bunked', 'total')}
+        for sid in student_ids
+    }
+    rows = (
+        StudentAttendanceMonthly.objects.filter(student_id__in=student_ids, kind=kind)
+        .order_by().values('student_id')
+        .annotate(**{name: Sum(name) for name in (*STATUSES, 'bunked')})
+    )
+    for row in rows:
+        counts = {name: row[name] or 0 for name in (*STATUSES, 'bunked')}
+        counts['total'] = sum(counts[name] for name in STATUSES)
+        summary[row['student_id']] = counts
+    return summary
+
+
+def school_daily_attendance(school, start, end=None, kind='class'):
+    """Return {date: {'total', 'present', 'absent', 'late', 'excused'}} for a school's classes."""
+    qs = AttendanceDailyRollup.objects.filter(school=school, kind=kind, date__gte=start)
+    if end:
+        qs = qs.filter(date__lte=end)
+    by_day = {}
+    for row in qs.order_by().values('date').annotate(**{name: Sum(name) for name in STATUSES}):
+        counts = {name: row[name] or 0 for name in STATUSES}
+        counts['total'] = sum(counts.values())
+        by_day[row['date']] = counts
+    return by_day
@@ -0,0 +1,162 @@
+"""
+Batched writer for teacher attendance registers.
+
+Marking a register used to cost a Student lookup and an INSERT per learner
+(plus a daily-status and a permission lookup per learner for period
+attendance). A register is now validated and written with a fixed number
+of queries whatever its size:
+
+    1. the submitted student IDs, resolved in one query
+    2. approved AttendancePermission rows for the whole register (period only)
+    3. same-day ClassAttendance statuses for bunk detection (period only)
+    4. one bulk_create, followed by the rollup refresh, in one transaction
+
+    created, errors = write_class_register(the_class, day, entries, request.user)
+
+Entries are the dicts posted by the teacher UI ({'student_id', 'status',
+'remarks'}). Invalid entries are skipped and reported in `errors`, in
+submission order, exactly as the per-row loop did. RegisterAlreadySubmitted
+is raised when a concurrent submission for the same register won the race.
+"""
+
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .attendance_rollups import refresh_rollups_for_records
+from .models import AttendancePermission, ClassAttendance, Student, SubjectAttendance
+
+logger = logging.getLogger(__name__)
+
+VALID_STATUSES = {'present', 'absent', 'late', 'excused'}
+BULK_BATCH_SIZE = 500
+BUNK_REASON = 'Absent during period without approved permission'
+
+
+class RegisterAlreadySubmitted(Exception):
+    """Another submission already stored attendance for this register."""
+
+
+def _as_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def validate_register(entries, class_id, not_in_class_message):
+    """
+    Check every entry with one student query.
+    Returns ([(student_id, status, remarks), ...], errors).
+    """
+    wanted = {_as_id(item.get('student_id')) for item in entries if isinstance(item, dict)}
+    wanted.discard(None)
+    class_of = dict(Student.objects.filter(id__in=wanted).values_list('id', 'student_class_id'))
+
+    rows, errors, seen = [], [], set()
+    for item in entries:
+        if not isinstance(item, dict):
+            errors.append('Missing student_id or status for an entry')
+            continue
+        student_id = item.get('student_id')
+        status_value = item.get('status')
+        if not student_id or not status_value:
+            errors.append('Missing student_id or status for an entry')
+            continue
+        if status_value not in VALID_STATUSES:
+            errors.append(f"Invalid status '{status_value}' for student {student_id}")
+            continue
+        sid = _as_id(student_id)
+        if sid not in class_of:
+            errors.append(f'Student with ID {student_id} not found')
+            continue
+        if class_of[sid] != class_id:
+            errors.append(not_in_class_message.format(student_id=student_id))
+            continue
+        if sid in seen:
+            errors.append(f'Duplicate entry for student {student_id}')
+            continue
+        seen.add(sid)
+        rows.append((sid, status_value, item.get('remarks', '') or ''))
+    return rows, errors
+
+
+def _bulk_insert(model, objs, kind):
+    try:
+        with transaction.atomic():
+            created = model.objects.bulk_create(objs, batch_size=BULK_BATCH_SIZE)
+            refresh_rollups_for_records(kind, created)
+    except IntegrityError as exc:
+        logger.info("Attendance register insert conflicted: %s", exc)
+        raise RegisterAlreadySubmitted() from exc
+    return created
+
+
+def write_class_register(the_class, attendance_date, entries, recorded_by):
+    """Validate and insert a daily class register. Returns (created, errors)."""
+    rows, errors = validate_register(entries, the_class.id, 'Student {student_id} is not in your class')
+    objs = [
+        ClassAttendance(
+            student_id=sid,
+            class_assigned=the_class,
+            date=attendance_date,
+            status=status_value,
+            remarks=remarks,
+            recorded_by=recorded_by,
+        )
+        for sid, status_value, remarks in rows
+    ]
+    return _bulk_insert(ClassAttendance, objs, 'class'), errors
+
+
+def approved_permission_students(student_ids, the_class, attendance_date, period_number):
+    """IDs of students with an approved permission covering this date (and period)."""
+    qs = AttendancePermission.objects.filter(
+        student_id__in=student_ids,
+        class_assigned=the_class,
+        date=attendance_date,
+        approved=True,
+    )
+    if period_number is not None:
+        qs = qs.filter(Q(period_number=period_number) | Q(period_number__isnull=True))
+    return set(qs.values_list('student_id', flat=True))
+
+
+def write_subject_register(the_class, the_subject, attendance_date, entries, recorded_by,
+                           period_number=None, period_label='', period_rules_active=False):
+    """Validate and insert a subject/period register. Returns (created, errors)."""
+    rows, errors = validate_register(entries, the_class.id, 'Student {student_id} is not in this class')
+    student_ids = [sid for sid, _, _ in rows]
+    permitted = approved_permission_students(student_ids, the_class, attendance_date, period_number) if rows else set()
+
+    daily_status = {}
+    if period_rules_active and any(status_value == 'absent' for _, status_value, _ in rows):
+        daily_status = dict(
+            ClassAttendance.objects.filter(student_id__in=student_ids, date=attendance_date)
+            .values_list('student_id', 'status')
+        )
+
+    objs = []
+    for sid, status_value, remarks in rows:
+        has_permission = sid in permitted
+        # Bunking: absent from the period after being marked in for the day.
+        bunk_flag = (
+            period_rules_active and status_value == 'absent' and not has_permission
+            and daily_status.get(sid) in ('present', 'late')
+        )
+        objs.append(SubjectAttendance(
+            student_id=sid,
+            class_assigned=the_class,
+            subject=the_subject,
+            date=attendance_date,
+            period_number=period_number,
+            period_label=period_label,
+            status=status_value,
+            remarks=remarks,
+            marked_with_permission=has_permission,
+            bunk_flag=bunk_flag,
+            bunk_reason=BUNK_REASON if bunk_flag else '',
+            recorded_by=recorded_by,
+        ))
+    return _bulk_insert(SubjectAttendance, objs, 'subject'), errors
@@ -0,0 +1,206 @@
+"""
+Materialized class rankings for report cards and dashboards.
+
+Class position and class subject stats used to be recomputed from every
+Result row in the class each time a single report card was rendered. They
+now live in ClassTermRanking (one row per school/class/year/term):
+
+    from .class_rankings import class_position_for, refresh_rankings_for_result
+    rank, size = class_position_for(student, year, term)
+
+Write paths call refresh_rankings_for_result()/refresh_class_rankings() after
+saving a Result so only the affected class-term is rebuilt. Paths that change
+class membership (or write results outside Django, e.g. Go bulk imports) call
+invalidate_class_rankings()/invalidate_school_rankings(), and the next read
+rebuilds lazily.
+"""
+
+import logging
+
+from .models import ClassTermRanking, Result, Student, Class
+
+logger = logging.getLogger(__name__)
+
+
+def _compute_ranking_payload(class_id, year, term):
+    """Return (positions, class_size, subject_stats) from the class's report results."""
+    active_ids = set(
+        Student.objects.filter(
+            student_class_id=class_id, user__is_active=True,
+        ).values_list('id', flat=True)
+    )
+    rows = Result.objects.filter(
+        student__student_class_id=class_id,
+        academic_year=year, academic_term=term,
+        include_in_report=True, max_score__gt=0,
+    ).values_list('student_id', 'subject__name', 'score', 'max_score')
+
+    per_student = {}
+    per_subject = {}
+    for student_id, subject_name, score, max_score in rows:
+        pct = (score / max_score) * 100
+        if student_id in active_ids:
+            per_student.setdefault(student_id, []).append(pct)
+        per_subject.setdefault(subject_name, {}).setdefault(student_id, []).append(pct)
+
+    averages = [(sid, sum(v) / len(v)) for sid, v in per_student.items() if v]
+    averages.sort(key=lambda x: x[1], reverse=True)
+    positions = {
+        str(sid): [rank, round(avg, 2)]
+        for rank, (sid, avg) in enumerate(averages, start=1)
+    }
+
+    subject_stats = {}
+    for subject_name, by_student in per_subject.items():
+        student_avgs = [sum(v) / len(v) for v in by_student.values() if v]
+        if student_avgs:
+            subject_stats[subject_name] = [
+                round(sum(student_avgs) / len(student_avgs), 1),
+                round(max(student_avgs), 1),
+            ]
+    return positions, len(averages), subject_stats
+
+
+def refresh_class_ranking(class_id, year, term, school_id=None):
+    """Rebuild and persist the ranking row for one class/year/term."""
+    if not class_id or not year or not term:
+        return None
+    if school_id is None:
+        school_id = Class.objects.filter(id=class_id).values_list('school_id', flat=True).first()
+        if school_id is None:
+            return None
+    positions, class_size, subject_stats = _compute_ranking_payload(class_id, year, term)
+    ranking, _ = ClassTermRanking.objects.update_or_create(
+        school_id=school_id,
+        class_obj_id=class_id,
+        academic_year=year,
+        academic_term=term,
+        defaults={
+            'positions': positions,
+            'class_size': class_size,
+            'subject_stats': subject_stats,
+        },
+    )
+    return ranking
+
+
+def refresh_class_rankings(class_ids, year, term, school_id=None):
+    """
+    Best-effort rebuild of several classes for one year/term.
+
+    Failures are logged and the row is dropped so the next read rebuilds it —
+    mark entry must never fail because of ranking maintenance.
+    """
+    for class_id in class_ids:
+        try:
+            refresh_class_ranking(class_id, year, term, school_id=school_id)
+        except Exception as exc:
+            logger.error("Class ranking refresh failed for class %s %s %s: %s", class_id, term, year, exc)
+            invalidate_class_rankings([class_id], year=year, term=term)
+
+
+def refresh_rankings_for_result(result, previous_key=None):
+    """
+    Rebuild the ranking touched by a saved/deleted Result.
+
+    previous_key is an optional (year, term) tuple for overrides that moved
+    the result to another term, so the old term is rebuilt as well.
+    """
+    class_id = result.student.student_class_id
+    keys = {(result.academic_year, result.academic_term)}
+    if previous_key:
+        keys.add(tuple(previous_key))
+    for year, term in keys:
+        refresh_class_rankings([class_id], year, term)
+
+
+def invalidate_class_rankings(class_ids, year=None, term=None):
+    """Drop materialized rankings for the given classes so they rebuild on next read."""
+    class_ids = [cid for cid in class_ids if cid]
+    if not class_ids:
+        return
+    qs = ClassTermRanking.objects.filter(class_obj_id__in=class_ids)
+    if year:
+        qs = qs.filter(academic_year=year)
+    if term:
+        qs = qs.filter(academic_term=term)
+    qs.delete()
+
+
+def invalidate_school_rankings(school, year=None):
+    """Drop every materialized ranking for a school (e.g. after an out-of-band bulk import)."""
+    qs = ClassTermRanking.objects.filter(school=school)
+    if year:
+        qs = qs.filter(academic_year=year)
+    qs.delete()
+
+
+def get_class_ranking(class_id, year, term):
+    """Return the ClassTermRanking for a class/year/term, building it on first read."""
+    if not class_id:
+        return None
+    ranking = ClassTermRanking.objects.filter(
+        class_obj_id=class_id, academic_year=year, academic_term=term,
+    ).first()
+    if ranking is None:
+        ranking = refresh_class_ranking(class_id, year, term)
+    return ranking
+
+
+def class_position_for(student, year, term, ranking=None):
+    """Return (rank, class_size) for a student, or (None, None) when the class has no results."""
+    if ranking is None:
+        ranking = get_class_ranking(student.student_class_id, year, term)
+    if ranking is None or not ranking.class_size:
+        return None, None
+    entry = ranking.positions.get(str(student.id))
+    if not entry:
+        return None, ranking.class_size
+    return entry[0], ranking.class_size
+
+
+def class_subject_stats_for(student, year, term, ranking=None):
+    """Return {subject_name: (class_avg, top)} for the student's class."""
+    if ranking is None:
+        ranking = get_class_ranking(student.student_class_id, year, term)
+    if ranking is None:
+        return {}
+    return {name: (stats[0], stats[1]) for name, stats in ranking.subject_stats.items()}
+
+
+def current_term_position(student, school):
+    """Return the dashboard position payload for the school's current year/term."""
+    return current_term_positions([student], school)[student.id]
+
+
+def current_term_positions(students, school):
+    """
+    {student_id: position payload} for several students of one school, reading
+    SchoolSettings once and each class's ranking row once.
+    """
+    from users.models import SchoolSettings
+    settings_obj = SchoolSettings.objects.filter(school=school).only(
+        'current_academic_year', 'current_term',
+    ).first()
+    empty = {'rank': None, 'class_size': None, 'academic_year': None, 'academic_term': None}
+    if not settings_obj:
+        return {student.id: dict(empty) for student in students}
+    year = str(settings_obj.current_academic_year or '')
+    term = settings_obj.current_term or ''
+    class_ids = {student.student_class_id for student in students if student.student_class_id}
+    rankings = {
+        ranking.class_obj_id: ranking
+        for ranking in ClassTermRanking.objects.filter(
+            class_obj_id__in=class_ids, academic_year=year, academic_term=term,
+        )
+    }
+    positions = {}
+    for student in students:
+        if not student.student_class_id:
+            positions[student.id] = dict(empty)
+            continue
+        if student.student_class_id not in rankings:
+            rankings[student.student_class_id] = get_class_ranking(student.student_class_id, year, term)
+        rank, size = class_position_for(student, year, term, ranking=rankings[student.student_class_id])
+        positions[student.id] = {'rank': rank, 'class_size': size, 'academic_year': year, 'academic_term': term}
+    return positions
@@ -0,0 +1,164 @@
+"""
+Persisted per-student dashboard summary.
+
+The student dashboard and the parent's per-child dashboard each re-derived a
+student's average, attendance, bunk count and (for parents) fee balance on
+every load. StudentDashboardSummary stores those figures per student with a
+version stamp, like StudentPredictionCache:
+
+    from .dashboard_summary import get_dashboard_summary, get_dashboard_summaries, invalidate_student_summaries
+    summary = get_dashboard_summary(student)          # one keyed read when fresh
+    by_student = get_dashboard_summaries(students)    # {student_id: summary}
+    invalidate_student_summaries([student_id])        # after a write
+
+Result write paths, attendance rollup refreshes and the fee models'
+save/delete bump the affected students' versions; fee structure changes,
+class-wide additional fees, bulk billing and assessment plan edits bump the
+whole school. Rows older than DASHBOARD_SUMMARY_MAX_AGE_SECONDS are also
+treated as stale, so a write path that misses its invalidation self-heals.
+A read recomputes only stale rows, for all of them at once with set-based
+queries.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Result, StudentDashboardSummary, Subject
+
+
+def compute_dashboard_figures(students):
+    """
+    {student_id: {overall_average, subject_averages, attendance_percentage,
+    bunked_periods, outstanding_fees}} for `students` (with user and
+    student_class loaded).
+    """
+    from finances.fee_calculator import get_outstanding_fees_for_students
+    from .attendance_rollups import student_attendance_summary
+    from .grading_calc import compute_from_queryset
+
+    students = list(students)
+    student_ids = [student.id for student in students]
+
+    results_by_student = defaultdict(list)
+    for result in Result.objects.filter(student_id__in=student_ids).select_related('assessment_plan').order_by('id'):
+        results_by_student[result.student_id].append(result)
+    class_attendance = student_attendance_summary(student_ids, kind='class')
+    subject_attendance = student_attendance_summary(student_ids, kind='subject')
+    outstanding = get_outstanding_fees_for_students(students)
+
+    figures = {}
+    for student_id in student_ids:
+        # Composite per-subject percentages via the AssessmentPlan weights, then mean across subjects.
+        per_subject = compute_from_queryset(results_by_student.get(student_id, []))
+        attendance = class_attendance[student_id]
+        present = attendance['present'] + attendance['late']
+        figures[student_id] = {
+            'overall_average': round(sum(per_subject.values()) / len(per_subject), 1) if per_subject else 0,
+            'subject_averages': {str(subject_id): pct for subject_id, pct in per_subject.items()},
+            'attendance_percentage': round(present / attendance['total'] * 100, 1) if attendance['total'] > 0 else 100,
+            'bunked_periods': subject_attendance[student_id]['bunked'],
+            'outstanding_fees': outstanding.get(student_id, Decimal('0')),
+        }
+    return figures
+
+
+def get_dashboard_summaries(students):
+    """
+    Return {student_id: StudentDashboardSummary} for `students` (Student
+    instances with user and student_class loaded). Fresh rows are read in one
+    query; stale or missing ones are recomputed together and written back.
+    """
+    students = list(students)
+    if not students:
+        return {}
+    student_ids = [student.id for student in students]
+
+    rows = {row.student_id: row for row in StudentDashboardSummary.objects.filter(student_id__in=student_ids)}
+    missing = [sid for sid in student_ids if sid not in rows]
+    if missing:
+        StudentDashboardSummary.objects.bulk_create(
+            [StudentDashboardSummary(student_id=sid) for sid in missing], ignore_conflicts=True,
+        )
+        rows.update({
+            row.student_id: row
+            for row in StudentDashboardSummary.objects.filter(student_id__in=missing)
+        })
+
+    max_age = int(getattr(settings, 'DASHBOARD_SUMMARY_MAX_AGE_SECONDS', 3600) or 0)
+    expired_before = timezone.now() - timedelta(seconds=max_age) if max_age else None
+    stale = [
+        row for row in rows.values()
+        if row.computed_version != row.version
+        or (expired_before and (row.computed_at is None or row.computed_at < expired_before))
+    ]
+    if stale:
+        stale_ids = {row.student_id for row in stale}
+        figures = compute_dashboard_figures([student for student in students if student.id in stale_ids])
+        now = timezone.now()
+        for row in stale:
+            for field, value in figures[row.student_id].items():
+                setattr(row, field, value)
+            # Stamp with the version read before computing: a write that lands
+            # meanwhile bumps `version` past it and the row stays stale.
+            row.computed_version = row.version
+            row.computed_at = now
+        StudentDashboardSummary.objects.bulk_update(
+            stale,
+            ['overall_average', 'subject_averages', 'attendance_percentage', 'bunked_periods',
+             'outstanding_fees', 'computed_version', 'computed_at'],
+            batch_size=500,
+        )
+    return rows
+
+
+def get_dashboard_summary(student):
+    return get_dashboard_summaries([student])[student.id]
+
+
+def class_subjects(student):
+    """The subjects on the student's class timetable, as [{id, name, code}] sorted by name."""
+    return class_subjects_for([student])[student.id]
+
+
+def class_subjects_for(students):
+    """{student_id: class_subjects list} for several students, with one Subject query."""
+    from .timetable_index import timetable_index
+
+    ids_by_student = {}
+    for student in students:
+        if student.student_class_id:
+            index = timetable_index(student.user.school_id)
+            ids_by_student[student.id] = index.subjects_for_class(student.student_class_id)
+        else:
+            ids_by_student[student.id] = set()
+    all_ids = set().union(*ids_by_student.values()) if ids_by_student else set()
+    subjects = []
+    if all_ids:
+        subjects = list(
+            Subject.objects.filter(id__in=all_ids, is_deleted=False).values('id', 'name', 'code').order_by('name')
+        )
+    return {
+        student_id: [
+            {'id': row['id'], 'name': row['name'], 'code': row['code']}
+            for row in subjects if row['id'] in subject_ids
+        ]
+        for student_id, subject_ids in ids_by_student.items()
+    }
+
+
+def invalidate_student_summaries(student_ids):
+    """Bump the version stamp for these students so their next read recomputes."""
+    student_ids = {sid for sid in student_ids if sid}
+    if student_ids:
+        StudentDashboardSummary.objects.filter(student_id__in=student_ids).update(version=F('version') + 1)
+
+
+def invalidate_school_summaries(school_id):
+    """Bump every student in a school (fee structure changes, bulk billing, imports)."""
+    if school_id:
+        StudentDashboardSummary.objects.filter(student__user__school_id=school_id).update(version=F('version') + 1)
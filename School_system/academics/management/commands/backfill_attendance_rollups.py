@@ -0,0 +1,53 @@
+"""
+Rebuild the attendance rollup tables from the raw attendance records.
+
+Run once after deploying the rollup tables, and again whenever attendance
+rows were changed outside the application (raw SQL, restores, data fixes).
+
+Usage:
+    python manage.py backfill_attendance_rollups
+    python manage.py backfill_attendance_rollups --school-id 3 --kind class
+    python manage.py backfill_attendance_rollups --start 2026-01-01 --end 2026-03-31
+"""
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from academics.attendance_rollups import KINDS, rebuild_attendance_rollups
+
+
+def _parse_date(value, name):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise CommandError(f"--{name} must be YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    help = "Rebuild daily and monthly attendance rollups from ClassAttendance/SubjectAttendance."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--school-id", type=int, default=None, help="Only rebuild this school.")
+        parser.add_argument("--kind", choices=KINDS, default=None, help="Only rebuild class or subject attendance.")
+        parser.add_argument("--start", default=None, help="First date to rebuild (YYYY-MM-DD).")
+        parser.add_argument("--end", default=None, help="Last date to rebuild (YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        from users.models import School
+
+        school = None
+        if options["school_id"]:
+            try:
+                school = School.objects.get(id=options["school_id"])
+            except School.DoesNotExist:
+                raise CommandError(f"School {options['school_id']} not found")
+        start = _parse_date(options["start"], "start") if options["start"] else None
+        end = _parse_date(options["end"], "end") if options["end"] else None
+        if start and end and start > end:
+            raise CommandError("--start must not be after --end")
+
+        written = rebuild_attendance_rollups(school=school, kind=options["kind"], start=start, end=end)
+        self.stdout.write(self.style.SUCCESS("Attendance rollups rebuilt"))
+        self.stdout.write(f"- daily rows: {written['daily']}")
+        self.stdout.write(f"- monthly rows: {written['monthly']}")
@@ -11,6 +11,7 @@ from .utils import check_rate_limit, log_school_audit, parent_belongs_to_school
 
 logger = logging.getLogger(__name__)
 from .serializers import ParentTeacherMessageSerializer, TeacherSerializer
+from .timetable_index import timetable_index
 from django.utils import timezone
 
 from email_service import send_teacher_message_email
@@ -116,7 +117,7 @@ def send_message(request):
 
     try:
         from users.models import CustomUser
-        from .models import Timetable, Class, ParentChildLink
+        from .models import Class, ParentChildLink
         recipient = CustomUser.objects.get(id=recipient_id)
 
         if recipient.role not in ['parent', 'teacher']:
@@ -134,9 +135,7 @@ def send_message(request):
         if user.role == 'teacher':
             teacher = Teacher.objects.get(user=user)
             # Classes taught via Timetable OR where teacher is the class teacher
-            timetable_class_ids = set(Timetable.objects.filter(
-                teacher=teacher
-            ).values_list('class_assigned_id', flat=True))
+            timetable_class_ids = timetable_index(user.school_id).classes_for_teacher(teacher.id)
             class_teacher_class_ids = set(Class.objects.filter(
                 class_teacher=user
             ).values_list('id', flat=True))
@@ -165,9 +164,7 @@ def send_message(request):
                 id__in=confirmed_child_ids
             ).values_list('student_class_id', flat=True))
             # Teachers via Timetable OR as class teacher of the child's class
-            timetable_teacher_ids = set(Timetable.objects.filter(
-                class_assigned_id__in=child_class_ids
-            ).values_list('teacher_id', flat=True))
+            timetable_teacher_ids = timetable_index(user.school_id).teachers_for_classes(child_class_ids)
             class_teacher_user_ids = set(Class.objects.filter(
                 id__in=child_class_ids
             ).exclude(class_teacher__isnull=True).values_list('class_teacher_id', flat=True))
@@ -257,15 +254,12 @@ def search_teachers(request):
         confirmed_child_ids = ParentChildLink.objects.filter(
             parent=parent, is_confirmed=True
         ).values_list('student_id', flat=True)
-        child_class_ids = Student.objects.filter(
+        child_class_ids = list(Student.objects.filter(
             id__in=confirmed_child_ids
-        ).values_list('student_class_id', flat=True)
+        ).values_list('student_class_id', flat=True))
         
-        from .models import Timetable
         # Find all teachers assigned to these classes in the Timetable
-        teacher_ids = Timetable.objects.filter(
-            class_assigned_id__in=child_class_ids
-        ).values_list('teacher_id', flat=True).distinct()
+        teacher_ids = timetable_index(user.school_id).teachers_for_classes(child_class_ids)
         
         # ALSO include class teachers
         from .models import Class
@@ -307,11 +301,9 @@ def search_parents(request):
     try:
         teacher = Teacher.objects.get(user=user)
         
-        from .models import Timetable, Class
+        from .models import Class
         # Get all class IDs where this teacher has scheduled lessons
-        class_ids = list(Timetable.objects.filter(
-            teacher=teacher
-        ).values_list('class_assigned_id', flat=True).distinct())
+        class_ids = list(timetable_index(user.school_id).classes_for_teacher(teacher.id))
         
         # Also include classes where this teacher is the class teacher
         class_teacher_ids = list(Class.objects.filter(
@@ -0,0 +1,31 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0044_classsubjectassignment'),
+        ('users', '0037_superadmin_platform_notices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassTermRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_year', models.CharField(max_length=20)),
+                ('academic_term', models.CharField(max_length=50)),
+                ('positions', models.JSONField(blank=True, default=dict, help_text='{student_id: [rank, average_pct]} for active students with report results')),
+                ('class_size', models.PositiveIntegerField(default=0, help_text='Number of ranked students')),
+                ('subject_stats', models.JSONField(blank=True, default=dict, help_text='{subject_name: [class_average_pct, top_pct]}')),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('class_obj', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='term_rankings', to='academics.class')),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='class_term_rankings', to='users.school')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['school', 'academic_year'], name='academics_c_school__58321c_idx')],
+                'unique_together': {('school', 'class_obj', 'academic_year', 'academic_term')},
+            },
+        ),
+    ]
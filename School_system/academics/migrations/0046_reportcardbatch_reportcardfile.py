@@ -0,0 +1,56 @@
+import academics.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0045_classtermranking'),
+        ('users', '0037_superadmin_platform_notices'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportCardBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('class_ids', models.JSONField(blank=True, default=list, help_text='Classes rendered in this batch')),
+                ('academic_year', models.CharField(max_length=20)),
+                ('academic_term', models.CharField(max_length=50)),
+                ('build_bundle', models.BooleanField(default=True, help_text='Also produce one merged PDF for download')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='queued', max_length=20)),
+                ('total_students', models.PositiveIntegerField(default=0)),
+                ('rendered_count', models.PositiveIntegerField(default=0)),
+                ('failed_count', models.PositiveIntegerField(default=0)),
+                ('errors', models.JSONField(blank=True, default=list)),
+                ('bundle', models.FileField(blank=True, null=True, upload_to=academics.models.report_card_bundle_path)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='report_card_batches', to=settings.AUTH_USER_MODEL)),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_card_batches', to='users.school')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['school', 'academic_year', 'academic_term'], name='academics_r_school__03b569_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReportCardFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pdf', models.FileField(upload_to=academics.models.report_card_file_path)),
+                ('generated_at', models.DateTimeField(auto_now_add=True)),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='files', to='academics.reportcardbatch')),
+                ('class_obj', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_card_files', to='academics.class')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_card_files', to='academics.student')),
+            ],
+            options={
+                'ordering': ['class_obj_id', 'id'],
+                'unique_together': {('batch', 'student')},
+            },
+        ),
+    ]
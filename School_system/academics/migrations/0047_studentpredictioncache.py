@@ -0,0 +1,23 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0046_reportcardbatch_reportcardfile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentPredictionCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(default=1, help_text="Bumped whenever the student's results change")),
+                ('computed_version', models.PositiveIntegerField(default=0, help_text='Version the stored predictions were computed from')),
+                ('predictions', models.JSONField(blank=True, default=list)),
+                ('computed_at', models.DateTimeField(blank=True, null=True)),
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='prediction_cache', to='academics.student')),
+            ],
+        ),
+    ]
@@ -0,0 +1,50 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0047_studentpredictioncache'),
+        ('users', '0038_auditlog_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('kind', models.CharField(choices=[('class', 'Daily class attendance'), ('subject', 'Subject/period attendance')], default='class', max_length=10)),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('late', models.PositiveIntegerField(default=0)),
+                ('excused', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('class_assigned', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_daily_rollups', to='academics.class')),
+                ('school', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attendance_daily_rollups', to='users.school')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['school', 'kind', 'date'], name='academics_a_school__80e309_idx')],
+                'unique_together': {('class_assigned', 'date', 'kind')},
+            },
+        ),
+        migrations.CreateModel(
+            name='StudentAttendanceMonthly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('kind', models.CharField(choices=[('class', 'Daily class attendance'), ('subject', 'Subject/period attendance')], default='class', max_length=10)),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('late', models.PositiveIntegerField(default=0)),
+                ('excused', models.PositiveIntegerField(default=0)),
+                ('bunked', models.PositiveIntegerField(default=0, help_text='Subject periods flagged as bunked')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_monthly', to='academics.student')),
+            ],
+            options={
+                'unique_together': {('student', 'month', 'kind')},
+            },
+        ),
+    ]
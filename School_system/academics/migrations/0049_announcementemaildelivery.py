@@ -0,0 +1,35 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0048_attendancedailyrollup_studentattendancemonthly'),
+        ('users', '0038_auditlog_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnnouncementEmailDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posted_by', models.CharField(blank=True, max_length=255)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='queued', max_length=20)),
+                ('total_recipients', models.PositiveIntegerField(default=0)),
+                ('sent_count', models.PositiveIntegerField(default=0)),
+                ('failed_count', models.PositiveIntegerField(default=0)),
+                ('total_batches', models.PositiveIntegerField(default=0)),
+                ('completed_batches', models.PositiveIntegerField(default=0)),
+                ('errors', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('announcement', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='email_delivery', to='academics.announcement')),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='announcement_email_deliveries', to='users.school')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
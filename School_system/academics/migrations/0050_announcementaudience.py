@@ -0,0 +1,50 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_announcement_audiences(apps, schema_editor):
+    Announcement = apps.get_model('academics', 'Announcement')
+    AnnouncementAudience = apps.get_model('academics', 'AnnouncementAudience')
+    rows = []
+    for announcement in Announcement.objects.select_related('author').iterator():
+        audiences = set(announcement.target_audiences or []) | {announcement.target_audience}
+        roles = set()
+        for audience in audiences:
+            audience = (audience or '').strip().lower()
+            if audience:
+                roles.add(audience[:-1] if audience.endswith('s') else audience)
+        rows.extend(
+            AnnouncementAudience(
+                announcement_id=announcement.id,
+                school_id=announcement.author.school_id,
+                role=role,
+                target_class_id=announcement.target_class_id,
+            )
+            for role in sorted(roles)
+        )
+    AnnouncementAudience.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0049_announcementemaildelivery'),
+        ('users', '0038_auditlog_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnnouncementAudience',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(max_length=50)),
+                ('announcement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audience_index', to='academics.announcement')),
+                ('school', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='announcement_audiences', to='users.school')),
+                ('target_class', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='academics.class')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['school', 'role'], name='academics_a_school__560fa8_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_announcement_audiences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0050_announcementaudience'),
+        ('users', '0038_auditlog_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingAtRiskEvaluation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('queued_at', models.DateTimeField(auto_now_add=True)),
+                ('school', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pending_at_risk_evaluations', to='users.school')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_at_risk_evaluations', to='academics.student')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_at_risk_evaluations', to='academics.subject')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['school', 'queued_at'], name='academics_p_school__4c3d83_idx')],
+                'unique_together': {('student', 'subject')},
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0051_pendingatriskevaluation'),
+        ('users', '0038_auditlog_timestamp_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimetableGenerationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_year', models.CharField(blank=True, max_length=20)),
+                ('mode', models.CharField(blank=True, help_text='greedy or solver; blank uses TIMETABLE_GENERATOR_MODE', max_length=20)),
+                ('clear_existing', models.BooleanField(default=True)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], db_index=True, default='queued', max_length=20)),
+                ('phase', models.CharField(blank=True, choices=[('loading', 'Loading'), ('solving', 'Solving'), ('saving', 'Saving')], max_length=20)),
+                ('progress_done', models.PositiveIntegerField(default=0)),
+                ('progress_total', models.PositiveIntegerField(default=0)),
+                ('cancel_requested', models.BooleanField(default=False)),
+                ('entries_count', models.PositiveIntegerField(default=0)),
+                ('score', models.JSONField(blank=True, default=dict)),
+                ('summary', models.JSONField(blank=True, default=list, help_text='Per-class entry and unplaced-period counts')),
+                ('errors', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='timetable_jobs', to=settings.AUTH_USER_MODEL)),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timetable_jobs', to='users.school')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
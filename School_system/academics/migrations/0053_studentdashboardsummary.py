@@ -0,0 +1,27 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0052_timetablegenerationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentDashboardSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(default=1, help_text="Bumped by the student's result, attendance and fee writes")),
+                ('computed_version', models.PositiveIntegerField(default=0, help_text='Version the stored figures were computed from')),
+                ('overall_average', models.FloatField(default=0)),
+                ('subject_averages', models.JSONField(blank=True, default=dict)),
+                ('attendance_percentage', models.FloatField(default=100)),
+                ('bunked_periods', models.PositiveIntegerField(default=0)),
+                ('outstanding_fees', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('computed_at', models.DateTimeField(blank=True, null=True)),
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='dashboard_summary', to='academics.student')),
+            ],
+        ),
+    ]
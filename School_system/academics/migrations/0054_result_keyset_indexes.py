@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0053_studentdashboardsummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['-date_recorded', '-id'], name='academics_r_date_re_a76f53_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['teacher', '-date_recorded', '-id'], name='academics_r_teacher_d92ec1_idx'),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0054_result_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timetablegenerationjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Last time the worker reported progress', null=True),
+        ),
+    ]
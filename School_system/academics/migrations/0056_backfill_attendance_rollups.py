@@ -0,0 +1,70 @@
+from django.db import migrations, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncMonth
+
+STATUSES = ('present', 'absent', 'late', 'excused')
+BATCH_SIZE = 1000
+
+
+def _status_counts(bunked=False):
+    counts = {name: Count('id', filter=Q(status=name)) for name in STATUSES}
+    if bunked:
+        counts['bunked'] = Count('id', filter=Q(bunk_flag=True))
+    return counts
+
+
+def backfill_attendance_rollups(apps, schema_editor):
+    """
+    Fill the rollup tables from the raw attendance records, one school per
+    transaction, so rate readers do not see empty rollups after deploy.
+    Existing rollup rows for the school are replaced; the result matches
+    attendance_rollups.rebuild_attendance_rollups().
+    """
+    School = apps.get_model('users', 'School')
+    AttendanceDailyRollup = apps.get_model('academics', 'AttendanceDailyRollup')
+    StudentAttendanceMonthly = apps.get_model('academics', 'StudentAttendanceMonthly')
+    StudentDashboardSummary = apps.get_model('academics', 'StudentDashboardSummary')
+    sources = {
+        'class': apps.get_model('academics', 'ClassAttendance'),
+        'subject': apps.get_model('academics', 'SubjectAttendance'),
+    }
+
+    for school_id in School.objects.order_by('id').values_list('id', flat=True).iterator():
+        with transaction.atomic():
+            for kind, source in sources.items():
+                AttendanceDailyRollup.objects.filter(kind=kind, class_assigned__school_id=school_id).delete()
+                StudentAttendanceMonthly.objects.filter(kind=kind, student__user__school_id=school_id).delete()
+
+                AttendanceDailyRollup.objects.bulk_create((
+                    AttendanceDailyRollup(
+                        school_id=school_id, class_assigned_id=row['class_assigned_id'], date=row['date'], kind=kind,
+                        **{name: row[name] for name in STATUSES},
+                    )
+                    for row in source.objects.filter(class_assigned__school_id=school_id).order_by()
+                    .values('class_assigned_id', 'date').annotate(**_status_counts())
+                ), batch_size=BATCH_SIZE)
+
+                StudentAttendanceMonthly.objects.bulk_create((
+                    StudentAttendanceMonthly(
+                        student_id=row['student_id'], month=row['month'], kind=kind, bunked=row.get('bunked', 0),
+                        **{name: row[name] for name in STATUSES},
+                    )
+                    for row in source.objects.filter(student__user__school_id=school_id).order_by()
+                    .annotate(month=TruncMonth('date')).values('student_id', 'month')
+                    .annotate(**_status_counts(bunked=kind == 'subject'))
+                ), batch_size=BATCH_SIZE)
+
+            StudentDashboardSummary.objects.filter(student__user__school_id=school_id).update(version=F('version') + 1)
+
+
+class Migration(migrations.Migration):
+    # Each school is committed on its own so large installs do not hold one long transaction.
+    atomic = False
+
+    dependencies = [
+        ('academics', '0055_timetablegenerationjob_heartbeat_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_attendance_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations, models
+
+
+def fail_duplicate_active_jobs(apps, schema_editor):
+    """Keep each school's newest queued/running job; fail older ones so the constraint can apply."""
+    TimetableGenerationJob = apps.get_model('academics', 'TimetableGenerationJob')
+    seen = set()
+    duplicates = []
+    for job_id, school_id in (
+        TimetableGenerationJob.objects.filter(status__in=['queued', 'running'])
+        .order_by('school_id', '-created_at', '-id').values_list('id', 'school_id')
+    ):
+        if school_id in seen:
+            duplicates.append(job_id)
+        seen.add(school_id)
+    if duplicates:
+        TimetableGenerationJob.objects.filter(id__in=duplicates).update(
+            status='failed', errors=[{'error': 'Superseded by a newer job for the same school'}],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0056_backfill_attendance_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_duplicate_active_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='timetablegenerationjob',
+            constraint=models.UniqueConstraint(
+                condition=models.Q(status__in=['queued', 'running']),
+                fields=('school',),
+                name='one_active_timetable_job_per_school',
+            ),
+        ),
+    ]
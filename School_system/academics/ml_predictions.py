@@ -1,8 +1,14 @@
 """
 ML Grade Predictions — linear regression over past results.
 
-Uses scikit-learn when available; falls back to a simple slope calculation
-so the app keeps working in environments without scikit-learn installed.
+Predictions for a whole scope (a school, a class, one subject) are computed in
+one pass: every Result for the scope is fetched with a single query, grouped
+by (student, subject) into NumPy arrays, and the least-squares slope, mean,
+standard deviation and trend for every group are computed together. Falls back
+to a pure-Python slope calculation if NumPy is unavailable at runtime.
+
+    from .ml_predictions import predict_grades_for_students
+    by_student = predict_grades_for_students(students)   # {student_id: [prediction, ...]}
 
 Grading follows the Zimbabwe academic system (see academics/grading.py):
   A = Distinction  (70–100%)  — pass
@@ -28,7 +34,7 @@ from .grading import (
 # ── Prediction maths ──────────────────────────────────────────────────────────
 
 def _linear_predict(scores):
-    """Simple slope-based prediction without scikit-learn."""
+    """Simple slope-based prediction for one ordered series of scores."""
     n = len(scores)
     if n == 1:
         return scores[0]
@@ -43,26 +49,78 @@ def _linear_predict(scores):
     return slope * n + intercept
 
 
-def _sklearn_predict(scores):
-    """Linear regression using scikit-learn."""
+def _group_stats_numpy(group_keys, scores, max_scores):
+    """
+    Vectorized per-group statistics.
+
+    group_keys must already be sorted so each group is contiguous and scores
+    within a group are in chronological order. Returns a list of
+    (n, mean, predicted_raw, std_dev, first, last, max_score) per group, in
+    group order. The prediction is the ordinary least-squares line over
+    x = 0..n-1 evaluated at x = n, identical to fitting LinearRegression per
+    subject.
+    """
     import numpy as np
-    from sklearn.linear_model import LinearRegression
-
-    X = np.arange(len(scores)).reshape(-1, 1)
-    y = np.array(scores, dtype=float)
-    model = LinearRegression().fit(X, y)
-    next_x = np.array([[len(scores)]])
-    return float(model.predict(next_x)[0])
-
 
-def _compute_prediction(scores):
-    """Returns (predicted_score, used_sklearn)."""
+    y = np.asarray(scores, dtype=float)
+    m = np.asarray(max_scores, dtype=float)
+    total = len(y)
+    if total == 0:
+        return []
+
+    keys = np.asarray(group_keys)
+    boundaries = np.ones(total, dtype=bool)
+    boundaries[1:] = (keys[1:] != keys[:-1]).any(axis=1)
+    starts = np.flatnonzero(boundaries)
+    group_idx = np.cumsum(boundaries) - 1
+    counts = np.diff(np.append(starts, total))
+
+    mean = np.add.reduceat(y, starts) / counts
+    x = np.arange(total) - starts[group_idx]
+    x_mean = (counts - 1) / 2.0
+
+    dx = x - x_mean[group_idx]
+    dy = y - mean[group_idx]
+    numerator = np.add.reduceat(dx * dy, starts)
+    denominator = np.add.reduceat(dx * dx, starts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.where(denominator > 0, numerator / denominator, 0.0)
+    predicted = mean + slope * (counts - x_mean)
+
+    std_dev = np.sqrt(np.add.reduceat(dy * dy, starts) / counts)
+    first = y[starts]
+    last = y[starts + counts - 1]
+    max_score = np.maximum.reduceat(m, starts)
+
+    return list(zip(
+        counts.tolist(), mean.tolist(), predicted.tolist(), std_dev.tolist(),
+        first.tolist(), last.tolist(), max_score.tolist(),
+    ))
+
+
+def _group_stats_python(group_keys, scores, max_scores):
+    """Pure-Python equivalent of _group_stats_numpy."""
+    stats = []
+    i, total = 0, len(scores)
+    while i < total:
+        j = i
+        while j < total and group_keys[j] == group_keys[i]:
+            j += 1
+        series = scores[i:j]
+        n = len(series)
+        mean = sum(series) / n
+        std_dev = (sum((s - mean) ** 2 for s in series) / n) ** 0.5
+        stats.append((n, mean, _linear_predict(series), std_dev, series[0], series[-1], max(max_scores[i:j])))
+        i = j
+    return stats
+
+
+def _group_stats(group_keys, scores, max_scores):
     try:
-        return _sklearn_predict(scores), True
-    except Exception:
-        # Keep API resilient if sklearn/numpy is missing or misconfigured at runtime.
-        logger.exception("Falling back to linear prediction for scores=%s", scores)
-        return _linear_predict(scores), False
+        return _group_stats_numpy(group_keys, scores, max_scores)
+    except ImportError:
+        logger.warning("NumPy unavailable; computing grade predictions in pure Python")
+        return _group_stats_python(group_keys, scores, max_scores)
 
 
 def _confidence(n, std_dev, max_score):
@@ -74,11 +132,7 @@ def _confidence(n, std_dev, max_score):
     return 'low'
 
 
-def _trend(scores):
-    """Execute trend."""
-    if len(scores) < 2:
-        return 'stable'
-    delta = scores[-1] - scores[0]
+def _trend_from_delta(delta):
     if delta > 2:
         return 'up'
     if delta < -2:
@@ -117,6 +171,85 @@ def _intervention_message(grade: str, trend: str, subject: str) -> str:
 
 # ── Public API ────────────────────────────────────────────────────────────────
 
+def _build_prediction(subject_id, subject_name, n, mean, predicted_raw, std_dev, first, last, max_score):
+    current_pct = score_to_percentage(mean, max_score)
+    current_grade_info = percentage_to_grade(current_pct)
+
+    predicted_raw = predicted_raw if n >= 2 else first
+    # Clamp to valid range
+    predicted_score = max(0.0, min(float(max_score), predicted_raw))
+    predicted_pct = score_to_percentage(predicted_score, max_score)
+    predicted_grade_info = percentage_to_grade(predicted_pct)
+
+    trend = _trend_from_delta(last - first) if n >= 2 else 'stable'
+    return {
+        # Subject info
+        'subject_id':            subject_id,
+        'subject':               subject_name,
+        'max_score':             float(max_score),
+
+        # Current performance
+        'current_avg':           round(mean, 2),
+        'current_percentage':    current_pct,
+        'current_grade':         current_grade_info['grade'],
+        'current_description':   current_grade_info['description'],
+        'passed':                current_grade_info['passed'],
+        'at_risk':               current_grade_info['at_risk'],
+
+        # Prediction
+        'predicted_score':       round(predicted_score, 2),
+        'predicted_percentage':  predicted_pct,
+        'predicted_grade':       predicted_grade_info['grade'],
+        'predicted_description': predicted_grade_info['description'],
+        'will_pass':             predicted_grade_info['passed'],
+        'predicted_at_risk':     predicted_grade_info['at_risk'],
+
+        # Meta
+        'trend':                 trend,
+        'confidence':            _confidence(n, std_dev, max_score),
+        'intervention':          _intervention_message(predicted_grade_info['grade'], trend, subject_name),
+    }
+
+
+def predict_grades_for_students(students, subject_id=None):
+    """
+    Predict next-term scores for every student in `students` (queryset, list
+    of Students, or list of ids) in one query and one vectorized pass.
+
+    Returns {student_id: [prediction, ...]} using the same dict shape and
+    ordering as predict_student_grades(). Students without results are absent.
+    """
+    from .models import Result
+
+    results_qs = Result.objects.filter(student__in=students)
+    if subject_id is not None:
+        results_qs = results_qs.filter(subject_id=subject_id)
+    rows = list(
+        results_qs
+        .order_by('student_id', 'subject_id', 'academic_year', 'academic_term', 'id')
+        .values_list('student_id', 'subject_id', 'subject__name', 'score', 'max_score')
+    )
+    if not rows:
+        return {}
+
+    group_keys = [(r[0], r[1]) for r in rows]
+    stats = _group_stats(group_keys, [r[3] for r in rows], [r[4] for r in rows])
+
+    by_student = {}
+    row_idx = 0
+    for n, mean, predicted_raw, std_dev, first, last, max_score in stats:
+        student_id, sid, subject_name = rows[row_idx][0], rows[row_idx][1], rows[row_idx][2]
+        row_idx += n
+        by_student.setdefault(student_id, []).append(
+            _build_prediction(sid, subject_name, n, mean, predicted_raw, std_dev, first, last, max_score)
+        )
+
+    for predictions in by_student.values():
+        # Sort: at-risk first, then by predicted percentage ascending (worst first)
+        predictions.sort(key=lambda x: (not x['predicted_at_risk'], x['predicted_percentage']))
+    return by_student
+
+
 def predict_student_grades(student):
     """
     Predict next-term scores for each subject the student has results in.
@@ -146,84 +279,4 @@ def predict_student_grades(student):
         ...
     ]
     """
-    from .models import Result
-
-    results_qs = (
-        Result.objects
-        .filter(student=student)
-        .select_related('subject')
-        .order_by('subject', 'academic_year', 'academic_term')
-    )
-
-    # Group by subject
-    subject_results: dict = {}
-    for r in results_qs:
-        sid = r.subject_id
-        if sid not in subject_results:
-            subject_results[sid] = {'name': r.subject.name, 'entries': []}
-        subject_results[sid]['entries'].append(r)
-
-    predictions = []
-
-    for sid, data in subject_results.items():
-        entries = data['entries']
-        if not entries:
-            continue
-
-        scores = [e.score for e in entries]
-        max_scores = [e.max_score for e in entries]
-        max_score = max(max_scores) if max_scores else 100
-
-        current_avg = sum(scores) / len(scores)
-        current_pct = score_to_percentage(current_avg, max_score)
-        current_grade_info = percentage_to_grade(current_pct)
-
-        if len(scores) >= 2:
-            predicted_raw, _ = _compute_prediction(scores)
-        else:
-            predicted_raw = scores[0]
-
-        # Clamp to valid range
-        predicted_score = max(0.0, min(float(max_score), predicted_raw))
-        predicted_pct = score_to_percentage(predicted_score, max_score)
-        predicted_grade_info = percentage_to_grade(predicted_pct)
-
-        # Standard deviation for confidence
-        variance = sum((s - current_avg) ** 2 for s in scores) / len(scores)
-        std_dev = variance ** 0.5
-
-        predictions.append({
-            # Subject info
-            'subject_id':            sid,
-            'subject':               data['name'],
-            'max_score':             float(max_score),
-
-            # Current performance
-            'current_avg':           round(current_avg, 2),
-            'current_percentage':    current_pct,
-            'current_grade':         current_grade_info['grade'],
-            'current_description':   current_grade_info['description'],
-            'passed':                current_grade_info['passed'],
-            'at_risk':               current_grade_info['at_risk'],
-
-            # Prediction
-            'predicted_score':       round(predicted_score, 2),
-            'predicted_percentage':  predicted_pct,
-            'predicted_grade':       predicted_grade_info['grade'],
-            'predicted_description': predicted_grade_info['description'],
-            'will_pass':             predicted_grade_info['passed'],
-            'predicted_at_risk':     predicted_grade_info['at_risk'],
-
-            # Meta
-            'trend':                 _trend(scores),
-            'confidence':            _confidence(len(scores), std_dev, max_score),
-            'intervention':          _intervention_message(
-                                         predicted_grade_info['grade'],
-                                         _trend(scores),
-                                         data['name'],
-                                     ),
-        })
-
-    # Sort: at-risk first, then by predicted percentage ascending (worst first)
-    predictions.sort(key=lambda x: (not x['predicted_at_risk'], x['predicted_percentage']))
-    return predictions
+    return predict_grades_for_students([student.id]).get(student.id, [])
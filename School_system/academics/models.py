@@ -5,6 +5,14 @@ from django.core.exceptions import ValidationError
 from users.models import TenantAwareManager, TenantSoftDeleteManager, TransferAwareManager
 
 
+def _user_school_id(profile):
+    """school_id of a Student/Parent's user; reads just that column unless the user is already loaded."""
+    user_field = profile._meta.get_field('user')
+    if user_field.is_cached(profile):
+        return profile.user.school_id
+    return user_field.related_model.objects.filter(pk=profile.user_id).values_list('school_id', flat=True).first()
+
+
 class Subject(models.Model):
     name = models.CharField(max_length=100)
     code = models.CharField(max_length=20)
@@ -24,6 +32,11 @@ class Subject(models.Model):
     class Meta:
         unique_together = ('code', 'school')
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from users.school_stats import invalidate_school_stats
+        invalidate_school_stats(self.school_id)
+
     def delete(self, using=None, keep_parents=False):
         self.is_deleted = True
         self.deleted_at = timezone.now()
@@ -62,6 +75,27 @@ class Class(models.Model):
     def __str__(self):
         return f"{self.name} - {self.academic_year}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from users.school_stats import invalidate_school_stats
+        from .announcement_feed import invalidate_school_feeds
+        from .timetable_index import invalidate_timetable_index
+        invalidate_school_stats(self.school_id)
+        invalidate_school_feeds(self.school_id)
+        invalidate_timetable_index(self.school_id)
+
+    def delete(self, *args, **kwargs):
+        school_id = self.school_id
+        result = super().delete(*args, **kwargs)
+        from users.school_stats import invalidate_school_stats
+        from .announcement_feed import invalidate_school_feeds
+        from .timetable_index import invalidate_timetable_index
+        invalidate_school_stats(school_id)
+        invalidate_school_feeds(school_id)
+        # The class's timetable rows went with it.
+        invalidate_timetable_index(school_id)
+        return result
+
 
 class ClassSubjectAssignment(models.Model):
     school = models.ForeignKey('users.School', on_delete=models.CASCADE, related_name='class_subject_assignments')
@@ -126,6 +160,29 @@ class Student(models.Model):
     def __str__(self):
         return f"{self.user.student_number} - {self.user.full_name}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from users.school_stats import invalidate_school_stats
+        from finances.report_snapshot import invalidate_finance_snapshots
+        from .announcement_feed import invalidate_school_feeds
+        from .dashboard_summary import invalidate_student_summaries
+        school_id = _user_school_id(self)
+        invalidate_school_stats(school_id)
+        invalidate_school_feeds(school_id)
+        invalidate_finance_snapshots(school_id)
+        invalidate_student_summaries([self.pk])
+
+    def delete(self, *args, **kwargs):
+        school_id = _user_school_id(self)
+        result = super().delete(*args, **kwargs)
+        from users.school_stats import invalidate_school_stats
+        from finances.report_snapshot import invalidate_finance_snapshots
+        from .announcement_feed import invalidate_school_feeds
+        invalidate_school_stats(school_id)
+        invalidate_school_feeds(school_id)
+        invalidate_finance_snapshots(school_id)
+        return result
+
 
 class DietaryFlag(models.Model):
     student = models.OneToOneField(Student, on_delete=models.CASCADE, related_name='dietary_flag')
@@ -495,6 +552,18 @@ class Parent(models.Model):
     def __str__(self):
         return f"{self.user.first_name} {self.user.last_name} - Parent"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from users.school_stats import invalidate_school_stats
+        invalidate_school_stats(_user_school_id(self))
+
+    def delete(self, *args, **kwargs):
+        school_id = _user_school_id(self)
+        result = super().delete(*args, **kwargs)
+        from users.school_stats import invalidate_school_stats
+        invalidate_school_stats(school_id)
+        return result
+
 
 class ParentChildLink(models.Model):
     """Track confirmed/unconfirmed parent-child relationships"""
@@ -511,6 +580,18 @@ class ParentChildLink(models.Model):
         status = "Confirmed" if self.is_confirmed else "Pending"
         return f"{self.parent.user.first_name} {self.parent.user.last_name} -> {self.student.user.first_name} {self.student.user.last_name} ({status})"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .announcement_feed import invalidate_user_feed
+        invalidate_user_feed(self.parent.user)
+
+    def delete(self, *args, **kwargs):
+        parent_user = self.parent.user
+        result = super().delete(*args, **kwargs)
+        from .announcement_feed import invalidate_user_feed
+        invalidate_user_feed(parent_user)
+        return result
+
 
 class Result(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='results', db_index=True)
@@ -545,6 +626,8 @@ class Result(models.Model):
         indexes = [
             models.Index(fields=['student', 'academic_year', 'academic_term']),
             models.Index(fields=['student', 'academic_year', 'include_in_report']),
+            models.Index(fields=['-date_recorded', '-id']),
+            models.Index(fields=['teacher', '-date_recorded', '-id']),
         ]
 
     @property
@@ -627,6 +710,19 @@ class AssessmentPlan(models.Model):
             return [int(n) for n in self.paper_numbers]
         return list(range(1, int(self.num_papers) + 1))
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Plan weights feed the composite averages on student/parent dashboards.
+        from .dashboard_summary import invalidate_school_summaries
+        invalidate_school_summaries(self.school_id)
+
+    def delete(self, *args, **kwargs):
+        school_id = self.school_id
+        result = super().delete(*args, **kwargs)
+        from .dashboard_summary import invalidate_school_summaries
+        invalidate_school_summaries(school_id)
+        return result
+
 
 class SubjectTermFeedback(models.Model):
     """Per-student, per-subject, per-term teacher comment + effort grade for the report card."""
@@ -666,6 +762,55 @@ class Timetable(models.Model):
         return f"{self.class_assigned.name} - {self.subject.name} - {self.day_of_week}"
 
 
+class TimetableGenerationJob(models.Model):
+    """Background timetable generation run for one school, polled for progress."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+    PHASE_CHOICES = [
+        ('loading', 'Loading'),
+        ('solving', 'Solving'),
+        ('saving', 'Saving'),
+    ]
+
+    school = models.ForeignKey('users.School', on_delete=models.CASCADE, related_name='timetable_jobs')
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='timetable_jobs')
+    academic_year = models.CharField(max_length=20, blank=True)
+    mode = models.CharField(max_length=20, blank=True, help_text='greedy or solver; blank uses TIMETABLE_GENERATOR_MODE')
+    clear_existing = models.BooleanField(default=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', db_index=True)
+    phase = models.CharField(max_length=20, choices=PHASE_CHOICES, blank=True)
+    progress_done = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(default=0)
+    cancel_requested = models.BooleanField(default=False)
+    entries_count = models.PositiveIntegerField(default=0)
+    score = models.JSONField(default=dict, blank=True)
+    summary = models.JSONField(default=list, blank=True, help_text='Per-class entry and unplaced-period counts')
+    errors = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, help_text='Last time the worker reported progress')
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            # One generation at a time per school; concurrent POSTs race past the view's check.
+            models.UniqueConstraint(
+                fields=['school'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='one_active_timetable_job_per_school',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Timetable job {self.id} - school {self.school_id} ({self.status})"
+
+
 class Announcement(models.Model):
     title = models.CharField(max_length=200)
     content = models.TextField()
@@ -682,6 +827,34 @@ class Announcement(models.Model):
         audiences = self.target_audiences or [self.target_audience]
         return f"{self.title} - {', '.join(audiences)}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .announcement_feed import sync_announcement_audience
+        sync_announcement_audience(self)
+
+    def delete(self, *args, **kwargs):
+        school_id = self.author.school_id
+        result = super().delete(*args, **kwargs)
+        from .announcement_feed import invalidate_school_feeds
+        invalidate_school_feeds(school_id)
+        return result
+
+
+class AnnouncementAudience(models.Model):
+    """Normalized audience index for the announcement feed, one row per role."""
+    announcement = models.ForeignKey(Announcement, on_delete=models.CASCADE, related_name='audience_index')
+    school = models.ForeignKey('users.School', on_delete=models.CASCADE, null=True, related_name='announcement_audiences')
+    role = models.CharField(max_length=50)
+    target_class = models.ForeignKey('Class', on_delete=models.CASCADE, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['school', 'role']),
+        ]
+
+    def __str__(self):
+        return f"{self.announcement_id}:{self.role}"
+
 
 class AnnouncementDismissal(models.Model):
     """Per-user dismissal so users can clear announcements from their own feed only."""
@@ -699,6 +872,36 @@ class AnnouncementDismissal(models.Model):
         return f"{self.user_id}:{self.announcement_id}"
 
 
+class AnnouncementEmailDelivery(models.Model):
+    """Progress of the background parent email fan-out for one announcement."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    announcement = models.OneToOneField(Announcement, on_delete=models.CASCADE, related_name='email_delivery')
+    school = models.ForeignKey('users.School', on_delete=models.CASCADE, related_name='announcement_email_deliveries')
+    posted_by = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', db_index=True)
+    total_recipients = models.PositiveIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    total_batches = models.PositiveIntegerField(default=0)
+    completed_batches = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Announcement {self.announcement_id} emails ({self.status})"
+
+
 class ReportCardRelease(models.Model):
     """Tracks which class/year/term report cards have been published by the admin."""
     ACCESS_SCOPE_CHOICES = [
@@ -797,6 +1000,97 @@ class ReportCardDeliveryExclusion(models.Model):
         return f"{self.student} excluded for {self.class_obj} {self.academic_term} {self.academic_year}"
 
 
+class ClassTermRanking(models.Model):
+    """
+    Materialized class positions and per-subject class stats for one
+    class/year/term. Rebuilt from Result rows by academics.class_rankings
+    whenever a result for the class changes, so report cards and dashboards
+    read a single row instead of re-scanning the whole class.
+    """
+    school = models.ForeignKey('users.School', on_delete=models.CASCADE, related_name='class_term_rankings')
+    class_obj = models.ForeignKey('Class', on_delete=models.CASCADE, related_name='term_rankings')
+    academic_year = models.CharField(max_length=20)
+    academic_term = models.CharField(max_length=50)
+    positions = models.JSONField(
+        default=dict, blank=True,
+        help_text='{student_id: [rank, average_pct]} for active students with report results'
+    )
+    class_size = models.PositiveIntegerField(default=0, help_text='Number of ranked students')
+    subject_stats = models.JSONField(
+        default=dict, blank=True,
+        help_text='{subject_name: [class_average_pct, top_pct]}'
+    )
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('school', 'class_obj', 'academic_year', 'academic_term')
+        indexes = [
+            models.Index(fields=['school', 'academic_year']),
+        ]
+
+    def __str__(self):
+        return f"{self.class_obj.name} ranking - {self.academic_term} {self.academic_year}"
+
+
+def report_card_bundle_path(instance, filename):
+    return f'report_cards/{instance.school_id}/batch_{instance.id}/{filename}'
+
+
+def report_card_file_path(instance, filename):
+    return f'report_cards/{instance.batch.school_id}/batch_{instance.batch_id}/{filename}'
+
+
+class ReportCardBatch(models.Model):
+    """Background job that renders report card PDFs for one or more classes in a single pass."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    school = models.ForeignKey('users.School', on_delete=models.CASCADE, related_name='report_card_batches')
+    class_ids = models.JSONField(default=list, blank=True, help_text='Classes rendered in this batch')
+    academic_year = models.CharField(max_length=20)
+    academic_term = models.CharField(max_length=50)
+    build_bundle = models.BooleanField(default=True, help_text='Also produce one merged PDF for download')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', db_index=True)
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='report_card_batches')
+    total_students = models.PositiveIntegerField(default=0)
+    rendered_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    bundle = models.FileField(upload_to=report_card_bundle_path, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['school', 'academic_year', 'academic_term']),
+        ]
+
+    def __str__(self):
+        return f"Report batch {self.id} - {self.academic_term} {self.academic_year} ({self.status})"
+
+
+class ReportCardFile(models.Model):
+    """One rendered student report card PDF produced by a ReportCardBatch."""
+    batch = models.ForeignKey(ReportCardBatch, on_delete=models.CASCADE, related_name='files')
+    student = models.ForeignKey('Student', on_delete=models.CASCADE, related_name='report_card_files')
+    class_obj = models.ForeignKey('Class', on_delete=models.CASCADE, related_name='report_card_files')
+    pdf = models.FileField(upload_to=report_card_file_path)
+    generated_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('batch', 'student')
+        ordering = ['class_obj_id', 'id']
+
+    def __str__(self):
+        return f"{self.student} report card (batch {self.batch_id})"
+
+
 class Complaint(models.Model):
     COMPLAINT_TYPE_CHOICES = [
         ('parent', 'Parent'),
@@ -969,6 +1263,55 @@ class AttendancePermission(models.Model):
         return f"{self.student.user.full_name} - {self.date} - {scope} ({'approved' if self.approved else 'pending'})"
 
 
+ATTENDANCE_ROLLUP_KIND_CHOICES = [
+    ('class', 'Daily class attendance'),
+    ('subject', 'Subject/period attendance'),
+]
+
+
+class AttendanceDailyRollup(models.Model):
+    """Per class, per day status counts; maintained by academics/attendance_rollups.py."""
+    school = models.ForeignKey('users.School', on_delete=models.CASCADE, null=True, blank=True, related_name='attendance_daily_rollups')
+    class_assigned = models.ForeignKey('Class', on_delete=models.CASCADE, related_name='attendance_daily_rollups')
+    date = models.DateField()
+    kind = models.CharField(max_length=10, choices=ATTENDANCE_ROLLUP_KIND_CHOICES, default='class')
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    late = models.PositiveIntegerField(default=0)
+    excused = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('class_assigned', 'date', 'kind')
+        indexes = [models.Index(fields=['school', 'kind', 'date'])]
+
+    @property
+    def total(self):
+        return self.present + self.absent + self.late + self.excused
+
+    def __str__(self):
+        return f"{self.class_assigned_id} {self.kind} {self.date}: {self.present}/{self.total}"
+
+
+class StudentAttendanceMonthly(models.Model):
+    """Per student, per calendar month status counts; maintained by academics/attendance_rollups.py."""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='attendance_monthly')
+    month = models.DateField(help_text='First day of the month')
+    kind = models.CharField(max_length=10, choices=ATTENDANCE_ROLLUP_KIND_CHOICES, default='class')
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    late = models.PositiveIntegerField(default=0)
+    excused = models.PositiveIntegerField(default=0)
+    bunked = models.PositiveIntegerField(default=0, help_text='Subject periods flagged as bunked')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('student', 'month', 'kind')
+
+    def __str__(self):
+        return f"{self.student_id} {self.kind} {self.month:%Y-%m}"
+
+
 # Keep backward-compatible alias so existing imports (report card, etc.) don't break immediately
 Attendance = ClassAttendance
 
@@ -1446,6 +1789,51 @@ class AtRiskAlert(models.Model):
         return f"{self.student.user.full_name} - {self.subject.name if self.subject else 'Overall'} ({self.status})"
 
 
+class PendingAtRiskEvaluation(models.Model):
+    """A student/subject whose at-risk alert is re-evaluated by the next coalesced run."""
+    school = models.ForeignKey('users.School', on_delete=models.CASCADE, null=True, related_name='pending_at_risk_evaluations')
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='pending_at_risk_evaluations')
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='pending_at_risk_evaluations')
+    queued_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('student', 'subject')
+        indexes = [
+            models.Index(fields=['school', 'queued_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id}:{self.subject_id}"
+
+
+class StudentPredictionCache(models.Model):
+    """Persisted grade predictions for one student; valid while computed_version == version."""
+    student = models.OneToOneField(Student, on_delete=models.CASCADE, related_name='prediction_cache')
+    version = models.PositiveIntegerField(default=1, help_text="Bumped whenever the student's results change")
+    computed_version = models.PositiveIntegerField(default=0, help_text='Version the stored predictions were computed from')
+    predictions = models.JSONField(default=list, blank=True)
+    computed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Predictions for student {self.student_id} (v{self.computed_version}/{self.version})"
+
+
+class StudentDashboardSummary(models.Model):
+    """Student/parent dashboard figures for one student; valid while computed_version == version."""
+    student = models.OneToOneField(Student, on_delete=models.CASCADE, related_name='dashboard_summary')
+    version = models.PositiveIntegerField(default=1, help_text="Bumped by the student's result, attendance and fee writes")
+    computed_version = models.PositiveIntegerField(default=0, help_text='Version the stored figures were computed from')
+    overall_average = models.FloatField(default=0)
+    subject_averages = models.JSONField(default=dict, blank=True)
+    attendance_percentage = models.FloatField(default=100)
+    bunked_periods = models.PositiveIntegerField(default=0)
+    outstanding_fees = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    computed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Dashboard summary for student {self.student_id} (v{self.computed_version}/{self.version})"
+
+
 class BulkImportJob(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -9,6 +9,7 @@ urlpatterns = [
     path('children/<int:child_id>/stats/', parent_views.child_dashboard_stats, name='child-dashboard-stats'),
     path('children/<int:child_id>/performance/', parent_views.child_performance, name='child-performance'),
     path('children/<int:child_id>/fees/', parent_views.child_fees, name='child-fees'),
+    path('overview/', parent_views.parent_overview, name='parent-overview'),
     path('students/search/', parent_views.search_students, name='search-students'),
     
     path('homework/', homework_views.parent_homework_list, name='parent-homework-list'),
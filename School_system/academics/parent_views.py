@@ -1,4 +1,5 @@
 import logging
+from collections import defaultdict
 
 from django.db.models import Avg, Count, Q, Sum
 from django.utils import timezone
@@ -9,8 +10,9 @@ from rest_framework.response import Response
 logger = logging.getLogger(__name__)
 from datetime import datetime
 from .models import (
-    Parent, Student, ParentChildLink, Result, ClassAttendance, SubjectAttendance, Timetable
+    Parent, Student, ParentChildLink, Result
 )
+from .dashboard_summary import class_subjects, class_subjects_for, get_dashboard_summaries, get_dashboard_summary
 from .utils import MAX_PARENTS_PER_CHILD, check_rate_limit, log_school_audit
 from finances.models import StudentFee, Payment, StudentPaymentRecord, PaymentTransaction
 from finances.fee_calculator import build_school_fee_breakdown, get_additional_fees_for_student
@@ -316,83 +318,23 @@ def child_dashboard_stats(request, child_id):
     try:
         parent = request.user.parent
         # Verify this child belongs to the parent and is confirmed
-        link = ParentChildLink.objects.get(parent=parent, student_id=child_id, is_confirmed=True)
+        link = ParentChildLink.objects.select_related('student__user', 'student__student_class').get(
+            parent=parent, student_id=child_id, is_confirmed=True,
+        )
         student = link.student
-        
-        # Calculate overall average from results
-        results = Result.objects.filter(student=student)
-        avg_percentage = 0
-        if results.exists():
-            total_percentage = 0
-            count = 0
-            for result in results:
-                if result.max_score > 0:
-                    total_percentage += (result.score / result.max_score) * 100
-                    count += 1
-            if count > 0:
-                avg_percentage = round(total_percentage / count, 1)
-        
-        # Get subjects the child is currently learning from their timetable
-        subjects = []
-        if student.student_class:
-            subject_rows = (
-                Timetable.objects.filter(
-                    class_assigned=student.student_class,
-                    class_assigned__school=request.user.school,
-                    subject__is_deleted=False,
-                )
-                .values('subject_id', 'subject__name', 'subject__code')
-                .distinct()
-                .order_by('subject__name')
-            )
-            subjects = [
-                {
-                    'id': row['subject_id'],
-                    'name': row['subject__name'],
-                    'code': row['subject__code'],
-                }
-                for row in subject_rows
-            ]
-        total_subjects = len(subjects)
-        
-        # Calculate attendance percentage
-        total_days = ClassAttendance.objects.filter(student=student).count()
-        present_days = ClassAttendance.objects.filter(
-            student=student,
-            status__in=['present', 'late']
-        ).count()
-        attendance_percentage = round((present_days / total_days * 100), 1) if total_days > 0 else 100
-        bunked_periods = SubjectAttendance.objects.filter(student=student, bunk_flag=True).count()
-        
-        # Calculate outstanding fees using the same logic/path as the Parent Fees page.
+        summary = get_dashboard_summary(student)
+        subjects = class_subjects(student)
         school = request.user.school
-        student_fees = StudentFee.objects.filter(student=student)
-        fee_breakdown = build_school_fee_breakdown(student, school, parent=parent)
-        additional_fees = get_additional_fees_for_student(student, school)
-
-        legacy_total_fees = sum(float(fee.amount_due) for fee in student_fees)
-        school_fee_total = float(fee_breakdown['total_school_fee'])
-        additional_fees_total = sum(float(f.amount) for f in additional_fees)
-        total_fees = school_fee_total + additional_fees_total + legacy_total_fees
-
-        legacy_paid = sum(float(fee.amount_paid) for fee in student_fees)
-        payment_records_paid = sum(
-            float(record.amount_paid)
-            for record in StudentPaymentRecord.objects.filter(
-                student=student,
-                school=school,
-            )
-        )
-        total_paid = legacy_paid + payment_records_paid
-        outstanding_fees = max(total_fees - total_paid, 0)
         
+        from .class_rankings import current_term_position
         data = {
-            'overall_average': avg_percentage,
-            'total_subjects': total_subjects,
+            'overall_average': summary.overall_average,
+            'total_subjects': len(subjects),
             'subjects': subjects,
-            'attendance_percentage': attendance_percentage,
-            'bunked_periods': bunked_periods,
-            'outstanding_fees': float(outstanding_fees)
+            'attendance_percentage': summary.attendance_percentage,
+            'bunked_periods': summary.bunked_periods,
+            'outstanding_fees': float(summary.outstanding_fees),
+            'class_position': current_term_position(student, school),
         }
         
         return Response(data)
@@ -404,6 +346,58 @@ def child_dashboard_stats(request, child_id):
                        status=status.HTTP_404_NOT_FOUND)
 
 
+def _performance_rows(results):
+    """Group a child's results by subject into the child_performance payload."""
+    subjects_data = {}
+    for result in results:
+        subject_id = result.subject.id
+        if subject_id not in subjects_data:
+            subjects_data[subject_id] = {
+                'subject_id': subject_id,
+                'subject_name': result.subject.name,
+                'test_scores': [],
+                'assignment_scores': [],
+                'recent_scores': []
+            }
+        
+        # Calculate percentage
+        percentage = round((result.score / result.max_score * 100), 1) if result.max_score > 0 else 0
+        
+        # Categorize by exam type
+        if 'test' in result.exam_type.lower() or 'exam' in result.exam_type.lower():
+            subjects_data[subject_id]['test_scores'].append(percentage)
+        else:
+            subjects_data[subject_id]['assignment_scores'].append(percentage)
+        
+        # Add to recent scores
+        subjects_data[subject_id]['recent_scores'].append({
+            'name': result.exam_type,
+            'percentage': percentage,
+            'date': result.date_recorded.strftime('%Y-%m-%d')
+        })
+    
+    # Calculate averages
+    data = []
+    for subject in subjects_data.values():
+        test_avg = round(sum(subject['test_scores']) / len(subject['test_scores']), 1) if subject['test_scores'] else 0
+        assignment_avg = round(sum(subject['assignment_scores']) / len(subject['assignment_scores']), 1) if subject['assignment_scores'] else 0
+        
+        # Overall term and year percentage
+        all_scores = subject['test_scores'] + subject['assignment_scores']
+        overall_avg = round(sum(all_scores) / len(all_scores), 1) if all_scores else 0
+        
+        data.append({
+            'subject_id': subject['subject_id'],
+            'subject_name': subject['subject_name'],
+            'test_score_percentage': test_avg,
+            'assignment_score_percentage': assignment_avg,
+            'overall_term_percentage': overall_avg,
+            'overall_year_percentage': overall_avg,
+            'recent_scores': sorted(subject['recent_scores'], key=lambda x: x['date'], reverse=True)[:3]
+        })
+    return data
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def child_performance(request, child_id):
@@ -418,61 +412,81 @@ def child_performance(request, child_id):
         link = ParentChildLink.objects.get(parent=parent, student_id=child_id, is_confirmed=True)
         student = link.student
         
-        results = Result.objects.filter(student=student)
-        
-        # Group results by subject
-        subjects_data = {}
-        for result in results:
-            subject_id = result.subject.id
-            if subject_id not in subjects_data:
-                subjects_data[subject_id] = {
-                    'subject_id': subject_id,
-                    'subject_name': result.subject.name,
-                    'test_scores': [],
-                    'assignment_scores': [],
-                    'recent_scores': []
-                }
-            
-            # Calculate percentage
-            percentage = round((result.score / result.max_score * 100), 1) if result.max_score > 0 else 0
-            
-            # Categorize by exam type
-            if 'test' in result.exam_type.lower() or 'exam' in result.exam_type.lower():
-                subjects_data[subject_id]['test_scores'].append(percentage)
-            else:
-                subjects_data[subject_id]['assignment_scores'].append(percentage)
-            
-            # Add to recent scores
-            subjects_data[subject_id]['recent_scores'].append({
-                'name': result.exam_type,
-                'percentage': percentage,
-                'date': result.date_recorded.strftime('%Y-%m-%d')
-            })
+        data = _performance_rows(Result.objects.filter(student=student).select_related('subject'))
         
-        # Calculate averages
+        return Response(data)
+    except ParentChildLink.DoesNotExist:
+        return Response({'error': 'Child not found or not confirmed'}, 
+                       status=status.HTTP_404_NOT_FOUND)
+    except Parent.DoesNotExist:
+        return Response({'error': 'Parent profile not found'}, 
+                       status=status.HTTP_404_NOT_FOUND)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def parent_overview(request):
+    """
+    Stats, performance and fee status for every confirmed child in one call.
+
+    Replaces one child_dashboard_stats/child_performance/child_fees round trip
+    per child on app open: the links are resolved once and each section is
+    read for all children together, keyed by student id.
+    """
+    if request.user.role != 'parent':
+        return Response({'error': 'Only parents can access this endpoint'}, 
+                       status=status.HTTP_403_FORBIDDEN)
+    
+    try:
+        parent = request.user.parent
+        child_links = list(ParentChildLink.objects.filter(
+            parent=parent,
+            is_confirmed=True
+        ).select_related('student__user', 'student__student_class').order_by('id'))
+        students = [link.student for link in child_links]
+        school = request.user.school
+
+        from .class_rankings import current_term_positions
+        summaries = get_dashboard_summaries(students)
+        subjects_by_student = class_subjects_for(students)
+        positions = current_term_positions(students, school)
+        results_by_student = defaultdict(list)
+        for result in Result.objects.filter(
+            student_id__in=[student.id for student in students],
+        ).select_related('subject').order_by('id'):
+            results_by_student[result.student_id].append(result)
+
         data = []
-        for subject in subjects_data.values():
-            test_avg = round(sum(subject['test_scores']) / len(subject['test_scores']), 1) if subject['test_scores'] else 0
-            assignment_avg = round(sum(subject['assignment_scores']) / len(subject['assignment_scores']), 1) if subject['assignment_scores'] else 0
-            
-            # Overall term and year percentage
-            all_scores = subject['test_scores'] + subject['assignment_scores']
-            overall_avg = round(sum(all_scores) / len(all_scores), 1) if all_scores else 0
-            
+        for link in child_links:
+            student = link.student
+            summary = summaries[student.id]
+            subjects = subjects_by_student[student.id]
+            outstanding = float(summary.outstanding_fees)
             data.append({
-                'subject_id': subject['subject_id'],
-                'subject_name': subject['subject_name'],
-                'test_score_percentage': test_avg,
-                'assignment_score_percentage': assignment_avg,
-                'overall_term_percentage': overall_avg,
-                'overall_year_percentage': overall_avg,
-                'recent_scores': sorted(subject['recent_scores'], key=lambda x: x['date'], reverse=True)[:3]
+                'id': student.id,
+                'name': student.user.first_name,
+                'surname': student.user.last_name,
+                'class': student.student_class.name if student.student_class else 'Not Assigned',
+                'student_number': student.user.student_number or '',
+                'residence_type': student.residence_type,
+                'is_confirmed': link.is_confirmed,
+                'stats': {
+                    'overall_average': summary.overall_average,
+                    'total_subjects': len(subjects),
+                    'subjects': subjects,
+                    'attendance_percentage': summary.attendance_percentage,
+                    'bunked_periods': summary.bunked_periods,
+                    'outstanding_fees': outstanding,
+                    'class_position': positions[student.id],
+                },
+                'performance': _performance_rows(results_by_student[student.id]),
+                'fees': {
+                    'outstanding': outstanding,
+                    'status': 'outstanding' if outstanding > 0 else 'clear',
+                },
             })
         
         return Response(data)
-    except ParentChildLink.DoesNotExist:
-        return Response({'error': 'Child not found or not confirmed'}, 
-                       status=status.HTTP_404_NOT_FOUND)
     except Parent.DoesNotExist:
         return Response({'error': 'Parent profile not found'}, 
                        status=status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,114 @@
+"""
+Persisted grade prediction cache.
+
+Predictions are stored per student in StudentPredictionCache. Each row has a
+version stamp that result write paths bump, and the version the stored
+predictions were computed from. Reads recompute only the stale rows, so risk
+screens become a single cache read once the cache is warm:
+
+    from .prediction_cache import get_cached_predictions, invalidate_student_predictions
+    by_student = get_cached_predictions(students)        # {student_id: [prediction, ...]}
+    invalidate_student_predictions([result.student_id])  # after a Result write
+
+Write paths call invalidate_student_predictions() after saving/deleting a
+Result; out-of-band writes (Go bulk imports) call invalidate_school_predictions().
+tasks.warm_prediction_cache_task rebuilds stale rows nightly.
+"""
+
+import logging
+
+from django.db.models import F
+from django.utils import timezone
+
+from .ml_predictions import predict_grades_for_students
+from .models import Student, StudentPredictionCache
+
+logger = logging.getLogger(__name__)
+
+
+def get_cached_predictions(students):
+    """
+    Return {student_id: [prediction, ...]} for `students` (queryset, Students or ids).
+
+    Fresh rows are read in one query; stale or missing ones are recomputed in
+    one vectorized pass and written back.
+    """
+    student_ids = [s if isinstance(s, int) else s.pk for s in students]
+    if not student_ids:
+        return {}
+
+    rows = {
+        row.student_id: row
+        for row in StudentPredictionCache.objects.filter(student_id__in=student_ids)
+    }
+    missing = [sid for sid in student_ids if sid not in rows]
+    if missing:
+        StudentPredictionCache.objects.bulk_create(
+            [StudentPredictionCache(student_id=sid) for sid in missing], ignore_conflicts=True,
+        )
+        rows.update({
+            row.student_id: row
+            for row in StudentPredictionCache.objects.filter(student_id__in=missing)
+        })
+
+    by_student = {}
+    stale = []
+    for sid in student_ids:
+        row = rows.get(sid)
+        if row is None:
+            continue
+        if row.computed_version == row.version:
+            if row.predictions:
+                by_student[sid] = row.predictions
+        else:
+            stale.append(row)
+
+    if stale:
+        fresh = predict_grades_for_students([row.student_id for row in stale])
+        now = timezone.now()
+        for row in stale:
+            row.predictions = fresh.get(row.student_id, [])
+            # Stamp with the version read before computing: a write that lands
+            # meanwhile bumps `version` past it and the row stays stale.
+            row.computed_version = row.version
+            row.computed_at = now
+            if row.predictions:
+                by_student[row.student_id] = row.predictions
+        StudentPredictionCache.objects.bulk_update(
+            stale, ['predictions', 'computed_version', 'computed_at'], batch_size=500,
+        )
+    return by_student
+
+
+def get_cached_student_predictions(student):
+    """Cached equivalent of ml_predictions.predict_student_grades(student)."""
+    return get_cached_predictions([student.pk]).get(student.pk, [])
+
+
+def invalidate_student_predictions(student_ids):
+    """Bump the version stamp for these students so their next read recomputes."""
+    student_ids = {sid for sid in student_ids if sid}
+    if student_ids:
+        StudentPredictionCache.objects.filter(student_id__in=student_ids).update(version=F('version') + 1)
+
+
+def invalidate_school_predictions(school):
+    """Bump every student in a school (e.g. after an out-of-band results import)."""
+    StudentPredictionCache.objects.filter(student__user__school=school).update(version=F('version') + 1)
+
+
+def warm_prediction_cache(school=None, chunk_size=500):
+    """Recompute stale/missing predictions for every active student (optionally one school)."""
+    students = Student.objects.filter(user__is_active=True)
+    if school is not None:
+        students = students.filter(user__school=school)
+    student_ids = list(students.order_by('id').values_list('id', flat=True))
+    warmed = 0
+    for start in range(0, len(student_ids), chunk_size):
+        chunk = student_ids[start:start + chunk_size]
+        try:
+            get_cached_predictions(chunk)
+            warmed += len(chunk)
+        except Exception as exc:
+            logger.error("Prediction cache warm-up failed for students %s..%s: %s", chunk[0], chunk[-1], exc)
+    return warmed
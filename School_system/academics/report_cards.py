@@ -0,0 +1,413 @@
+"""
+Report card render context and class-wide batch engine.
+
+A single report card needs a dozen small lookups (report config, attendance,
+feedback, previous term, class position, promotion, fees). ReportCardContext
+runs them per student, which is what the on-demand PDF endpoint uses.
+ClassReportCardContext answers the same questions from data preloaded once
+per class, so rendering a batch costs a fixed number of queries per class
+rather than per student:
+
+    from .report_cards import run_report_card_batch
+    run_report_card_batch(batch)   # usually via tasks.generate_report_card_batch_task
+
+Pages are rendered in-process by default. Set REPORT_CARD_RENDER_PROCESSES > 1
+to fan rendering out across a process pool; this needs a worker that is
+allowed to fork (e.g. `celery worker --pool=threads` or `--pool=solo`), and
+falls back to in-process rendering otherwise.
+"""
+
+import io
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections
+from django.db.models import Case, CharField, Count, F, Q, Sum, When
+from django.utils import timezone
+
+from .class_rankings import class_position_for, class_subject_stats_for, get_class_ranking
+from .models import (
+    Class, ClassAttendance, PromotionRecord, ReportCardApprovalRequest, ReportCardBatch,
+    ReportCardFile, Result, Student, SubjectTermFeedback,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def report_results_queryset(year, term):
+    """Results that belong on a year/term report card (report_term overrides academic_term)."""
+    return Result.objects.filter(
+        academic_year=year, include_in_report=True,
+    ).annotate(
+        effective_term=Case(
+            When(report_term='', then=F('academic_term')),
+            default=F('report_term'),
+            output_field=CharField(),
+        )
+    ).filter(effective_term=term).select_related('subject', 'assessment_plan')
+
+
+def _previous_term(term):
+    return {'Term 2': 'Term 1', 'Term 3': 'Term 2'}.get(term)
+
+
+def _average_by_subject(rows):
+    """rows: iterable of (subject_name, score, max_score) -> {subject_name: pct}."""
+    out = {}
+    for subject_name, score, max_score in rows:
+        out.setdefault(subject_name, []).append((score / max_score * 100) if max_score else 0.0)
+    return {k: round(sum(v) / len(v), 1) for k, v in out.items() if v}
+
+
+class ReportCardContext:
+    """Per-student lookups for one school/year/term report card."""
+
+    def __init__(self, school, year, term):
+        from .views import _get_report_config
+        self.school = school
+        self.year = year
+        self.term = term
+        self.cfg = _get_report_config(school)
+        self._styles = None
+
+    def __getstate__(self):
+        # ReportLab stylesheets are rebuilt in worker processes rather than pickled.
+        state = self.__dict__.copy()
+        state['_styles'] = None
+        return state
+
+    @property
+    def styles(self):
+        if self._styles is None:
+            from reportlab.lib.styles import getSampleStyleSheet
+            self._styles = getSampleStyleSheet()
+        return self._styles
+
+    def teacher_comment(self, student):
+        if not student.student_class_id:
+            return ''
+        approval = ReportCardApprovalRequest.objects.filter(
+            school=self.school,
+            class_obj_id=student.student_class_id,
+            academic_year=self.year,
+            academic_term=self.term,
+        ).order_by('-submitted_at').first()
+        return approval.teacher_comment if approval else ''
+
+    def attendance_counts(self, student):
+        """Return (total, present, absent, late) class attendance days."""
+        agg = student.class_attendance_records.filter(date__isnull=False).aggregate(
+            total=Count('id'),
+            present=Count('id', filter=Q(status='present')),
+            absent=Count('id', filter=Q(status='absent')),
+            late=Count('id', filter=Q(status='late')),
+        )
+        return agg['total'], agg['present'], agg['absent'], agg['late']
+
+    def feedback_map(self, student):
+        return {
+            fb.subject.name: fb for fb in SubjectTermFeedback.objects.filter(
+                student=student, academic_year=self.year, academic_term=self.term,
+            ).select_related('subject')
+        }
+
+    def previous_term_averages(self, student):
+        prev_term = _previous_term(self.term)
+        if not prev_term:
+            return {}
+        return _average_by_subject(
+            Result.objects.filter(
+                student=student, academic_year=self.year, academic_term=prev_term,
+                include_in_report=True,
+            ).values_list('subject__name', 'score', 'max_score')
+        )
+
+    def class_subject_stats(self, student):
+        if not student.student_class_id:
+            return {}
+        return class_subject_stats_for(student, self.year, self.term)
+
+    def class_position(self, student):
+        if not student.student_class_id:
+            return None, None
+        return class_position_for(student, self.year, self.term)
+
+    def subject_group_map(self):
+        from users.models import SubjectGroup
+        return {
+            sg.subject.name: sg.group_type
+            for sg in SubjectGroup.objects.filter(school=self.school).select_related('subject')
+        }
+
+    def promotion(self, student):
+        return PromotionRecord.objects.filter(
+            student=student, academic_year=self.year,
+        ).select_related('to_class').order_by('-date_processed').first()
+
+    def fee_totals(self, student):
+        """Return (amount_due, amount_paid) for the student's term StudentFees."""
+        from finances.models import StudentFee
+        fees = StudentFee.objects.filter(student=student, academic_year=self.year, academic_term=self.term)
+        return sum((f.amount_due for f in fees), 0), sum((f.amount_paid for f in fees), 0)
+
+
+class ClassReportCardContext(ReportCardContext):
+    """ReportCardContext with every lookup preloaded for one class."""
+
+    def __init__(self, school, class_obj, year, term, students):
+        super().__init__(school, year, term)
+        from finances.models import StudentFee
+        from users.models import SubjectGroup
+
+        self.class_obj = class_obj
+        student_ids = [s.id for s in students]
+
+        approval = ReportCardApprovalRequest.objects.filter(
+            school=school, class_obj=class_obj, academic_year=year, academic_term=term,
+        ).order_by('-submitted_at').first()
+        self._teacher_comment = approval.teacher_comment if approval else ''
+
+        self._attendance = {
+            row['student_id']: (row['total'], row['present'], row['absent'], row['late'])
+            for row in ClassAttendance.objects.filter(
+                student_id__in=student_ids, date__isnull=False,
+            ).values('student_id').annotate(
+                total=Count('id'),
+                present=Count('id', filter=Q(status='present')),
+                absent=Count('id', filter=Q(status='absent')),
+                late=Count('id', filter=Q(status='late')),
+            )
+        }
+
+        self._feedback = defaultdict(dict)
+        for fb in SubjectTermFeedback.objects.filter(
+            student_id__in=student_ids, academic_year=year, academic_term=term,
+        ).select_related('subject'):
+            self._feedback[fb.student_id][fb.subject.name] = fb
+
+        self._previous = {}
+        prev_term = _previous_term(term)
+        if prev_term:
+            rows = defaultdict(list)
+            for sid, name, score, max_score in Result.objects.filter(
+                student_id__in=student_ids, academic_year=year, academic_term=prev_term,
+                include_in_report=True,
+            ).values_list('student_id', 'subject__name', 'score', 'max_score'):
+                rows[sid].append((name, score, max_score))
+            self._previous = {sid: _average_by_subject(r) for sid, r in rows.items()}
+
+        self._ranking = get_class_ranking(class_obj.id, year, term)
+
+        self._groups = {
+            sg.subject.name: sg.group_type
+            for sg in SubjectGroup.objects.filter(school=school).select_related('subject')
+        }
+
+        self._promotions = {}
+        for promo in PromotionRecord.objects.filter(
+            student_id__in=student_ids, academic_year=year,
+        ).select_related('to_class').order_by('date_processed'):
+            self._promotions[promo.student_id] = promo
+
+        self._fees = {
+            row['student_id']: (row['due'] or 0, row['paid'] or 0)
+            for row in StudentFee.objects.filter(
+                student_id__in=student_ids, academic_year=year, academic_term=term,
+            ).values('student_id').annotate(due=Sum('amount_due'), paid=Sum('amount_paid'))
+        }
+
+    def teacher_comment(self, student):
+        return self._teacher_comment
+
+    def attendance_counts(self, student):
+        return self._attendance.get(student.id, (0, 0, 0, 0))
+
+    def feedback_map(self, student):
+        return self._feedback.get(student.id, {})
+
+    def previous_term_averages(self, student):
+        return self._previous.get(student.id, {})
+
+    def class_subject_stats(self, student):
+        return class_subject_stats_for(student, self.year, self.term, ranking=self._ranking)
+
+    def class_position(self, student):
+        return class_position_for(student, self.year, self.term, ranking=self._ranking)
+
+    def subject_group_map(self):
+        return self._groups
+
+    def promotion(self, student):
+        return self._promotions.get(student.id)
+
+    def fee_totals(self, student):
+        return self._fees.get(student.id, (0, 0))
+
+
+def _render_student_pdf(job):
+    """Render one student's PDF bytes. Module-level so it can run in a process pool."""
+    from .views import _build_report_card_pdf
+    student, results, school, year, term, context = job
+    return student.id, _build_report_card_pdf(student, results, school, year, term, context=context).read()
+
+
+def _render_jobs(jobs):
+    """Yield (student_id, pdf_bytes | Exception) for each job, using a process pool when configured."""
+    processes = int(getattr(settings, 'REPORT_CARD_RENDER_PROCESSES', 1) or 1)
+    if processes > 1 and len(jobs) > 1:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        try:
+            # Forked children must not share the parent's DB socket.
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=processes, mp_context=multiprocessing.get_context('fork'),
+            ) as pool:
+                rendered = list(pool.map(_render_student_pdf, jobs, chunksize=4))
+            yield from rendered
+            return
+        except Exception as exc:
+            logger.warning("Report card process pool unavailable (%s); rendering in-process", exc)
+    for job in jobs:
+        try:
+            yield _render_student_pdf(job)
+        except Exception as exc:
+            yield job[0].id, exc
+
+
+def _merge_pdfs(pdf_blobs):
+    from pypdf import PdfWriter
+    writer = PdfWriter()
+    for blob in pdf_blobs:
+        writer.append(io.BytesIO(blob))
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def run_report_card_batch(batch):
+    """
+    Render every student in the batch's classes and persist per-student PDFs (+ optional bundle).
+
+    Cards already stored on the batch (by an earlier, interrupted attempt) are
+    kept and skipped, so a retried task only renders what is missing.
+    """
+    school = batch.school
+    year, term = batch.academic_year, batch.academic_term
+    classes = list(
+        Class.objects.filter(school=school, id__in=batch.class_ids).select_related('class_teacher').order_by('name')
+    )
+    # Warm school.settings once so every render (and pickled job) reuses it.
+    getattr(school, 'settings', None)
+    generated = {f.student_id: f for f in batch.files.all()}
+
+    batch.status = 'running'
+    batch.started_at = timezone.now()
+    batch.rendered_count = len(generated)
+    batch.failed_count = 0
+    batch.errors = []
+    batch.save(update_fields=['status', 'started_at', 'rendered_count', 'failed_count', 'errors'])
+
+    bundle_parts = []
+    errors = []
+    total = 0
+    for class_obj in classes:
+        students = list(
+            Student.objects.filter(student_class=class_obj, user__is_active=True)
+            .select_related('user', 'student_class__class_teacher')
+            .order_by('user__last_name', 'user__first_name')
+        )
+        if not students:
+            continue
+        total += len(students)
+        pending = [s for s in students if s.id not in generated]
+        outputs = {}
+        if pending:
+            outputs = _render_class(batch, class_obj, pending, errors)
+        if batch.build_bundle:
+            for student in students:
+                if student.id in generated:
+                    with generated[student.id].pdf.open('rb') as fh:
+                        bundle_parts.append(fh.read())
+                elif student.id in outputs:
+                    bundle_parts.append(outputs[student.id])
+
+        batch.total_students = total
+        batch.rendered_count += len(outputs)
+        batch.failed_count = len(errors)
+        batch.save(update_fields=['total_students', 'rendered_count', 'failed_count'])
+
+    if batch.build_bundle and bundle_parts:
+        batch.bundle.save(f'report_cards_{term}_{year}.pdf'.replace(' ', '_'),
+                          ContentFile(_merge_pdfs(bundle_parts)), save=False)
+
+    batch.total_students = total
+    batch.errors = errors[:500]
+    batch.status = 'failed' if total and not batch.rendered_count else 'done'
+    batch.completed_at = timezone.now()
+    batch.save(update_fields=['total_students', 'errors', 'status', 'bundle', 'completed_at'])
+    return batch
+
+
+def _render_class(batch, class_obj, students, errors):
+    """Render and store one class's cards; returns {student_id: pdf_bytes} for those stored."""
+    school = batch.school
+    year, term = batch.academic_year, batch.academic_term
+    results_by_student = defaultdict(list)
+    for r in report_results_queryset(year, term).filter(
+        student_id__in=[s.id for s in students],
+    ).order_by('subject__name'):
+        results_by_student[r.student_id].append(r)
+
+    context = ClassReportCardContext(school, class_obj, year, term, students)
+    jobs = [(s, results_by_student.get(s.id, []), school, year, term, context) for s in students]
+    by_id = {s.id: s for s in students}
+
+    files = []
+    outputs = {}
+    try:
+        for student_id, output in _render_jobs(jobs):
+            student = by_id[student_id]
+            if isinstance(output, Exception):
+                logger.error("Report card render failed for student %s: %s", student_id, output)
+                errors.append({'student_id': student_id, 'error': str(output)})
+                continue
+            report_file = ReportCardFile(batch=batch, student=student, class_obj=class_obj)
+            number = student.user.student_number or student.id
+            report_file.pdf.save(f'report_card_{number}_{term}_{year}.pdf'.replace(' ', '_'),
+                                 ContentFile(output), save=False)
+            files.append(report_file)
+            outputs[student_id] = output
+        ReportCardFile.objects.bulk_create(files)
+    except BaseException:
+        # Interrupted (time limit, worker error): drop the PDFs that never got a row.
+        for report_file in files:
+            report_file.pdf.delete(save=False)
+        raise
+    return outputs
+
+
+def discard_report_card_batch_files(batch):
+    """Delete a batch's stored PDFs, file rows and bundle."""
+    for report_file in batch.files.all():
+        report_file.pdf.delete(save=False)
+    batch.files.all().delete()
+    if batch.bundle:
+        batch.bundle.delete(save=False)
+
+
+def queue_report_card_batch(school, class_ids, year, term, requested_by, build_bundle=True):
+    """Create a ReportCardBatch and hand it to the Celery worker."""
+    from .tasks import generate_report_card_batch_task
+    batch = ReportCardBatch.objects.create(
+        school=school,
+        class_ids=sorted({int(cid) for cid in class_ids}),
+        academic_year=year,
+        academic_term=term,
+        build_bundle=build_bundle,
+        requested_by=requested_by,
+    )
+    generate_report_card_batch_task.delay(batch.id)
+    return batch
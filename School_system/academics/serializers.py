@@ -12,22 +12,24 @@ from .models import (
     SportsHouse, MatchSquadEntry, TrainingAttendance, HousePointEntry,
 )
 from users.serializers import UserSerializer
+from School_system.serializer_prefetch import PrefetchPlanMixin, prefetched_first
 from .utils import generate_unique_student_number, MAX_PARENTS_PER_CHILD
 from users.models import CustomUser
 from django.db import transaction
+from django.db.models import Prefetch
 from django.utils import timezone
 from staff.models import Staff
 
-class SubjectSerializer(serializers.ModelSerializer):
+class SubjectSerializer(PrefetchPlanMixin, serializers.ModelSerializer):
     teachers = serializers.SerializerMethodField()
     teacher_names = serializers.SerializerMethodField()
+    prefetch_related_plan = ('teachers__user',)
     
     class Meta:
         model = Subject
         fields = ['id', 'name', 'code', 'description', 'is_priority', 'teachers', 'teacher_names']
     
     def get_teachers(self, obj):
-        # prefetch_related('teachers__user') in the view makes this a single query
         return [{'id': t.id, 'name': t.user.get_full_name()} for t in obj.teachers.all()]
 
     def get_teacher_names(self, obj):
@@ -37,7 +39,15 @@ class SubjectSerializer(serializers.ModelSerializer):
         return 'No teacher assigned'
 
 
-class ClassSerializer(serializers.ModelSerializer):
+class ClassSerializer(PrefetchPlanMixin, serializers.ModelSerializer):
+    select_related_plan = ('class_teacher',)
+    prefetch_related_plan = (
+        Prefetch(
+            'subject_assignments',
+            queryset=ClassSubjectAssignment.objects.select_related('subject').order_by('subject__name', 'id'),
+            to_attr='prefetched_subject_assignments',
+        ),
+    )
     class_teacher_name = serializers.CharField(source='class_teacher.full_name', read_only=True)
     student_count = serializers.SerializerMethodField()
     subject_ids = serializers.ListField(
@@ -66,16 +76,23 @@ class ClassSerializer(serializers.ModelSerializer):
         return obj.students.count()
 
     def get_subjects_detail(self, obj):
-        assignments = (
-            ClassSubjectAssignment.objects
-            .filter(
-                class_obj=obj,
-                school=obj.school,
-                academic_year=obj.academic_year,
+        prefetched = getattr(obj, 'prefetched_subject_assignments', None)
+        if prefetched is not None:
+            assignments = [
+                a for a in prefetched
+                if a.school_id == obj.school_id and a.academic_year == obj.academic_year
+            ]
+        else:
+            assignments = (
+                ClassSubjectAssignment.objects
+                .filter(
+                    class_obj=obj,
+                    school_id=obj.school_id,
+                    academic_year=obj.academic_year,
+                )
+                .select_related('subject')
+                .order_by('subject__name', 'id')
             )
-            .select_related('subject')
-            .order_by('subject__name')
-        )
         return [
             {'id': a.subject_id, 'name': a.subject.name, 'code': a.subject.code}
             for a in assignments
@@ -165,7 +182,9 @@ class ClassSerializer(serializers.ModelSerializer):
             ClassSubjectAssignment.objects.bulk_create(new_rows)
 
 
-class StudentSerializer(serializers.ModelSerializer):
+class StudentSerializer(PrefetchPlanMixin, serializers.ModelSerializer):
+    select_related_plan = ('student_class', 'house')
+    prefetch_related_plan = ('parents__user',)
     user = UserSerializer(read_only=True)
     class_name = serializers.CharField(source='student_class.name', read_only=True)
     parent_names = serializers.SerializerMethodField()
@@ -186,19 +205,20 @@ class StudentSerializer(serializers.ModelSerializer):
         return [parent.user.full_name for parent in obj.parents.all()]
 
     def get_parent_phone(self, obj):
-        parent = obj.parents.first()
+        parent = prefetched_first(obj, 'parents')
         if parent:
             return parent.user.phone_number
         return obj.parent_contact
 
     def get_parent_email(self, obj):
-        parent = obj.parents.first()
+        parent = prefetched_first(obj, 'parents')
         if parent:
             return parent.user.email
         return None
 
 
-class TransferredStudentSerializer(serializers.ModelSerializer):
+class TransferredStudentSerializer(PrefetchPlanMixin, serializers.ModelSerializer):
+    select_related_plan = ('student_class', 'transferred_by')
     user = UserSerializer(read_only=True)
     class_name = serializers.CharField(source='student_class.name', read_only=True)
     transferred_by_name = serializers.SerializerMethodField()
@@ -218,7 +238,8 @@ class TransferredStudentSerializer(serializers.ModelSerializer):
         return None
 
 
-class TeacherSerializer(serializers.ModelSerializer):
+class TeacherSerializer(PrefetchPlanMixin, serializers.ModelSerializer):
+    prefetch_related_plan = ('teaching_classes', 'user__taught_classes')
     user = UserSerializer(read_only=True)
     subjects = SubjectSerializer(source='subjects_taught', many=True, read_only=True)
     class_taught = serializers.SerializerMethodField()
@@ -245,7 +266,8 @@ class TeacherSerializer(serializers.ModelSerializer):
         } for cls in classes]
 
 
-class ParentSerializer(serializers.ModelSerializer):
+class ParentSerializer(PrefetchPlanMixin, serializers.ModelSerializer):
+    prefetch_related_plan = ('children__user', 'children__student_class')
     user = UserSerializer(read_only=True)
     children_details = serializers.SerializerMethodField()
 
@@ -263,7 +285,8 @@ class ParentSerializer(serializers.ModelSerializer):
         } for child in obj.children.all()]
 
 
-class ResultSerializer(serializers.ModelSerializer):
+class ResultSerializer(PrefetchPlanMixin, serializers.ModelSerializer):
+    select_related_plan = ('student__user', 'subject', 'teacher__user')
     student_name = serializers.CharField(source='student.user.full_name', read_only=True)
     student_number = serializers.CharField(source='student.user.student_number', read_only=True)
     subject_name = serializers.CharField(source='subject.name', read_only=True)
@@ -313,7 +336,8 @@ class ResultSerializer(serializers.ModelSerializer):
         else: return 'F'
 
 
-class TimetableSerializer(serializers.ModelSerializer):
+class TimetableSerializer(PrefetchPlanMixin, serializers.ModelSerializer):
+    select_related_plan = ('class_assigned', 'subject', 'teacher__user')
     class_name = serializers.CharField(source='class_assigned.name', read_only=True)
     subject_name = serializers.CharField(source='subject.name', read_only=True)
     teacher_name = serializers.CharField(source='teacher.user.full_name', read_only=True)
@@ -402,7 +426,8 @@ class AnnouncementSerializer(serializers.ModelSerializer):
         return obj.author_id == user.id
 
 
-class ComplaintSerializer(serializers.ModelSerializer):
+class ComplaintSerializer(PrefetchPlanMixin, serializers.ModelSerializer):
+    select_related_plan = ('student__user', 'submitted_by')
     student_name = serializers.SerializerMethodField()
     student_number = serializers.SerializerMethodField()
     submitted_by_name = serializers.CharField(source='submitted_by.full_name', read_only=True)
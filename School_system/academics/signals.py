@@ -0,0 +1,37 @@
+"""
+Signal receivers for academics models.
+
+Timetable rows invalidate the cached timetable index from post_save and
+post_delete rather than from Timetable.save()/delete(), so queryset deletes
+and cascades (deleting a teacher's user, a subject, a class) expire it too.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Class, Timetable
+from .timetable_index import invalidate_timetable_index
+
+
+def _timetable_school_id(entry, memo):
+    if Timetable.class_assigned.is_cached(entry):
+        return entry.class_assigned.school_id
+    if entry.class_assigned_id not in memo:
+        memo[entry.class_assigned_id] = (
+            Class.objects.filter(pk=entry.class_assigned_id).values_list('school_id', flat=True).first()
+        )
+    return memo[entry.class_assigned_id]
+
+
+@receiver(post_save, sender=Timetable, dispatch_uid='timetable_index_on_save')
+def timetable_saved(sender, instance, **kwargs):
+    invalidate_timetable_index(_timetable_school_id(instance, {}))
+
+
+@receiver(post_delete, sender=Timetable, dispatch_uid='timetable_index_on_delete')
+def timetable_deleted(sender, instance, origin=None, **kwargs):
+    # A cascade sends one signal per row; keep the class -> school lookups on the
+    # delete's origin so each class is looked up once.
+    memo = getattr(origin, '__dict__', {}).setdefault('_timetable_school_ids', {})
+    # None when the class went in the same delete; Class.delete() expires the index itself.
+    invalidate_timetable_index(_timetable_school_id(instance, memo))
@@ -1,6 +1,6 @@
 import logging
 
-from django.db.models import Avg, Count, Q
+from django.db.models import Avg, Count
 from django.utils import timezone
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
@@ -10,8 +10,11 @@ logger = logging.getLogger(__name__)
 from datetime import timedelta, datetime
 from .models import (
     Student, Subject, Result, Timetable, Teacher,
-    Announcement, AnnouncementDismissal, Assignment, SchoolEvent, ClassAttendance, SubjectAttendance
+    Assignment, SchoolEvent, ClassAttendance, SubjectAttendance
 )
+from .announcement_feed import announcement_feed
+from .attendance_rollups import student_attendance_summary
+from .dashboard_summary import class_subjects, get_dashboard_summary
 from .serializers import (
     StudentSerializer, ResultSerializer, TimetableSerializer,
     AnnouncementSerializer, AssignmentSerializer, SchoolEventSerializer
@@ -94,38 +97,8 @@ def student_dashboard_stats(request):
     try:
         student = request.user.student
         
-        # Composite per-subject percentages via the admin-defined AssessmentPlan
-        # weights, then mean across subjects. Falls back to equal weighting when
-        # no plan is attached to the results.
-        from .grading_calc import compute_from_queryset
-        per_subject = compute_from_queryset(
-            Result.objects.filter(student=student).select_related('assessment_plan')
-        )
-        avg_percentage = round(
-            sum(per_subject.values()) / len(per_subject), 1
-        ) if per_subject else 0
-        
-        # Get subjects the student is currently learning from their timetable
-        subjects = []
-        if student.student_class:
-            subject_rows = (
-                Timetable.objects.filter(
-                    class_assigned=student.student_class,
-                    class_assigned__school=student.user.school,
-                    subject__is_deleted=False,
-                )
-                .values('subject_id', 'subject__name', 'subject__code')
-                .distinct()
-                .order_by('subject__name')
-            )
-            subjects = [
-                {
-                    'id': row['subject_id'],
-                    'name': row['subject__name'],
-                    'code': row['subject__code'],
-                }
-                for row in subject_rows
-            ]
+        summary = get_dashboard_summary(student)
+        subjects = class_subjects(student)
         total_subjects = len(subjects)
         
         # Get pending submissions
@@ -134,20 +107,14 @@ def student_dashboard_stats(request):
             deadline__gt=timezone.now()
         ).count()
         
-        # Calculate attendance percentage (based on class attendance)
-        total_days = ClassAttendance.objects.filter(student=student).count()
-        present_days = ClassAttendance.objects.filter(
-            student=student,
-            status__in=['present', 'late']
-        ).count()
-        attendance_percentage = round((present_days / total_days * 100), 1) if total_days > 0 else 100
-        
+        from .class_rankings import current_term_position
         data = {
-            'overall_average': avg_percentage,
+            'overall_average': summary.overall_average,
             'total_subjects': total_subjects,
             'subjects': subjects,
             'pending_submissions': pending_submissions,
-            'attendance_percentage': attendance_percentage
+            'attendance_percentage': summary.attendance_percentage,
+            'class_position': current_term_position(student, student.user.school),
         }
         
         return Response(data)
@@ -389,24 +356,7 @@ def student_announcements(request):
         student = request.user.student
     except Student.DoesNotExist:
         return Response({'error': 'Student profile not found'}, status=status.HTTP_404_NOT_FOUND)
-    announcements = Announcement.objects.filter(
-        (
-            Q(target_audience='all') |
-            Q(target_audience='student') |
-            Q(target_audience='students') |
-            Q(target_audiences__contains=['all']) |
-            Q(target_audiences__contains=['student']) |
-            Q(target_audiences__contains=['students'])
-        ),
-        is_active=True,
-        author__school=request.user.school,
-    ).filter(
-        Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now())
-    ).filter(
-        Q(target_class__isnull=True) | Q(target_class_id=student.student_class_id)
-    ).exclude(
-        id__in=AnnouncementDismissal.objects.filter(user=request.user).values_list('announcement_id', flat=True)
-    ).select_related('author').order_by('-date_posted')
+    announcements = announcement_feed(request.user)
     
     data = []
     for announcement in announcements:
@@ -447,10 +397,11 @@ def student_attendance(request):
 
     # --- Class attendance ---
     class_qs = ClassAttendance.objects.filter(student=student).order_by('-date')
-    class_total = class_qs.count()
-    class_present = class_qs.filter(status__in=['present', 'late']).count()
-    class_absent = class_qs.filter(status='absent').count()
-    class_late = class_qs.filter(status='late').count()
+    class_stats = student_attendance_summary([student.id], kind='class')[student.id]
+    class_total = class_stats['total']
+    class_present = class_stats['present'] + class_stats['late']
+    class_absent = class_stats['absent']
+    class_late = class_stats['late']
     class_pct = round(class_present / class_total * 100, 1) if class_total else 100.0
 
     class_records = [
@@ -468,10 +419,11 @@ def student_attendance(request):
                .filter(student=student)
                .select_related('subject')
                .order_by('-date'))
-    subj_total = subj_qs.count()
-    subj_present = subj_qs.filter(status__in=['present', 'late']).count()
-    subj_absent = subj_qs.filter(status='absent').count()
-    subj_late = subj_qs.filter(status='late').count()
+    subj_stats = student_attendance_summary([student.id], kind='subject')[student.id]
+    subj_total = subj_stats['total']
+    subj_present = subj_stats['present'] + subj_stats['late']
+    subj_absent = subj_stats['absent']
+    subj_late = subj_stats['late']
     subj_pct = round(subj_present / subj_total * 100, 1) if subj_total else 100.0
 
     subject_records = [
@@ -0,0 +1,141 @@
+"""
+Celery tasks for academic operations.
+
+Class-wide report card rendering runs in the background so publishing a term
+does not hold an HTTP request open while hundreds of PDFs are built. Parent
+emails for announcements are fanned out here for the same reason, as is
+timetable generation.
+"""
+from celery import shared_task
+from django.utils import timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, max_retries=2, default_retry_delay=60, soft_time_limit=1800, time_limit=2100)
+def generate_report_card_batch_task(self, batch_id: int):
+    """
+    Render every report card in an already-created ReportCardBatch.
+    The view creates the queued batch and enqueues this task; the frontend
+    polls the batch for progress and downloads the files/bundle when done.
+    A retry keeps the cards an earlier attempt stored and renders the rest.
+    """
+    from .models import ReportCardBatch
+    try:
+        from .report_cards import run_report_card_batch
+
+        batch = ReportCardBatch.objects.select_related('school').get(id=batch_id)
+        if batch.status == 'done':
+            return batch_id
+        run_report_card_batch(batch)
+
+        logger.info(
+            "Report card batch %s finished: %s rendered, %s failed",
+            batch_id, batch.rendered_count, batch.failed_count,
+        )
+        return batch_id
+
+    except ReportCardBatch.DoesNotExist:
+        logger.error("ReportCardBatch %s not found", batch_id)
+    except Exception as exc:
+        logger.error("Error generating report card batch %s: %s", batch_id, exc)
+        if self.request.retries >= self.max_retries:
+            from .report_cards import discard_report_card_batch_files
+
+            batch = ReportCardBatch.objects.filter(id=batch_id).first()
+            if batch is not None:
+                discard_report_card_batch_files(batch)
+            ReportCardBatch.objects.filter(id=batch_id).update(
+                status='failed', errors=[{'error': str(exc)}], rendered_count=0, bundle='',
+            )
+        raise self.retry(exc=exc)
+
+
+@shared_task(bind=True, max_retries=1, default_retry_delay=300, soft_time_limit=1800, time_limit=2100)
+def warm_prediction_cache_task(self, school_id=None):
+    """
+    Nightly rebuild of stale/missing StudentPredictionCache rows so risk
+    screens open on a warm cache. Scheduled via CELERY_BEAT_SCHEDULE.
+    """
+    try:
+        from users.models import School
+        from .prediction_cache import warm_prediction_cache
+
+        school = School.objects.get(id=school_id) if school_id else None
+        warmed = warm_prediction_cache(school=school)
+        logger.info("Prediction cache warm-up checked %s students", warmed)
+        return warmed
+
+    except Exception as exc:
+        logger.error("Error warming prediction cache: %s", exc)
+        raise self.retry(exc=exc)
+
+
+@shared_task(bind=True, max_retries=2, default_retry_delay=60)
+def evaluate_at_risk_task(self, school_id):
+    """
+    Re-evaluate at-risk alerts for every student/subject queued by mark
+    entry since the last run. Scheduled by at_risk_alerts.queue_at_risk_evaluation
+    so a teacher entering a whole class's marks triggers one batched run.
+    """
+    try:
+        from .at_risk_alerts import drain_at_risk_queue
+
+        evaluated = drain_at_risk_queue(school_id)
+        logger.info("At-risk evaluation for school %s checked %s pairs", school_id, evaluated)
+        return evaluated
+
+    except Exception as exc:
+        logger.error("Error evaluating at-risk alerts for school %s: %s", school_id, exc)
+        raise self.retry(exc=exc)
+
+
+@shared_task(bind=True, max_retries=0, soft_time_limit=1800, time_limit=2100)
+def send_announcement_emails_task(self, delivery_id: int):
+    """
+    Email every confirmed parent about an announcement.
+    Batches are retried inside the run; the task itself is not retried so
+    parents never receive the same announcement twice.
+    """
+    from .models import AnnouncementEmailDelivery
+    try:
+        from .announcement_emails import run_announcement_delivery
+
+        delivery = AnnouncementEmailDelivery.objects.select_related('announcement', 'school').get(id=delivery_id)
+        if delivery.status != 'queued':
+            return delivery_id
+        run_announcement_delivery(delivery)
+        return delivery_id
+
+    except AnnouncementEmailDelivery.DoesNotExist:
+        logger.error("AnnouncementEmailDelivery %s not found", delivery_id)
+    except Exception as exc:
+        logger.error("Error sending announcement emails for delivery %s: %s", delivery_id, exc)
+        AnnouncementEmailDelivery.objects.filter(id=delivery_id).update(status='failed', errors=[{'error': str(exc)}])
+
+
+@shared_task(bind=True, max_retries=0, soft_time_limit=1800, time_limit=2100)
+def generate_timetable_task(self, job_id: int):
+    """
+    Generate and save the timetable for an already-created TimetableGenerationJob.
+    Not retried: a retry would replace a timetable the admin may already be
+    reviewing, so a failure is recorded on the job and the admin re-runs it.
+    """
+    from .models import TimetableGenerationJob
+    try:
+        from .timetable_generator import run_timetable_job
+
+        job = TimetableGenerationJob.objects.select_related('school').get(id=job_id)
+        if job.status != 'queued':
+            return job_id
+        run_timetable_job(job)
+        return job_id
+
+    except TimetableGenerationJob.DoesNotExist:
+        logger.error("TimetableGenerationJob %s not found", job_id)
+    except Exception as exc:
+        logger.error("Error generating timetable for job %s: %s", job_id, exc)
+        TimetableGenerationJob.objects.filter(id=job_id).update(
+            status='failed', errors=[{'error': str(exc)}], completed_at=timezone.now(),
+        )
@@ -3,6 +3,7 @@ import os
 import json as _json
 import urllib.request
 import urllib.error
+from collections import defaultdict
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 
 from django.db.models import Avg, Count, Q, Max, Min
@@ -14,13 +15,18 @@ from rest_framework.response import Response
 logger = logging.getLogger(__name__)
 from datetime import datetime, timedelta
 from .models import (
-    Teacher, Student, Subject, Result, ClassAttendance, SubjectAttendance, Class, Timetable,
+    Teacher, Student, Subject, Result, ClassAttendance, SubjectAttendance, Class,
     SubjectTermFeedback, AssessmentPlan, ReportCardApprovalRequest, ReportCardGeneration,
-    AttendancePermission,
 )
 from .serializers import ResultSerializer, ClassAttendanceSerializer, SubjectAttendanceSerializer
 from users.models import SchoolSettings
 from .utils import apply_late_penalty, log_school_audit
+from .class_rankings import refresh_rankings_for_result, refresh_class_rankings
+from .prediction_cache import invalidate_student_predictions
+from .dashboard_summary import invalidate_student_summaries
+from .at_risk_alerts import queue_at_risk_evaluation
+from .attendance_writer import RegisterAlreadySubmitted, write_class_register, write_subject_register
+from .timetable_index import timetable_index
 
 MAX_PAGE_SIZE = 200
 
@@ -82,10 +88,7 @@ def _teacher_authorized_class_ids(teacher, subject_id=None, fallback_to_school=T
     )
     class_ids.update(teacher.teaching_classes.values_list('id', flat=True))
 
-    timetable_qs = Timetable.objects.filter(teacher=teacher)
-    if subject_id is not None:
-        timetable_qs = timetable_qs.filter(subject_id=subject_id)
-    class_ids.update(timetable_qs.values_list('class_assigned_id', flat=True).distinct())
+    class_ids.update(timetable_index(teacher.user.school_id).classes_for_teacher(teacher.id, subject_id))
 
     if class_ids or not fallback_to_school:
         return class_ids
@@ -698,6 +701,8 @@ def finalize_test_results(request, test_id):
         test=test, submitted_at__isnull=False, pushed_to_results=False
     ).select_related('student')
     pushed = 0
+    touched_class_ids = set()
+    touched_student_ids = set()
     for attempt in attempts:
         if attempt.status not in ('graded', 'finalized'):
             continue
@@ -722,8 +727,16 @@ def finalize_test_results(request, test_id):
         attempt.pushed_to_results = True
         attempt.status = 'finalized'
         attempt.save(update_fields=['pushed_to_results', 'status'])
+        touched_class_ids.add(attempt.student.student_class_id)
+        touched_student_ids.add(attempt.student_id)
         pushed += 1
 
+    # One rebuild per class rather than per pushed attempt.
+    refresh_class_rankings(touched_class_ids, test.academic_year, test.academic_term, school_id=test.school_id)
+    invalidate_student_predictions(touched_student_ids)
+    invalidate_student_summaries(touched_student_ids)
+    queue_at_risk_evaluation([(sid, test.subject_id) for sid in touched_student_ids], test.school_id)
+
     if test.status != 'closed':
         test.status = 'closed'
         test.save(update_fields=['status', 'updated_at'])
@@ -1201,6 +1214,7 @@ def add_student_mark(request):
             }, status=status.HTTP_409_CONFLICT)
 
         if existing_result and override_existing:
+            previous_key = (existing_result.academic_year, existing_result.academic_term)
             existing_result.exam_type = exam_type
             existing_result.score = float(score)
             existing_result.max_score = float(max_score)
@@ -1216,6 +1230,10 @@ def add_student_mark(request):
                 'include_in_report', 'report_term', 'assessment_plan',
                 'component_kind', 'component_index',
             ])
+            refresh_rankings_for_result(existing_result, previous_key=previous_key)
+            invalidate_student_predictions([student.id])
+            invalidate_student_summaries([student.id])
+            queue_at_risk_evaluation([(student.id, subject.id)], request.user.school_id)
             return Response({
                 'id': existing_result.id,
                 'student': f"{student.user.first_name} {student.user.last_name}",
@@ -1247,6 +1265,10 @@ def add_student_mark(request):
             component_kind=component_kind or '',
             component_index=component_index if component_index is not None else None,
         )
+        refresh_rankings_for_result(result)
+        invalidate_student_predictions([student.id])
+        invalidate_student_summaries([student.id])
+        queue_at_risk_evaluation([(student.id, subject.id)], request.user.school_id)
         
         return Response({
             'id': result.id,
@@ -1490,8 +1512,6 @@ def _parse_date(raw):
     except (ValueError, TypeError):
         return None
 
-VALID_STATUSES = {'present', 'absent', 'late', 'excused'}
-
 
 def _period_tracking_active(school, attendance_date):
     settings = SchoolSettings.objects.filter(school=school).first()
@@ -1500,18 +1520,6 @@ def _period_tracking_active(school, attendance_date):
     return attendance_date >= settings.attendance_period_tracking_start_date
 
 
-def _has_approved_permission(student, class_obj, attendance_date, period_number):
-    permission_qs = AttendancePermission.objects.filter(
-        student=student,
-        class_assigned=class_obj,
-        date=attendance_date,
-        approved=True,
-    )
-    if period_number is not None:
-        permission_qs = permission_qs.filter(Q(period_number=period_number) | Q(period_number__isnull=True))
-    return permission_qs.exists()
-
-
 ## --------------- CLASS attendance ---------------
 
 @api_view(['GET'])
@@ -1605,35 +1613,12 @@ def mark_class_attendance(request):
             return Response({'error': 'Class attendance for this date has already been submitted and cannot be changed.'},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        created_count = 0
-        errors = []
-        for item in attendance_data:
-            student_id = item.get('student_id')
-            status_value = item.get('status')
-            remarks = item.get('remarks', '')
-
-            if not student_id or not status_value:
-                errors.append('Missing student_id or status for an entry')
-                continue
-            if status_value not in VALID_STATUSES:
-                errors.append(f"Invalid status '{status_value}' for student {student_id}")
-                continue
-            try:
-                student = Student.objects.get(id=student_id)
-                if student.student_class_id != teacher_class.id:
-                    errors.append(f'Student {student_id} is not in your class')
-                    continue
-                ClassAttendance.objects.create(
-                    student=student,
-                    class_assigned=teacher_class,
-                    date=attendance_date,
-                    status=status_value,
-                    remarks=remarks,
-                    recorded_by=request.user,
-                )
-                created_count += 1
-            except Student.DoesNotExist:
-                errors.append(f'Student with ID {student_id} not found')
+        try:
+            created, errors = write_class_register(teacher_class, attendance_date, attendance_data, request.user)
+        except RegisterAlreadySubmitted:
+            return Response({'error': 'Class attendance for this date has already been submitted and cannot be changed.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        created_count = len(created)
 
         return Response({
             'message': 'Class attendance submitted successfully',
@@ -1669,9 +1654,7 @@ def subject_attendance_register(request):
                             status=status.HTTP_400_BAD_REQUEST)
 
         # Verify the teacher teaches this subject in this class via timetable
-        teaches = Timetable.objects.filter(
-            teacher=teacher, class_assigned_id=class_id, subject_id=subject_id
-        ).exists()
+        teaches = timetable_index(request.user.school_id).teaches(teacher.id, class_id, subject_id)
         if not teaches:
             return Response({'error': 'You do not teach this subject in this class'},
                             status=status.HTTP_403_FORBIDDEN)
@@ -1786,9 +1769,7 @@ def mark_subject_attendance(request):
                             status=status.HTTP_400_BAD_REQUEST)
 
         # Verify teacher teaches this subject in this class
-        teaches = Timetable.objects.filter(
-            teacher=teacher, class_assigned_id=class_id, subject_id=subject_id
-        ).exists()
+        teaches = timetable_index(request.user.school_id).teaches(teacher.id, class_id, subject_id)
         if not teaches:
             return Response({'error': 'You do not teach this subject in this class'},
                             status=status.HTTP_403_FORBIDDEN)
@@ -1822,52 +1803,17 @@ def mark_subject_attendance(request):
             return Response({'error': 'Subject attendance for this class and date has already been submitted and cannot be changed.'},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        created_count = 0
-        errors = []
-        for item in attendance_data:
-            student_id = item.get('student_id')
-            status_value = item.get('status')
-            remarks = item.get('remarks', '')
-
-            if not student_id or not status_value:
-                errors.append('Missing student_id or status for an entry')
-                continue
-            if status_value not in VALID_STATUSES:
-                errors.append(f"Invalid status '{status_value}' for student {student_id}")
-                continue
-            try:
-                student = Student.objects.get(id=student_id)
-                if student.student_class_id != the_class.id:
-                    errors.append(f'Student {student_id} is not in this class')
-                    continue
-                daily = ClassAttendance.objects.filter(student=student, date=attendance_date).first()
-                has_permission = _has_approved_permission(student, the_class, attendance_date, parsed_period_number)
-                period_rules_active = _period_tracking_active(request.user.school, attendance_date)
-
-                bunk_flag = False
-                bunk_reason = ''
-                if period_rules_active and status_value == 'absent' and not has_permission:
-                    if daily and daily.status in ('present', 'late'):
-                        bunk_flag = True
-                        bunk_reason = 'Absent during period without approved permission'
-
-                SubjectAttendance.objects.create(
-                    student=student,
-                    class_assigned=the_class,
-                    subject=the_subject,
-                    date=attendance_date,
-                    period_number=parsed_period_number,
-                    period_label=period_label,
-                    status=status_value,
-                    remarks=remarks,
-                    marked_with_permission=has_permission,
-                    bunk_flag=bunk_flag,
-                    bunk_reason=bunk_reason,
-                    recorded_by=request.user,
-                )
-                created_count += 1
-            except Student.DoesNotExist:
-                errors.append(f'Student with ID {student_id} not found')
+        try:
+            created, errors = write_subject_register(
+                the_class, the_subject, attendance_date, attendance_data, request.user,
+                period_number=parsed_period_number,
+                period_label=period_label,
+                period_rules_active=_period_tracking_active(request.user.school, attendance_date),
+            )
+        except RegisterAlreadySubmitted:
+            return Response({'error': 'Subject attendance for this class and date has already been submitted and cannot be changed.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        created_count = len(created)
 
         return Response({
             'message': 'Subject attendance submitted successfully',
@@ -2100,13 +2046,19 @@ def update_report_settings(request):
     # Validate all IDs belong to this teacher
     result_ids = [u['id'] for u in updates if 'id' in u]
     teacher_results = Result.objects.filter(id__in=result_ids, teacher=teacher)
-    valid_ids = set(teacher_results.values_list('id', flat=True))
+    valid = {
+        row['id']: row
+        for row in teacher_results.values(
+            'id', 'student_id', 'subject_id', 'student__student_class_id', 'academic_year', 'academic_term',
+        )
+    }
 
     updated_count = 0
     errors = []
+    touched = []
     for u in updates:
         rid = u.get('id')
-        if rid not in valid_ids:
+        if rid not in valid:
             errors.append(f'Result {rid} not found or not yours')
             continue
 
@@ -2119,6 +2071,20 @@ def update_report_settings(request):
         if update_fields:
             Result.objects.filter(id=rid).update(**update_fields)
             updated_count += 1
+            touched.append(valid[rid])
+
+    # queryset.update() skips the per-result write hooks; refresh once per class-term instead.
+    if touched:
+        class_ids_by_term = defaultdict(set)
+        for row in touched:
+            class_ids_by_term[(row['academic_year'], row['academic_term'])].add(row['student__student_class_id'])
+        for (year, term), class_ids in class_ids_by_term.items():
+            refresh_class_rankings(class_ids, year, term, school_id=request.user.school_id)
+        invalidate_student_predictions({row['student_id'] for row in touched})
+        invalidate_student_summaries({row['student_id'] for row in touched})
+        queue_at_risk_evaluation(
+            {(row['student_id'], row['subject_id']) for row in touched}, request.user.school_id,
+        )
 
     return Response({
         'message': f'{updated_count} result(s) updated',
@@ -2136,7 +2102,6 @@ def teacher_classes(request):
                        status=status.HTTP_403_FORBIDDEN)
     try:
         teacher = request.user.teacher
-        from .models import Timetable
 
         # Classes where teacher is class_teacher
         class_teacher_classes = set(Class.objects.filter(
@@ -2149,9 +2114,7 @@ def teacher_classes(request):
         )
 
         # Classes where teacher has timetable entries
-        timetable_classes = set(Timetable.objects.filter(
-            teacher=teacher
-        ).values_list('class_assigned_id', flat=True).distinct())
+        timetable_classes = timetable_index(request.user.school_id).classes_for_teacher(teacher.id)
 
         all_class_ids = class_teacher_classes | assigned_teaching_classes | timetable_classes
         classes = Class.objects.filter(id__in=all_class_ids).order_by('name')
@@ -2192,12 +2155,7 @@ def teacher_class_subjects(request, class_id):
         if class_id_int not in authorized_class_ids:
             return Response({'error': 'You are not assigned to this class'}, status=status.HTTP_403_FORBIDDEN)
 
-        subject_ids = list(
-            Timetable.objects
-            .filter(teacher=teacher, class_assigned_id=class_id_int)
-            .values_list('subject_id', flat=True)
-            .distinct()
-        )
+        subject_ids = list(timetable_index(request.user.school_id).subjects_for(teacher.id, class_id_int))
         if not subject_ids:
             subject_ids = list(teacher.subjects_taught.values_list('id', flat=True))
 
@@ -2529,24 +2487,23 @@ def subject_students_risk(request, subject_id):
                 Q(user__student_number__icontains=search)
             )
         
-        # Get predictions and build results
-        from .ml_predictions import predict_student_grades
+        # Get cached predictions (stale students are recomputed in one pass) and build results
+        from .prediction_cache import get_cached_predictions
         
         results = []
         at_risk_filter = request.query_params.get('at_risk', 'all')
+        try:
+            predictions_by_student = get_cached_predictions(students)
+        except Exception:
+            logger.exception(
+                "Failed to generate predictions for subject_id=%s teacher_id=%s",
+                subject_id,
+                teacher.id,
+            )
+            predictions_by_student = {}
         
         for student in students:
-            try:
-                predictions = predict_student_grades(student)
-            except Exception:
-                logger.exception(
-                    "Failed to generate predictions for student_id=%s subject_id=%s teacher_id=%s",
-                    student.id,
-                    subject_id,
-                    teacher.id,
-                )
-                continue
-
+            predictions = predictions_by_student.get(student.id, [])
             subject_pred = next((p for p in predictions if p['subject_id'] == subject_id), None)
             
             if subject_pred:
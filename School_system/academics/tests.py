@@ -32,6 +32,7 @@ from academics.models import (
     Announcement,
     AnnouncementDismissal,
     Assignment,
+    ClassSubjectAssignment,
     AssignmentSubmission,
     GeneratedTest,
     TestQuestion,
@@ -54,6 +55,7 @@ from academics.models import (
     Timetable,
 )
 from finances.models import SchoolFees, StudentPaymentRecord
+from School_system.testing import QueryCountAssertionsMixin
 
 
 # ---------------------------------------------------------------------------
@@ -305,6 +307,24 @@ class StudentModelTest(TestCase):
         student = make_student(self.school, self.cls)
         self.assertIn("STU001", str(student))
 
+    def test_save_reads_school_without_loading_the_user_row(self):
+        """Test that saving a student does not fetch its whole user for the invalidation hooks."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        student_id = make_student(self.school, self.cls).id
+
+        student = Student.objects.get(id=student_id)
+        with CaptureQueriesContext(connection) as queries:
+            student.save(update_fields=["student_class"])
+        user_reads = [q["sql"] for q in queries if 'FROM "users_customuser"' in q["sql"]]
+        self.assertEqual(len(user_reads), 1)
+        self.assertNotIn('"users_customuser"."password"', user_reads[0])
+
+        student = Student.objects.select_related("user").get(id=student_id)
+        with CaptureQueriesContext(connection) as queries:
+            student.save(update_fields=["student_class"])
+        self.assertFalse([q for q in queries if 'FROM "users_customuser"' in q["sql"]])
+
 
 class ResultModelTest(TestCase):
 
@@ -1264,6 +1284,28 @@ class ResultAPITest(APITestCase):
         student_ids = {r["student"] for r in get_list(response.data)}
         self.assertEqual(student_ids, {self.student.pk})
 
+    def test_list_results_cursor_mode_skips_count(self):
+        """Test that ?cursor= pages results by keyset without a COUNT query."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        for score in (40, 50, 60):
+            Result.objects.create(
+                student=self.student, subject=self.subject, teacher=self.teacher,
+                exam_type="Quiz", score=score, max_score=100,
+                academic_term="Term 1", academic_year="2026",
+            )
+        self.client.force_authenticate(user=self.admin)
+        with CaptureQueriesContext(connection) as ctx:
+            first = self.client.get(self.url, {"cursor": "", "page_size": 2})
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertFalse(any("COUNT(" in q["sql"] for q in ctx.captured_queries))
+        self.assertTrue(first.data["has_next"])
+        second = self.client.get(self.url, {"cursor": first.data["next_cursor"], "page_size": 2})
+        self.assertFalse(second.data["has_next"])
+        scores = [r["score"] for r in first.data["results"] + second.data["results"]]
+        self.assertEqual(sorted(scores), [40.0, 50.0, 60.0])
+
     def test_list_results_requires_authentication(self):
         """Test that list results requires authentication."""
         response = self.client.get(self.url)
@@ -1354,6 +1396,73 @@ class TimetableAPITest(APITestCase):
         conflict_types = [c["type"] for c in response.data["conflicts"]]
         self.assertIn("teacher", conflict_types)
 
+    def test_conflict_check_reports_each_overlapping_pair_once(self):
+        """Test that conflict check reports teacher, room and class overlaps but not adjacent slots."""
+        other_teacher = make_teacher(self.school, username="tt_teacher2")
+        other_class = make_class(self.school, name="Form 2B", grade_level=2)
+        self._create_timetable_entry(start="08:00", end="08:45", room="Lab")
+        self._create_timetable_entry(start="08:45", end="09:30", room="101")    # adjacent: no clash
+        Timetable.objects.create(
+            class_assigned=other_class, subject=self.subject, teacher=other_teacher,
+            day_of_week="Monday", start_time="08:30", end_time="09:00", room=" lab ",
+        )
+        Timetable.objects.create(
+            class_assigned=other_class, subject=self.subject, teacher=self.teacher,
+            day_of_week="Tuesday", start_time="08:00", end_time="08:45",
+        )
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(self.conflicts_url)
+
+        self.assertEqual(response.data["total_entries"], 4)
+        self.assertEqual(sorted(c["type"] for c in response.data["conflicts"]), ["room"])
+        self.assertEqual(response.data["conflicts"][0]["slot_2"]["time"], "08:30:00-09:00:00")
+
+        Timetable.objects.create(
+            class_assigned=self.cls, subject=self.subject, teacher=self.teacher,
+            day_of_week="Monday", start_time="09:00", end_time="09:45",
+        )
+        response = self.client.get(self.conflicts_url)
+        self.assertEqual(sorted(c["type"] for c in response.data["conflicts"]), ["class", "room", "teacher"])
+
+    def test_timetable_index_lookups_are_cached_until_a_write(self):
+        """Test that the timetable index serves membership lookups from cache until the timetable changes."""
+        from academics.timetable_index import timetable_index
+
+        entry = self._create_timetable_entry()
+        index = timetable_index(self.school.id)
+        self.assertEqual(index.classes_for_teacher(self.teacher.id), {self.cls.id})
+        self.assertTrue(index.teaches(self.teacher.id, self.cls.id, self.subject.id))
+        self.assertEqual(index.teachers_for_classes([self.cls.id]), {self.teacher.id})
+        self.assertTrue(index.teacher_busy(self.teacher.id, "Monday", datetime.time(8, 30), datetime.time(9, 0)))
+        self.assertFalse(index.teacher_busy(self.teacher.id, "Monday", datetime.time(8, 45), datetime.time(9, 30)))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(len(timetable_index(self.school.id)), 1)
+
+        entry.delete()
+        self.assertEqual(timetable_index(self.school.id).classes_for_teacher(self.teacher.id), set())
+
+    def test_cascade_and_queryset_deletes_expire_the_timetable_index(self):
+        """Test that timetable rows removed by a cascade or a queryset delete leave the index."""
+        from academics.timetable_index import timetable_index
+
+        self._create_timetable_entry()
+        other = make_teacher(self.school, username="tt_cascade_teacher")
+        Timetable.objects.create(
+            class_assigned=self.cls, subject=self.subject, teacher=other,
+            day_of_week="Tuesday", start_time="08:00", end_time="08:45",
+        )
+        self.assertEqual(timetable_index(self.school.id).teachers_for_classes([self.cls.id]), {self.teacher.id, other.id})
+
+        other.user.delete()
+        index = timetable_index(self.school.id)
+        self.assertEqual(index.teachers_for_classes([self.cls.id]), {self.teacher.id})
+        self.assertEqual(index.classes_for_teacher(other.id), set())
+
+        Timetable.objects.filter(class_assigned=self.cls).delete()
+        self.assertFalse(timetable_index(self.school.id).teaches(self.teacher.id, self.cls.id, self.subject.id))
+
     def test_conflict_check_forbidden_for_teacher_role(self):
         """Test that conflict check forbidden for teacher role."""
         teacher_user = self.teacher.user
@@ -1368,6 +1477,185 @@ class TimetableAPITest(APITestCase):
 # API tests — Permissions for announcements & suspensions
 # ---------------------------------------------------------------------------
 
+class TimetableGenerationTest(APITestCase):
+
+    """Timetable generation: solver mode, scoring, bulk persistence and background jobs."""
+    def setUp(self):
+        """Execute setUp."""
+        self.client = APIClient()
+        self.school = make_school(name="Timetable Solver School")
+        self.admin = make_user(self.school, "tg_admin", role="admin")
+        self.classes = [make_class(self.school, name=f"Form 4{c}", grade_level=10) for c in "ABC"]
+        self.subjects = [make_subject(self.school, name=f"Subject {i}", code=f"TGS{i}") for i in range(5)]
+        self.subjects[0].is_priority = True
+        self.subjects[0].save()
+        self.teachers = [make_teacher(self.school, username=f"tg_teacher{i}") for i in range(4)]
+        for i, subject in enumerate(self.subjects):
+            self.teachers[i % 4].subjects_taught.add(subject)
+        # Priority subject has two teachers so three classes can share its daily periods.
+        self.teachers[3].subjects_taught.add(self.subjects[0])
+
+    def test_score_counts_unplaced_clustering_and_gaps(self):
+        """Test that score counts unplaced clustering and gaps."""
+        from academics.timetable_solver import score_timetable
+
+        problem = {
+            "slots": {1: [("Monday", "08:00", "08:45"), ("Monday", "08:45", "09:30"), ("Monday", "09:30", "10:15")]},
+            "demand": {1: {10: 2, 11: 1}},
+        }
+        assignments = [(1, 10, 7, "Monday", "08:00", "08:45"), (1, 10, 7, "Monday", "09:30", "10:15")]
+        score = score_timetable(problem, assignments)
+        self.assertEqual((score["unplaced"], score["clustering"], score["teacher_gaps"]), (1, 1, 1))
+
+    def test_generation_job_is_clash_free_and_bulk_inserted(self):
+        """Test that a generation job is clash free, bulk inserted and summarised per class."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from academics.models import TimetableGenerationJob
+        from academics.tasks import generate_timetable_task
+
+        self.client.force_authenticate(user=self.admin)
+        with patch("academics.tasks.generate_timetable_task.delay") as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/v1/academics/timetables/generate/", {"mode": "solver"}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], "queued")
+        self.assertNotIn("timetables", response.data)
+        delay.assert_called_once_with(response.data["id"])
+
+        with self.settings(TIMETABLE_SOLVER_RESTARTS=2, TIMETABLE_SOLVER_ITERATIONS=3000), \
+                CaptureQueriesContext(connection) as ctx:
+            generate_timetable_task(response.data["id"])
+
+        inserts = [q for q in ctx.captured_queries if q["sql"].startswith('INSERT INTO "academics_timetable"')]
+        self.assertEqual(len(inserts), 1)
+
+        job = self.client.get(f"/api/v1/academics/timetables/jobs/{response.data['id']}/").data
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["mode"], "solver")
+        self.assertEqual(job["score"]["unplaced"], 0)
+        self.assertEqual((job["progress_done"], job["progress_total"]), (3, 3))
+        self.assertEqual([row["class_name"] for row in job["summary"]], ["Form 4A", "Form 4B", "Form 4C"])
+        self.assertEqual(sum(row["entries"] for row in job["summary"]), job["entries_count"])
+        self.assertEqual(TimetableGenerationJob.objects.get().entries_count, job["entries_count"])
+
+        entries = list(Timetable.objects.filter(class_assigned__school=self.school).values_list(
+            "teacher_id", "day_of_week", "start_time"))
+        self.assertEqual(len(entries), job["entries_count"])
+        self.assertEqual(len(entries), len(set(entries)))
+
+        page = self.client.get("/api/v1/academics/timetables/", {"class": self.classes[0].id}).data
+        self.assertEqual(page["count"], job["summary"][0]["entries"])
+
+    def test_cancelled_running_job_keeps_existing_timetable(self):
+        """Test that cancelling a running job stops it before the timetable is replaced."""
+        from academics import timetable_generator
+        from academics.timetable_generator import cancel_timetable_job, queue_timetable_job, run_timetable_job
+
+        existing = Timetable.objects.create(
+            class_assigned=self.classes[0], subject=self.subjects[0], teacher=self.teachers[0],
+            day_of_week="Monday", start_time=datetime.time(8, 0), end_time=datetime.time(8, 45),
+        )
+        job = queue_timetable_job(self.school, self.admin, mode="greedy")
+        build_problem = timetable_generator._build_problem
+
+        def cancel_then_build(ctx):
+            self.assertTrue(cancel_timetable_job(job))
+            return build_problem(ctx)
+
+        with patch("academics.timetable_generator._build_problem", side_effect=cancel_then_build):
+            job = run_timetable_job(job)
+
+        self.assertEqual(job.status, "cancelled")
+        self.assertIsNotNone(job.completed_at)
+        self.assertEqual(list(Timetable.objects.all()), [existing])
+        self.assertFalse(cancel_timetable_job(job))
+
+    def test_queued_job_cancel_and_single_active_job(self):
+        """Test that a second job is refused while one is queued and a queued job cancels at once."""
+        self.client.force_authenticate(user=self.admin)
+        url = "/api/v1/academics/timetables/generate/"
+        with patch("academics.tasks.generate_timetable_task.delay"):
+            job_id = self.client.post(url, {"mode": "greedy"}, format="json").data["id"]
+            conflict = self.client.post(url, {}, format="json")
+        self.assertEqual(conflict.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(conflict.data["job"]["id"], job_id)
+
+        cancel_url = f"/api/v1/academics/timetables/jobs/{job_id}/cancel/"
+        response = self.client.post(cancel_url)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], "cancelled")
+        self.assertEqual(self.client.post(cancel_url).status_code, status.HTTP_409_CONFLICT)
+
+        bad_mode = self.client.post(url, {"mode": "random"}, format="json")
+        self.assertEqual(bad_mode.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_stale_jobs_stop_blocking_generation_and_cancel_at_once(self):
+        """Test that jobs whose worker died are failed or cancelled instead of blocking generation forever."""
+        from academics.models import TimetableGenerationJob
+        from academics.timetable_generator import cancel_timetable_job
+
+        stale_at = timezone.now() - datetime.timedelta(hours=1)
+        lost = TimetableGenerationJob.objects.create(school=self.school, requested_by=self.admin)
+        TimetableGenerationJob.objects.filter(id=lost.id).update(created_at=stale_at, heartbeat_at=stale_at)
+
+        self.client.force_authenticate(user=self.admin)
+        with patch("academics.tasks.generate_timetable_task.delay"), self.settings(TIMETABLE_JOB_STALE_SECONDS=600):
+            response = self.client.post("/api/v1/academics/timetables/generate/", {}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        lost.refresh_from_db()
+        self.assertEqual(lost.status, "failed")
+        self.assertIsNotNone(lost.completed_at)
+        TimetableGenerationJob.objects.filter(id=response.data["id"]).update(status="done")
+
+        killed = TimetableGenerationJob.objects.create(school=self.school, requested_by=self.admin, status="running")
+        TimetableGenerationJob.objects.filter(id=killed.id).update(heartbeat_at=stale_at)
+        with self.settings(TIMETABLE_JOB_STALE_SECONDS=600):
+            self.assertTrue(cancel_timetable_job(killed))
+        killed.refresh_from_db()
+        self.assertEqual(killed.status, "cancelled")
+
+        alive = TimetableGenerationJob.objects.create(
+            school=self.school, requested_by=self.admin, status="running", heartbeat_at=timezone.now(),
+        )
+        self.assertTrue(cancel_timetable_job(alive))
+        alive.refresh_from_db()
+        self.assertEqual((alive.status, alive.cancel_requested), ("running", True))
+
+        self.client.force_authenticate(user=self.teachers[0].user)
+        response = self.client.get("/api/v1/academics/timetables/jobs/")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_racing_generate_requests_queue_one_job(self):
+        """Test that a request passing the in-progress check after another queued a job gets 409."""
+        from academics.models import TimetableGenerationJob
+
+        self.client.force_authenticate(user=self.admin)
+        with patch("academics.tasks.generate_timetable_task.delay"):
+            first = self.client.post("/api/v1/academics/timetables/generate/", {}, format="json")
+            # Simulate the race: the second request's check ran before the first insert.
+            queued = TimetableGenerationJob.objects.get(id=first.data["id"])
+            with patch("academics.timetable_generator.active_timetable_job", side_effect=[None, queued]):
+                second = self.client.post("/api/v1/academics/timetables/generate/", {}, format="json")
+        self.assertEqual(first.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(second.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(second.data["job"]["id"], first.data["id"])
+        self.assertEqual(TimetableGenerationJob.objects.filter(school=self.school).count(), 1)
+
+    def test_solver_scores_no_worse_than_greedy(self):
+        """Test that solver scores no worse than greedy."""
+        from academics.timetable_generator import plan_timetable
+
+        with self.settings(TIMETABLE_SOLVER_RESTARTS=2, TIMETABLE_SOLVER_ITERATIONS=3000):
+            ok, _, greedy = plan_timetable(self.school, mode="greedy", seed=7)
+            self.assertTrue(ok)
+            ok, _, solved = plan_timetable(self.school, mode="solver", seed=7)
+            self.assertTrue(ok)
+        self.assertLessEqual(solved["score"]["total"], greedy["score"]["total"])
+        self.assertFalse(Timetable.objects.exists())
+
+
 class AnnouncementSuspensionPermissionAPITest(APITestCase):
 
     def setUp(self):
@@ -1523,6 +1811,186 @@ class AnnouncementSuspensionPermissionAPITest(APITestCase):
         self.assertEqual(suspension.teacher_id, self.teacher.id)
 
 
+class AnnouncementEmailFanoutTest(APITestCase):
+
+    """Parent announcement emails are queued and sent in batches."""
+    def setUp(self):
+        """Execute setUp."""
+        self.client = APIClient()
+        self.school = make_school(name="Fanout School")
+        self.admin = make_user(self.school, "fan_admin", role="admin", first_name="Ada", last_name="Admin")
+        self.cls = make_class(self.school, name="Form 2B")
+        self.parents = []
+        for i in range(3):
+            parent_user = make_user(self.school, f"fan_parent{i}", role="parent", first_name=f"Parent{i}", last_name="P")
+            parent = Parent.objects.create(user=parent_user)
+            student = make_student(self.school, self.cls, username=f"fan_student{i}", student_number=f"FAN{i:03d}")
+            ParentChildLink.objects.create(parent=parent, student=student, is_confirmed=True)
+            self.parents.append(parent)
+        # A second child must not produce a second email to the same parent.
+        sibling = make_student(self.school, self.cls, username="fan_sibling", student_number="FAN999")
+        ParentChildLink.objects.create(parent=self.parents[0], student=sibling, is_confirmed=True)
+
+    def _post(self, audience="parents"):
+        self.client.force_authenticate(user=self.admin)
+        with patch("academics.tasks.send_announcement_emails_task.delay") as delay, \
+                patch("email_service._send") as send, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/v1/academics/announcements/", {
+                "title": "Sports Day", "content": "Friday at 9am.", "target_audience": audience,
+            }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        send.assert_not_called()
+        return response, delay
+
+    def test_create_enqueues_one_job_instead_of_sending(self):
+        """Test that create enqueues one job instead of sending."""
+        from academics.models import AnnouncementEmailDelivery
+
+        response, delay = self._post()
+        delivery = AnnouncementEmailDelivery.objects.get(announcement_id=response.data["id"])
+        delay.assert_called_once_with(delivery.id)
+        self.assertEqual(delivery.status, "queued")
+        self.assertEqual(delivery.posted_by, "Ada Admin")
+
+    def test_staff_only_announcement_is_not_emailed(self):
+        """Test that staff only announcement is not emailed."""
+        from academics.models import AnnouncementEmailDelivery
+
+        _, delay = self._post(audience="teachers")
+        delay.assert_not_called()
+        self.assertFalse(AnnouncementEmailDelivery.objects.exists())
+
+    def test_delivery_sends_personalized_batches_and_records_progress(self):
+        """Test that delivery sends personalized batches and records progress."""
+        from academics.announcement_emails import run_announcement_delivery
+        from academics.models import AnnouncementEmailDelivery
+
+        response, _ = self._post()
+        delivery = AnnouncementEmailDelivery.objects.get(announcement_id=response.data["id"])
+        sent = []
+        with self.settings(ANNOUNCEMENT_EMAIL_BATCH_SIZE=2, ANNOUNCEMENT_EMAIL_CONCURRENCY=2):
+            run_announcement_delivery(delivery, send_batch=lambda batch: sent.append(batch) or True)
+
+        self.assertEqual(sorted(len(batch) for batch in sent), [1, 2])
+        messages = {m["to"][0]: m for batch in sent for m in batch}
+        self.assertEqual(set(messages), {p.user.email for p in self.parents})
+        self.assertIn("Parent1 P", messages[self.parents[1].user.email]["html"])
+        self.assertNotIn("{{parent_name}}", messages[self.parents[1].user.email]["html"])
+
+        delivery.refresh_from_db()
+        self.assertEqual(delivery.status, "done")
+        self.assertEqual((delivery.total_recipients, delivery.sent_count, delivery.failed_count), (3, 3, 0))
+        self.assertEqual((delivery.total_batches, delivery.completed_batches), (2, 2))
+
+        self.client.force_authenticate(user=self.admin)
+        progress = self.client.get(f"/api/v1/academics/announcements/{response.data['id']}/email-delivery/")
+        self.assertEqual(progress.status_code, status.HTTP_200_OK)
+        self.assertEqual(progress.data["sent_count"], 3)
+
+    def test_failed_batches_are_retried_then_recorded(self):
+        """Test that failed batches are retried then recorded."""
+        from academics.announcement_emails import run_announcement_delivery
+        from academics.models import AnnouncementEmailDelivery
+
+        response, _ = self._post()
+        delivery = AnnouncementEmailDelivery.objects.get(announcement_id=response.data["id"])
+        calls = []
+        with self.settings(ANNOUNCEMENT_EMAIL_RETRIES=2, ANNOUNCEMENT_EMAIL_RETRY_DELAY=0):
+            run_announcement_delivery(delivery, send_batch=lambda batch: calls.append(batch) and False)
+
+        self.assertEqual(len(calls), 3)
+        delivery.refresh_from_db()
+        self.assertEqual(delivery.status, "failed")
+        self.assertEqual((delivery.sent_count, delivery.failed_count), (0, 3))
+        self.assertEqual(len(delivery.errors[0]["recipients"]), 3)
+
+
+class AnnouncementFeedCacheTest(APITestCase):
+
+    """The announcement feed reads from the audience index and a per-user cache."""
+    def setUp(self):
+        """Execute setUp."""
+        from django.core.cache import cache
+
+        cache.clear()
+        self.client = APIClient()
+        self.school = make_school(name="Feed School")
+        self.admin = make_user(self.school, "feed_admin", role="admin")
+        self.cls = make_class(self.school, name="Form 4A")
+        self.other_cls = make_class(self.school, name="Form 4B")
+        self.student = make_student(self.school, self.cls, username="feed_student", student_number="FEED001")
+        self.url = "/api/v1/academics/announcements/"
+
+    def _announce(self, title, audiences, target_class=None):
+        return Announcement.objects.create(
+            title=title, content="...", author=self.admin, target_audience=audiences[0],
+            target_audiences=audiences, target_class=target_class,
+        )
+
+    def _titles(self, user):
+        self.client.force_authenticate(user=user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row["title"] for row in response.data["results"]]
+
+    def test_audience_index_normalizes_roles(self):
+        """Test that audience index normalizes roles."""
+        announcement = self._announce("Mixed", ["students", "parent"])
+        roles = set(announcement.audience_index.values_list("role", flat=True))
+        self.assertEqual(roles, {"student", "parent"})
+
+    def test_feed_filters_by_role_and_class(self):
+        """Test that feed filters by role and class."""
+        from academics.announcement_feed import announcement_feed
+
+        self._announce("Everyone", ["all"])
+        self._announce("Students", ["students"])
+        self._announce("Teachers", ["teacher"])
+        self._announce("My Class", ["student"], target_class=self.cls)
+        self._announce("Other Class", ["student"], target_class=self.other_cls)
+
+        titles = {a.title for a in announcement_feed(self.student.user)}
+        self.assertEqual(titles, {"Everyone", "Students", "My Class"})
+
+    def test_warm_feed_costs_one_query(self):
+        """Test that warm feed costs one query."""
+        from academics.announcement_feed import announcement_feed
+
+        self._announce("Everyone", ["all"])
+        announcement_feed(self.student.user)
+        with self.assertNumQueries(1):
+            self.assertEqual([a.title for a in announcement_feed(self.student.user)], ["Everyone"])
+
+    def test_new_announcement_and_dismissal_invalidate_feed(self):
+        """Test that new announcement and dismissal invalidate feed."""
+        first = self._announce("First", ["all"])
+        self.assertEqual(self._titles(self.student.user), ["First"])
+
+        self._announce("Second", ["students"])
+        self.assertEqual(self._titles(self.student.user), ["Second", "First"])
+
+        response = self.client.post(f"{self.url}{first.id}/dismiss/", {}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._titles(self.student.user), ["Second"])
+
+    def test_class_change_invalidates_feed(self):
+        """Test that class change invalidates feed."""
+        self._announce("Other Class", ["student"], target_class=self.other_cls)
+        self.assertEqual(self._titles(self.student.user), [])
+
+        self.student.student_class = self.other_cls
+        self.student.save()
+        self.assertEqual(self._titles(self.student.user), ["Other Class"])
+
+    def test_deactivated_announcement_drops_out_of_cached_feed(self):
+        """Test that deactivated announcement drops out of cached feed."""
+        announcement = self._announce("Everyone", ["all"])
+        self.assertEqual(self._titles(self.student.user), ["Everyone"])
+        Announcement.objects.filter(id=announcement.id).update(is_active=False)
+        self.assertEqual(self._titles(self.student.user), [])
+
+
 class BulkImportWizardAPITest(APITestCase):
     def setUp(self):
         self.client = APIClient()
@@ -1590,7 +2058,7 @@ class BulkImportWizardAPITest(APITestCase):
             "errors": [],
             "message": "Imported 1 students with 0 errors.",
         }
-        with patch("academics.views.requests.post", return_value=mocked_resp):
+        with patch("academics.views.outbound.post", return_value=mocked_resp):
             res = self.client.post(self.commit_url, {
                 "import_type": "students",
                 "class_id": str(self.class_a.id),
@@ -1690,6 +2158,216 @@ class StudentAttendanceAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
 
+class AttendanceRollupTest(APITestCase):
+
+    """Attendance rollups follow the write paths and match a full rebuild."""
+    def setUp(self):
+        """Execute setUp."""
+        self.client = APIClient()
+        self.school = make_school()
+        self.admin = make_user(self.school, "roll_admin", role="admin")
+        self.teacher = make_teacher(self.school, username="roll_teacher")
+        self.cls = make_class(self.school, teacher_user=self.teacher.user)
+        self.students = [
+            make_student(self.school, self.cls, username=f"roll_s{i}", student_number=f"ROLL{i:03d}")
+            for i in range(3)
+        ]
+        self.day = datetime.date(2026, 3, 2)
+
+    def _mark(self, statuses):
+        self.client.force_authenticate(user=self.teacher.user)
+        return self.client.post("/api/v1/teachers/attendance/class/mark/", {
+            "date": self.day.isoformat(),
+            "attendance": [
+                {"student_id": student.id, "status": value}
+                for student, value in zip(self.students, statuses)
+            ],
+        }, format="json")
+
+    def _daily(self):
+        from academics.models import AttendanceDailyRollup
+        row = AttendanceDailyRollup.objects.get(class_assigned=self.cls, date=self.day, kind="class")
+        return row.school_id, row.present, row.absent, row.late, row.excused
+
+    def test_marking_updates_daily_and_student_rollups(self):
+        """Test that marking updates daily and student rollups."""
+        from academics.attendance_rollups import school_daily_attendance, student_attendance_summary
+
+        response = self._mark(["present", "absent", "late"])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self._daily(), (self.school.id, 1, 1, 1, 0))
+        self.assertEqual(school_daily_attendance(self.school, self.day)[self.day]["total"], 3)
+
+        summary = student_attendance_summary([s.id for s in self.students])
+        self.assertEqual(summary[self.students[1].id]["absent"], 1)
+        self.assertEqual(summary[self.students[2].id]["late"], 1)
+        self.assertEqual(summary[self.students[0].id]["total"], 1)
+
+    def test_admin_edit_moves_counts(self):
+        """Test that admin edit moves counts."""
+        self._mark(["present", "absent", "late"])
+        record = ClassAttendance.objects.get(student=self.students[1], date=self.day)
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.patch(
+            f"/api/v1/academics/attendance/class/{record.id}/edit/", {"status": "excused"}, format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._daily(), (self.school.id, 1, 0, 1, 1))
+
+    def test_student_endpoint_reads_rollup_stats(self):
+        """Test that student endpoint reads rollup stats."""
+        self._mark(["late", "absent", "present"])
+        self.client.force_authenticate(user=self.students[0].user)
+        response = self.client.get("/api/v1/students/attendance/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stats = response.data["class_attendance"]["stats"]
+        self.assertEqual((stats["total_days"], stats["present"], stats["late"]), (1, 1, 1))
+
+    def test_rebuild_matches_incremental_refresh(self):
+        """Test that rebuild matches incremental refresh."""
+        from academics.attendance_rollups import rebuild_attendance_rollups, student_attendance_summary
+        from academics.models import AttendanceDailyRollup, StudentAttendanceMonthly
+
+        self._mark(["present", "absent", "late"])
+        ClassAttendance.objects.create(
+            student=self.students[0], class_assigned=self.cls,
+            date=datetime.date(2026, 4, 1), status="absent", recorded_by=self.admin,
+        )
+        before_daily = self._daily()
+        written = rebuild_attendance_rollups(school=self.school, kind="class")
+
+        self.assertEqual(written, {"daily": 2, "monthly": 4})
+        self.assertEqual(self._daily(), before_daily)
+        self.assertEqual(AttendanceDailyRollup.objects.filter(kind="class").count(), 2)
+        self.assertEqual(StudentAttendanceMonthly.objects.filter(student=self.students[0]).count(), 2)
+        self.assertEqual(student_attendance_summary([self.students[0].id])[self.students[0].id]["total"], 2)
+
+    def test_migration_backfill_fills_empty_rollups(self):
+        """Test that the rollup backfill migration restores rollups for records written before it."""
+        import importlib
+        from django.apps import apps
+        from academics.attendance_rollups import student_attendance_summary
+        from academics.models import AttendanceDailyRollup, StudentAttendanceMonthly
+
+        self._mark(["present", "absent", "late"])
+        before_daily = self._daily()
+        before_summary = student_attendance_summary([s.id for s in self.students])
+        AttendanceDailyRollup.objects.all().delete()
+        StudentAttendanceMonthly.objects.all().delete()
+
+        migration = importlib.import_module("academics.migrations.0056_backfill_attendance_rollups")
+        migration.backfill_attendance_rollups(apps, None)
+
+        self.assertEqual(self._daily(), before_daily)
+        self.assertEqual(student_attendance_summary([s.id for s in self.students]), before_summary)
+
+
+class AttendanceRegisterWriteAPITest(APITestCase):
+
+    """Registers are written with a fixed number of queries."""
+    def setUp(self):
+        """Execute setUp."""
+        self.client = APIClient()
+        self.school = make_school()
+        self.teacher = make_teacher(self.school, username="reg_teacher")
+        self.cls = make_class(self.school, teacher_user=self.teacher.user)
+        self.other_cls = make_class(self.school, name="Form 1B")
+        self.subject = make_subject(self.school)
+        Timetable.objects.create(
+            class_assigned=self.cls, subject=self.subject, teacher=self.teacher,
+            day_of_week="Monday", start_time=datetime.time(8, 0), end_time=datetime.time(8, 40),
+        )
+        self.students = [
+            make_student(self.school, self.cls, username=f"reg_s{i}", student_number=f"REG{i:03d}")
+            for i in range(8)
+        ]
+        self.outsider = make_student(self.school, self.other_cls, username="reg_out", student_number="REGOUT")
+        self.day = datetime.date(2026, 3, 2)
+        self.client.force_authenticate(user=self.teacher.user)
+
+    def _class_payload(self, students, day):
+        return {
+            "date": day.isoformat(),
+            "attendance": [{"student_id": s.id, "status": "present"} for s in students],
+        }
+
+    def test_class_register_query_count_does_not_grow_with_size(self):
+        """Test that class register query count does not grow with size."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        url = "/api/v1/teachers/attendance/class/mark/"
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(url, self._class_payload(self.students[:2], self.day), format="json")
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.post(
+                url, self._class_payload(self.students, self.day + datetime.timedelta(days=1)), format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 8)
+        self.assertEqual(len(large.captured_queries), len(small.captured_queries))
+
+    def test_class_register_reports_invalid_entries(self):
+        """Test that class register reports invalid entries."""
+        response = self.client.post("/api/v1/teachers/attendance/class/mark/", {
+            "date": self.day.isoformat(),
+            "attendance": [
+                {"student_id": self.students[0].id, "status": "present"},
+                {"student_id": self.students[0].id, "status": "absent"},
+                {"student_id": self.outsider.id, "status": "present"},
+                {"student_id": 999999, "status": "present"},
+                {"student_id": self.students[1].id, "status": "asleep"},
+                {"status": "present"},
+            ],
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(response.data["errors"], [
+            f"Duplicate entry for student {self.students[0].id}",
+            f"Student {self.outsider.id} is not in your class",
+            "Student with ID 999999 not found",
+            f"Invalid status 'asleep' for student {self.students[1].id}",
+            "Missing student_id or status for an entry",
+        ])
+        self.assertEqual(ClassAttendance.objects.get(student=self.students[0], date=self.day).status, "present")
+
+    def test_subject_register_flags_bunks_and_permissions(self):
+        """Test that subject register flags bunks and permissions."""
+        from academics.models import AttendancePermission, SubjectAttendance
+
+        SchoolSettings.objects.update_or_create(
+            school=self.school, defaults={"attendance_period_tracking_start_date": datetime.date(2026, 1, 1)},
+        )
+        for student in self.students[:3]:
+            ClassAttendance.objects.create(
+                student=student, class_assigned=self.cls, date=self.day, status="present",
+            )
+        AttendancePermission.objects.create(
+            student=self.students[1], class_assigned=self.cls, date=self.day, approved=True,
+        )
+        response = self.client.post("/api/v1/teachers/attendance/subject/mark/", {
+            "date": self.day.isoformat(),
+            "class_id": self.cls.id,
+            "subject_id": self.subject.id,
+            "period_number": 1,
+            "attendance": [
+                {"student_id": self.students[0].id, "status": "absent"},
+                {"student_id": self.students[1].id, "status": "absent"},
+                {"student_id": self.students[2].id, "status": "present"},
+            ],
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        rows = {
+            row.student_id: row
+            for row in SubjectAttendance.objects.filter(date=self.day, subject=self.subject)
+        }
+        self.assertTrue(rows[self.students[0].id].bunk_flag)
+        self.assertFalse(rows[self.students[1].id].bunk_flag)
+        self.assertTrue(rows[self.students[1].id].marked_with_permission)
+        self.assertFalse(rows[self.students[2].id].bunk_flag)
+
+
 class ParentLinkRequestApprovalFlowAPITest(APITestCase):
 
     def setUp(self):
@@ -2387,3 +3065,624 @@ class ReportQrVerificationAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(response.data["valid"])
         self.assertEqual(response.data["student_number"], "QR001")
+
+
+class ClassTermRankingAPITest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.school = make_school(name="Ranking School")
+        self.teacher = make_teacher(self.school, username="rank_teacher")
+        self.subject = make_subject(self.school, name="Physics", code="PHY01")
+        self.cls = make_class(self.school, name="Form 4A", grade_level=11, year="2026")
+        self.first = make_student(self.school, self.cls, username="rank_first", student_number="RNK001")
+        self.second = make_student(self.school, self.cls, username="rank_second", student_number="RNK002")
+        self.teacher.subjects_taught.add(self.subject)
+        self.teacher.teaching_classes.set([self.cls])
+        self.url = "/api/v1/teachers/marks/add/"
+
+    def _add_mark(self, student, score, **extra):
+        self.client.force_authenticate(user=self.teacher.user)
+        payload = {
+            "student_id": student.id,
+            "subject_id": self.subject.id,
+            "exam_type": "Exam",
+            "score": score,
+            "max_score": 100,
+            "academic_term": "Term 1",
+            "academic_year": "2026",
+        }
+        payload.update(extra)
+        return self.client.post(self.url, payload, format="json")
+
+    def test_add_mark_rebuilds_class_ranking(self):
+        from academics.models import ClassTermRanking
+        from academics.views import _compute_class_position, _class_subject_stats
+
+        self.assertEqual(self._add_mark(self.first, 60).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self._add_mark(self.second, 90).status_code, status.HTTP_201_CREATED)
+
+        ranking = ClassTermRanking.objects.get(class_obj=self.cls, academic_year="2026", academic_term="Term 1")
+        self.assertEqual(ranking.class_size, 2)
+        with self.assertNumQueries(1):
+            self.assertEqual(_compute_class_position(self.second, "2026", "Term 1"), (1, 2))
+        self.assertEqual(_compute_class_position(self.first, "2026", "Term 1"), (2, 2))
+        self.assertEqual(_class_subject_stats(self.first, "2026", "Term 1"), {"Physics": (75.0, 90.0)})
+
+    def test_result_moved_to_another_term_rebuilds_both_terms(self):
+        from academics.views import _compute_class_position
+
+        self._add_mark(self.first, 60)
+        self._add_mark(self.second, 90)
+        result = Result.objects.get(student=self.second)
+        admin = make_user(self.school, "rank_move_admin", role="admin")
+        self.client.force_authenticate(user=admin)
+        response = self.client.patch(
+            f"/api/v1/academics/results/{result.id}/", {"academic_term": "Term 2"}, format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(_compute_class_position(self.first, "2026", "Term 1"), (1, 1))
+        self.assertEqual(_compute_class_position(self.second, "2026", "Term 2"), (1, 1))
+
+    def test_report_settings_update_rebuilds_class_ranking(self):
+        from academics.views import _compute_class_position
+
+        self._add_mark(self.first, 60)
+        self._add_mark(self.second, 90)
+        self.assertEqual(_compute_class_position(self.first, "2026", "Term 1"), (2, 2))
+
+        result = Result.objects.get(student=self.second)
+        response = self.client.patch("/api/v1/teachers/results/report-settings/", {
+            "updates": [{"id": result.id, "include_in_report": False}],
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["updated"], 1)
+        self.assertEqual(_compute_class_position(self.first, "2026", "Term 1"), (1, 1))
+        self.assertIsNone(_compute_class_position(self.second, "2026", "Term 1")[0])
+
+    def test_transfer_invalidates_class_ranking(self):
+        from academics.models import ClassTermRanking
+        from academics.views import _compute_class_position
+
+        self._add_mark(self.first, 60)
+        self._add_mark(self.second, 90)
+        admin = make_user(self.school, "rank_admin", role="admin")
+        self.client.force_authenticate(user=admin)
+        response = self.client.post(f"/api/v1/academics/students/{self.second.id}/transfer/", {}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(ClassTermRanking.objects.filter(class_obj=self.cls).exists())
+        self.assertEqual(_compute_class_position(self.first, "2026", "Term 1"), (1, 1))
+
+    def test_student_dashboard_reports_current_term_position(self):
+        self._add_mark(self.first, 60)
+        self._add_mark(self.second, 90)
+        SchoolSettings.objects.update_or_create(
+            school=self.school,
+            defaults={"current_academic_year": "2026", "current_term": "Term 1"},
+        )
+        self.first.user.role = "student"
+        self.first.user.save(update_fields=["role"])
+        self.client.force_authenticate(user=self.first.user)
+        response = self.client.get("/api/v1/students/dashboard/stats/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["class_position"]["rank"], 2)
+        self.assertEqual(response.data["class_position"]["class_size"], 2)
+
+
+class ReportCardBatchAPITest(APITestCase):
+    def setUp(self):
+        import tempfile
+        from django.test import override_settings
+
+        media_override = override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        self.client = APIClient()
+        self.school = make_school(name="Batch School")
+        self.admin = make_user(self.school, "batch_admin", role="admin")
+        self.subject = make_subject(self.school, name="Chemistry", code="CHE01")
+        self.cls = make_class(self.school, name="Form 3B", grade_level=10, year="2026")
+        self.first = make_student(self.school, self.cls, username="batch_first", student_number="BAT001")
+        self.second = make_student(self.school, self.cls, username="batch_second", student_number="BAT002")
+        teacher = make_teacher(self.school, username="batch_teacher")
+        for student, score in ((self.first, 55), (self.second, 80)):
+            Result.objects.create(
+                student=student, subject=self.subject, teacher=teacher,
+                exam_type="Exam", score=score, max_score=100,
+                academic_term="Term 1", academic_year="2026",
+            )
+        self.client.force_authenticate(user=self.admin)
+
+    def _queue(self, **extra):
+        payload = {"year": "2026", "term": "Term 1"}
+        payload.update(extra)
+        with patch("academics.tasks.generate_report_card_batch_task.delay") as delay:
+            response = self.client.post("/api/v1/academics/reports/batches/", payload, format="json")
+        return response, delay
+
+    def test_batch_renders_each_student_and_bundle(self):
+        from pypdf import PdfReader
+        from academics.models import ReportCardBatch
+        from academics.tasks import generate_report_card_batch_task
+
+        response, delay = self._queue(class_id=self.cls.id)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], "queued")
+        delay.assert_called_once_with(response.data["id"])
+
+        generate_report_card_batch_task(response.data["id"])
+
+        batch = ReportCardBatch.objects.get(id=response.data["id"])
+        self.assertEqual(batch.status, "done")
+        self.assertEqual((batch.total_students, batch.rendered_count, batch.failed_count), (2, 2, 0))
+
+        detail = self.client.get(f"/api/v1/academics/reports/batches/{batch.id}/")
+        self.assertEqual(detail.status_code, status.HTTP_200_OK)
+        self.assertEqual({f["student_id"] for f in detail.data["files"]}, {self.first.id, self.second.id})
+
+        download = self.client.get(f"/api/v1/academics/reports/batches/{batch.id}/bundle/")
+        self.assertEqual(download.status_code, status.HTTP_200_OK)
+        self.assertEqual(download["Content-Type"], "application/pdf")
+        bundle_pages = len(PdfReader(io.BytesIO(download.content)).pages)
+        single_pages = sum(len(PdfReader(f.pdf.path).pages) for f in batch.files.all())
+        self.assertEqual(bundle_pages, single_pages)
+
+    def test_retry_renders_only_missing_cards_and_interrupts_leave_no_files(self):
+        import os
+        from django.conf import settings
+        from academics import report_cards
+        from academics.models import ReportCardBatch
+
+        response, _ = self._queue(class_id=self.cls.id)
+        batch = ReportCardBatch.objects.get(id=response.data["id"])
+
+        def interrupted(jobs):
+            yield report_cards._render_student_pdf(jobs[0])
+            raise RuntimeError("worker lost")
+
+        with patch("academics.report_cards._render_jobs", side_effect=interrupted):
+            with self.assertRaises(RuntimeError):
+                report_cards.run_report_card_batch(batch)
+        self.assertFalse(batch.files.exists())
+        stored = [name for _, _, names in os.walk(settings.MEDIA_ROOT) for name in names]
+        self.assertEqual(stored, [])
+
+        # An earlier attempt already stored the first card.
+        report_cards.run_report_card_batch(ReportCardBatch.objects.get(id=batch.id))
+        batch.files.filter(student=self.second).delete()
+        batch = ReportCardBatch.objects.select_related("school").get(id=batch.id)
+        with patch("academics.report_cards._render_student_pdf", wraps=report_cards._render_student_pdf) as render:
+            report_cards.run_report_card_batch(batch)
+        self.assertEqual([call.args[0][0].id for call in render.call_args_list], [self.second.id])
+        self.assertEqual((batch.status, batch.rendered_count), ("done", 2))
+        self.assertEqual(set(batch.files.values_list("student_id", flat=True)), {self.first.id, self.second.id})
+
+    def test_bundle_not_ready_and_other_roles_rejected(self):
+        response, _ = self._queue(bundle=False)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["class_ids"], [self.cls.id])
+        download = self.client.get(f"/api/v1/academics/reports/batches/{response.data['id']}/bundle/")
+        self.assertEqual(download.status_code, status.HTTP_409_CONFLICT)
+
+        self.client.force_authenticate(user=self.first.user)
+        denied = self.client.post("/api/v1/academics/reports/batches/", {"year": "2026", "term": "Term 1"}, format="json")
+        self.assertEqual(denied.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class AtRiskPredictionEngineTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.school = make_school(name="Risk School")
+        self.admin = make_user(self.school, "risk_admin", role="admin")
+        self.teacher = make_teacher(self.school, username="risk_teacher")
+        self.subject = make_subject(self.school, name="Biology", code="BIO01")
+        self.cls = make_class(self.school, name="Form 2C", grade_level=9, year="2026")
+        self.count = 0
+
+    def _student_with_scores(self, scores):
+        self.count += 1
+        student = make_student(self.school, self.cls, username=f"risk_{self.count}", student_number=f"RSK{self.count:03d}")
+        for term, score in zip(("Term 1", "Term 2", "Term 3"), scores):
+            Result.objects.create(
+                student=student, subject=self.subject, teacher=self.teacher, exam_type="Exam",
+                score=score, max_score=100, academic_term=term, academic_year="2026",
+            )
+        return student
+
+    def test_school_pass_matches_single_student_prediction(self):
+        from academics.ml_predictions import predict_grades_for_students, predict_student_grades
+
+        rising = self._student_with_scores([40, 50, 60])
+        falling = self._student_with_scores([45, 40, 35])
+        with self.assertNumQueries(1):
+            by_student = predict_grades_for_students(Student.objects.filter(student_class=self.cls))
+
+        pred = by_student[rising.id][0]
+        self.assertEqual((pred["current_avg"], pred["predicted_score"]), (50.0, 70.0))
+        self.assertEqual((pred["current_grade"], pred["predicted_grade"], pred["trend"]), ("C", "A", "up"))
+        self.assertEqual(by_student[falling.id][0]["trend"], "down")
+        self.assertTrue(by_student[falling.id][0]["at_risk"])
+        self.assertEqual(predict_student_grades(falling), by_student[falling.id])
+
+    def test_admin_at_risk_query_count_independent_of_school_size(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self._student_with_scores([30, 35, 40])
+        self._student_with_scores([80, 85, 90])
+        self.client.force_authenticate(user=self.admin)
+        url = "/api/v1/academics/admin/at-risk-students/"
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.get(url)
+        self.assertEqual(response.data["total_at_risk"], 1)
+
+        for _ in range(5):
+            self._student_with_scores([20, 30, 25])
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(url)
+        self.assertEqual(response.data["total_at_risk"], 6)
+        self.assertEqual(len(large.captured_queries), len(small.captured_queries))
+
+    @patch("academics.at_risk_alerts.notify_at_risk")
+    def test_batch_alert_check_creates_and_resolves(self, mock_notify):
+        from academics.at_risk_alerts import check_and_alert_at_risk, check_and_alert_at_risk_for_students
+        from academics.models import AtRiskAlert
+
+        failing = self._student_with_scores([30, 35, 40])
+        passing = self._student_with_scores([70, 75, 80])
+        check_and_alert_at_risk_for_students(Student.objects.filter(student_class=self.cls).select_related("user"))
+        alert = AtRiskAlert.objects.get(student=failing, subject=self.subject)
+        self.assertEqual(alert.status, "new")
+        self.assertFalse(AtRiskAlert.objects.filter(student=passing).exists())
+        mock_notify.assert_called_once()
+
+        from academics.prediction_cache import invalidate_student_predictions
+        Result.objects.filter(student=failing).update(score=90)
+        invalidate_student_predictions([failing.id])
+        check_and_alert_at_risk(failing)
+        alert.refresh_from_db()
+        self.assertEqual(alert.status, "resolved")
+
+
+class AtRiskEvaluationQueueTest(APITestCase):
+
+    """Mark entries queue student/subject pairs for one coalesced at-risk evaluation."""
+    def setUp(self):
+        """Execute setUp."""
+        from django.core.cache import cache
+
+        cache.clear()
+        self.client = APIClient()
+        self.school = make_school(name="Risk Queue School")
+        self.admin = make_user(self.school, "rq_admin", role="admin")
+        self.teacher = make_teacher(self.school, username="rq_teacher")
+        self.subject = make_subject(self.school, name="Chemistry", code="CHE01")
+        self.cls = make_class(self.school, name="Form 3C", grade_level=10, year="2026")
+        self.teacher.subjects_taught.add(self.subject)
+        self.teacher.teaching_classes.set([self.cls])
+        self.students = [
+            make_student(self.school, self.cls, username=f"rq_student{i}", student_number=f"RQS{i:03d}")
+            for i in range(3)
+        ]
+        parent = Parent.objects.create(user=make_user(self.school, "rq_parent", role="parent"))
+        parent.children.add(self.students[0])
+
+    def _enter(self, student, score, term="Term 1"):
+        response = self.client.post("/api/v1/teachers/marks/add/", {
+            "student_id": student.id, "subject_id": self.subject.id, "exam_type": "Test",
+            "score": score, "max_score": 100, "academic_term": term, "academic_year": "2026",
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_class_mark_entry_schedules_one_evaluation(self):
+        """Test that class mark entry schedules one evaluation."""
+        from academics.models import PendingAtRiskEvaluation
+
+        self.client.force_authenticate(user=self.teacher.user)
+        with patch("academics.tasks.evaluate_at_risk_task.apply_async") as apply_async, \
+                self.captureOnCommitCallbacks(execute=True):
+            for student in self.students:
+                self._enter(student, 30)
+        with patch("academics.tasks.evaluate_at_risk_task.apply_async") as later, \
+                self.captureOnCommitCallbacks(execute=True):
+            self._enter(self.students[0], 35, term="Term 2")
+
+        apply_async.assert_called_once_with(args=[self.school.id], countdown=60)
+        later.assert_not_called()
+        self.assertEqual(PendingAtRiskEvaluation.objects.filter(school=self.school).count(), 3)
+
+    def test_drain_creates_alerts_in_batch_and_notifies_once(self):
+        """Test that drain creates alerts in batch and notifies once."""
+        from django.core import mail
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from academics.at_risk_alerts import drain_at_risk_queue
+        from academics.models import AtRiskAlert, PendingAtRiskEvaluation
+
+        self.client.force_authenticate(user=self.teacher.user)
+        with patch("academics.tasks.evaluate_at_risk_task.apply_async"):
+            self._enter(self.students[0], 30)
+            self._enter(self.students[1], 35)
+            self._enter(self.students[2], 80)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(drain_at_risk_queue(self.school.id), 3)
+        self.assertLess(len(ctx.captured_queries), 20)
+        self.assertFalse(PendingAtRiskEvaluation.objects.exists())
+
+        alerts = AtRiskAlert.objects.filter(subject=self.subject)
+        self.assertEqual(set(alerts.values_list("student_id", flat=True)), {self.students[0].id, self.students[1].id})
+        first = alerts.get(student=self.students[0])
+        self.assertTrue(first.notified_teacher and first.notified_parent and first.notified_admin)
+        # Teacher + admin per alert, parent only for the first student.
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertIn("RQS000", mail.outbox[0].body)
+
+    def test_recovery_resolves_existing_alert(self):
+        """Test that recovery resolves existing alert."""
+        from academics.at_risk_alerts import drain_at_risk_queue
+        from academics.models import AtRiskAlert
+
+        self.client.force_authenticate(user=self.teacher.user)
+        with self.settings(AT_RISK_EVALUATION_DELAY=0), self.captureOnCommitCallbacks(execute=True):
+            self._enter(self.students[0], 30)
+        alert = AtRiskAlert.objects.get(student=self.students[0], subject=self.subject)
+        self.assertEqual(alert.status, "new")
+
+        Result.objects.filter(student=self.students[0]).update(score=90)
+        with self.settings(AT_RISK_EVALUATION_DELAY=0), self.captureOnCommitCallbacks(execute=True):
+            self._enter(self.students[0], 95, term="Term 2")
+        alert.refresh_from_db()
+        self.assertEqual(alert.status, "resolved")
+        self.assertEqual(drain_at_risk_queue(self.school.id), 0)
+
+
+class PredictionCacheTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.school = make_school(name="Prediction Cache School")
+        self.teacher = make_teacher(self.school, username="pc_teacher")
+        self.subject = make_subject(self.school, name="Geography", code="GEO01")
+        self.cls = make_class(self.school, name="Form 1D", grade_level=8, year="2026")
+        self.student = make_student(self.school, self.cls, username="pc_student", student_number="PCS001")
+        self.teacher.subjects_taught.add(self.subject)
+        self.teacher.teaching_classes.set([self.cls])
+        Result.objects.create(
+            student=self.student, subject=self.subject, teacher=self.teacher, exam_type="Exam",
+            score=30, max_score=100, academic_term="Term 1", academic_year="2026",
+        )
+
+    def test_warm_cache_is_a_single_read(self):
+        from academics.prediction_cache import get_cached_predictions, warm_prediction_cache
+
+        self.assertEqual(warm_prediction_cache(school=self.school), 1)
+        with self.assertNumQueries(1):
+            by_student = get_cached_predictions([self.student.id])
+        self.assertEqual(by_student[self.student.id][0]["current_grade"], "E")
+
+    def test_mark_entry_bumps_version_and_next_read_recomputes(self):
+        from academics.models import StudentPredictionCache
+        from academics.prediction_cache import get_cached_student_predictions
+
+        self.assertEqual(get_cached_student_predictions(self.student)[0]["current_avg"], 30.0)
+        self.client.force_authenticate(user=self.teacher.user)
+        response = self.client.post("/api/v1/teachers/marks/add/", {
+            "student_id": self.student.id, "subject_id": self.subject.id, "exam_type": "Test",
+            "score": 90, "max_score": 100, "academic_term": "Term 2", "academic_year": "2026",
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        row = StudentPredictionCache.objects.get(student=self.student)
+        self.assertNotEqual(row.version, row.computed_version)
+        self.assertEqual(get_cached_student_predictions(self.student)[0]["current_avg"], 60.0)
+        row.refresh_from_db()
+        self.assertEqual(row.version, row.computed_version)
+
+
+class DashboardSummaryTest(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.school = make_school(name="Dashboard Summary School")
+        self.admin = make_user(self.school, "ds_admin", role="admin")
+        self.teacher = make_teacher(self.school, username="ds_teacher")
+        self.subject = make_subject(self.school, name="History", code="HIS01")
+        self.cls = make_class(self.school, name="Form 2E", grade_level=9, year="2026")
+        self.student = make_student(self.school, self.cls, username="ds_student", student_number="DSS001")
+        Timetable.objects.create(
+            class_assigned=self.cls, subject=self.subject, teacher=self.teacher,
+            day_of_week="Monday", start_time=datetime.time(8, 0), end_time=datetime.time(8, 40),
+        )
+        Result.objects.create(
+            student=self.student, subject=self.subject, teacher=self.teacher, exam_type="Exam",
+            score=70, max_score=100, academic_term="Term 1", academic_year="2026",
+        )
+        SchoolFees.objects.create(
+            school=self.school, grade_level=9, grade_name="Form 2", tuition_fee=500,
+            academic_year="2026", academic_term="term_1", created_by=self.admin,
+        )
+        self.parent = Parent.objects.create(user=make_user(self.school, "ds_parent", role="parent"))
+        ParentChildLink.objects.create(parent=self.parent, student=self.student, is_confirmed=True)
+        self.url = f"/api/v1/parents/children/{self.student.id}/stats/"
+
+    def test_parent_dashboard_reads_stored_summary(self):
+        self.client.force_authenticate(user=self.parent.user)
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data["overall_average"], 70.0)
+        self.assertEqual(first.data["outstanding_fees"], 500.0)
+        self.assertEqual([s["code"] for s in first.data["subjects"]], ["HIS01"])
+
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as ctx:
+            again = self.client.get(self.url)
+        self.assertEqual(again.data, first.data)
+        for table in ("academics_result", "finances_studentpaymentrecord", "finances_additionalfee"):
+            self.assertFalse(any(table in q["sql"] for q in ctx.captured_queries), table)
+
+    def test_payment_and_attendance_writes_refresh_the_summary(self):
+        from academics.attendance_rollups import refresh_rollups_for_records
+
+        self.client.force_authenticate(user=self.parent.user)
+        self.assertEqual(self.client.get(self.url).data["attendance_percentage"], 100)
+
+        StudentPaymentRecord.objects.create(
+            student=self.student, school=self.school, payment_type="school_fees", payment_plan="one_term",
+            academic_year="2026", academic_term="term_1", total_amount_due=500, amount_paid=200,
+            payment_status="partial", recorded_by=self.admin,
+        )
+        records = [
+            ClassAttendance.objects.create(
+                student=self.student, class_assigned=self.cls, date=datetime.date(2026, 3, day),
+                status=state, recorded_by=self.admin,
+            )
+            for day, state in ((2, "present"), (3, "absent"))
+        ]
+        refresh_rollups_for_records("class", records)
+
+        data = self.client.get(self.url).data
+        self.assertEqual(data["outstanding_fees"], 300.0)
+        self.assertEqual(data["attendance_percentage"], 50.0)
+
+        self.student.user.role = "student"
+        self.student.user.save(update_fields=["role"])
+        self.client.force_authenticate(user=self.student.user)
+        student_view = self.client.get("/api/v1/students/dashboard/stats/").data
+        self.assertEqual(student_view["overall_average"], 70.0)
+        self.assertEqual(student_view["attendance_percentage"], 50.0)
+
+    def test_assessment_plan_edit_and_max_age_refresh_the_summary(self):
+        from academics.models import AssessmentPlan, StudentDashboardSummary
+
+        plan = AssessmentPlan.objects.create(
+            school=self.school, academic_year="2026", academic_term="Term 1",
+            papers_weight=0.5, tests_weight=0.5, assignments_weight=0.0,
+        )
+        plan.subjects.add(self.subject)
+        Result.objects.filter(student=self.student).update(assessment_plan=plan)
+        Result.objects.create(
+            student=self.student, subject=self.subject, teacher=self.teacher, exam_type="Test",
+            score=30, max_score=100, academic_term="Term 1", academic_year="2026",
+            assessment_plan=plan, component_kind="test",
+        )
+        self.client.force_authenticate(user=self.parent.user)
+        self.assertEqual(self.client.get(self.url).data["overall_average"], 50.0)
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.patch(f"/api/v1/academics/assessment-plans/{plan.id}/", {
+            "papers_weight": 0.75, "tests_weight": 0.25, "assignments_weight": 0.0,
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.client.force_authenticate(user=self.parent.user)
+        self.assertEqual(self.client.get(self.url).data["overall_average"], 60.0)
+
+        # A write that skips invalidation is picked up once the row ages out.
+        AssessmentPlan.objects.filter(id=plan.id).update(papers_weight=0.25, tests_weight=0.75)
+        self.assertEqual(self.client.get(self.url).data["overall_average"], 60.0)
+        StudentDashboardSummary.objects.filter(student=self.student).update(
+            computed_at=timezone.now() - datetime.timedelta(hours=2),
+        )
+        with self.settings(DASHBOARD_SUMMARY_MAX_AGE_SECONDS=3600):
+            self.assertEqual(self.client.get(self.url).data["overall_average"], 40.0)
+
+    def test_parent_overview_batches_all_children(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        sibling = make_student(self.school, self.cls, username="ds_sibling", student_number="DSS002")
+        ParentChildLink.objects.create(parent=self.parent, student=sibling, is_confirmed=True)
+        Result.objects.create(
+            student=sibling, subject=self.subject, teacher=self.teacher, exam_type="Assignment",
+            score=45, max_score=50, academic_term="Term 1", academic_year="2026",
+        )
+        self.client.force_authenticate(user=self.parent.user)
+        response = self.client.get("/api/v1/parents/overview/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        by_id = {child["id"]: child for child in response.data}
+        self.assertEqual(set(by_id), {self.student.id, sibling.id})
+        self.assertEqual(by_id[sibling.id]["stats"]["overall_average"], 90.0)
+        self.assertEqual(by_id[sibling.id]["performance"][0]["assignment_score_percentage"], 90.0)
+        self.assertEqual(by_id[self.student.id]["fees"], {"outstanding": 500.0, "status": "outstanding"})
+        single = self.client.get(self.url).data
+        self.assertEqual(by_id[self.student.id]["stats"], single)
+
+        # Query count does not grow with the number of children.
+        with CaptureQueriesContext(connection) as two_children:
+            self.client.get("/api/v1/parents/overview/")
+        ParentChildLink.objects.filter(student=sibling).delete()
+        with CaptureQueriesContext(connection) as one_child:
+            self.client.get("/api/v1/parents/overview/")
+        self.assertEqual(len(two_children), len(one_child))
+
+
+class ListEndpointQueryCountTest(QueryCountAssertionsMixin, APITestCase):
+    """List endpoints must issue the same number of queries however many rows they return."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.school = make_school(name="Query Count School")
+        self.admin = make_user(self.school, "qc_admin", role="admin")
+        self.subject = make_subject(self.school, name="Geography", code="GEO01")
+        self.client.force_authenticate(user=self.admin)
+        self.rows = 0
+
+    def _add_class(self):
+        self.rows += 1
+        cls = make_class(self.school, name=f"Form Q{self.rows}", grade_level=3)
+        ClassSubjectAssignment.objects.create(
+            school=self.school, class_obj=cls, subject=self.subject, academic_year=cls.academic_year,
+        )
+        return cls
+
+    def _add_student_with_parent(self):
+        cls = self._add_class()
+        student = make_student(self.school, cls, username=f"qc_student{self.rows}", student_number=f"QC{self.rows:03d}")
+        parent = Parent.objects.create(user=make_user(self.school, f"qc_parent{self.rows}", role="parent"))
+        parent.children.add(student)
+        return student
+
+    def _add_teacher(self):
+        self.rows += 1
+        teacher = make_teacher(self.school, username=f"qc_teacher{self.rows}")
+        teacher.subjects_taught.add(self.subject)
+        teacher.teaching_classes.add(self._add_class())
+        return teacher
+
+    def _fetch(self, url):
+        def fetch():
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return response
+        return fetch
+
+    def test_student_list_reads_parents_from_prefetch(self):
+        self._add_student_with_parent()
+        self.assertQueryCountStable(
+            self._fetch("/api/v1/academics/students/"),
+            lambda: [self._add_student_with_parent() for _ in range(3)],
+        )
+        rows = get_list(self.client.get("/api/v1/academics/students/").data)
+        self.assertEqual(len(rows), 4)
+        self.assertTrue(all(row["parent_email"] for row in rows))
+
+    def test_class_list_reads_subject_assignments_from_prefetch(self):
+        self._add_class()
+        self.assertQueryCountStable(
+            self._fetch("/api/v1/academics/classes/"),
+            lambda: [self._add_class() for _ in range(3)],
+        )
+        rows = get_list(self.client.get("/api/v1/academics/classes/").data)
+        self.assertEqual({tuple(s["code"] for s in row["subjects_detail"]) for row in rows}, {("GEO01",)})
+
+    def test_teacher_and_parent_lists_have_constant_queries(self):
+        self._add_teacher()
+        self._add_student_with_parent()
+        self.assertQueryCountStable(
+            self._fetch("/api/v1/academics/teachers/"),
+            lambda: [self._add_teacher() for _ in range(3)],
+        )
+        self.assertQueryCountStable(
+            self._fetch("/api/v1/academics/parents/"),
+            lambda: [self._add_student_with_parent() for _ in range(3)],
+        )
@@ -1,7 +1,30 @@
 """
-Timetable Generation — Per-class greedy scheduler.
+Timetable Generation.
 
-Rules:
+Two modes share the loading and saving code here:
+
+    greedy  — per-class greedy scheduler (rules below)
+    solver  — constraint-based search in timetable_solver.py: parallel
+              randomized restarts with simulated annealing, keeping the
+              best-scoring candidate (unplaced periods, same-subject
+              clustering, teacher gaps)
+
+    ok, message, plan = plan_timetable(school, academic_year, mode='solver')
+    entries = save_timetable(plan, school, academic_year)   # one bulk_create
+
+generate_timetable() does both; TIMETABLE_GENERATOR_MODE picks the default mode.
+
+The admin endpoint runs generation as a TimetableGenerationJob on the Celery
+worker instead of inside the request:
+
+    job = queue_timetable_job(school, request.user, academic_year, mode)
+    run_timetable_job(job)   # usually via tasks.generate_timetable_task
+
+The job records its phase and progress (solver restarts or greedy classes),
+can be cancelled until saving starts, and ends with a per-class summary; the
+entries themselves are read back through the paginated timetable list.
+
+Greedy rules:
 1. Max 2 periods of the same subject per day per class
 2. Priority subjects (is_priority=True) are scheduled FIRST and get
    at least 1 period every day (2 on some days if slots allow)
@@ -14,9 +37,17 @@ Rules:
 import logging
 import random
 from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
 
 logger = logging.getLogger(__name__)
-from .models import Class, Subject, Teacher, Timetable, ClassSubjectAssignment
+from .models import Class, Subject, Teacher, Timetable, ClassSubjectAssignment, TimetableGenerationJob
+from .announcement_feed import invalidate_school_feeds
+from .timetable_index import invalidate_timetable_index, timetable_index
+from .timetable_solver import MAX_PER_DAY, SolverCancelled, score_timetable, solve_timetable
 
 DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
 
@@ -118,13 +149,13 @@ def generate_periods_for_class(class_obj):
     return day_periods
 
 
-def _find_teacher(subject_teachers, sid, class_id, time_key, teacher_busy, teacher_scoped_classes):
+def _find_teacher(subject_teachers, sid, class_id, time_key, teacher_busy, teacher_scoped_classes, rng=random):
     """Find a teacher for subject `sid` and class who is free at `time_key`."""
     candidates = [
         tid for tid in subject_teachers.get(sid, [])
         if not teacher_scoped_classes.get(tid) or class_id in teacher_scoped_classes[tid]
     ]
-    random.shuffle(candidates)
+    rng.shuffle(candidates)
     for tid in candidates:
         if time_key not in teacher_busy[tid]:
             return tid
@@ -141,17 +172,8 @@ def _find_room(rooms, time_key, room_busy):
     return new_room
 
 
-def generate_timetable(school=None, academic_year=None, clear_existing=True):
-    """
-    Generate timetables for all classes.
-    Priority subjects → scheduled first, 1-2 periods/day across all 5 days.
-    Normal subjects → fill remaining slots, max 2 per day.
-    """
-    from django.db import transaction
-
-    if not school:
-        return False, "School is required for timetable generation", []
-
+def _load_school(school, academic_year):
+    """Read classes, subjects, teachers and assignments once. Returns (context, error)."""
     class_qs = Class.objects.filter(school=school)
     if academic_year:
         class_qs = class_qs.filter(academic_year=academic_year)
@@ -160,13 +182,12 @@ def generate_timetable(school=None, academic_year=None, clear_existing=True):
     teachers = list(Teacher.objects.filter(user__school=school).prefetch_related('subjects_taught', 'teaching_classes'))
 
     if not classes:
-        return False, "No classes found", []
+        return None, "No classes found"
     if not teachers:
-        return False, "No teachers found", []
+        return None, "No teachers found"
     if not subjects:
-        return False, "No subjects found", []
+        return None, "No subjects found"
 
-    # ── Maps ──
     subject_map = {s.id: s for s in subjects}
     subject_teachers = defaultdict(list)
     for teacher in teachers:
@@ -175,34 +196,16 @@ def generate_timetable(school=None, academic_year=None, clear_existing=True):
 
     teachable = [s for s in subjects if s.id in subject_teachers]
     if not teachable:
-        return False, "No subjects have assigned teachers. Assign teachers to subjects first.", []
+        return None, "No subjects have assigned teachers. Assign teachers to subjects first."
 
     # Teacher class scopes:
     # - Empty set means unrestricted (legacy behavior) so existing schools continue to work.
     # - Non-empty set means admin explicitly limited this teacher to those forms/grades.
     teacher_scoped_classes = {
-        teacher.id: set(teacher.teaching_classes.values_list('id', flat=True))
+        teacher.id: {c.id for c in teacher.teaching_classes.all()}
         for teacher in teachers
     }
 
-    # ── Periods per class ──
-    class_periods = {}
-    for cls in classes:
-        class_periods[cls.id] = generate_periods_for_class(cls)
-
-    rooms = [f"Room {i}" for i in range(1, len(classes) + 5)]
-
-    # ── Global state — prevents teacher double-booking ──
-    teacher_busy = defaultdict(set)
-    room_busy = defaultdict(set)
-    assignments = []
-
-    # Shuffle class order for fairness
-    class_order = list(classes)
-    random.shuffle(class_order)
-
-    MAX_PER_DAY = 2  # Hard cap: no subject gets more than 2 periods on any day
-
     # Canonical class-subject mapping:
     # use explicit class assignments first; fallback to legacy subject pool only when missing.
     assignment_qs = ClassSubjectAssignment.objects.filter(
@@ -217,73 +220,135 @@ def generate_timetable(school=None, academic_year=None, clear_existing=True):
         if assignment.subject_id in subject_map:
             class_subject_assignments[assignment.class_obj_id].append(assignment)
 
-    for cls in class_order:
-        day_periods_map = class_periods.get(cls.id, {})
+    return {
+        'classes': classes,
+        'teachers': teachers,
+        'subject_map': subject_map,
+        'subject_teachers': subject_teachers,
+        'teachable': teachable,
+        'teacher_scoped_classes': teacher_scoped_classes,
+        'class_periods': {cls.id: generate_periods_for_class(cls) for cls in classes},
+        'class_subject_assignments': class_subject_assignments,
+    }, None
+
+
+def _class_subjects(cls, ctx):
+    """Subjects this class can be taught, and the preferred teacher per subject."""
+    subject_teachers = ctx['subject_teachers']
+    teacher_scoped_classes = ctx['teacher_scoped_classes']
+    assignment_rows = ctx['class_subject_assignments'].get(cls.id, [])
+    assignment_teacher_map = {}
+    class_teachable_subjects = []
+
+    if assignment_rows:
+        for row in assignment_rows:
+            subj = row.subject
+            teacher_ids = subject_teachers.get(subj.id, [])
+            scoped_teacher_ids = [
+                tid for tid in teacher_ids
+                if not teacher_scoped_classes.get(tid) or cls.id in teacher_scoped_classes[tid]
+            ]
+            if not scoped_teacher_ids:
+                continue
+            class_teachable_subjects.append(subj)
+            if row.teacher_id and row.teacher_id in scoped_teacher_ids:
+                assignment_teacher_map[subj.id] = row.teacher_id
+    else:
+        for subj in ctx['teachable']:
+            teacher_ids = subject_teachers.get(subj.id, [])
+            if any(
+                not teacher_scoped_classes.get(tid) or cls.id in teacher_scoped_classes[tid]
+                for tid in teacher_ids
+            ):
+                class_teachable_subjects.append(subj)
+
+    if not class_teachable_subjects:
+        logger.warning(
+            "Skipping class %s (%s): no teachers assigned for its allowed form/grade scope.",
+            cls.id,
+            cls.name,
+        )
+    return class_teachable_subjects, assignment_teacher_map
+
+
+def _weekly_budget(class_teachable_subjects, total_slots):
+    """Periods per week for each subject of a class."""
+    priority_subjects = [s for s in class_teachable_subjects if s.is_priority]
+    normal_subjects = [s for s in class_teachable_subjects if not s.is_priority]
+
+    # Priority subjects: 1 period/day = 5/week
+    weekly_budget = {s.id: 5 for s in priority_subjects}
+
+    # Remaining slots are shared by normal subjects
+    remaining_slots = max(0, total_slots - sum(weekly_budget.values()))
+    if normal_subjects and remaining_slots > 0:
+        per_normal = max(1, min(remaining_slots // len(normal_subjects), 5))
+        for s in normal_subjects:
+            weekly_budget[s.id] = per_normal
+    return weekly_budget
+
+
+def _build_problem(ctx):
+    """Plain-data solver input (see timetable_solver) for every schedulable class."""
+    problem = {'slots': {}, 'demand': {}, 'eligible': {}, 'preferred': {}, 'priority': set()}
+    teacher_scoped_classes = ctx['teacher_scoped_classes']
+    for cls in ctx['classes']:
+        day_periods_map = ctx['class_periods'].get(cls.id, {})
+        slots = [(day, start, end) for day in DAYS for start, end in day_periods_map.get(day, [])]
+        if not slots:
+            continue
+        class_teachable_subjects, assignment_teacher_map = _class_subjects(cls, ctx)
+        if not class_teachable_subjects:
+            continue
+        problem['slots'][cls.id] = slots
+        problem['demand'][cls.id] = _weekly_budget(class_teachable_subjects, len(slots))
+        for subj in class_teachable_subjects:
+            if subj.is_priority:
+                problem['priority'].add(subj.id)
+            problem['eligible'][(cls.id, subj.id)] = [
+                tid for tid in ctx['subject_teachers'].get(subj.id, [])
+                if not teacher_scoped_classes.get(tid) or cls.id in teacher_scoped_classes[tid]
+            ]
+            if subj.id in assignment_teacher_map:
+                problem['preferred'][(cls.id, subj.id)] = assignment_teacher_map[subj.id]
+    return problem
+
+
+def _greedy_assignments(ctx, rng=random, progress=None):
+    """
+    Per-class greedy scheduler.
+    Priority subjects → scheduled first, 1-2 periods/day across all 5 days.
+    Normal subjects → fill remaining slots, max 2 per day.
+    progress(done, total) is called as each class is started and at the end.
+    """
+    report = progress or (lambda done, total: None)
+    subject_teachers = ctx['subject_teachers']
+    teacher_scoped_classes = ctx['teacher_scoped_classes']
+
+    # ── Global state — prevents teacher double-booking ──
+    teacher_busy = defaultdict(set)
+    assignments = []
+
+    # Shuffle class order for fairness
+    class_order = list(ctx['classes'])
+    rng.shuffle(class_order)
+
+    for position, cls in enumerate(class_order):
+        report(position, len(class_order))
+        day_periods_map = ctx['class_periods'].get(cls.id, {})
         total_slots = sum(len(slots) for slots in day_periods_map.values())
         if total_slots == 0:
             continue
 
-        assignment_rows = class_subject_assignments.get(cls.id, [])
-        assignment_teacher_map = {}
-        class_teachable_subjects = []
-
-        if assignment_rows:
-            for row in assignment_rows:
-                subj = row.subject
-                teacher_ids = subject_teachers.get(subj.id, [])
-                scoped_teacher_ids = [
-                    tid for tid in teacher_ids
-                    if not teacher_scoped_classes.get(tid) or cls.id in teacher_scoped_classes[tid]
-                ]
-                if not scoped_teacher_ids:
-                    continue
-                class_teachable_subjects.append(subj)
-                if row.teacher_id and row.teacher_id in scoped_teacher_ids:
-                    assignment_teacher_map[subj.id] = row.teacher_id
-        else:
-            for subj in teachable:
-                teacher_ids = subject_teachers.get(subj.id, [])
-                if any(
-                    not teacher_scoped_classes.get(tid) or cls.id in teacher_scoped_classes[tid]
-                    for tid in teacher_ids
-                ):
-                    class_teachable_subjects.append(subj)
-
+        class_teachable_subjects, assignment_teacher_map = _class_subjects(cls, ctx)
         if not class_teachable_subjects:
-            logger.warning(
-                "Skipping class %s (%s): no teachers assigned for its allowed form/grade scope.",
-                cls.id,
-                cls.name,
-            )
             continue
 
         priority_subjects = [s for s in class_teachable_subjects if s.is_priority]
         normal_subjects = [s for s in class_teachable_subjects if not s.is_priority]
 
-        # ── Per-class: calculate how many weekly periods each subject gets ──
-        # Priority subjects: 1 period/day = 5/week, or 2/day on some days
-        # if few priority subjects relative to slots
-        n_priority = len(priority_subjects)
-        n_normal = len(normal_subjects)
-
-        # Reserve slots for priority: each priority subject gets ~5 periods/week (1/day)
-        priority_weekly = {}
-        for s in priority_subjects:
-            priority_weekly[s.id] = 5  # 1 per day across 5 days
-
-        # Remaining slots for normal subjects
-        reserved = sum(priority_weekly.values())
-        remaining_slots = max(0, total_slots - reserved)
-        normal_weekly = {}
-        if n_normal > 0 and remaining_slots > 0:
-            per_normal = max(1, min(remaining_slots // n_normal, 5))
-            for s in normal_subjects:
-                normal_weekly[s.id] = per_normal
-
         # Combined weekly budget per subject for this class
-        weekly_budget = {}
-        weekly_budget.update(priority_weekly)
-        weekly_budget.update(normal_weekly)
+        weekly_budget = _weekly_budget(class_teachable_subjects, total_slots)
 
         # ── Per-class trackers ──
         week_count = defaultdict(int)      # subject_id → total periods assigned this week
@@ -313,20 +378,19 @@ def generate_timetable(school=None, academic_year=None, clear_existing=True):
             priority_ids = [s.id for s in priority_subjects
                            if s.id not in todays_queue
                            and week_count[s.id] < weekly_budget.get(s.id, 0)]
-            random.shuffle(priority_ids)
+            rng.shuffle(priority_ids)
             todays_queue.extend(priority_ids)
 
             # Normal subjects
             normal_ids = [s.id for s in normal_subjects
                          if s.id not in todays_queue
                          and week_count[s.id] < weekly_budget.get(s.id, 0)]
-            random.shuffle(normal_ids)
+            rng.shuffle(normal_ids)
             todays_queue.extend(normal_ids)
 
             # ── Fill each slot ──
             for start, end in day_slots:
                 time_key = (day, start)
-                placed = False
 
                 # Try each subject in queue order
                 tried = 0
@@ -347,22 +411,8 @@ def generate_timetable(school=None, academic_year=None, clear_existing=True):
 
                     # Find available teacher
                     preferred_tid = assignment_teacher_map.get(sid)
-                    if preferred_tid:
-                        in_scope = (
-                            not teacher_scoped_classes.get(preferred_tid)
-                            or cls.id in teacher_scoped_classes[preferred_tid]
-                        )
-                        if in_scope and time_key not in teacher_busy[preferred_tid]:
-                            tid = preferred_tid
-                        else:
-                            tid = _find_teacher(
-                                subject_teachers,
-                                sid,
-                                cls.id,
-                                time_key,
-                                teacher_busy,
-                                teacher_scoped_classes,
-                            )
+                    if preferred_tid and time_key not in teacher_busy[preferred_tid]:
+                        tid = preferred_tid
                     else:
                         tid = _find_teacher(
                             subject_teachers,
@@ -371,6 +421,7 @@ def generate_timetable(school=None, academic_year=None, clear_existing=True):
                             time_key,
                             teacher_busy,
                             teacher_scoped_classes,
+                            rng,
                         )
                     if tid is None:
                         # Teacher busy — carry this subject over to next day
@@ -379,25 +430,93 @@ def generate_timetable(school=None, academic_year=None, clear_existing=True):
                         todays_queue.append(todays_queue.pop(0))
                         continue
 
-                    # Find room
-                    room = _find_room(rooms, time_key, room_busy)
-
                     # ── Assign ──
                     teacher_busy[tid].add(time_key)
-                    room_busy[room].add(time_key)
                     week_count[sid] += 1
                     day_count[sid][day] += 1
-                    assignments.append((cls.id, sid, tid, room, day, start, end))
-                    placed = True
+                    assignments.append((cls.id, sid, tid, day, start, end))
 
                     # Rotate subject to back for variety
                     todays_queue.append(todays_queue.pop(0))
                     break
 
-    # ── Write to database ──
-    class_map = {c.id: c for c in classes}
-    teacher_map_db = {t.id: t for t in teachers}
-    timetable_entries = []
+    report(len(class_order), len(class_order))
+    return assignments
+
+
+def plan_timetable(school=None, academic_year=None, mode=None, seed=None, progress=None):
+    """
+    Build a timetable without touching the Timetable table.
+    Returns (success, message, plan); plan carries the assignments, their
+    score and the loaded objects save_timetable() needs.
+    progress(phase, done, total) reports solver restarts or greedy classes
+    and may raise SolverCancelled to stop.
+    """
+    if not school:
+        return False, "School is required for timetable generation", None
+    mode = mode or getattr(settings, 'TIMETABLE_GENERATOR_MODE', 'solver')
+    if mode not in ('greedy', 'solver'):
+        return False, f"Unknown timetable generation mode '{mode}'", None
+
+    ctx, error = _load_school(school, academic_year)
+    if error:
+        return False, error, None
+
+    problem = _build_problem(ctx)
+    report = (lambda done, total: progress('solving', done, total)) if progress else None
+    if mode == 'solver':
+        assignments, score = solve_timetable(problem, seed=seed, progress=report)
+    else:
+        assignments = _greedy_assignments(ctx, random.Random(seed) if seed is not None else random, report)
+        score = score_timetable(problem, assignments)
+
+    return True, f"Planned {len(assignments)} entries", {
+        'mode': mode,
+        'assignments': assignments,
+        'score': score,
+        'demand': problem['demand'],
+        'classes': {c.id: c for c in ctx['classes']},
+        'subjects': ctx['subject_map'],
+        'teachers': {t.id: t for t in ctx['teachers']},
+    }
+
+
+def plan_summary(plan):
+    """Per-class entry and unplaced-period counts, ordered by class name."""
+    placed = defaultdict(lambda: defaultdict(int))
+    for cls_id, subj_id, *_ in plan['assignments']:
+        placed[cls_id][subj_id] += 1
+    summary = []
+    for cls_id, cls in plan['classes'].items():
+        demand = plan['demand'].get(cls_id, {})
+        summary.append({
+            'class_id': cls_id,
+            'class_name': cls.name,
+            'entries': sum(placed[cls_id].values()),
+            'unplaced': sum(max(0, n - placed[cls_id][sid]) for sid, n in demand.items()),
+        })
+    return sorted(summary, key=lambda row: row['class_name'])
+
+
+def save_timetable(plan, school, academic_year=None, clear_existing=True):
+    """Replace the school's timetable with the plan's entries in one transaction."""
+    from django.db import transaction
+
+    rooms = [f"Room {i}" for i in range(1, len(plan['classes']) + 5)]
+    room_busy = defaultdict(set)
+    entries = []
+    for cls_id, subj_id, teach_id, day, start, end in plan['assignments']:
+        room = _find_room(rooms, (day, start), room_busy)
+        room_busy[room].add((day, start))
+        entries.append(Timetable(
+            class_assigned=plan['classes'][cls_id],
+            subject=plan['subjects'][subj_id],
+            teacher=plan['teachers'][teach_id],
+            day_of_week=day,
+            start_time=start,
+            end_time=end,
+            room=room,
+        ))
 
     with transaction.atomic():
         if clear_existing:
@@ -405,21 +524,138 @@ def generate_timetable(school=None, academic_year=None, clear_existing=True):
             if academic_year:
                 delete_qs = delete_qs.filter(class_assigned__academic_year=academic_year)
             delete_qs.delete()
+        entries = Timetable.objects.bulk_create(entries, batch_size=1000)
+
+    # Teachers' class-targeted announcements follow their timetabled classes.
+    invalidate_school_feeds(school.id)
+    invalidate_timetable_index(school.id)
+    timetable_index(school.id)   # rebuild now rather than on the next lookup
+    return entries
 
-        for cls_id, subj_id, teach_id, room, day, start, end in assignments:
-            try:
-                entry = Timetable.objects.create(
-                    class_assigned=class_map[cls_id],
-                    subject=subject_map[subj_id],
-                    teacher=teacher_map_db[teach_id],
-                    day_of_week=day,
-                    start_time=start,
-                    end_time=end,
-                    room=room,
-                )
-                timetable_entries.append(entry)
-            except Exception as e:
-                logger.error("Error creating timetable entry: %s", e, exc_info=True)
-                continue
 
+def generate_timetable(school=None, academic_year=None, clear_existing=True, mode=None, seed=None):
+    """
+    Generate and save timetables for all classes.
+    Returns (success, message, entries).
+    """
+    success, message, plan = plan_timetable(school, academic_year, mode=mode, seed=seed)
+    if not success:
+        return False, message, []
+    timetable_entries = save_timetable(plan, school, academic_year, clear_existing=clear_existing)
+    score = plan['score']
+    logger.info(
+        "Generated %s timetable for school %s: %s entries, %s unplaced periods, %s teacher gaps",
+        plan['mode'], school.id, len(timetable_entries), score['unplaced'], score['teacher_gaps'],
+    )
     return True, f"Successfully generated timetable with {len(timetable_entries)} entries", timetable_entries
+
+
+def queue_timetable_job(school, requested_by, academic_year=None, mode=None, clear_existing=True):
+    """
+    Create a TimetableGenerationJob and hand it to the Celery worker once committed.
+
+    Raises IntegrityError when the school already has a queued or running job
+    (enforced by the one_active_timetable_job_per_school constraint).
+    """
+    from django.db import transaction
+    from .tasks import generate_timetable_task
+
+    with transaction.atomic():
+        job = TimetableGenerationJob.objects.create(
+            school=school,
+            requested_by=requested_by,
+            academic_year=academic_year or '',
+            mode=mode or '',
+            clear_existing=clear_existing,
+            heartbeat_at=timezone.now(),
+        )
+    transaction.on_commit(lambda: generate_timetable_task.delay(job.id))
+    return job
+
+
+def _stale_jobs(queryset):
+    """Queued/running jobs that have not reported progress within TIMETABLE_JOB_STALE_SECONDS."""
+    cutoff = timezone.now() - timedelta(seconds=settings.TIMETABLE_JOB_STALE_SECONDS)
+    return queryset.filter(status__in=['queued', 'running']).filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, created_at__lt=cutoff)
+    )
+
+
+def active_timetable_job(school):
+    """
+    The school's queued or running job, if any. Jobs whose worker stopped
+    reporting (lost enqueue, hard time limit, OOM kill) are marked failed
+    first so they no longer block new generation.
+    """
+    jobs = TimetableGenerationJob.objects.filter(school=school)
+    expired = _stale_jobs(jobs).update(
+        status='failed',
+        errors=[{'error': 'Job stopped reporting progress and was abandoned'}],
+        completed_at=timezone.now(),
+    )
+    if expired:
+        logger.warning("Marked %s stale timetable job(s) for school %s as failed", expired, school.id)
+    return jobs.filter(status__in=['queued', 'running']).first()
+
+
+def cancel_timetable_job(job):
+    """
+    Cancel a queued or stale job outright, or flag a running one to stop at
+    its next progress update. Returns False if the job had already finished.
+    """
+    jobs = TimetableGenerationJob.objects.filter(id=job.id)
+    now = timezone.now()
+    if jobs.filter(status='queued').update(status='cancelled', cancel_requested=True, completed_at=now):
+        return True
+    if _stale_jobs(jobs).update(status='cancelled', cancel_requested=True, completed_at=now):
+        return True
+    return bool(jobs.filter(status='running').update(cancel_requested=True))
+
+
+def run_timetable_job(job):
+    """Plan and save the job's timetable, recording progress, cancellation and a per-class summary."""
+    jobs = TimetableGenerationJob.objects.filter(id=job.id)
+    started = timezone.now()
+    if not jobs.filter(status='queued').update(status='running', phase='loading', started_at=started, heartbeat_at=started):
+        return job
+
+    def progress(phase, done, total):
+        # One UPDATE per tick doubles as the cancellation check and the heartbeat.
+        if not jobs.filter(cancel_requested=False).update(
+            phase=phase, progress_done=done, progress_total=total, heartbeat_at=timezone.now(),
+        ):
+            raise SolverCancelled()
+
+    school = job.school
+    academic_year = job.academic_year or None
+    try:
+        success, message, plan = plan_timetable(school, academic_year, mode=job.mode or None, progress=progress)
+        if not success:
+            jobs.update(status='failed', errors=[{'error': message}], completed_at=timezone.now())
+            job.refresh_from_db()
+            return job
+        summary = plan_summary(plan)
+        progress('saving', 0, len(summary))
+        entries = save_timetable(plan, school, academic_year, clear_existing=job.clear_existing)
+    except SolverCancelled:
+        jobs.update(status='cancelled', completed_at=timezone.now())
+        logger.info("Timetable job %s for school %s cancelled", job.id, school.id)
+        job.refresh_from_db()
+        return job
+
+    jobs.update(
+        status='done',
+        mode=plan['mode'],
+        progress_done=len(summary),
+        progress_total=len(summary),
+        entries_count=len(entries),
+        score=plan['score'],
+        summary=summary,
+        completed_at=timezone.now(),
+    )
+    logger.info(
+        "Timetable job %s for school %s: %s entries, %s unplaced periods",
+        job.id, school.id, len(entries), plan['score']['unplaced'],
+    )
+    job.refresh_from_db()
+    return job
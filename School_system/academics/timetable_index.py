@@ -0,0 +1,206 @@
+"""
+Per-school timetable index for clash checks and teacher/class membership.
+
+Messaging, announcement feeds and teacher authorization each re-queried
+Timetable to work out which classes a teacher teaches (or which teachers a
+class has), and the conflict check compared every pair of entries on a day.
+One query now loads a school's timetable into a TimetableIndex:
+
+    index = timetable_index(school_id)
+    index.classes_for_teacher(teacher_id)               # {class_id, ...}
+    index.classes_for_teacher(teacher_id, subject_id)
+    index.subjects_for(teacher_id, class_id)
+    index.subjects_for_class(class_id)
+    index.teachers_for_classes(class_ids)
+    index.teacher_busy(teacher_id, 'Monday', start, end)
+    index.conflicts()                                   # overlapping entry pairs
+
+Each day's distinct start/end times split it into elementary intervals; an
+entry is a bitmask over them, and teacher x day, class x day and room x day
+masks are the OR of their entries. Two lessons overlap exactly when their
+masks share a bit, so a clash check is one AND.
+
+The index is cached under a per-school version. Timetable post_save and
+post_delete signals (cascades included), class saves and deletes and
+generated timetables call invalidate_timetable_index();
+TIMETABLE_INDEX_CACHE_SECONDS bounds staleness from anything else.
+"""
+
+import bisect
+import logging
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+def _seconds(value):
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+class TimetableIndex:
+    """Bitmap and set views over one school's timetable rows."""
+
+    def __init__(self, rows):
+        """rows: (id, teacher_id, class_id, subject_id, day, start_time, end_time, room) tuples."""
+        rows = [
+            (pk, teacher_id, class_id, subject_id, day, _seconds(start), _seconds(end), (room or '').strip().lower())
+            for pk, teacher_id, class_id, subject_id, day, start, end, room in rows
+        ]
+        bounds = defaultdict(set)
+        for _, _, _, _, day, start, end, _ in rows:
+            bounds[day].update((start, end))
+        self.bounds = {day: sorted(points) for day, points in bounds.items()}
+
+        self.entries = {}
+        self.teacher_slots = defaultdict(int)      # (teacher_id, day) -> mask
+        self.class_slots = defaultdict(int)        # (class_id, day) -> mask
+        self.room_slots = defaultdict(int)         # (room, day) -> mask
+        self.teacher_classes = defaultdict(set)
+        self.teacher_subject_classes = defaultdict(set)
+        self.teacher_class_subjects = defaultdict(set)
+        self.class_teachers = defaultdict(set)
+        self.class_subjects = defaultdict(set)
+        for pk, teacher_id, class_id, subject_id, day, start, end, room in rows:
+            mask = self.slot_mask(day, start, end)
+            self.entries[pk] = (teacher_id, class_id, subject_id, day, start, end, room, mask)
+            self.teacher_slots[(teacher_id, day)] |= mask
+            self.class_slots[(class_id, day)] |= mask
+            if room:
+                self.room_slots[(room, day)] |= mask
+            self.teacher_classes[teacher_id].add(class_id)
+            self.teacher_subject_classes[(teacher_id, subject_id)].add(class_id)
+            self.teacher_class_subjects[(teacher_id, class_id)].add(subject_id)
+            self.class_teachers[class_id].add(teacher_id)
+            self.class_subjects[class_id].add(subject_id)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def slot_mask(self, day, start, end):
+        """Bits of the day's elementary intervals that [start, end) overlaps."""
+        if not isinstance(start, int):
+            start, end = _seconds(start), _seconds(end)
+        points = self.bounds.get(day, [])
+        first = max(bisect.bisect_right(points, start) - 1, 0)
+        last = bisect.bisect_left(points, end)
+        mask = 0
+        for i in range(first, min(last, len(points) - 1)):
+            if points[i] < end and start < points[i + 1]:
+                mask |= 1 << i
+        return mask
+
+    def teacher_busy(self, teacher_id, day, start, end):
+        return bool(self.teacher_slots.get((teacher_id, day), 0) & self.slot_mask(day, start, end))
+
+    def class_busy(self, class_id, day, start, end):
+        return bool(self.class_slots.get((class_id, day), 0) & self.slot_mask(day, start, end))
+
+    def classes_for_teacher(self, teacher_id, subject_id=None):
+        if subject_id is None:
+            return set(self.teacher_classes.get(teacher_id, ()))
+        return set(self.teacher_subject_classes.get((teacher_id, int(subject_id)), ()))
+
+    def teaches(self, teacher_id, class_id, subject_id=None):
+        if subject_id is None:
+            return int(class_id) in self.teacher_classes.get(teacher_id, ())
+        return int(subject_id) in self.teacher_class_subjects.get((teacher_id, int(class_id)), ())
+
+    def teaches_subject(self, teacher_id, subject_id):
+        return bool(self.teacher_subject_classes.get((teacher_id, int(subject_id))))
+
+    def subjects_for(self, teacher_id, class_id):
+        return set(self.teacher_class_subjects.get((teacher_id, int(class_id)), ()))
+
+    def subjects_for_class(self, class_id):
+        return set(self.class_subjects.get(class_id, ()))
+
+    def teachers_for_classes(self, class_ids):
+        teachers = set()
+        for class_id in class_ids:
+            teachers |= self.class_teachers.get(class_id, set())
+        return teachers
+
+    def conflicts(self):
+        """
+        Overlapping entry pairs as (type, day, entry_id_1, entry_id_2), type being
+        'teacher', 'room' or 'class', ordered by day and start time.
+        """
+        groups = defaultdict(list)
+        for pk, (teacher_id, class_id, _, day, start, _, room, mask) in self.entries.items():
+            groups[('teacher', teacher_id, day)].append((start, pk, mask))
+            groups[('class', class_id, day)].append((start, pk, mask))
+            if room:
+                groups[('room', room, day)].append((start, pk, mask))
+
+        found = []
+        for (kind, _, day), members in groups.items():
+            if len(members) < 2:
+                continue
+            members.sort()
+            seen = 0
+            for i, (start, pk, mask) in enumerate(members):
+                if seen & mask:
+                    # Only now pay for the pairwise scan, against earlier members.
+                    for _, other_pk, other_mask in members[:i]:
+                        if other_mask & mask:
+                            found.append((day, start, kind, other_pk, pk))
+                seen |= mask
+        found.sort(key=lambda row: (row[0], row[1], row[3], row[4]))
+        return [(kind, day, a, b) for day, _, kind, a, b in found]
+
+
+def build_timetable_index(school_id):
+    """Load a school's timetable into a TimetableIndex (one query)."""
+    from .models import Timetable
+
+    if not school_id:
+        return TimetableIndex([])
+    return TimetableIndex(
+        Timetable.objects.filter(class_assigned__school_id=school_id).values_list(
+            'id', 'teacher_id', 'class_assigned_id', 'subject_id',
+            'day_of_week', 'start_time', 'end_time', 'room',
+        )
+    )
+
+
+def _version_key(school_id):
+    return f'timetable_index_version:{school_id}'
+
+
+def _index_key(school_id, version):
+    return f'timetable_index:{school_id}:{version}'
+
+
+def invalidate_timetable_index(school_id):
+    """Expire the cached index for a school."""
+    if not school_id:
+        return
+    try:
+        cache.set(_version_key(school_id), time.time_ns(), None)
+    except Exception as exc:
+        logger.warning("Timetable index version bump failed for school %s: %s", school_id, exc)
+
+
+def timetable_index(school_id):
+    """The school's cached TimetableIndex, built on a miss."""
+    ttl = int(getattr(settings, 'TIMETABLE_INDEX_CACHE_SECONDS', 3600) or 0)
+    if not ttl or not school_id:
+        return build_timetable_index(school_id)
+    try:
+        version = cache.get(_version_key(school_id), 0)
+        index = cache.get(_index_key(school_id, version))
+    except Exception as exc:
+        logger.warning("Timetable index cache read failed for school %s: %s", school_id, exc)
+        version, index = None, None
+    if index is None:
+        index = build_timetable_index(school_id)
+        if version is not None:
+            try:
+                cache.set(_index_key(school_id, version), index, ttl)
+            except Exception as exc:
+                logger.warning("Timetable index cache write failed for school %s: %s", school_id, exc)
+    return index
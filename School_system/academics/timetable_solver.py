@@ -0,0 +1,413 @@
+"""
+Constraint-based timetable solver.
+
+timetable_generator.plan_timetable() loads a school into a plain `problem`
+dict and calls solve_timetable(), which runs TIMETABLE_SOLVER_RESTARTS
+randomized restarts (across a process pool when TIMETABLE_SOLVER_PROCESSES > 1)
+and keeps the best-scoring timetable. Each restart:
+
+    1. builds a timetable greedily: priority subjects first, a teacher is never
+       double-booked, at most MAX_PER_DAY periods of a subject per class per day
+    2. improves it with simulated annealing over fill / move / swap / replace /
+       change-teacher moves; a move that breaks a hard constraint is rejected
+
+Timetables are scored by score_timetable() (lower is better):
+
+    unplaced periods          x UNPLACED_WEIGHT   weekly demand left unscheduled
+    same-subject clustering   x CLUSTER_WEIGHT    extra periods of a subject on one day
+    teacher gaps              x GAP_WEIGHT        idle periods between a teacher's lessons
+
+Problem shape (plain data so restarts can run in forked workers):
+
+    {
+        'slots':    {class_id: [(day, start, end), ...]},
+        'demand':   {class_id: {subject_id: weekly_periods}},
+        'eligible':  {(class_id, subject_id): [teacher_id, ...]},
+        'preferred': {(class_id, subject_id): teacher_id},    # ClassSubjectAssignment.teacher
+        'priority':  {subject_id, ...},
+    }
+
+Assignments are (class_id, subject_id, teacher_id, day, start, end) tuples.
+Teachers clash when two lessons share a (day, start) time key, as in the
+greedy scheduler.
+"""
+
+import logging
+import math
+import random
+from collections import defaultdict
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_PER_DAY = 2
+UNPLACED_WEIGHT = 100
+CLUSTER_WEIGHT = 3
+GAP_WEIGHT = 1
+
+START_TEMPERATURE = 2.0
+END_TEMPERATURE = 0.02
+
+
+def _day_positions(problem):
+    """{day: {start: position}} over the union of every class's start times."""
+    starts = defaultdict(set)
+    for slots in problem['slots'].values():
+        for day, start, _ in slots:
+            starts[day].add(start)
+    return {day: {start: i for i, start in enumerate(sorted(values))} for day, values in starts.items()}
+
+
+def _gap_count(positions):
+    if len(positions) < 2:
+        return 0
+    return max(positions) - min(positions) + 1 - len(positions)
+
+
+def score_timetable(problem, assignments):
+    """Score a list of assignments: {'unplaced', 'clustering', 'teacher_gaps', 'total'}."""
+    placed = defaultdict(int)
+    per_day = defaultdict(int)
+    teacher_day = defaultdict(list)
+    grid = _day_positions(problem)
+    for cid, sid, tid, day, start, _ in assignments:
+        placed[(cid, sid)] += 1
+        per_day[(cid, day, sid)] += 1
+        teacher_day[(tid, day)].append(grid[day][start])
+
+    unplaced = sum(
+        max(0, n - placed[(cid, sid)])
+        for cid, demand in problem['demand'].items()
+        for sid, n in demand.items()
+    )
+    clustering = sum(n - 1 for n in per_day.values() if n > 1)
+    gaps = sum(_gap_count(positions) for positions in teacher_day.values())
+    return {
+        'unplaced': unplaced,
+        'clustering': clustering,
+        'teacher_gaps': gaps,
+        'total': unplaced * UNPLACED_WEIGHT + clustering * CLUSTER_WEIGHT + gaps * GAP_WEIGHT,
+    }
+
+
+class _State:
+    """Mutable timetable with the indexes needed for O(1) constraint checks and local scoring."""
+
+    def __init__(self, problem, rng):
+        """Initialize instance state."""
+        self.problem = problem
+        self.rng = rng
+        self.slots = problem['slots']
+        self.demand = problem['demand']
+        self.eligible = problem['eligible']
+        self.preferred = problem.get('preferred', {})
+        self.positions = _day_positions(problem)
+        self.class_ids = [cid for cid in self.slots if self.slots[cid] and self.demand.get(cid)]
+        self.grid = {cid: [None] * len(self.slots[cid]) for cid in self.class_ids}
+        self.busy = defaultdict(dict)          # teacher_id -> {(day, start): (class_id, index)}
+        self.day_count = defaultdict(int)      # (class_id, day, subject_id) -> periods
+        self.remaining = {cid: dict(self.demand[cid]) for cid in self.class_ids}
+        self.unplaced = sum(sum(d.values()) for d in self.remaining.values())
+
+    # ── Mutation ──
+
+    def place(self, cid, idx, sid, tid):
+        day, start, _ = self.slots[cid][idx]
+        self.grid[cid][idx] = (sid, tid)
+        self.busy[tid][(day, start)] = (cid, idx)
+        self.day_count[(cid, day, sid)] += 1
+        self.remaining[cid][sid] -= 1
+        self.unplaced -= 1
+
+    def remove(self, cid, idx):
+        sid, tid = self.grid[cid][idx]
+        day, start, _ = self.slots[cid][idx]
+        self.grid[cid][idx] = None
+        del self.busy[tid][(day, start)]
+        self.day_count[(cid, day, sid)] -= 1
+        self.remaining[cid][sid] += 1
+        self.unplaced += 1
+        return sid, tid
+
+    # ── Constraints ──
+
+    def allowed(self, cid, idx, sid, tid):
+        day, start, _ = self.slots[cid][idx]
+        return (
+            self.grid[cid][idx] is None
+            and self.day_count[(cid, day, sid)] < MAX_PER_DAY
+            and (day, start) not in self.busy[tid]
+        )
+
+    def free_teacher(self, cid, idx, sid, exclude=None):
+        """A free eligible teacher for this slot: the preferred one if free, else a random one."""
+        day, start, _ = self.slots[cid][idx]
+        preferred = self.preferred.get((cid, sid))
+        if preferred is not None and preferred != exclude and (day, start) not in self.busy[preferred]:
+            return preferred
+        free = [
+            tid for tid in self.eligible.get((cid, sid), [])
+            if tid != exclude and (day, start) not in self.busy[tid]
+        ]
+        return self.rng.choice(free) if free else None
+
+    # ── Local cost ──
+
+    def cluster_cost(self, cid, day):
+        return sum(
+            self.day_count[(cid, day, sid)] - 1
+            for sid in self.demand[cid]
+            if self.day_count[(cid, day, sid)] > 1
+        )
+
+    def gap_cost(self, tid, day):
+        grid = self.positions[day]
+        return _gap_count([grid[start] for d, start in self.busy[tid] if d == day])
+
+    def local_cost(self, class_days, teacher_days):
+        return (
+            self.unplaced * UNPLACED_WEIGHT
+            + CLUSTER_WEIGHT * sum(self.cluster_cost(cid, day) for cid, day in class_days)
+            + GAP_WEIGHT * sum(self.gap_cost(tid, day) for tid, day in teacher_days)
+        )
+
+    # ── Construction ──
+
+    def construct(self):
+        priority = self.problem['priority']
+        order = list(self.class_ids)
+        self.rng.shuffle(order)
+        for cid in order:
+            for idx, (day, _, _) in enumerate(self.slots[cid]):
+                candidates = [
+                    sid for sid, left in self.remaining[cid].items()
+                    if left > 0 and self.day_count[(cid, day, sid)] < MAX_PER_DAY
+                ]
+                candidates.sort(key=lambda sid: (
+                    not (sid in priority and self.day_count[(cid, day, sid)] == 0),
+                    self.day_count[(cid, day, sid)],
+                    -self.remaining[cid][sid],
+                    self.rng.random(),
+                ))
+                for sid in candidates:
+                    tid = self.free_teacher(cid, idx, sid)
+                    if tid is not None:
+                        self.place(cid, idx, sid, tid)
+                        break
+
+    def assignments(self):
+        rows = []
+        for cid in self.class_ids:
+            for idx, cell in enumerate(self.grid[cid]):
+                if cell is not None:
+                    day, start, end = self.slots[cid][idx]
+                    rows.append((cid, cell[0], cell[1], day, start, end))
+        return rows
+
+    # ── Local search ──
+
+    def _random_cell(self, cid, filled):
+        cells = [i for i, cell in enumerate(self.grid[cid]) if (cell is not None) == filled]
+        return self.rng.choice(cells) if cells else None
+
+    def propose(self):
+        """
+        Apply one random move. Returns (undo, class_days, teacher_days, before)
+        or None if no valid move was found; `before` is the local cost prior to
+        the move, and undo() restores the previous state.
+        """
+        cid = self.rng.choice(self.class_ids)
+        kind = self.rng.random()
+        slots = self.slots[cid]
+
+        if kind < 0.2 and any(left > 0 for left in self.remaining[cid].values()):
+            # Fill: schedule an unplaced period in an empty slot.
+            idx = self._random_cell(cid, filled=False)
+            if idx is None:
+                return None
+            sid = self.rng.choice([s for s, left in self.remaining[cid].items() if left > 0])
+            tid = self.free_teacher(cid, idx, sid)
+            if tid is None or not self.allowed(cid, idx, sid, tid):
+                return None
+            day = slots[idx][0]
+            affected = ({(cid, day)}, {(tid, day)})
+            before = self.local_cost(*affected)
+            self.place(cid, idx, sid, tid)
+            return (lambda: self.remove(cid, idx)), affected[0], affected[1], before
+
+        i = self._random_cell(cid, filled=True)
+        if i is None:
+            return None
+        sid, tid = self.grid[cid][i]
+        day_i = slots[i][0]
+
+        if kind < 0.45:
+            # Move: shift a lesson to an empty slot of the same class.
+            j = self._random_cell(cid, filled=False)
+            if j is None:
+                return None
+            day_j = slots[j][0]
+            affected = ({(cid, day_i), (cid, day_j)}, {(tid, day_i), (tid, day_j)})
+            before = self.local_cost(*affected)
+            self.remove(cid, i)
+            if not self.allowed(cid, j, sid, tid):
+                self.place(cid, i, sid, tid)
+                return None
+            self.place(cid, j, sid, tid)
+
+            def undo():
+                self.remove(cid, j)
+                self.place(cid, i, sid, tid)
+            return undo, affected[0], affected[1], before
+
+        if kind < 0.7:
+            # Swap: exchange two lessons of the same class, keeping their teachers.
+            j = self._random_cell(cid, filled=True)
+            if j is None or j == i:
+                return None
+            sid_j, tid_j = self.grid[cid][j]
+            day_j = slots[j][0]
+            affected = (
+                {(cid, day_i), (cid, day_j)},
+                {(tid, day_i), (tid, day_j), (tid_j, day_i), (tid_j, day_j)},
+            )
+            before = self.local_cost(*affected)
+            self.remove(cid, i)
+            self.remove(cid, j)
+            if self.allowed(cid, j, sid, tid):
+                self.place(cid, j, sid, tid)
+                if self.allowed(cid, i, sid_j, tid_j):
+                    self.place(cid, i, sid_j, tid_j)
+
+                    def undo():
+                        self.remove(cid, i)
+                        self.remove(cid, j)
+                        self.place(cid, i, sid, tid)
+                        self.place(cid, j, sid_j, tid_j)
+                    return undo, affected[0], affected[1], before
+                self.remove(cid, j)
+            self.place(cid, i, sid, tid)
+            self.place(cid, j, sid_j, tid_j)
+            return None
+
+        if kind < 0.85:
+            # Replace: give the slot to a subject that still has unplaced periods.
+            wanting = [s for s, left in self.remaining[cid].items() if left > 0 and s != sid]
+            if not wanting:
+                return None
+            new_sid = self.rng.choice(wanting)
+            affected_before = ({(cid, day_i)}, {(tid, day_i)})
+            self.remove(cid, i)
+            new_tid = self.free_teacher(cid, i, new_sid)
+            if new_tid is None or not self.allowed(cid, i, new_sid, new_tid):
+                self.place(cid, i, sid, tid)
+                return None
+            self.place(cid, i, sid, tid)
+            affected = (affected_before[0], affected_before[1] | {(new_tid, day_i)})
+            before = self.local_cost(*affected)
+            self.remove(cid, i)
+            self.place(cid, i, new_sid, new_tid)
+
+            def undo():
+                self.remove(cid, i)
+                self.place(cid, i, sid, tid)
+            return undo, affected[0], affected[1], before
+
+        # Change teacher: hand the lesson to another eligible teacher who is free.
+        new_tid = self.free_teacher(cid, i, sid, exclude=tid)
+        if new_tid is None:
+            return None
+        affected = ({(cid, day_i)}, {(tid, day_i), (new_tid, day_i)})
+        before = self.local_cost(*affected)
+        self.remove(cid, i)
+        self.place(cid, i, sid, new_tid)
+
+        def undo():
+            self.remove(cid, i)
+            self.place(cid, i, sid, tid)
+        return undo, affected[0], affected[1], before
+
+    def anneal(self, iterations):
+        if not self.class_ids or iterations <= 0:
+            return
+        temperature = START_TEMPERATURE
+        cooling = (END_TEMPERATURE / START_TEMPERATURE) ** (1.0 / iterations)
+        for _ in range(iterations):
+            temperature *= cooling
+            move = self.propose()
+            if move is None:
+                continue
+            undo, class_days, teacher_days, before = move
+            delta = self.local_cost(class_days, teacher_days) - before
+            if delta > 0 and self.rng.random() >= math.exp(-delta / temperature):
+                undo()
+
+
+def _run_restart(job):
+    """Construct and anneal one randomized timetable. Module-level so it can run in a process pool."""
+    problem, seed, iterations = job
+    state = _State(problem, random.Random(seed))
+    state.construct()
+    state.anneal(iterations)
+    assignments = state.assignments()
+    return seed, score_timetable(problem, assignments), assignments
+
+
+class SolverCancelled(Exception):
+    """Raised from a progress callback to stop the solver between restarts."""
+
+
+def _run_jobs(jobs, processes, progress=None):
+    report = progress or (lambda done, total: None)
+    if processes > 1 and len(jobs) > 1:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        from django.db import connections
+        try:
+            # Forked children must not share the parent's DB socket.
+            connections.close_all()
+            pool = ProcessPoolExecutor(
+                max_workers=min(processes, len(jobs)), mp_context=multiprocessing.get_context('fork'),
+            )
+            try:
+                futures = [pool.submit(_run_restart, job) for job in jobs]
+                results = []
+                for future in as_completed(futures):
+                    results.append(future.result())
+                    report(len(results), len(jobs))
+                return results
+            finally:
+                # On cancellation, don't wait for restarts still in flight.
+                pool.shutdown(wait=False, cancel_futures=True)
+        except SolverCancelled:
+            raise
+        except Exception as exc:
+            logger.warning("Timetable solver process pool unavailable (%s); solving in-process", exc)
+    results = []
+    for job in jobs:
+        results.append(_run_restart(job))
+        report(len(results), len(jobs))
+    return results
+
+
+def solve_timetable(problem, restarts=None, processes=None, iterations=None, seed=None, progress=None):
+    """
+    Run randomized restarts and return (assignments, score) for the best one.
+    Settings supply defaults for restarts, processes and annealing iterations.
+    progress(done, total) is called as each restart finishes and may raise
+    SolverCancelled to abandon the run.
+    """
+    restarts = max(1, int(restarts or getattr(settings, 'TIMETABLE_SOLVER_RESTARTS', 8)))
+    processes = max(1, int(processes or getattr(settings, 'TIMETABLE_SOLVER_PROCESSES', 1)))
+    if iterations is None:
+        iterations = int(getattr(settings, 'TIMETABLE_SOLVER_ITERATIONS', 20000))
+    base_seed = seed if seed is not None else random.randrange(1 << 30)
+
+    results = _run_jobs([(problem, base_seed + i, iterations) for i in range(restarts)], processes, progress)
+    best_seed, best_score, best = min(results, key=lambda r: (r[1]['total'], r[0]))
+    logger.info(
+        "Timetable solver: best of %s restarts (seed %s) scored %s",
+        restarts, best_seed, best_score,
+    )
+    return best, best_score
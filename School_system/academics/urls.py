@@ -39,6 +39,9 @@ urlpatterns = [
     # Timetable endpoints
     path('timetables/', views.TimetableListView.as_view(), name='timetable-list'),
     path('timetables/generate/', views.generate_timetable_view, name='timetable-generate'),
+    path('timetables/jobs/', views.timetable_jobs, name='timetable-jobs'),
+    path('timetables/jobs/<int:job_id>/', views.timetable_job_detail, name='timetable-job-detail'),
+    path('timetables/jobs/<int:job_id>/cancel/', views.cancel_timetable_job_view, name='timetable-job-cancel'),
     path('timetables/stats/', views.get_timetable_stats, name='timetable-stats'),
     path('timetables/conflicts/', views.timetable_conflict_check, name='timetable-conflicts'),
     
@@ -46,6 +49,7 @@ urlpatterns = [
     path('announcements/', views.AnnouncementListCreateView.as_view(), name='announcement-list-create'),
     path('announcements/dismiss-all/', views.dismiss_all_announcements, name='announcement-dismiss-all'),
     path('announcements/<int:pk>/dismiss/', views.dismiss_announcement, name='announcement-dismiss'),
+    path('announcements/<int:pk>/email-delivery/', views.announcement_email_delivery, name='announcement-email-delivery'),
     path('announcements/<int:pk>/', views.AnnouncementDetailView.as_view(), name='announcement-detail'),
     
     # Complaint endpoints
@@ -68,6 +72,9 @@ urlpatterns = [
     path('reports/publish/', views.publish_reports, name='publish-reports'),
     path('reports/publish-all/', views.publish_all_reports, name='publish-all-reports'),
     path('reports/published/', views.list_published_reports, name='list-published-reports'),
+    path('reports/batches/', views.report_card_batches, name='report-card-batches'),
+    path('reports/batches/<int:batch_id>/', views.report_card_batch_detail, name='report-card-batch-detail'),
+    path('reports/batches/<int:batch_id>/bundle/', views.download_report_card_bundle, name='report-card-batch-bundle'),
     path('reports/approval-requests/', views.list_report_approval_requests, name='list-report-approval-requests'),
     path('reports/delivery-exclusions/', views.set_report_delivery_exclusion, name='set-report-delivery-exclusion'),
     path('reports/approval-requests/<int:request_id>/review/', views.review_report_approval_request, name='review-report-approval-request'),
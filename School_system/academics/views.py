@@ -8,24 +8,27 @@ import string
 import os
 from decimal import Decimal
 
+from django.db import IntegrityError, transaction
 from django.db.models import Avg, Count, Q, Prefetch
 from django.utils import timezone
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.response import Response
-import requests
 
 logger = logging.getLogger(__name__)
 
 from email_service import (
     send_result_entered_email,
-    send_announcement_email,
     send_parent_link_approved_email,
     get_parents_of_student,
     send_bulk_welcome_teacher,
     send_bulk_welcome_parent,
+    send_concurrently,
 )
+from School_system.outbound_http import outbound
+from School_system.pagination import KeysetPagination
+from School_system.serializer_prefetch import PrefetchPlanViewMixin
 from .models import (
     Subject, Class, Student, Teacher, Parent, Result, 
     Timetable, Announcement, AnnouncementDismissal, Complaint, Suspension,
@@ -40,6 +43,16 @@ from .serializers import (
     TransferredStudentSerializer,
 )
 from .utils import MAX_PARENTS_PER_CHILD, check_rate_limit, log_school_audit
+from .class_rankings import (
+    refresh_rankings_for_result, invalidate_class_rankings, invalidate_school_rankings,
+)
+from .prediction_cache import invalidate_student_predictions, invalidate_school_predictions
+from .dashboard_summary import invalidate_student_summaries, invalidate_school_summaries
+from .at_risk_alerts import queue_at_risk_evaluation
+from .attendance_rollups import refresh_attendance_rollups, refresh_rollups_for_records
+from .announcement_emails import announcement_targets_parents, queue_announcement_emails
+from .announcement_feed import announcement_feed, announcement_feed_queryset, invalidate_user_feed
+from .timetable_index import timetable_index
 from users.models import SchoolSettings
 
 
@@ -201,7 +214,7 @@ def _delegate_bulk_import_to_go_workers(import_type, mapped_rows, user, selected
         "X-User-Role": str(user.role or ""),
         "X-User-School-ID": str(user.school_id or ""),
     }
-    resp = requests.post(
+    resp = outbound.post(
         f"{workers_base}{endpoint_map[import_type]}",
         files=files,
         data=form_data,
@@ -440,7 +453,7 @@ def _should_apply_row_for_strategy(strategy, exists, row_idx, label, errors):
 
 
 # Subject Views
-class SubjectListCreateView(generics.ListCreateAPIView):
+class SubjectListCreateView(PrefetchPlanViewMixin, generics.ListCreateAPIView):
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -451,7 +464,6 @@ class SubjectListCreateView(generics.ListCreateAPIView):
             return (
                 Subject.objects
                 .filter(school=user.school)
-                .prefetch_related('teachers__user')
                 .order_by('name', 'id')
             )
         return Subject.objects.none()
@@ -460,7 +472,7 @@ class SubjectListCreateView(generics.ListCreateAPIView):
         serializer.save(school=self.request.user.school)
 
 
-class SubjectDetailView(generics.RetrieveUpdateDestroyAPIView):
+class SubjectDetailView(PrefetchPlanViewMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -471,14 +483,13 @@ class SubjectDetailView(generics.RetrieveUpdateDestroyAPIView):
             return (
                 Subject.objects
                 .filter(school=user.school)
-                .prefetch_related('teachers__user')
                 .order_by('name', 'id')
             )
         return Subject.objects.none()
 
 
 # Class Views
-class ClassListCreateView(generics.ListCreateAPIView):
+class ClassListCreateView(PrefetchPlanViewMixin, generics.ListCreateAPIView):
     queryset = Class.objects.all()
     serializer_class = ClassSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -486,7 +497,7 @@ class ClassListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         user = self.request.user
         if user.school:
-            queryset = Class.objects.filter(school=user.school).select_related('class_teacher').annotate(
+            queryset = Class.objects.filter(school=user.school).annotate(
                 _student_count=Count('students', distinct=True)
             )
         else:
@@ -502,7 +513,7 @@ class ClassListCreateView(generics.ListCreateAPIView):
         serializer.save(school=self.request.user.school)
 
 
-class ClassDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ClassDetailView(PrefetchPlanViewMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Class.objects.all()
     serializer_class = ClassSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -513,7 +524,6 @@ class ClassDetailView(generics.RetrieveUpdateDestroyAPIView):
             return (
                 Class.objects
                 .filter(school=user.school)
-                .select_related('class_teacher')
                 .annotate(_student_count=Count('students', distinct=True))
                 .order_by('grade_level', 'name', 'id')
             )
@@ -521,9 +531,11 @@ class ClassDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Student Views
-class StudentListView(generics.ListCreateAPIView):
+class StudentListView(PrefetchPlanViewMixin, generics.ListCreateAPIView):
     queryset = Student.objects.all()
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-id',)
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -533,9 +545,7 @@ class StudentListView(generics.ListCreateAPIView):
     def get_queryset(self):
         user = self.request.user
         if user.school:
-            queryset = Student.objects.filter(user__school=user.school).select_related(
-                'user', 'student_class'
-            ).prefetch_related('parents__user')
+            queryset = Student.objects.filter(user__school=user.school)
         else:
             queryset = Student.objects.none()
 
@@ -578,7 +588,7 @@ class StudentListView(generics.ListCreateAPIView):
         return Response(payload, status=status.HTTP_201_CREATED)
 
 
-class StudentDetailView(generics.RetrieveUpdateDestroyAPIView):
+class StudentDetailView(PrefetchPlanViewMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Student.objects.all()
     permission_classes = [permissions.IsAuthenticated]
 
@@ -590,22 +600,27 @@ class StudentDetailView(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         user = self.request.user
         if user.school:
-            return Student.objects.filter(user__school=user.school).select_related(
-                'user', 'student_class'
-            ).prefetch_related('parents__user')
+            return Student.objects.filter(user__school=user.school)
         return Student.objects.none()
 
     def perform_update(self, serializer):
         if self.request.user.role not in ('admin', 'hr', 'superadmin'):
             from rest_framework.exceptions import PermissionDenied
             raise PermissionDenied('Only admin/HR can edit students.')
-        serializer.save()
+        previous_class_id = serializer.instance.student_class_id
+        student = serializer.save()
+        invalidate_class_rankings([previous_class_id, student.student_class_id])
 
     def destroy(self, request, *args, **kwargs):
         if request.user.role not in ('admin', 'hr', 'superadmin'):
             return Response({'error': 'Only admin/HR can delete students.'}, status=status.HTTP_403_FORBIDDEN)
         return super().destroy(request, *args, **kwargs)
 
+    def perform_destroy(self, instance):
+        class_id = instance.student_class_id
+        instance.delete()
+        invalidate_class_rankings([class_id])
+
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
@@ -623,6 +638,7 @@ def transfer_student(request, pk):
     student.transferred_by = request.user
     student.transfer_note = note
     student.save(update_fields=['is_transferred', 'transferred_at', 'transferred_by', 'transfer_note'])
+    invalidate_class_rankings([student.student_class_id])
     return Response({'message': 'Student transferred successfully.'}, status=status.HTTP_200_OK)
 
 
@@ -640,8 +656,8 @@ def past_students_search(request):
         Q(user__student_number__icontains=q) |
         Q(user__first_name__icontains=q) |
         Q(user__last_name__icontains=q)
-    ).select_related('user', 'student_class', 'transferred_by')
-    serializer = TransferredStudentSerializer(queryset, many=True)
+    )
+    serializer = TransferredStudentSerializer(TransferredStudentSerializer.setup_queryset(queryset), many=True)
     return Response(serializer.data)
 
 
@@ -709,7 +725,7 @@ def student_performance_view(request, student_id):
 
 
 # Teacher Views
-class TeacherListView(generics.ListCreateAPIView):
+class TeacherListView(PrefetchPlanViewMixin, generics.ListCreateAPIView):
     queryset = Teacher.objects.all().order_by('user__first_name', 'user__last_name', 'id')
     permission_classes = [permissions.IsAuthenticated]
 
@@ -724,14 +740,12 @@ class TeacherListView(generics.ListCreateAPIView):
             return (
                 Teacher.objects
                 .filter(user__school=user.school)
-                .select_related('user')
-                .prefetch_related('subjects_taught', 'teaching_classes')
                 .order_by('user__first_name', 'user__last_name', 'id')
             )
         return Teacher.objects.none()
 
 
-class TeacherDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TeacherDetailView(PrefetchPlanViewMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Teacher.objects.all().order_by('user__first_name', 'user__last_name', 'id')
     permission_classes = [permissions.IsAuthenticated]
 
@@ -746,8 +760,6 @@ class TeacherDetailView(generics.RetrieveUpdateDestroyAPIView):
             return (
                 Teacher.objects
                 .filter(user__school=user.school)
-                .select_related('user')
-                .prefetch_related('subjects_taught', 'teaching_classes')
                 .order_by('user__first_name', 'user__last_name', 'id')
             )
         return Teacher.objects.none()
@@ -765,7 +777,7 @@ class TeacherDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Parent Views
-class ParentListView(generics.ListCreateAPIView):
+class ParentListView(PrefetchPlanViewMixin, generics.ListCreateAPIView):
     queryset = Parent.objects.all()
     permission_classes = [permissions.IsAuthenticated]
 
@@ -781,11 +793,11 @@ class ParentListView(generics.ListCreateAPIView):
                 Q(user__school=user.school) |
                 Q(schools=user.school) |
                 Q(children__user__school=user.school)
-            ).distinct().select_related('user').prefetch_related('children__user', 'children__student_class')
+            ).distinct()
         return Parent.objects.none()
 
 
-class ParentDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ParentDetailView(PrefetchPlanViewMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Parent.objects.all()
     permission_classes = [permissions.IsAuthenticated]
 
@@ -801,7 +813,7 @@ class ParentDetailView(generics.RetrieveUpdateDestroyAPIView):
                 Q(user__school=user.school) |
                 Q(schools=user.school) |
                 Q(children__user__school=user.school)
-            ).distinct().select_related('user').prefetch_related('children__user', 'children__student_class')
+            ).distinct()
         return Parent.objects.none()
 
     def perform_update(self, serializer):
@@ -817,9 +829,11 @@ class ParentDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Result Views
-class ResultListCreateView(generics.ListCreateAPIView):
+class ResultListCreateView(PrefetchPlanViewMixin, generics.ListCreateAPIView):
     queryset = Result.objects.all()
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-date_recorded', '-id')
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -829,9 +843,7 @@ class ResultListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         user = self.request.user
         if user.school:
-            queryset = Result.objects.filter(student__user__school=user.school).select_related(
-                'student__user', 'subject', 'teacher__user'
-            )
+            queryset = Result.objects.filter(student__user__school=user.school)
         else:
             queryset = Result.objects.none()
 
@@ -865,6 +877,10 @@ class ResultListCreateView(generics.ListCreateAPIView):
 
     def perform_create(self, serializer):
         result = serializer.save()
+        refresh_rankings_for_result(result)
+        invalidate_student_predictions([result.student_id])
+        invalidate_student_summaries([result.student_id])
+        queue_at_risk_evaluation([(result.student_id, result.subject_id)], self.request.user.school_id)
         # Notify parents that a result has been posted for their child
         try:
             student = result.student
@@ -875,8 +891,8 @@ class ResultListCreateView(generics.ListCreateAPIView):
             if result.teacher and result.teacher.user:
                 t = result.teacher.user
                 teacher_name = f"{t.first_name} {t.last_name}".strip() or t.email
-            for p in get_parents_of_student(student):
-                send_result_entered_email(
+            send_concurrently([
+                (send_result_entered_email, dict(
                     parent_email=p['email'],
                     parent_name=p['name'],
                     school_name=school_name,
@@ -889,12 +905,14 @@ class ResultListCreateView(generics.ListCreateAPIView):
                     academic_term=result.academic_term or "",
                     academic_year=result.academic_year or "",
                     teacher_name=teacher_name,
-                )
+                ))
+                for p in get_parents_of_student(student)
+            ])
         except Exception as exc:
             logger.error("Result email notification failed: %s", exc)
 
 
-class ResultDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ResultDetailView(PrefetchPlanViewMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Result.objects.all()
     serializer_class = ResultSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -902,18 +920,31 @@ class ResultDetailView(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         user = self.request.user
         if user.school:
-            queryset = Result.objects.filter(student__user__school=user.school).select_related(
-                'student__user', 'subject', 'teacher__user'
-            )
+            queryset = Result.objects.filter(student__user__school=user.school)
         else:
             queryset = Result.objects.none()
         if user.role == 'teacher':
             queryset = queryset.filter(teacher__user=user)
         return queryset
 
+    def perform_update(self, serializer):
+        previous_key = (serializer.instance.academic_year, serializer.instance.academic_term)
+        result = serializer.save()
+        refresh_rankings_for_result(result, previous_key=previous_key)
+        invalidate_student_predictions([result.student_id])
+        invalidate_student_summaries([result.student_id])
+        queue_at_risk_evaluation([(result.student_id, result.subject_id)], self.request.user.school_id)
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        refresh_rankings_for_result(instance)
+        invalidate_student_predictions([instance.student_id])
+        invalidate_student_summaries([instance.student_id])
+        queue_at_risk_evaluation([(instance.student_id, instance.subject_id)], self.request.user.school_id)
+
 
 # Timetable Views
-class TimetableListView(generics.ListAPIView):
+class TimetableListView(PrefetchPlanViewMixin, generics.ListAPIView):
     queryset = Timetable.objects.all()
     serializer_class = TimetableSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -921,9 +952,7 @@ class TimetableListView(generics.ListAPIView):
     def get_queryset(self):
         user = self.request.user
         if user.school:
-            queryset = Timetable.objects.filter(class_assigned__school=user.school).select_related(
-                'class_assigned', 'subject', 'teacher__user'
-            )
+            queryset = Timetable.objects.filter(class_assigned__school=user.school)
         else:
             queryset = Timetable.objects.none()
 
@@ -943,68 +972,12 @@ class TimetableListView(generics.ListAPIView):
         if day:
             queryset = queryset.filter(day_of_week=day)
 
-        return queryset.order_by('day_of_week', 'start_time')
+        return queryset.order_by('day_of_week', 'start_time', 'id')
 
 
 # Announcement Views
 def _announcement_feed_queryset_for_user(user, include_dismissed=False):
-    if user.school:
-        queryset = Announcement.objects.filter(
-            is_active=True, author__school=user.school
-        ).filter(
-            Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now())
-        ).select_related('author', 'target_class')
-    else:
-        return Announcement.objects.none()
-
-    user_role = user.role
-
-    if user_role not in ('admin', 'hr', 'superadmin'):
-        audience_aliases = {
-            user_role,
-            f"{user_role}s",
-        }
-        audience_filter = Q(target_audience='all') | Q(target_audiences__contains=['all'])
-        for audience in audience_aliases:
-            audience_filter |= Q(target_audience=audience) | Q(target_audiences__contains=[audience])
-        queryset = queryset.filter(audience_filter)
-
-    if user_role == 'student':
-        try:
-            user_class_id = user.student.student_class_id
-            queryset = queryset.filter(Q(target_class__isnull=True) | Q(target_class_id=user_class_id))
-        except Exception:
-            queryset = queryset.filter(target_class__isnull=True)
-    elif user_role == 'parent':
-        from .models import ParentChildLink
-        child_class_ids = list(
-            ParentChildLink.objects.filter(parent=user.parent, is_confirmed=True)
-            .values_list('student__student_class_id', flat=True)
-        )
-        if child_class_ids:
-            queryset = queryset.filter(Q(target_class__isnull=True) | Q(target_class_id__in=child_class_ids))
-        else:
-            queryset = queryset.filter(target_class__isnull=True)
-    elif user_role == 'teacher':
-        try:
-            teacher = user.teacher
-            teacher_class_ids = list(
-                set(Class.objects.filter(class_teacher=user).values_list('id', flat=True)) |
-                set(Timetable.objects.filter(teacher=teacher).values_list('class_assigned_id', flat=True).distinct())
-            )
-            if teacher_class_ids:
-                queryset = queryset.filter(Q(target_class__isnull=True) | Q(target_class_id__in=teacher_class_ids))
-            else:
-                queryset = queryset.filter(target_class__isnull=True)
-        except Exception:
-            queryset = queryset.filter(target_class__isnull=True)
-
-    if not include_dismissed:
-        queryset = queryset.exclude(
-            id__in=AnnouncementDismissal.objects.filter(user=user).values_list('announcement_id', flat=True)
-        )
-
-    return queryset.order_by('-date_posted')
+    return announcement_feed_queryset(user, include_dismissed=include_dismissed)
 
 
 class AnnouncementListCreateView(generics.ListCreateAPIView):
@@ -1015,51 +988,59 @@ class AnnouncementListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         return _announcement_feed_queryset_for_user(self.request.user, include_dismissed=False)
 
+    def list(self, request, *args, **kwargs):
+        announcements = announcement_feed(request.user)
+        page = self.paginate_queryset(announcements)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(announcements, many=True).data)
+
     def perform_create(self, serializer):
         if self.request.user.role not in ('admin', 'hr'):
             raise PermissionDenied('Only admin and HR can create announcements.')
         announcement = serializer.save(author=self.request.user)
-        audiences = set(announcement.target_audiences or [announcement.target_audience])
         # Notify parents if target_audience includes 'all' or 'parent'
-        if not {'all', 'parent', 'parents'}.intersection(audiences):
+        if not announcement_targets_parents(announcement):
             return
+        school = self.request.user.school
+        if not school:
+            return
+        author_user = self.request.user
+        posted_by = f"{author_user.first_name} {author_user.last_name}".strip() or author_user.email
         try:
-            school = self.request.user.school
-            if not school:
-                return
-            school_name = school.name
-            author_user = self.request.user
-            posted_by = f"{author_user.first_name} {author_user.last_name}".strip() or author_user.email
-            # Get all parents in the school whose children are confirmed-linked
-            from .models import ParentChildLink
-            links = ParentChildLink.objects.filter(
-                is_confirmed=True,
-                student__user__school=school,
-            ).select_related('parent__user', 'student__user', 'student__student_class').distinct()
-            # Send one email per unique parent (they may have multiple children)
-            notified = set()
-            for link in links:
-                parent_email = link.parent.user.email
-                if not parent_email or parent_email in notified:
-                    continue
-                notified.add(parent_email)
-                parent_name = f"{link.parent.user.first_name} {link.parent.user.last_name}".strip()
-                student_name = f"{link.student.user.first_name} {link.student.user.last_name}".strip()
-                class_name = link.student.student_class.name if link.student.student_class else "N/A"
-                send_announcement_email(
-                    parent_email=parent_email,
-                    parent_name=parent_name,
-                    school_name=school_name,
-                    student_name=student_name,
-                    class_name=class_name,
-                    announcement_title=announcement.title,
-                    announcement_body=announcement.content,
-                    posted_by=posted_by,
-                )
+            queue_announcement_emails(announcement, school, posted_by)
         except Exception as exc:
             logger.error("Announcement email notification failed: %s", exc)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def announcement_email_delivery(request, pk):
+    """Progress of the parent email fan-out for an announcement."""
+    if request.user.role not in ('admin', 'hr'):
+        return Response({'error': 'Only admin and HR can view announcement deliveries.'},
+                        status=status.HTTP_403_FORBIDDEN)
+    from .models import AnnouncementEmailDelivery
+    delivery = AnnouncementEmailDelivery.objects.filter(
+        announcement_id=pk, school=request.user.school,
+    ).first()
+    if not delivery:
+        return Response({'error': 'No email delivery for this announcement'}, status=status.HTTP_404_NOT_FOUND)
+    return Response({
+        'announcement_id': delivery.announcement_id,
+        'status': delivery.status,
+        'total_recipients': delivery.total_recipients,
+        'sent_count': delivery.sent_count,
+        'failed_count': delivery.failed_count,
+        'total_batches': delivery.total_batches,
+        'completed_batches': delivery.completed_batches,
+        'errors': delivery.errors,
+        'created_at': delivery.created_at,
+        'started_at': delivery.started_at,
+        'completed_at': delivery.completed_at,
+    })
+
+
 class AnnouncementDetailView(generics.DestroyAPIView):
     queryset = Announcement.objects.all()
     serializer_class = AnnouncementSerializer
@@ -1089,6 +1070,7 @@ def dismiss_announcement(request, pk):
     if not announcement:
         return Response({'error': 'Announcement not found'}, status=status.HTTP_404_NOT_FOUND)
     AnnouncementDismissal.objects.get_or_create(user=request.user, announcement=announcement)
+    invalidate_user_feed(request.user)
     return Response({'message': 'Announcement cleared from your page.'}, status=status.HTTP_200_OK)
 
 
@@ -1110,11 +1092,12 @@ def dismiss_all_announcements(request):
     AnnouncementDismissal.objects.bulk_create(
         [AnnouncementDismissal(user=request.user, announcement_id=announcement_id) for announcement_id in new_ids]
     )
+    invalidate_user_feed(request.user)
     return Response({'dismissed': len(new_ids), 'total_visible': len(visible_ids)}, status=status.HTTP_200_OK)
 
 
 # Complaint Views
-class ComplaintListCreateView(generics.ListCreateAPIView):
+class ComplaintListCreateView(PrefetchPlanViewMixin, generics.ListCreateAPIView):
     queryset = Complaint.objects.all()
     serializer_class = ComplaintSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -1124,9 +1107,7 @@ class ComplaintListCreateView(generics.ListCreateAPIView):
         if user.school:
             queryset = Complaint.objects.filter(
                 Q(school=user.school) | Q(student__user__school=user.school)
-            ).distinct().select_related(
-                'student__user', 'submitted_by'
-            )
+            ).distinct()
         else:
             queryset = Complaint.objects.none()
 
@@ -1172,7 +1153,7 @@ class ComplaintListCreateView(generics.ListCreateAPIView):
         )
 
 
-class ComplaintDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ComplaintDetailView(PrefetchPlanViewMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Complaint.objects.all()
     serializer_class = ComplaintSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -1487,10 +1468,37 @@ def class_averages_view(request):
     return Response(results)
 
 
+def _serialize_timetable_job(job):
+    return {
+        'id': job.id,
+        'status': job.status,
+        'mode': job.mode,
+        'academic_year': job.academic_year,
+        'clear_existing': job.clear_existing,
+        'phase': job.phase,
+        'progress_done': job.progress_done,
+        'progress_total': job.progress_total,
+        'cancel_requested': job.cancel_requested,
+        'entries_count': job.entries_count,
+        'score': job.score,
+        'summary': job.summary,
+        'errors': job.errors,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'completed_at': job.completed_at.isoformat() if job.completed_at else None,
+        'heartbeat_at': job.heartbeat_at.isoformat() if job.heartbeat_at else None,
+    }
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def generate_timetable_view(request):
-    """Generate timetables for all classes using CSP algorithm - filtered by school"""
+    """
+    Queue timetable generation for all classes (solver or greedy mode) - filtered by school.
+    Returns the job to poll at timetables/jobs/<id>/; entries are read from timetables/ afterwards.
+    Body: { "academic_year": "2026" (optional), "mode": "solver" | "greedy" (optional),
+            "clear_existing": true }
+    """
     if request.user.role not in ('admin', 'hr', 'superadmin'):
         return Response({'error': 'Only admin/HR can generate timetables'}, status=status.HTTP_403_FORBIDDEN)
     
@@ -1499,35 +1507,92 @@ def generate_timetable_view(request):
         return Response({'error': 'No school associated with user'}, status=status.HTTP_400_BAD_REQUEST)
     
     academic_year = request.data.get('academic_year')
-    clear_existing = request.data.get('clear_existing', True)
-    
+    clear_raw = request.data.get('clear_existing')
+    mode = request.data.get('mode')
+    if mode and mode not in ('greedy', 'solver'):
+        return Response({'error': "mode must be 'solver' or 'greedy'"}, status=status.HTTP_400_BAD_REQUEST)
+
+    from .timetable_generator import active_timetable_job, queue_timetable_job
+
+    job = None
+    active = active_timetable_job(school)
+    if not active:
+        try:
+            job = queue_timetable_job(
+                school, request.user, academic_year, mode,
+                clear_existing=True if clear_raw is None else _parse_bool(clear_raw),
+            )
+        except IntegrityError:
+            # A concurrent request queued one between the check and the insert.
+            active = active_timetable_job(school)
+    if job is None:
+        return Response({
+            'error': 'Timetable generation is already in progress',
+            'job': _serialize_timetable_job(active) if active else None,
+        }, status=status.HTTP_409_CONFLICT)
+
+    log_school_audit(
+        user=request.user,
+        action='CREATE',
+        model_name='TimetableGenerationJob',
+        object_id=job.id,
+        object_repr=f'Timetable generation {academic_year or ""}'.strip(),
+        changes={'mode': job.mode, 'clear_existing': job.clear_existing},
+        status_code=status.HTTP_202_ACCEPTED,
+        ip_address=request.META.get('REMOTE_ADDR'),
+    )
+    return Response(_serialize_timetable_job(job), status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def timetable_jobs(request):
+    """List recent timetable generation jobs for the school."""
+    if request.user.role not in ('admin', 'hr', 'superadmin'):
+        return Response({'error': 'Only admin/HR can view timetable jobs'}, status=status.HTTP_403_FORBIDDEN)
+
+    from .models import TimetableGenerationJob
+    jobs = TimetableGenerationJob.objects.filter(school=request.user.school)[:50]
+    return Response([_serialize_timetable_job(job) for job in jobs])
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def timetable_job_detail(request, job_id):
+    """Status, progress and per-class summary of a timetable generation job."""
+    if request.user.role not in ('admin', 'hr', 'superadmin'):
+        return Response({'error': 'Only admin/HR can view timetable jobs'}, status=status.HTTP_403_FORBIDDEN)
+
+    from .models import TimetableGenerationJob
     try:
-        from .timetable_generator import generate_timetable
-        
-        success, message, entries = generate_timetable(
-            school=school,
-            academic_year=academic_year,
-            clear_existing=clear_existing
-        )
-        
-        if success:
-            return Response({
-                'success': True,
-                'message': message,
-                'entries_count': len(entries),
-                'timetables': TimetableSerializer(entries, many=True).data
-            })
-        else:
-            return Response({
-                'success': False,
-                'message': message
-            }, status=status.HTTP_400_BAD_REQUEST)
-    
-    except Exception as e:
+        job = TimetableGenerationJob.objects.get(id=job_id, school=request.user.school)
+    except TimetableGenerationJob.DoesNotExist:
+        return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(_serialize_timetable_job(job))
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def cancel_timetable_job_view(request, job_id):
+    """Cancel a queued, running or stalled timetable generation job; the existing timetable is kept."""
+    if request.user.role not in ('admin', 'hr', 'superadmin'):
+        return Response({'error': 'Only admin/HR can cancel timetable jobs'}, status=status.HTTP_403_FORBIDDEN)
+
+    from .models import TimetableGenerationJob
+    from .timetable_generator import cancel_timetable_job
+    try:
+        job = TimetableGenerationJob.objects.get(id=job_id, school=request.user.school)
+    except TimetableGenerationJob.DoesNotExist:
+        return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    if not cancel_timetable_job(job):
+        job.refresh_from_db()
         return Response({
-            'success': False,
-            'message': f'Error generating timetable: {str(e)}'
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            'error': f'Job has already finished ({job.status})',
+            'job': _serialize_timetable_job(job),
+        }, status=status.HTTP_409_CONFLICT)
+    job.refresh_from_db()
+    return Response(_serialize_timetable_job(job), status=status.HTTP_202_ACCEPTED)
 
 
 @api_view(['GET'])
@@ -1670,14 +1735,13 @@ def generate_report_card(request, student_id):
             return Response({'error': 'You can only view report cards for your confirmed children.'}, status=status.HTTP_403_FORBIDDEN)
 
     elif user.role == 'teacher':
-        from .models import Timetable
         teacher = user.teacher
         is_class_teacher = Class.objects.filter(
             id=student.student_class_id, class_teacher=user
         ).exists() if student.student_class_id else False
-        teaches_via_timetable = Timetable.objects.filter(
-            teacher=teacher, class_assigned_id=student.student_class_id
-        ).exists() if student.student_class_id else False
+        teaches_via_timetable = timetable_index(user.school_id).teaches(
+            teacher.id, student.student_class_id
+        ) if student.student_class_id else False
         teaches_via_scope = teacher.teaching_classes.filter(
             id=student.student_class_id
         ).exists() if student.student_class_id else False
@@ -1727,16 +1791,8 @@ def generate_report_card(request, student_id):
     # ── Build PDF ───────────────────────────────────────────────────────
     # Only include results marked for the report card.
     # Use report_term override when set, otherwise fall back to academic_term.
-    from django.db.models import Case, When, F, CharField
-    results = Result.objects.filter(
-        student=student, academic_year=year, include_in_report=True,
-    ).annotate(
-        effective_term=Case(
-            When(report_term='', then=F('academic_term')),
-            default=F('report_term'),
-            output_field=CharField(),
-        )
-    ).filter(effective_term=term).select_related('subject').order_by('subject__name')
+    from .report_cards import report_results_queryset
+    results = report_results_queryset(year, term).filter(student=student).order_by('subject__name')
 
     buffer = _build_report_card_pdf(student, results, school, year, term)
 
@@ -1790,74 +1846,30 @@ def _font_scale(scale):
 
 def _compute_class_position(student, year, term):
     """Return (rank, class_size) for this student in their class for the term."""
-    from django.db.models import Sum, F, FloatField, ExpressionWrapper
+    from .class_rankings import class_position_for
     if not student.student_class_id:
         return None, None
-    class_students = Student.objects.filter(
-        student_class_id=student.student_class_id, user__is_active=True,
-    ).values_list('id', flat=True)
-    totals = {}
-    for r in Result.objects.filter(
-        student_id__in=class_students, academic_year=year,
-        academic_term=term, include_in_report=True, max_score__gt=0,
-    ).values('student_id', 'score', 'max_score'):
-        pct = (r['score'] / r['max_score']) * 100 if r['max_score'] else 0
-        totals.setdefault(r['student_id'], []).append(pct)
-    averages = [(sid, sum(v) / len(v)) for sid, v in totals.items() if v]
-    if not averages:
-        return None, None
-    averages.sort(key=lambda x: x[1], reverse=True)
-    for i, (sid, _) in enumerate(averages, start=1):
-        if sid == student.id:
-            return i, len(averages)
-    return None, len(averages)
-
-
-def _previous_term(term):
-    return {'Term 2': 'Term 1', 'Term 3': 'Term 2'}.get(term)
-
-
-def _previous_term_averages(student, year, prev_term):
-    """Return {subject_name: pct} for the student's previous term."""
-    if not prev_term:
-        return {}
-    out = {}
-    for r in Result.objects.filter(
-        student=student, academic_year=year, academic_term=prev_term,
-        include_in_report=True,
-    ).select_related('subject'):
-        out.setdefault(r.subject.name, []).append(
-            (r.score / r.max_score * 100) if r.max_score else 0.0
-        )
-    return {k: round(sum(v) / len(v), 1) for k, v in out.items() if v}
+    return class_position_for(student, year, term)
 
 
 def _class_subject_stats(student, year, term):
     """Return {subject_name: (avg, high)} across the class for each subject."""
+    from .class_rankings import class_subject_stats_for
     if not student.student_class_id:
         return {}
-    out = {}
-    rows = Result.objects.filter(
-        student__student_class_id=student.student_class_id,
-        academic_year=year, academic_term=term, include_in_report=True, max_score__gt=0,
-    ).select_related('subject').values('subject__name', 'score', 'max_score', 'student_id')
-    by_subj = {}
-    for r in rows:
-        pct = (r['score'] / r['max_score']) * 100
-        by_subj.setdefault(r['subject__name'], {}).setdefault(r['student_id'], []).append(pct)
-    for subj, per_student in by_subj.items():
-        student_avgs = [sum(v) / len(v) for v in per_student.values() if v]
-        if student_avgs:
-            out[subj] = (round(sum(student_avgs) / len(student_avgs), 1),
-                         round(max(student_avgs), 1))
-    return out
+    return class_subject_stats_for(student, year, term)
+
 
+def _build_report_card_pdf(student, results, school, year, term, context=None):
+    """
+    Build a single student report card PDF and return a BytesIO buffer (seeked to 0).
 
-def _build_report_card_pdf(student, results, school, year, term):
-    """Build a single student report card PDF and return a BytesIO buffer (seeked to 0)."""
+    context is a report_cards.ReportCardContext; batch rendering passes a
+    ClassReportCardContext so per-student lookups come from preloaded data.
+    """
     from reportlab.lib import colors
     from reportlab.lib.pagesizes import A4, letter, landscape
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.styles import ParagraphStyle
     from reportlab.lib.units import cm, mm
     from reportlab.platypus import (
         SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, Frame, PageTemplate,
@@ -1866,11 +1878,13 @@ def _build_report_card_pdf(student, results, school, year, term):
     from reportlab.graphics.shapes import Drawing
     from reportlab.graphics.charts.barcharts import VerticalBarChart
     from .grading import percentage_to_grade, score_to_percentage
-    from .models import ReportCardApprovalRequest, SubjectTermFeedback, PromotionRecord
+    from .report_cards import ReportCardContext
     from io import BytesIO
     import os
 
-    cfg = _get_report_config(school)
+    if context is None:
+        context = ReportCardContext(school, year, term)
+    cfg = context.cfg
 
     # ── Config values (with defaults) ───────────────────────────────
     primary = _cfg(cfg, 'primary_color', '#1d4ed8')
@@ -1911,15 +1925,7 @@ def _build_report_card_pdf(student, results, school, year, term):
     )
     principal_comment = _cfg(cfg, 'principal_comments_default', '')
 
-    if student.student_class_id:
-        approval = ReportCardApprovalRequest.objects.filter(
-            school=school,
-            class_obj_id=student.student_class_id,
-            academic_year=year,
-            academic_term=term,
-        ).order_by('-submitted_at').first()
-        if approval and approval.teacher_comment:
-            teacher_comment = approval.teacher_comment
+    teacher_comment = context.teacher_comment(student) or teacher_comment
 
     show_next_term = _cfg(cfg, 'show_next_term_dates', True)
     footer_text = _cfg(cfg, 'custom_footer_text', '')
@@ -1929,32 +1935,19 @@ def _build_report_card_pdf(student, results, school, year, term):
     show_activities = _cfg(cfg, 'show_activities_section', False)
 
     # ── Attendance ──
-    attendance_qs = student.class_attendance_records.filter(date__isnull=False)
-    attendance_total = attendance_qs.count()
-    present_count = attendance_qs.filter(status='present').count()
-    absent_count = attendance_qs.filter(status='absent').count()
-    late_count = attendance_qs.filter(status='late').count()
+    attendance_total, present_count, absent_count, late_count = context.attendance_counts(student)
 
     # ── Per-subject feedback (comments + effort) ──
-    feedback_map = {
-        fb.subject.name: fb for fb in SubjectTermFeedback.objects.filter(
-            student=student, academic_year=year, academic_term=term,
-        ).select_related('subject')
-    }
+    feedback_map = context.feedback_map(student)
 
     # ── Previous term data ──
-    prev_term = _previous_term(term) if show_prev_term else None
-    prev_averages = _previous_term_averages(student, year, prev_term) if prev_term else {}
+    prev_averages = context.previous_term_averages(student) if show_prev_term else {}
 
     # ── Class stats ──
-    class_stats = _class_subject_stats(student, year, term) if show_class_avg else {}
+    class_stats = context.class_subject_stats(student) if show_class_avg else {}
 
     # ── Subject groups ──
-    subject_group_map = {}
-    if grouping_on:
-        from users.models import SubjectGroup
-        for sg in SubjectGroup.objects.filter(school=school).select_related('subject'):
-            subject_group_map[sg.subject.name] = sg.group_type
+    subject_group_map = context.subject_group_map() if grouping_on else {}
 
     # ── Page setup ──
     base_page = A4 if page_size_name == 'A4' else letter
@@ -1963,7 +1956,7 @@ def _build_report_card_pdf(student, results, school, year, term):
     buffer = BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=pagesize, topMargin=1.3*cm, bottomMargin=1.3*cm,
                             leftMargin=1.3*cm, rightMargin=1.3*cm)
-    styles = getSampleStyleSheet()
+    styles = context.styles
     elements = []
 
     primary_color = colors.HexColor(primary)
@@ -2151,13 +2144,13 @@ def _build_report_card_pdf(student, results, school, year, term):
         info_data.append(['Class Teacher:', ct.full_name, '', ''])
 
     if show_position:
-        rank, size = _compute_class_position(student, year, term)
+        rank, size = context.class_position(student)
         if rank:
             suffix = 'th' if 10 <= rank % 100 <= 20 else {1: 'st', 2: 'nd', 3: 'rd'}.get(rank % 10, 'th')
             info_data.append(['Position in Class:', f'{rank}{suffix} of {size}', '', ''])
 
     if show_promotion:
-        promo = PromotionRecord.objects.filter(student=student, academic_year=year).order_by('-date_processed').first()
+        promo = context.promotion(student)
         if promo:
             info_data.append(['Promotion Status:',
                               f'{promo.get_action_display()}'
@@ -2166,10 +2159,7 @@ def _build_report_card_pdf(student, results, school, year, term):
 
     if show_fees_status:
         try:
-            from finances.models import StudentFee
-            fees = StudentFee.objects.filter(student=student, academic_year=year, academic_term=term)
-            due = sum((f.amount_due for f in fees), 0)
-            paid = sum((f.amount_paid for f in fees), 0)
+            due, paid = context.fee_totals(student)
             bal = due - paid
             currency = getattr(school.settings, 'currency', 'USD') if hasattr(school, 'settings') else 'USD'
             info_data.append(['Fees Status:',
@@ -2721,6 +2711,7 @@ def bulk_import_commit(request):
     created, updated = 0, 0
     errors = []
     changes = []
+    welcome_emails = []
     ip_address = _get_request_ip(request)
     duplicate_strategy = (request.data.get("duplicate_strategy") or "skip").strip().lower()
     if duplicate_strategy not in ("skip", "update", "error"):
@@ -2775,6 +2766,11 @@ def bulk_import_commit(request):
             job.save(update_fields=[
                 'status', 'created_count', 'updated_count', 'error_count', 'errors', 'changes', 'completed_at'
             ])
+            if import_type == "results" and (created or updated):
+                # Go workers write Result rows directly; drop rankings/predictions/summaries so they rebuild on next read.
+                invalidate_school_rankings(school)
+                invalidate_school_predictions(school)
+                invalidate_school_summaries(school.id)
             AuditLog.objects.create(
                 user=request.user,
                 school=school,
@@ -3109,13 +3105,13 @@ def bulk_import_commit(request):
                     if isinstance(out, dict) and out.get("id"):
                         changes.append({"action": "create", "model": "academics.Teacher", "pk": out["id"]})
                     if "@import.local" not in email:
-                        send_bulk_welcome_teacher(
+                        welcome_emails.append((send_bulk_welcome_teacher, dict(
                             email=email,
                             first_name=first_name,
                             last_name=last_name,
                             school_name=school.name,
                             password=None if account_strategy == "inactive" else raw_password,
-                        )
+                        )))
                 else:
                     raise ValueError(serializer.errors)
             except Exception as exc:
@@ -3258,14 +3254,14 @@ def bulk_import_commit(request):
                     if hasattr(out, "id"):
                         changes.append({"action": "create", "model": "academics.Parent", "pk": out.id})
                     if "@import.local" not in email:
-                        send_bulk_welcome_parent(
+                        welcome_emails.append((send_bulk_welcome_parent, dict(
                             email=email,
                             first_name=first_name,
                             last_name=last_name,
                             school_name=school.name,
                             password=None if account_strategy == "inactive" else raw_password,
                             children=children_info,
-                        )
+                        )))
                 else:
                     raise ValueError(serializer.errors)
             except Exception as exc:
@@ -3342,6 +3338,8 @@ def bulk_import_commit(request):
                 errors.append({"row": i, "error": str(exc)})
 
     elif import_type == "attendance":
+        touched_attendance = []
+        moved_class_days = set()
         for i, row in enumerate(mapped_rows, start=2):
             try:
                 admission_no = (row.get("student_admission_no") or "").strip()
@@ -3368,12 +3366,14 @@ def bulk_import_commit(request):
                 ):
                     continue
                 if existing and duplicate_strategy == "update":
+                    moved_class_days.add((existing.class_assigned_id, existing.date))
                     existing.class_assigned = student.student_class
                     existing.status = status_val
                     existing.remarks = (row.get("reason") or "").strip()
                     existing.recorded_by = request.user
                     existing.save()
                     att_obj, was_created = existing, False
+                    touched_attendance.append(att_obj)
                 elif existing:
                     att_obj, was_created = existing, False
                 else:
@@ -3386,6 +3386,7 @@ def bulk_import_commit(request):
                         recorded_by=request.user,
                     )
                     was_created = True
+                    touched_attendance.append(att_obj)
                 if was_created:
                     created += 1
                     changes.append({"action": "create", "model": "academics.ClassAttendance", "pk": att_obj.pk})
@@ -3400,10 +3401,14 @@ def bulk_import_commit(request):
                     })
             except Exception as exc:
                 errors.append({"row": i, "error": str(exc)})
+        refresh_rollups_for_records('class', touched_attendance, extra_class_days=moved_class_days)
 
     else:
         return Response({'error': f"Unknown import type: {import_type}"}, status=status.HTTP_400_BAD_REQUEST)
 
+    # Welcome emails go out together on the pooled transport once the rows are in.
+    send_concurrently(welcome_emails)
+
     status_value = 'completed' if not errors else ('failed' if created == 0 and updated == 0 else 'completed')
     job.status = status_value
     job.created_count = created
@@ -3489,6 +3494,11 @@ def bulk_import_rollback(request, job_id):
 
     rolled_back = 0
     rollback_errors = []
+    attendance_before = []
+    if job.import_type == 'attendance':
+        attendance_before = list(ClassAttendance.objects.filter(
+            pk__in=[change.get('pk') for change in job.changes or []],
+        ).values_list('class_assigned_id', 'student_id', 'date'))
     for change in reversed(job.changes or []):
         try:
             model_label = change.get('model')
@@ -3509,6 +3519,12 @@ def bulk_import_rollback(request, job_id):
                     rolled_back += 1
         except Exception as exc:
             rollback_errors.append(str(exc))
+    if attendance_before:
+        refresh_attendance_rollups(
+            'class',
+            class_days={(class_id, day) for class_id, _, day in attendance_before},
+            student_days={(student_id, day) for _, student_id, day in attendance_before},
+        )
 
     job.status = 'rolled_back'
     job.rolled_back_at = timezone.now()
@@ -3555,8 +3571,8 @@ def student_grade_prediction(request, student_id):
     except Student.DoesNotExist:
         return Response({'error': 'Student not found.'}, status=status.HTTP_404_NOT_FOUND)
 
-    from .ml_predictions import predict_student_grades
-    predictions = predict_student_grades(student)
+    from .prediction_cache import get_cached_student_predictions
+    predictions = get_cached_student_predictions(student)
     return Response({'predictions': predictions, 'student': student.user.full_name})
 
 
@@ -3576,67 +3592,49 @@ def timetable_conflict_check(request):
         return Response({'error': 'Admins only'}, status=status.HTTP_403_FORBIDDEN)
 
     school = request.user.school
-    entries = list(
-        Timetable.objects.filter(class_assigned__school=school)
-        .select_related('class_assigned', 'subject', 'teacher__user')
-        .order_by('day_of_week', 'start_time')
+    index = timetable_index(school.id if school else None)
+    pairs = index.conflicts()
+    entries = Timetable.objects.select_related('class_assigned', 'subject', 'teacher__user').in_bulk(
+        {pk for _, _, a, b in pairs for pk in (a, b)}
     )
 
-    def overlaps(a, b):
-        """True if two timetable entries overlap in time."""
-        return a.start_time < b.end_time and b.start_time < a.end_time
-
     conflicts = []
-
-    # Group by day for efficiency
-    from itertools import combinations
-    from collections import defaultdict
-
-    by_day = defaultdict(list)
-    for e in entries:
-        by_day[e.day_of_week].append(e)
-
-    for day, day_entries in by_day.items():
-        for a, b in combinations(day_entries, 2):
-            if not overlaps(a, b):
-                continue
-
-            # Teacher conflict
-            if a.teacher_id and a.teacher_id == b.teacher_id:
-                conflicts.append({
-                    'type': 'teacher',
-                    'day': day,
-                    'teacher': f"{a.teacher.user.first_name} {a.teacher.user.last_name}",
-                    'slot_1': {'class': a.class_assigned.name, 'subject': a.subject.name,
-                               'time': f"{a.start_time}-{a.end_time}"},
-                    'slot_2': {'class': b.class_assigned.name, 'subject': b.subject.name,
-                               'time': f"{b.start_time}-{b.end_time}"},
-                })
-
-            # Room conflict (skip empty rooms)
-            if a.room and b.room and a.room.strip().lower() == b.room.strip().lower():
-                conflicts.append({
-                    'type': 'room',
-                    'day': day,
-                    'room': a.room,
-                    'slot_1': {'class': a.class_assigned.name, 'subject': a.subject.name,
-                               'time': f"{a.start_time}-{a.end_time}"},
-                    'slot_2': {'class': b.class_assigned.name, 'subject': b.subject.name,
-                               'time': f"{b.start_time}-{b.end_time}"},
-                })
-
-            # Class double-booked
-            if a.class_assigned_id == b.class_assigned_id:
-                conflicts.append({
-                    'type': 'class',
-                    'day': day,
-                    'class': a.class_assigned.name,
-                    'slot_1': {'subject': a.subject.name, 'time': f"{a.start_time}-{a.end_time}"},
-                    'slot_2': {'subject': b.subject.name, 'time': f"{b.start_time}-{b.end_time}"},
-                })
+    for kind, day, a_id, b_id in pairs:
+        a, b = entries.get(a_id), entries.get(b_id)
+        if a is None or b is None:
+            continue  # deleted since the index was built
+
+        if kind == 'teacher':
+            conflicts.append({
+                'type': 'teacher',
+                'day': day,
+                'teacher': f"{a.teacher.user.first_name} {a.teacher.user.last_name}",
+                'slot_1': {'class': a.class_assigned.name, 'subject': a.subject.name,
+                           'time': f"{a.start_time}-{a.end_time}"},
+                'slot_2': {'class': b.class_assigned.name, 'subject': b.subject.name,
+                           'time': f"{b.start_time}-{b.end_time}"},
+            })
+        elif kind == 'room':
+            conflicts.append({
+                'type': 'room',
+                'day': day,
+                'room': a.room,
+                'slot_1': {'class': a.class_assigned.name, 'subject': a.subject.name,
+                           'time': f"{a.start_time}-{a.end_time}"},
+                'slot_2': {'class': b.class_assigned.name, 'subject': b.subject.name,
+                           'time': f"{b.start_time}-{b.end_time}"},
+            })
+        else:
+            conflicts.append({
+                'type': 'class',
+                'day': day,
+                'class': a.class_assigned.name,
+                'slot_1': {'subject': a.subject.name, 'time': f"{a.start_time}-{a.end_time}"},
+                'slot_2': {'subject': b.subject.name, 'time': f"{b.start_time}-{b.end_time}"},
+            })
 
     return Response({
-        'total_entries': len(entries),
+        'total_entries': len(index),
         'conflict_count': len(conflicts),
         'conflicts': conflicts,
     })
@@ -3974,7 +3972,8 @@ def publish_reports(request):
     Publish report cards for a single class/year/term.
     Creates a ReportCardRelease record and sends announcements to
     students, parents, and the class teacher.
-    Body: { "class_id": 5, "year": "2026", "term": "Term 1" }
+    Body: { "class_id": 5, "year": "2026", "term": "Term 1", "render_pdfs": false }
+    render_pdfs queues a background ReportCardBatch for the class.
     """
     if request.user.role != 'admin':
         return Response({'error': 'Only admins can publish reports'}, status=status.HTTP_403_FORBIDDEN)
@@ -4048,12 +4047,18 @@ def publish_reports(request):
             link='/teacher/results',
         )
 
+    batch_id = None
+    if _parse_bool(request.data.get('render_pdfs')):
+        from .report_cards import queue_report_card_batch
+        batch_id = queue_report_card_batch(school, [class_obj.id], year, term, request.user).id
+
     return Response({
         'message': f'Reports published for {class_obj.name} - {term} {year}',
         'class_name': class_obj.name,
         'access_scope': release.access_scope,
         'excluded_students_count': excluded_count,
         'published': True,
+        'report_card_batch_id': batch_id,
     }, status=status.HTTP_201_CREATED)
 
 
@@ -4062,7 +4067,8 @@ def publish_reports(request):
 def publish_all_reports(request):
     """
     Publish report cards for ALL classes in the school for a given year/term.
-    Body: { "year": "2026", "term": "Term 1" }
+    Body: { "year": "2026", "term": "Term 1", "render_pdfs": false }
+    render_pdfs queues one background ReportCardBatch covering every newly published class.
     """
     if request.user.role != 'admin':
         return Response({'error': 'Only admins can publish reports'}, status=status.HTTP_403_FORBIDDEN)
@@ -4130,11 +4136,19 @@ def publish_all_reports(request):
         else:
             skipped.append(class_obj.name)
 
+    batch_id = None
+    if published_details and _parse_bool(request.data.get('render_pdfs')):
+        from .report_cards import queue_report_card_batch
+        batch_id = queue_report_card_batch(
+            school, [d['class_id'] for d in published_details], year, term, request.user,
+        ).id
+
     return Response({
         'message': f'{len(published)} class(es) published, {len(skipped)} already published',
         'published_classes': published,
         'published_details': published_details,
         'skipped_classes': skipped,
+        'report_card_batch_id': batch_id,
     }, status=status.HTTP_201_CREATED)
 
 
@@ -4164,6 +4178,124 @@ def list_published_reports(request):
     return Response({'releases': data})
 
 
+def _serialize_report_card_batch(request, batch, include_files=False):
+    data = {
+        'id': batch.id,
+        'class_ids': batch.class_ids,
+        'academic_year': batch.academic_year,
+        'academic_term': batch.academic_term,
+        'status': batch.status,
+        'total_students': batch.total_students,
+        'rendered_count': batch.rendered_count,
+        'failed_count': batch.failed_count,
+        'errors': batch.errors,
+        'bundle_url': request.build_absolute_uri(batch.bundle.url) if batch.bundle else None,
+        'created_at': batch.created_at.isoformat(),
+        'started_at': batch.started_at.isoformat() if batch.started_at else None,
+        'completed_at': batch.completed_at.isoformat() if batch.completed_at else None,
+    }
+    if include_files:
+        data['files'] = [{
+            'student_id': f.student_id,
+            'student_name': f.student.user.full_name,
+            'class_id': f.class_obj_id,
+            'url': request.build_absolute_uri(f.pdf.url),
+        } for f in batch.files.select_related('student__user')]
+    return data
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([permissions.IsAuthenticated])
+def report_card_batches(request):
+    """
+    GET: list recent report card PDF batches for the school.
+    POST: queue a class-wide PDF render.
+    Body: { "year": "2026", "term": "Term 1", "class_id": 5 (optional, default all classes),
+            "bundle": true }
+    """
+    if request.user.role != 'admin':
+        return Response({'error': 'Only admins can generate report card batches'}, status=status.HTTP_403_FORBIDDEN)
+
+    from .models import ReportCardBatch
+    school = request.user.school
+
+    if request.method == 'GET':
+        batches = ReportCardBatch.objects.filter(school=school)[:50]
+        return Response([_serialize_report_card_batch(request, b) for b in batches])
+
+    year = _normalize_report_year(request.data.get('year'))
+    term = _normalize_report_term(request.data.get('term'))
+    if not all([year, term]):
+        return Response({'error': 'year and term are required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    class_id = request.data.get('class_id')
+    classes = Class.objects.filter(school=school)
+    if class_id:
+        classes = classes.filter(id=class_id)
+        if not classes.exists():
+            return Response({'error': 'Class not found'}, status=status.HTTP_404_NOT_FOUND)
+    class_ids = list(classes.values_list('id', flat=True))
+    if not class_ids:
+        return Response({'error': 'No classes to render'}, status=status.HTTP_400_BAD_REQUEST)
+
+    bundle_raw = request.data.get('bundle')
+    from .report_cards import queue_report_card_batch
+    batch = queue_report_card_batch(
+        school, class_ids, year, term, request.user,
+        build_bundle=True if bundle_raw is None else _parse_bool(bundle_raw),
+    )
+    log_school_audit(
+        user=request.user,
+        action='CREATE',
+        model_name='ReportCardBatch',
+        object_id=batch.id,
+        object_repr=f'Report cards {term} {year}',
+        changes={'class_ids': batch.class_ids},
+        status_code=status.HTTP_202_ACCEPTED,
+        ip_address=request.META.get('REMOTE_ADDR'),
+    )
+    return Response(_serialize_report_card_batch(request, batch), status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def report_card_batch_detail(request, batch_id):
+    """Progress of a report card batch plus per-student PDF links once rendered."""
+    if request.user.role != 'admin':
+        return Response({'error': 'Only admins can view report card batches'}, status=status.HTTP_403_FORBIDDEN)
+
+    from .models import ReportCardBatch
+    try:
+        batch = ReportCardBatch.objects.get(id=batch_id, school=request.user.school)
+    except ReportCardBatch.DoesNotExist:
+        return Response({'error': 'Batch not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(_serialize_report_card_batch(request, batch, include_files=True))
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def download_report_card_bundle(request, batch_id):
+    """Download the merged PDF bundle of a finished report card batch."""
+    from django.http import HttpResponse
+
+    if request.user.role != 'admin':
+        return Response({'error': 'Only admins can download report card bundles'}, status=status.HTTP_403_FORBIDDEN)
+
+    from .models import ReportCardBatch
+    try:
+        batch = ReportCardBatch.objects.get(id=batch_id, school=request.user.school)
+    except ReportCardBatch.DoesNotExist:
+        return Response({'error': 'Batch not found'}, status=status.HTTP_404_NOT_FOUND)
+    if batch.status != 'done' or not batch.bundle:
+        return Response({'error': 'Bundle is not ready'}, status=status.HTTP_409_CONFLICT)
+
+    with batch.bundle.open('rb') as fh:
+        response = HttpResponse(fh.read(), content_type='application/pdf')
+    filename = f'report_cards_{batch.academic_term}_{batch.academic_year}.pdf'.replace(' ', '_')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def list_report_approval_requests(request):
@@ -4441,36 +4573,37 @@ def admin_at_risk_students(request):
     
     at_risk_data = []
     non_risk_data = []
-    from .ml_predictions import predict_student_grades
-    from .at_risk_alerts import get_student_risk_score
-    
+    from .prediction_cache import get_cached_predictions
+    from .at_risk_alerts import risk_score_from_predictions
+    from .models import AtRiskAlert
+
+    students = list(students)
+    by_subject = view_type == 'by_subject' and subject_id
+    try:
+        subject_filter = int(subject_id) if by_subject else None
+    except (TypeError, ValueError):
+        subject_filter = None
+        by_subject = False
+    # One cache read; only students whose results changed are recomputed (in one vectorized pass).
+    predictions_by_student = get_cached_predictions(students)
+
+    at_risk_students = []
     for student in students:
         try:
-            predictions = predict_student_grades(student)
+            predictions = predictions_by_student.get(student.id, [])
             
             # Calculate overall risk score
-            overall_risk_score = get_student_risk_score(student)
+            overall_risk_score = risk_score_from_predictions(predictions)
             at_risk_subjects = [p for p in predictions if p['at_risk']]
             total_subjects = len(predictions)
             
-            if view_type == 'by_subject' and subject_id:
+            if by_subject:
                 # Filter to specific subject
-                subject_preds = [p for p in predictions if p['subject_id'] == int(subject_id)]
+                subject_preds = [p for p in predictions if p['subject_id'] == subject_filter]
                 if not subject_preds or not subject_preds[0]['at_risk']:
                     continue
                 
                 for pred in subject_preds:
-                    # Get recent alerts
-                    from .models import AtRiskAlert
-                    recent_alerts = list(
-                        AtRiskAlert.objects.filter(
-                            student=student,
-                            subject_id=int(subject_id)
-                        ).order_by('-created_at')[:3].values(
-                            'id', 'status', 'created_at', 'triggered_by', 'current_grade', 'predicted_grade'
-                        )
-                    )
-                    
                     entry = {
                         'student_id': student.id,
                         'name': student.user.full_name,
@@ -4486,22 +4619,13 @@ def admin_at_risk_students(request):
                         'confidence': pred['confidence'],
                         'intervention': pred['intervention'],
                         'overall_risk_score': overall_risk_score,
-                        'recent_alerts': recent_alerts,
+                        'recent_alerts': [],
                     }
                     at_risk_data.append(entry)
+                    at_risk_students.append(student.id)
             else:
                 # Overall view - show all at-risk subjects for students if they have any
                 if at_risk_subjects:
-                    from .models import AtRiskAlert
-                    recent_alerts = list(
-                        AtRiskAlert.objects.filter(
-                            student=student,
-                            status__in=['new', 'acknowledged', 'intervention_scheduled']
-                        ).order_by('-created_at')[:3].values(
-                            'id', 'subject__name', 'status', 'created_at', 'triggered_by', 'current_grade'
-                        )
-                    )
-                    
                     entry = {
                         'student_id': student.id,
                         'name': student.user.full_name,
@@ -4521,9 +4645,10 @@ def admin_at_risk_students(request):
                             }
                             for p in at_risk_subjects
                         ],
-                        'recent_alerts': recent_alerts,
+                        'recent_alerts': [],
                     }
                     at_risk_data.append(entry)
+                    at_risk_students.append(student.id)
                 else:
                     avg_pct = 0.0
                     if predictions:
@@ -4544,6 +4669,25 @@ def admin_at_risk_students(request):
         except Exception as e:
             logger.error(f"Error processing student {student.id} for at-risk view: {str(e)}")
             continue
+
+    # Recent alerts for every listed student in one query (3 most recent each).
+    if at_risk_students:
+        if by_subject:
+            alerts_qs = AtRiskAlert.objects.filter(
+                student_id__in=at_risk_students, subject_id=subject_filter,
+            ).values('student_id', 'id', 'status', 'created_at', 'triggered_by', 'current_grade', 'predicted_grade')
+        else:
+            alerts_qs = AtRiskAlert.objects.filter(
+                student_id__in=at_risk_students,
+                status__in=['new', 'acknowledged', 'intervention_scheduled'],
+            ).values('student_id', 'id', 'subject__name', 'status', 'created_at', 'triggered_by', 'current_grade')
+        recent_by_student = {}
+        for alert in alerts_qs.order_by('-created_at'):
+            bucket = recent_by_student.setdefault(alert.pop('student_id'), [])
+            if len(bucket) < 3:
+                bucket.append(alert)
+        for entry in at_risk_data:
+            entry['recent_alerts'] = recent_by_student.get(entry['student_id'], [])
     
     # Sort
     if sort_by == 'name':
@@ -4719,7 +4863,9 @@ def edit_class_attendance(request, attendance_id):
     if remarks is not None:
         record.remarks = str(remarks)
     record.recorded_by = request.user
-    record.save(update_fields=['status', 'remarks', 'recorded_by'])
+    with transaction.atomic():
+        record.save(update_fields=['status', 'remarks', 'recorded_by'])
+        refresh_rollups_for_records('class', [record])
 
     return Response({
         'message': 'Class attendance updated.',
@@ -4780,9 +4926,11 @@ def edit_subject_attendance(request, attendance_id):
     record.bunk_flag = bunk_flag
     record.bunk_reason = 'Absent during period without approved permission' if bunk_flag else ''
     record.recorded_by = request.user
-    record.save(update_fields=[
-        'status', 'remarks', 'marked_with_permission', 'bunk_flag', 'bunk_reason', 'recorded_by',
-    ])
+    with transaction.atomic():
+        record.save(update_fields=[
+            'status', 'remarks', 'marked_with_permission', 'bunk_flag', 'bunk_reason', 'recorded_by',
+        ])
+        refresh_rollups_for_records('subject', [record])
 
     return Response({
         'message': 'Subject attendance updated.',
@@ -2,15 +2,17 @@
 MySchoolHub — Resend Email Service
 All transactional emails sent from the platform.
 
-Uses the Resend REST API directly via `requests`.
+Uses the Resend REST API over the shared pooled transport
+(School_system.outbound_http), preferring the Go email service when configured.
 Every email includes a no-reply notice directing parents to contact the school.
 """
 
 import logging
 import os
-import requests
 from django.conf import settings
 
+from School_system.outbound_http import outbound
+
 logger = logging.getLogger(__name__)
 
 # ── Brand colours ─────────────────────────────────────────────────────────────
@@ -167,7 +169,7 @@ def _send(to: list[str], subject: str, html: str) -> bool:
     go_services_url = getattr(settings, 'GO_SERVICES_URL', '') or os.environ.get('GO_SERVICES_URL', '')
     if go_services_url:
         try:
-            resp = requests.post(
+            resp = outbound.post(
                 f"{go_services_url}/api/v1/services/email/send",
                 headers={
                     "Content-Type": "application/json",
@@ -198,7 +200,7 @@ def _send(to: list[str], subject: str, html: str) -> bool:
         return False
 
     try:
-        resp = requests.post(
+        resp = outbound.post(
             "https://api.resend.com/emails",
             headers={
                 "Authorization": f"Bearer {api_key}",
@@ -223,6 +225,85 @@ def _send(to: list[str], subject: str, html: str) -> bool:
         return False
 
 
+RESEND_BATCH_LIMIT = 100
+
+
+def _send_batch(messages: list[dict]) -> bool:
+    """
+    Send up to RESEND_BATCH_LIMIT individually addressed emails in one call.
+    messages: [{"to": [...], "subject": ..., "html": ...}]
+    Uses the Go batch endpoint when GO_SERVICES_URL is set, else Resend's
+    /emails/batch directly. Returns True only when the whole batch was accepted.
+    """
+    messages = [m for m in messages if m.get("to")]
+    if not messages:
+        return False
+    if len(messages) > RESEND_BATCH_LIMIT:
+        raise ValueError(f"At most {RESEND_BATCH_LIMIT} messages per batch")
+
+    go_services_url = getattr(settings, 'GO_SERVICES_URL', '') or os.environ.get('GO_SERVICES_URL', '')
+    if go_services_url:
+        try:
+            resp = outbound.post(
+                f"{go_services_url}/api/v1/services/email/batch",
+                headers={
+                    "Content-Type": "application/json",
+                    "X-Gateway-Auth": "true",
+                    "X-User-ID": "system",
+                },
+                json={"messages": messages},
+                timeout=30,
+            )
+            if resp.status_code in (200, 201, 202):
+                logger.info("Email batch of %s delegated to Go service", len(messages))
+                return True
+            logger.warning("Go email batch returned %s, falling back to direct send", resp.status_code)
+        except Exception as exc:
+            logger.warning("Go email service unavailable (%s), falling back to direct send", exc)
+
+    api_key   = getattr(settings, 'RESEND_API_KEY', '')
+    from_addr = getattr(settings, 'RESEND_FROM_EMAIL', 'noreply@myschoolhub.co.zw')
+
+    if not api_key:
+        logger.warning("RESEND_API_KEY not configured — email batch skipped")
+        return False
+
+    try:
+        resp = outbound.post(
+            "https://api.resend.com/emails/batch",
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type":  "application/json",
+            },
+            json=[{"from": from_addr, **m} for m in messages],
+            timeout=30,
+        )
+        if resp.status_code in (200, 201):
+            logger.info("Email batch of %s sent", len(messages))
+            return True
+        logger.error("Resend batch error %s: %s", resp.status_code, resp.text[:300])
+        return False
+    except Exception as exc:
+        logger.error("Email batch send failed: %s", exc)
+        return False
+
+
+def send_concurrently(jobs: list[tuple]) -> list[bool]:
+    """
+    Run independent sends concurrently on the outbound pool.
+    jobs: [(send_function, kwargs), ...]; a failing job returns False.
+    """
+    def run(job):
+        func, kwargs = job
+        try:
+            return bool(func(**kwargs))
+        except Exception as exc:
+            logger.error("%s failed: %s", getattr(func, "__name__", "email send"), exc)
+            return False
+
+    return outbound.map(run, jobs)
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Public API
 # ─────────────────────────────────────────────────────────────────────────────
@@ -663,11 +744,20 @@ def send_result_entered_email(*, parent_email: str, parent_name: str,
     )
 
 
-def send_announcement_email(*, parent_email: str, parent_name: str,
-                             school_name: str, student_name: str,
-                             class_name: str, announcement_title: str,
-                             announcement_body: str, posted_by: str) -> bool:
-    """School posts an announcement → notify parent."""
+ANNOUNCEMENT_PLACEHOLDERS = ("parent_name", "student_name", "class_name")
+
+
+def render_announcement_email(*, school_name: str, announcement_title: str,
+                              announcement_body: str, posted_by: str,
+                              parent_name: str = "{{parent_name}}",
+                              student_name: str = "{{student_name}}",
+                              class_name: str = "{{class_name}}") -> tuple[str, str]:
+    """
+    Render the announcement email, returning (subject, html).
+    Called without the per-recipient arguments it returns a template with
+    {{parent_name}}/{{student_name}}/{{class_name}} placeholders for
+    personalize_announcement_email(), so fan-out renders the shell once.
+    """
     body = f"""
       {_alert_badge("&#128226; New Announcement from " + school_name, "#172554")}
 
@@ -700,11 +790,32 @@ def send_announcement_email(*, parent_email: str, parent_name: str,
         body=body,
         school_name=school_name,
     )
-    return _send(
-        to=[parent_email],
-        subject=f"Announcement: {announcement_title} | {school_name}",
-        html=html,
+    return f"Announcement: {announcement_title} | {school_name}", html
+
+
+def personalize_announcement_email(template_html: str, **values: str) -> str:
+    """Fill the per-recipient placeholders of a render_announcement_email() template."""
+    html = template_html
+    for name in ANNOUNCEMENT_PLACEHOLDERS:
+        html = html.replace("{{" + name + "}}", values.get(name, ""))
+    return html
+
+
+def send_announcement_email(*, parent_email: str, parent_name: str,
+                             school_name: str, student_name: str,
+                             class_name: str, announcement_title: str,
+                             announcement_body: str, posted_by: str) -> bool:
+    """School posts an announcement → notify parent."""
+    subject, html = render_announcement_email(
+        school_name=school_name,
+        announcement_title=announcement_title,
+        announcement_body=announcement_body,
+        posted_by=posted_by,
+        parent_name=parent_name,
+        student_name=student_name,
+        class_name=class_name,
     )
+    return _send(to=[parent_email], subject=subject, html=html)
 
 
 def send_bulk_welcome_teacher(
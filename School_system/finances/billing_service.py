@@ -1,4 +1,5 @@
 import uuid
+from collections import defaultdict
 from datetime import date, timedelta
 from decimal import Decimal
 
@@ -21,9 +22,13 @@ def compute_record_additional_fees_total(record):
     return sum((to_decimal(f.amount) for f in get_unpaid_additional_fees_for_record(record)), Decimal('0'))
 
 
-def compute_record_totals(record):
+def compute_record_totals(record, additional_fees=None):
+    """Totals and status for a payment record; pass `additional_fees` when already loaded."""
     base_due = to_decimal(record.total_amount_due)
-    additional_due = compute_record_additional_fees_total(record)
+    if additional_fees is None:
+        additional_due = compute_record_additional_fees_total(record)
+    else:
+        additional_due = sum((to_decimal(f.amount) for f in additional_fees), Decimal('0'))
     total_due = base_due + additional_due
     amount_paid = to_decimal(record.amount_paid)
     balance = total_due - amount_paid
@@ -274,25 +279,372 @@ def ensure_three_term_invoices_for_student(student, school, academic_year, recor
     return touched
 
 
-def ensure_three_term_invoices_for_school(school, academic_year, recorded_by=None, grade_level=None):
-    if not school or not academic_year:
-        return 0
+def _transport_opt_ins(student_ids):
+    """IDs of students with a transport opt-in from a confirmed parent (2 queries)."""
+    from academics.models import ParentChildLink
+    from .models import TransportFeePreference
+
+    confirmed = set(
+        ParentChildLink.objects.filter(student_id__in=student_ids, is_confirmed=True)
+        .values_list('student_id', 'parent_id')
+    )
+    return {
+        student_id
+        for student_id, parent_id in TransportFeePreference.objects.filter(
+            student_id__in=student_ids, include_transport_fee=True,
+        ).values_list('student_id', 'parent_id')
+        if (student_id, parent_id) in confirmed
+    }
+
+
+def _invoice_changes(record, invoice, today):
+    """Fields of an existing invoice that drift from its record, as _sync_invoice_from_record applies them."""
+    total_due = to_decimal(record.total_amount_due)
+    paid_amount = to_decimal(record.amount_paid)
+    target = {
+        'total_amount': total_due,
+        'amount_paid': paid_amount,
+        'is_paid': paid_amount >= total_due,
+        'due_date': record.due_date or invoice.due_date or (today + timedelta(days=30)),
+    }
+    return {field: value for field, value in target.items() if getattr(invoice, field) != value}
+
+
+def _new_invoice(record, today):
+    total_due = to_decimal(record.total_amount_due)
+    paid_amount = to_decimal(record.amount_paid)
+    return Invoice(
+        student_id=record.student_id,
+        school_id=record.school_id,
+        invoice_number=f"INV-{uuid.uuid4().hex[:8].upper()}",
+        total_amount=total_due,
+        amount_paid=paid_amount,
+        due_date=record.due_date or (today + timedelta(days=30)),
+        is_paid=paid_amount >= total_due,
+        payment_record=record,
+        notes=f"Auto-generated invoice for {record.academic_year} {record.academic_term}",
+    )
+
+
+def _update_by_value(model, objs, fields, batch_size=500):
+    """
+    Write objs' fields with one UPDATE per distinct set of values. A fee change
+    moves whole grades to the same totals, so this is a handful of statements
+    where bulk_update would build a CASE arm per row.
+    """
+    groups = defaultdict(list)
+    for obj in objs:
+        groups[tuple(getattr(obj, field) for field in fields)].append(obj.pk)
+    for values, ids in groups.items():
+        for start in range(0, len(ids), batch_size):
+            model.objects.filter(pk__in=ids[start:start + batch_size]).update(**dict(zip(fields, values)))
+
+
+def _bill_student_chunk(students, school, academic_year, fees_by_grade, recorded_by, report, dry_run):
+    """Diff one chunk of students' term records and invoices in memory, then write it in one transaction."""
+    from django.db import transaction
+    from django.utils import timezone
+
+    student_ids = [student.id for student in students]
+    opted_in = _transport_opt_ins(student_ids)
+
+    records = {}
+    for record in StudentPaymentRecord.objects.filter(
+        school=school,
+        student_id__in=student_ids,
+        payment_type='school_fees',
+        payment_plan='one_term',
+        academic_year=academic_year,
+        academic_term__in=TERM_SEQUENCE,
+    ).order_by('id'):
+        records.setdefault((record.student_id, record.academic_term), record)
+
+    invoices = {}
+    for invoice in Invoice.objects.filter(
+        school=school, payment_record_id__in=[r.id for r in records.values()],
+    ).order_by('-issue_date', '-id'):
+        invoices.setdefault(invoice.payment_record_id, invoice)
+
+    now = timezone.now()
+    today = date.today()
+    new_records, changed_records, synced_records = [], [], []
+    for student in students:
+        fee_by_term, fallback_fee = fees_by_grade[student.student_class.grade_level]
+        for term in TERM_SEQUENCE:
+            fee_row = fee_by_term.get(term) or fallback_fee
+            total_due = _school_fee_total_for_student_term(
+                student=student,
+                school=school,
+                school_fee_row=fee_row,
+                transport_opted_in=student.id in opted_in,
+            )
+            record = records.get((student.id, term))
+            if record is None:
+                new_records.append(StudentPaymentRecord(
+                    school=school,
+                    student=student,
+                    payment_type='school_fees',
+                    payment_plan='one_term',
+                    academic_year=academic_year,
+                    academic_term=term,
+                    total_amount_due=total_due,
+                    amount_paid=Decimal('0'),
+                    currency=fee_row.currency or 'USD',
+                    payment_status='unpaid',
+                    recorded_by=recorded_by,
+                    covered_terms=[term],
+                ))
+                continue
+
+            synced_records.append(record)
+            # Freeze already-paid records so fee increases do not create extra debt.
+            if record.payment_status == 'paid' or to_decimal(record.amount_paid) >= to_decimal(record.total_amount_due):
+                report['records_frozen'] += 1
+                continue
+
+            changed = False
+            if to_decimal(record.total_amount_due) != total_due:
+                record.total_amount_due = total_due
+                changed = True
+            if record.currency != (fee_row.currency or record.currency):
+                record.currency = fee_row.currency or record.currency
+                changed = True
+            amount_paid = to_decimal(record.amount_paid)
+            if amount_paid >= to_decimal(record.total_amount_due):
+                status_value = 'paid'
+            elif amount_paid > 0:
+                status_value = 'partial'
+            else:
+                status_value = 'unpaid'
+            if record.payment_status != status_value:
+                record.payment_status = status_value
+                changed = True
+            if changed:
+                record.date_updated = now
+                changed_records.append(record)
+
+    changed_invoices = []
+    missing_invoices = []
+    for record in synced_records:
+        invoice = invoices.get(record.id)
+        if invoice is None:
+            missing_invoices.append(record)
+            continue
+        changes = _invoice_changes(record, invoice, today)
+        if changes:
+            for field, value in changes.items():
+                setattr(invoice, field, value)
+            changed_invoices.append(invoice)
+
+    report['records_created'] += len(new_records)
+    report['records_updated'] += len(changed_records)
+    report['invoices_created'] += len(new_records) + len(missing_invoices)
+    report['invoices_updated'] += len(changed_invoices)
+    report['amount_billed'] += sum((r.total_amount_due for r in new_records), Decimal('0'))
+    if dry_run:
+        return
+
+    with transaction.atomic():
+        new_records = StudentPaymentRecord.objects.bulk_create(new_records, batch_size=1000)
+        _update_by_value(
+            StudentPaymentRecord, changed_records, ['total_amount_due', 'currency', 'payment_status', 'date_updated'],
+        )
+        Invoice.objects.bulk_create(
+            [_new_invoice(r, today) for r in new_records + missing_invoices], batch_size=1000,
+        )
+        _update_by_value(Invoice, changed_invoices, ['total_amount', 'amount_paid', 'is_paid', 'due_date'])
+
 
+def bill_three_terms_for_school(school, academic_year, recorded_by=None, grade_level=None,
+                                dry_run=False, chunk_size=None):
+    """
+    Set-based version of ensure_three_term_invoices_for_student for a whole
+    school: fee structures load once, and each chunk of students costs a fixed
+    handful of reads (records, invoices, transport opt-ins) plus bulk writes in
+    one transaction. Returns a report of what was (or, with dry_run, would be)
+    created and updated.
+    """
+    from django.conf import settings
     from academics.models import Student
 
-    students = Student.objects.filter(user__school=school).select_related('student_class')
+    report = {
+        'dry_run': dry_run,
+        'students': 0,
+        'students_skipped': 0,
+        'records_created': 0,
+        'records_updated': 0,
+        'records_frozen': 0,
+        'invoices_created': 0,
+        'invoices_updated': 0,
+        'amount_billed': Decimal('0'),
+        'touched': 0,
+    }
+    if not school or not academic_year:
+        return report
+    academic_year = str(academic_year)
+    chunk_size = max(1, int(chunk_size or getattr(settings, 'BILLING_CHUNK_SIZE', 500)))
+
+    fees_by_grade = {}
+    for row in SchoolFees.objects.filter(school=school, academic_year=academic_year).order_by('grade_level', 'id'):
+        # (fee row per term, first row as the fallback for terms without one)
+        fee_by_term = fees_by_grade.setdefault(row.grade_level, ({}, row))[0]
+        fee_by_term.setdefault(row.academic_term, row)
+
+    students = Student.objects.filter(user__school=school).select_related('student_class').order_by('id')
     if grade_level is not None:
         students = students.filter(student_class__grade_level=grade_level)
 
-    touched = 0
+    chunk = []
+    for student in students.iterator(chunk_size=chunk_size):
+        report['students'] += 1
+        if not student.student_class_id or student.student_class.grade_level not in fees_by_grade:
+            report['students_skipped'] += 1
+            continue
+        chunk.append(student)
+        if len(chunk) >= chunk_size:
+            _bill_student_chunk(chunk, school, academic_year, fees_by_grade, recorded_by, report, dry_run)
+            chunk = []
+    if chunk:
+        _bill_student_chunk(chunk, school, academic_year, fees_by_grade, recorded_by, report, dry_run)
+
+    report['touched'] = report['records_created'] + report['records_updated']
+    if not dry_run and (report['touched'] or report['invoices_created'] or report['invoices_updated']):
+        # bulk writes skip the models' save() hooks.
+        from users.school_stats import invalidate_school_stats
+        from academics.dashboard_summary import invalidate_school_summaries
+        from .report_snapshot import invalidate_finance_snapshots
+        invalidate_school_stats(school.id)
+        invalidate_finance_snapshots(school.id)
+        invalidate_school_summaries(school.id)
+    return report
+
+
+def ensure_three_term_invoices_for_school(school, academic_year, recorded_by=None, grade_level=None):
+    """Create or refresh every student's three term records and invoices; returns the number touched."""
+    return bill_three_terms_for_school(
+        school, academic_year, recorded_by=recorded_by, grade_level=grade_level,
+    )['touched']
+
+
+def _latest_fee_by_grade(school):
+    """Each grade's most recent SchoolFees row, as get_latest_school_fee_for_student picks it (one query)."""
+    latest = {}
+    for row in SchoolFees.objects.filter(school=school).order_by('grade_level', '-academic_year', '-academic_term'):
+        latest.setdefault(row.grade_level, row)
+    return latest
+
+
+def _assign_student_fee_chunk(students, school, academic_year, academic_term, structures, latest_fees,
+                              fee_types, report):
+    """Create the missing StudentFee rows for one chunk of students in one transaction."""
+    from django.db import transaction
+    from .models import FeeType, StudentFee
+
+    student_ids = [student.id for student in students]
+    opted_in = _transport_opt_ins(student_ids)
+    existing = set(
+        StudentFee.objects.filter(
+            student_id__in=student_ids,
+            fee_type_id__in=[fee_type.id for fee_type in fee_types.values() if fee_type.pk],
+            academic_year=academic_year,
+            academic_term=academic_term,
+        ).values_list('student_id', 'fee_type_id')
+    )
+
+    new_fee_types = []
+    pending = []
     for student in students:
-        touched += ensure_three_term_invoices_for_student(
+        structure = structures[student.student_class.grade_level]
+        # Priced like build_school_fee_breakdown: the grade's latest fee row.
+        amount_due = _school_fee_total_for_student_term(
             student=student,
             school=school,
-            academic_year=academic_year,
-            recorded_by=recorded_by,
+            school_fee_row=latest_fees.get(student.student_class.grade_level),
+            transport_opted_in=student.id in opted_in,
         )
-    return touched
+        fee_type = fee_types.get(structure.grade_name)
+        if fee_type is None:
+            fee_type = FeeType(name=structure.grade_name, school=school, academic_year=academic_year, amount=amount_due)
+            fee_types[structure.grade_name] = fee_type
+            new_fee_types.append(fee_type)
+        elif fee_type.pk and (student.id, fee_type.pk) in existing:
+            report['existing'] += 1
+            continue
+        pending.append((student, fee_type, amount_due, structure.date_updated.date()))
+
+    with transaction.atomic():
+        FeeType.objects.bulk_create(new_fee_types)
+        StudentFee.objects.bulk_create(
+            [
+                StudentFee(
+                    student=student,
+                    fee_type=fee_type,
+                    academic_year=academic_year,
+                    academic_term=academic_term,
+                    amount_due=amount_due,
+                    due_date=due_date,
+                )
+                for student, fee_type, amount_due, due_date in pending
+            ],
+            batch_size=1000,
+        )
+    report['created'] += len(pending)
+
+
+def assign_term_student_fees(school, academic_year, academic_term, chunk_size=None, progress=None):
+    """
+    Give every student with a fee structure for the term a StudentFee under
+    their grade's FeeType, skipping ones that already exist. Fee structures,
+    fee types and latest fees load once; each chunk of students costs a few
+    reads and commits its own bulk insert, so a whole-school run never holds
+    one long transaction. progress(done, total) is called after each chunk.
+    Returns counts of students seen, skipped (no class or no structure),
+    fees created and fees already present.
+    """
+    from django.conf import settings
+    from academics.models import Student
+    from .models import FeeType
+
+    report = {'students': 0, 'students_skipped': 0, 'created': 0, 'existing': 0}
+    chunk_size = max(1, int(chunk_size or getattr(settings, 'BILLING_CHUNK_SIZE', 500)))
+
+    structures = {}
+    for row in SchoolFees.objects.filter(
+        school=school, academic_year=academic_year, academic_term=academic_term,
+    ).order_by('id'):
+        structures.setdefault(row.grade_level, row)
+    latest_fees = _latest_fee_by_grade(school)
+    fee_types = {}
+    for fee_type in FeeType.objects.filter(
+        school=school, academic_year=academic_year, name__in={row.grade_name for row in structures.values()},
+    ).order_by('id'):
+        fee_types.setdefault(fee_type.name, fee_type)
+
+    students = Student.objects.filter(user__school=school).select_related('student_class').order_by('id')
+    total = students.count()
+    chunk = []
+    for student in students.iterator(chunk_size=chunk_size):
+        report['students'] += 1
+        if not student.student_class_id or student.student_class.grade_level not in structures:
+            report['students_skipped'] += 1
+        else:
+            chunk.append(student)
+        if len(chunk) >= chunk_size:
+            _assign_student_fee_chunk(chunk, school, academic_year, academic_term, structures, latest_fees,
+                                      fee_types, report)
+            chunk = []
+            if progress:
+                progress(report['students'], total)
+    if chunk:
+        _assign_student_fee_chunk(chunk, school, academic_year, academic_term, structures, latest_fees,
+                                  fee_types, report)
+    if progress:
+        progress(report['students'], total)
+    if report['created']:
+        # bulk inserts skip StudentFee.save(); legacy dues feed the dashboard balance.
+        from academics.dashboard_summary import invalidate_school_summaries
+        invalidate_school_summaries(school.id)
+    return report
 
 
 def recalculate_student_school_fee_records(student, school):
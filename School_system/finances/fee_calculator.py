@@ -58,6 +58,45 @@ def get_unpaid_additional_fees_for_record(payment_record):
     return list(queryset.order_by('created_at', 'id'))
 
 
+def get_unpaid_additional_fees_for_records(payment_records):
+    """
+    {record_id: get_unpaid_additional_fees_for_record(record)} for many
+    records with one AdditionalFee query. Records need student loaded.
+    """
+    records = [record for record in payment_records if record.school_id]
+    fees_by_record = {record.pk: [] for record in payment_records}
+    if not records:
+        return fees_by_record
+
+    class_ids = {record.student.student_class_id for record in records}
+    audience = Q(student_id__in={record.student_id for record in records})
+    audience |= Q(student_class_id__in={cid for cid in class_ids if cid})
+    if None in class_ids:
+        audience |= Q(student_class__isnull=True)
+    candidates = list(
+        AdditionalFee.objects.filter(
+            school_id__in={record.school_id for record in records},
+            is_paid=False,
+            academic_year__in={record.academic_year for record in records},
+        ).filter(audience).order_by('created_at', 'id')
+    )
+    for record in records:
+        covered_terms = normalize_terms(getattr(record, 'covered_terms', []))
+        class_id = record.student.student_class_id
+        for fee in candidates:
+            if fee.school_id != record.school_id or fee.academic_year != record.academic_year:
+                continue
+            if fee.student_id != record.student_id and fee.student_class_id != class_id:
+                continue
+            if covered_terms:
+                if fee.academic_term not in covered_terms:
+                    continue
+            elif record.academic_term and fee.academic_term != record.academic_term:
+                continue
+            fees_by_record[record.pk].append(fee)
+    return fees_by_record
+
+
 def get_additional_fees_total_for_record(payment_record):
     return sum((_to_decimal(fee.amount) for fee in get_unpaid_additional_fees_for_record(payment_record)), Decimal('0'))
 
@@ -137,3 +176,73 @@ def build_school_fee_breakdown(student, school, parent=None):
         'transport_opted_in': transport_opted_in,
         'total_school_fee': total_school_fee,
     }
+
+
+def get_outstanding_fees_for_students(students):
+    """
+    {student_id: outstanding balance} for many students with set-based queries:
+    latest school fee (boarding, confirmed transport opt-in) + unpaid additional
+    fees + legacy StudentFee dues, less StudentFee and payment record payments.
+    Students need student_class and user loaded (select_related).
+    """
+    from collections import defaultdict
+    from django.db.models import Sum
+    from users.models import School
+    from .billing_service import _latest_fee_by_grade, _school_fee_total_for_student_term, _transport_opt_ins
+    from .models import StudentFee, StudentPaymentRecord
+
+    students = list(students)
+    if not students:
+        return {}
+    student_ids = [student.id for student in students]
+    opted_in = _transport_opt_ins(student_ids)
+
+    # One School query for the batch; student.user.school would load a school per student.
+    schools = School.objects.in_bulk({student.user.school_id for student in students if student.user.school_id})
+    latest_by_school = {school_id: _latest_fee_by_grade(school) for school_id, school in schools.items()}
+
+    legacy = {
+        row['student_id']: row
+        for row in StudentFee.objects.filter(student_id__in=student_ids)
+        .order_by().values('student_id').annotate(due=Sum('amount_due'), paid=Sum('amount_paid'))
+    }
+    records_paid = defaultdict(Decimal)
+    for student_id, school_id, paid in StudentPaymentRecord.objects.filter(
+        student_id__in=student_ids,
+    ).order_by().values('student_id', 'school_id').annotate(paid=Sum('amount_paid')).values_list(
+        'student_id', 'school_id', 'paid',
+    ):
+        records_paid[(student_id, school_id)] += _to_decimal(paid)
+
+    class_of = {student.id: student.student_class_id for student in students}
+    class_ids = {class_id for class_id in class_of.values() if class_id}
+    additional_by_student = defaultdict(Decimal)
+    additional_by_class = defaultdict(Decimal)
+    for fee_student_id, fee_class_id, school_id, amount in AdditionalFee.objects.filter(
+        is_paid=False,
+    ).filter(
+        Q(student_id__in=student_ids) | Q(student_class_id__in=class_ids)
+    ).values_list('student_id', 'student_class_id', 'school_id', 'amount'):
+        if fee_class_id in class_ids:
+            additional_by_class[(fee_class_id, school_id)] += _to_decimal(amount)
+        # A fee naming both the student and their class is already counted above.
+        if fee_student_id in class_of and not (fee_class_id and fee_class_id == class_of[fee_student_id]):
+            additional_by_student[(fee_student_id, school_id)] += _to_decimal(amount)
+
+    outstanding = {}
+    for student in students:
+        school_id = student.user.school_id
+        school = schools.get(school_id)
+        fee_row = None
+        if school_id and student.student_class_id:
+            fee_row = latest_by_school[school_id].get(student.student_class.grade_level)
+        legacy_row = legacy.get(student.id, {})
+        total = (
+            _school_fee_total_for_student_term(student, school, fee_row, transport_opted_in=student.id in opted_in)
+            + additional_by_student[(student.id, school_id)]
+            + additional_by_class[(student.student_class_id, school_id)]
+            + _to_decimal(legacy_row.get('due'))
+        )
+        paid = _to_decimal(legacy_row.get('paid')) + records_paid[(student.id, school_id)]
+        outstanding[student.id] = max(total - paid, Decimal('0'))
+    return outstanding
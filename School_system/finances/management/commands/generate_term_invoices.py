@@ -0,0 +1,56 @@
+"""
+Management command to create or refresh three-term school fee records and invoices.
+
+Usage:
+    python manage.py generate_term_invoices --school-id 3 --year 2026 --dry-run  # report only
+    python manage.py generate_term_invoices --school-id 3 --year 2026
+    python manage.py generate_term_invoices --school-id 3 --year 2026 --grade 4
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Bill every student in a school for all three terms of an academic year."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--school-id", type=int, required=True, help="School to bill.")
+        parser.add_argument("--year", required=True, help="Academic year, e.g. 2026.")
+        parser.add_argument("--grade", type=int, default=None, help="Restrict to one grade level (optional).")
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would be created and updated without writing anything.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=None, help="Students per transaction.")
+
+    def handle(self, *args, **options):
+        from users.models import School
+        from finances.billing_service import bill_three_terms_for_school
+
+        try:
+            school = School.objects.get(id=options["school_id"])
+        except School.DoesNotExist:
+            raise CommandError(f"School {options['school_id']} not found")
+
+        started = time.perf_counter()
+        report = bill_three_terms_for_school(
+            school,
+            options["year"],
+            grade_level=options["grade"],
+            dry_run=options["dry_run"],
+            chunk_size=options["chunk_size"],
+        )
+        elapsed = time.perf_counter() - started
+
+        label = "DRY RUN — nothing written" if report["dry_run"] else "Applied"
+        self.stdout.write(self.style.WARNING(label) if report["dry_run"] else self.style.SUCCESS(label))
+        self.stdout.write(f"  {school.name} {options['year']}")
+        for key in (
+            "students", "students_skipped", "records_created", "records_updated",
+            "records_frozen", "invoices_created", "invoices_updated", "amount_billed",
+        ):
+            self.stdout.write(f"  {key:<18} {report[key]}")
+        self.stdout.write(f"  took {elapsed:.2f}s")
@@ -0,0 +1,38 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0013_studentpaymentrecord_covered_terms_and_specific_plan'),
+        ('users', '0038_auditlog_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='financialreport',
+            name='breakdown',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='financialreport',
+            name='computed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='FinanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_year', models.CharField(max_length=20)),
+                ('academic_term', models.CharField(max_length=20)),
+                ('data', models.JSONField(default=dict)),
+                ('source_version', models.BigIntegerField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField()),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='finance_snapshots', to='users.school')),
+            ],
+            options={
+                'unique_together': {('school', 'academic_year', 'academic_term')},
+            },
+        ),
+    ]
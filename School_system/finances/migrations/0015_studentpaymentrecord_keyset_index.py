@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0014_financialreport_breakdown_financesnapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studentpaymentrecord',
+            index=models.Index(fields=['school', '-date_created', '-id'], name='finances_st_school__56ce5a_idx'),
+        ),
+    ]
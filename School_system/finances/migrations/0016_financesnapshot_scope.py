@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0015_studentpaymentrecord_keyset_index'),
+        ('users', '0039_auditlog_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='financesnapshot',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='financesnapshot',
+            name='scope',
+            field=models.CharField(blank=True, default='', help_text="'' for the whole school, 'class:<id>' for one class", max_length=32),
+        ),
+        migrations.AlterUniqueTogether(
+            name='financesnapshot',
+            unique_together={('school', 'scope', 'academic_year', 'academic_term')},
+        ),
+    ]
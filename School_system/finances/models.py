@@ -33,6 +33,18 @@ class StudentFee(models.Model):
     def __str__(self):
         """Return a human-readable string representation."""
         return f"{self.student.user.full_name} - {self.fee_type.name}"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from academics.dashboard_summary import invalidate_student_summaries
+        invalidate_student_summaries([self.student_id])
+
+    def delete(self, *args, **kwargs):
+        student_id = self.student_id
+        result = super().delete(*args, **kwargs)
+        from academics.dashboard_summary import invalidate_student_summaries
+        invalidate_student_summaries([student_id])
+        return result
     
     @property
     def balance(self):
@@ -89,6 +101,20 @@ class Invoice(models.Model):
     def __str__(self):
         """Return a human-readable string representation."""
         return f"Invoice {self.invoice_number} - {self.student.user.full_name}"
+
+    def save(self, *args, **kwargs):
+        """Persist and drop the cached dashboard counters for the school."""
+        super().save(*args, **kwargs)
+        from users.school_stats import invalidate_school_stats
+        invalidate_school_stats(self.school_id or self.student.user.school_id)
+
+    def delete(self, *args, **kwargs):
+        """Delete and drop the cached dashboard counters for the school."""
+        school_id = self.school_id or self.student.user.school_id
+        result = super().delete(*args, **kwargs)
+        from users.school_stats import invalidate_school_stats
+        invalidate_school_stats(school_id)
+        return result
     
     @property
     def balance(self):
@@ -157,6 +183,9 @@ class StudentPaymentRecord(models.Model):
     class Meta:
         """Represents Meta."""
         ordering = ['-date_created']
+        indexes = [
+            models.Index(fields=['school', '-date_created', '-id']),
+        ]
     
     @property
     def balance(self):
@@ -172,6 +201,28 @@ class StudentPaymentRecord(models.Model):
         """Return a human-readable string representation."""
         return f"{self.student.user.full_name} - {self.payment_type} ({self.payment_status})"
 
+    def save(self, *args, **kwargs):
+        """Persist and drop the school's cached counters, finance snapshots and the student's dashboard summary."""
+        super().save(*args, **kwargs)
+        from users.school_stats import invalidate_school_stats
+        from academics.dashboard_summary import invalidate_student_summaries
+        from .report_snapshot import invalidate_finance_snapshots
+        invalidate_school_stats(self.school_id)
+        invalidate_finance_snapshots(self.school_id)
+        invalidate_student_summaries([self.student_id])
+
+    def delete(self, *args, **kwargs):
+        """Delete and drop the school's cached counters, finance snapshots and the student's dashboard summary."""
+        school_id, student_id = self.school_id, self.student_id
+        result = super().delete(*args, **kwargs)
+        from users.school_stats import invalidate_school_stats
+        from academics.dashboard_summary import invalidate_student_summaries
+        from .report_snapshot import invalidate_finance_snapshots
+        invalidate_school_stats(school_id)
+        invalidate_finance_snapshots(school_id)
+        invalidate_student_summaries([student_id])
+        return result
+
 
 class PaymentTransaction(models.Model):
     """Represents PaymentTransaction."""
@@ -261,12 +312,31 @@ class FinancialReport(models.Model):
     generated_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     date_generated = models.DateTimeField(auto_now_add=True)
     file_path = models.CharField(max_length=500, blank=True)
+    breakdown = models.JSONField(default=dict, blank=True)
+    computed_at = models.DateTimeField(null=True, blank=True)
     
     def __str__(self):
         """Return a human-readable string representation."""
         return f"{self.title} - {self.report_type}"
 
 
+class FinanceSnapshot(models.Model):
+    """Stored expected/collected figures for one school term (finances/report_snapshot.py)."""
+    school = models.ForeignKey('users.School', on_delete=models.CASCADE, related_name='finance_snapshots')
+    scope = models.CharField(max_length=32, blank=True, default='', help_text="'' for the whole school, 'class:<id>' for one class")
+    academic_year = models.CharField(max_length=20)
+    academic_term = models.CharField(max_length=20)
+    data = models.JSONField(default=dict)
+    source_version = models.BigIntegerField(null=True, blank=True)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('school', 'scope', 'academic_year', 'academic_term')
+
+    def __str__(self):
+        return f"{self.school_id} {self.academic_year} {self.academic_term} @ {self.computed_at}"
+
+
 class SchoolExpense(models.Model):
     """Recurring school expense that requires admin approval before counting."""
     EXPENSE_FREQUENCY_CHOICES = [
@@ -346,6 +416,22 @@ class SchoolFees(models.Model):
         """Return a human-readable string representation."""
         return f"{self.grade_name} - {self.academic_term} {self.academic_year}: {self.currency}{self.total_fee}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from academics.dashboard_summary import invalidate_school_summaries
+        from .report_snapshot import invalidate_finance_snapshots
+        invalidate_finance_snapshots(self.school_id)
+        invalidate_school_summaries(self.school_id)
+
+    def delete(self, *args, **kwargs):
+        school_id = self.school_id
+        result = super().delete(*args, **kwargs)
+        from academics.dashboard_summary import invalidate_school_summaries
+        from .report_snapshot import invalidate_finance_snapshots
+        invalidate_finance_snapshots(school_id)
+        invalidate_school_summaries(school_id)
+        return result
+
 
 class TransportFeePreference(models.Model):
     """Per-parent opt-in/out setting for a child's transport fee."""
@@ -364,6 +450,22 @@ class TransportFeePreference(models.Model):
         status = 'Included' if self.include_transport_fee else 'Excluded'
         return f"Transport ({status}) - {self.parent.user.full_name} / {self.student.user.full_name}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from academics.dashboard_summary import invalidate_student_summaries
+        from .report_snapshot import invalidate_finance_snapshots
+        invalidate_finance_snapshots(self.student.user.school_id)
+        invalidate_student_summaries([self.student_id])
+
+    def delete(self, *args, **kwargs):
+        school_id, student_id = self.student.user.school_id, self.student_id
+        result = super().delete(*args, **kwargs)
+        from academics.dashboard_summary import invalidate_student_summaries
+        from .report_snapshot import invalidate_finance_snapshots
+        invalidate_finance_snapshots(school_id)
+        invalidate_student_summaries([student_id])
+        return result
+
 
 class AdditionalFee(models.Model):
     """Additional one-time fees that admin can add for students (e.g., trip fees, uniform, books)"""
@@ -390,3 +492,26 @@ class AdditionalFee(models.Model):
         """Return a human-readable string representation."""
         target = self.student.user.full_name if self.student else (self.student_class.name if self.student_class else 'All Students')
         return f"{self.fee_name} - {self.currency}{self.amount} ({target})"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .report_snapshot import invalidate_finance_snapshots
+        invalidate_finance_snapshots(self.school_id)
+        self._invalidate_dashboard_summaries(self.school_id, self.student_id)
+
+    def delete(self, *args, **kwargs):
+        school_id, student_id = self.school_id, self.student_id
+        result = super().delete(*args, **kwargs)
+        from .report_snapshot import invalidate_finance_snapshots
+        invalidate_finance_snapshots(school_id)
+        self._invalidate_dashboard_summaries(school_id, student_id)
+        return result
+
+    @staticmethod
+    def _invalidate_dashboard_summaries(school_id, student_id):
+        from academics.dashboard_summary import invalidate_school_summaries, invalidate_student_summaries
+        if student_id:
+            invalidate_student_summaries([student_id])
+        else:
+            # Class-wide and school-wide fees.
+            invalidate_school_summaries(school_id)
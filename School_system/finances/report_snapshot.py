@@ -0,0 +1,223 @@
+"""
+Stored per-term finance snapshots for the summary and class fee reports.
+
+finance_summary_view and class_fees_report used to rebuild every student's
+expected and collected amounts on each request. The figures are now computed
+once per (school, academic year, term) and stored in FinanceSnapshot:
+
+    snapshot = get_finance_snapshot(school, '2026', 'term_1')
+    snapshot.data['summary']                      # active students, school-wide
+    snapshot.data['classes'][str(class_id)]       # per-class totals and student rows
+    snapshot.data['by_payment_status']            # grouped payment record sums
+    snapshot.computed_at
+
+The one-class report does not need the whole school: while the school-wide
+snapshot is fresh it is read from there, otherwise a class-scoped snapshot
+(scope 'class:<id>', only that class's students) is computed and stored, so
+the first read after a payment costs one class rather than every student:
+
+    snapshot = get_finance_snapshot(school, '2026', 'term_1', class_id=cls.id)
+
+Expected amounts keep the rules in views._student_term_financials (boarding,
+transport opt-in, additional fees, multi-term plans); record-level figures
+come from grouped aggregation. A snapshot is served while its source version
+matches the school's current one and it is younger than
+FINANCE_SNAPSHOT_MAX_AGE_SECONDS; payment records, fee structures,
+additional fees, transport preferences and students bump the version on
+save/delete through invalidate_finance_snapshots(). generate_financial_report_task
+rebuilds snapshots in the background; a view that finds none fresh builds
+it inline.
+"""
+
+import logging
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def _version_key(school_id):
+    return f'finance_snapshot_version:{school_id}'
+
+
+def invalidate_finance_snapshots(school_id):
+    """Mark the school's stored finance snapshots as stale."""
+    if not school_id:
+        return
+    try:
+        cache.set(_version_key(school_id), time.time_ns(), None)
+    except Exception as exc:
+        logger.warning("Finance snapshot version bump failed for school %s: %s", school_id, exc)
+
+
+def _current_version(school_id):
+    """The school's snapshot version; a lost cache entry starts a new one."""
+    try:
+        version = cache.get(_version_key(school_id))
+        if version is None:
+            version = time.time_ns()
+            cache.add(_version_key(school_id), version, None)
+            version = cache.get(_version_key(school_id), version)
+        return version
+    except Exception as exc:
+        logger.warning("Finance snapshot version read failed for school %s: %s", school_id, exc)
+        return None
+
+
+def _money(value):
+    return str(Decimal(value).quantize(Decimal('0.01')))
+
+
+def _status(due, paid):
+    if due <= 0:
+        return 'no_fees'
+    if due - paid <= 0:
+        return 'paid'
+    if paid > 0:
+        return 'partial'
+    return 'unpaid'
+
+
+def _scope(class_id):
+    return f'class:{class_id}' if class_id else ''
+
+
+def compute_finance_breakdown(school, academic_year, academic_term, class_id=None):
+    """
+    Compute one term's snapshot data for a school (see module docstring for
+    the layout). With class_id only that class's students are computed and
+    'by_payment_status' is left empty.
+    """
+    from academics.models import Class, Student
+    from .models import StudentPaymentRecord
+    from .term_finance import normalize_term_key
+    from .views import _student_term_financials
+
+    students = Student.objects.filter(Q(user__school=school) | Q(student_class__school=school))
+    if class_id:
+        students = students.filter(student_class_id=class_id)
+    students = list(students.select_related('student_class', 'user').order_by('id'))
+    expected_map, collected_map = _student_term_financials(
+        students=students,
+        school=school,
+        academic_year=academic_year,
+        terms=[academic_term],
+    )
+
+    summary = {'expected': Decimal('0'), 'collected': Decimal('0'), 'paid': 0, 'partial': 0, 'unpaid': 0}
+    class_names = dict(Class.objects.filter(school=school).values_list('id', 'name'))
+    classes = {}
+    for student in students:
+        due = expected_map.get((student.id, academic_term), Decimal('0'))
+        paid = collected_map.get((student.id, academic_term), Decimal('0'))
+        state = _status(due, paid)
+        if student.user.is_active and student.user.school_id == school.id:
+            summary['expected'] += due
+            summary['collected'] += paid
+            if state != 'no_fees':
+                summary[state] += 1
+        if not student.student_class_id:
+            continue
+        entry = classes.setdefault(student.student_class_id, {
+            'class_name': class_names.get(student.student_class_id, student.student_class.name),
+            'total_students': 0, 'paid': 0, 'partial': 0, 'unpaid': 0,
+            'expected': Decimal('0'), 'collected': Decimal('0'), 'students': {},
+        })
+        entry['total_students'] += 1
+        entry['expected'] += due
+        entry['collected'] += paid
+        if state != 'no_fees':
+            entry[state] += 1
+        entry['students'][str(student.id)] = [_money(due), _money(paid)]
+
+    # Records may carry a term label ("Term 1") rather than its key.
+    by_status = {}
+    status_rows = StudentPaymentRecord.objects.none() if class_id else StudentPaymentRecord.objects.filter(
+        school=school, academic_year=academic_year,
+    )
+    for row in status_rows.values('academic_term', 'payment_status').annotate(
+        records=Count('id'),
+        amount_due=Sum('total_amount_due'),
+        amount_paid=Sum('amount_paid'),
+    ).order_by('payment_status'):
+        if normalize_term_key(row['academic_term']) != academic_term:
+            continue
+        entry = by_status.setdefault(row['payment_status'], {
+            'payment_status': row['payment_status'], 'records': 0,
+            'amount_due': Decimal('0'), 'amount_paid': Decimal('0'),
+        })
+        entry['records'] += row['records']
+        entry['amount_due'] += row['amount_due'] or Decimal('0')
+        entry['amount_paid'] += row['amount_paid'] or Decimal('0')
+    by_payment_status = [
+        {**entry, 'amount_due': _money(entry['amount_due']), 'amount_paid': _money(entry['amount_paid'])}
+        for entry in by_status.values()
+    ]
+
+    for entry in [summary, *classes.values()]:
+        entry['expected'] = _money(entry['expected'])
+        entry['collected'] = _money(entry['collected'])
+    return {
+        'academic_year': str(academic_year),
+        'academic_term': academic_term,
+        'summary': summary,
+        'classes': {str(class_id): entry for class_id, entry in classes.items()},
+        'by_payment_status': by_payment_status,
+    }
+
+
+def build_finance_snapshot(school, academic_year, academic_term, class_id=None):
+    """Recompute and store one term's snapshot (school-wide, or one class with class_id)."""
+    from .models import FinanceSnapshot
+
+    version = _current_version(school.id)
+    data = compute_finance_breakdown(school, academic_year, academic_term, class_id=class_id)
+    snapshot, _ = FinanceSnapshot.objects.update_or_create(
+        school=school,
+        scope=_scope(class_id),
+        academic_year=str(academic_year),
+        academic_term=academic_term,
+        defaults={'data': data, 'source_version': version, 'computed_at': timezone.now()},
+    )
+    return snapshot
+
+
+def _fresh(snapshot, version):
+    max_age = int(getattr(settings, 'FINANCE_SNAPSHOT_MAX_AGE_SECONDS', 900) or 0)
+    return (
+        snapshot is not None
+        and max_age
+        and snapshot.source_version is not None
+        and snapshot.source_version == version
+        and snapshot.computed_at >= timezone.now() - timedelta(seconds=max_age)
+    )
+
+
+def get_finance_snapshot(school, academic_year, academic_term, refresh=False, class_id=None):
+    """
+    The stored snapshot for the term if still fresh, otherwise a rebuilt one.
+    With class_id a fresh school-wide snapshot is preferred; failing that only
+    the class is rebuilt.
+    """
+    from .models import FinanceSnapshot
+
+    if not refresh:
+        version = _current_version(school.id)
+        snapshots = {
+            snapshot.scope: snapshot
+            for snapshot in FinanceSnapshot.objects.filter(
+                school=school, academic_year=str(academic_year), academic_term=academic_term,
+                scope__in={'', _scope(class_id)},
+            )
+        }
+        for scope in dict.fromkeys(['', _scope(class_id)]):
+            if _fresh(snapshots.get(scope), version):
+                return snapshots[scope]
+    return build_finance_snapshot(school, academic_year, academic_term, class_id=class_id)
+
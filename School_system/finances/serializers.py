@@ -16,13 +16,14 @@ import uuid
 from datetime import date
 from decimal import Decimal
 
-from .fee_calculator import get_transport_opt_in, get_unpaid_additional_fees_for_record
+from .fee_calculator import get_transport_opt_in, get_unpaid_additional_fees_for_records
 from .billing_service import (
     compute_record_totals,
     settle_additional_fees_for_record,
     to_decimal,
 )
 from .term_finance import TERM_SEQUENCE, normalize_term_key, term_display, resolve_terms_for_plan
+from School_system.serializer_prefetch import PrefetchPlanMixin, batched
 
 
 class FeeTypeSerializer(serializers.ModelSerializer):
@@ -101,8 +102,9 @@ class FinancialReportSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'title', 'report_type', 'academic_year', 'academic_term',
             'total_revenue', 'total_expenses', 'net_profit', 'generated_by',
-            'generated_by_name', 'date_generated', 'file_path'
+            'generated_by_name', 'date_generated', 'file_path', 'breakdown', 'computed_at'
         ]
+        read_only_fields = ['breakdown', 'computed_at']
 
     def get_net_profit(self, obj):
         """Return net profit."""
@@ -255,8 +257,9 @@ class AdditionalFeeSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_by', 'created_at']
 
 
-class PaymentTransactionSerializer(serializers.ModelSerializer):
+class PaymentTransactionSerializer(PrefetchPlanMixin, serializers.ModelSerializer):
     """Represents PaymentTransactionSerializer."""
+    select_related_plan = ('processed_by',)
     processed_by_name = serializers.CharField(source='processed_by.full_name', read_only=True)
     
     class Meta:
@@ -270,8 +273,24 @@ class PaymentTransactionSerializer(serializers.ModelSerializer):
         read_only_fields = ['processed_by', 'payment_date']
 
 
-class StudentPaymentRecordSerializer(serializers.ModelSerializer):
+def _latest_invoice_numbers(records):
+    """{record_id: newest invoice number} for a page of payment records."""
+    school_of = {record.pk: record.school_id for record in records}
+    numbers = {}
+    for record_id, school_id, number in (
+        Invoice.objects
+        .filter(payment_record_id__in=list(school_of))
+        .order_by('-issue_date', '-id')
+        .values_list('payment_record_id', 'school_id', 'invoice_number')
+    ):
+        if school_id == school_of[record_id] and record_id not in numbers:
+            numbers[record_id] = number
+    return numbers
+
+
+class StudentPaymentRecordSerializer(PrefetchPlanMixin, serializers.ModelSerializer):
     """Represents StudentPaymentRecordSerializer."""
+    select_related_plan = ('student__user', 'student__student_class', 'recorded_by', 'school')
     student_name = serializers.CharField(source='student.user.full_name', read_only=True)
     student_number = serializers.CharField(source='student.user.student_number', read_only=True)
     class_name = serializers.CharField(source='student.student_class.name', read_only=True)
@@ -285,17 +304,25 @@ class StudentPaymentRecordSerializer(serializers.ModelSerializer):
     included_terms = serializers.SerializerMethodField()
     invoice_number = serializers.SerializerMethodField()
     
+    @batched(get_unpaid_additional_fees_for_records)
+    def _unpaid_additional_fees(self, obj, additional_fees):
+        """Unpaid additional fees for the record, loaded for the whole page."""
+        return additional_fees or []
+
+    def _totals(self, obj):
+        return compute_record_totals(obj, additional_fees=self._unpaid_additional_fees(obj))
+
     def get_additional_fees_total(self, obj):
         """Return additional fees total."""
-        return float(compute_record_totals(obj)['additional_due'])
+        return float(self._totals(obj)['additional_due'])
     
     def get_total_amount_due(self, obj):
         """Return total amount due."""
-        return float(compute_record_totals(obj)['total_due'])
+        return float(self._totals(obj)['total_due'])
     
     def get_balance(self, obj):
         """Return balance."""
-        return float(compute_record_totals(obj)['balance'])
+        return float(self._totals(obj)['balance'])
     
     def get_is_fully_paid(self, obj):
         """Return is fully paid."""
@@ -303,7 +330,7 @@ class StudentPaymentRecordSerializer(serializers.ModelSerializer):
     
     def get_additional_fees_list(self, obj):
         """Return additional fees list."""
-        additional_fees = get_unpaid_additional_fees_for_record(obj)
+        additional_fees = self._unpaid_additional_fees(obj)
         return [{'name': f.fee_name, 'amount': float(f.amount), 'reason': f.reason} for f in additional_fees]
 
     def get_included_terms(self, obj):
@@ -317,15 +344,10 @@ class StudentPaymentRecordSerializer(serializers.ModelSerializer):
             for term in terms
         ]
 
-    def get_invoice_number(self, obj):
-        invoice = (
-            Invoice.objects
-            .filter(payment_record=obj, school=obj.school)
-            .order_by('-issue_date', '-id')
-            .values_list('invoice_number', flat=True)
-            .first()
-        )
-        return invoice or ''
+    @batched(_latest_invoice_numbers)
+    def get_invoice_number(self, obj, invoice_number):
+        """Return invoice number."""
+        return invoice_number or ''
     
     class Meta:
         """Represents Meta."""
@@ -15,11 +15,17 @@ def generate_financial_report_task(self, report_id: int):
     """
     Populate aggregated figures on an already-created FinancialReport record.
     The view creates the shell record and enqueues this task; the frontend
-    can poll the record for completion.
+    can poll the record for completion. Besides total_revenue, the report
+    stores a per-term breakdown (school summary, per class, per payment
+    status, expected vs collected) and refreshes the finance snapshots the
+    summary and class fee views read.
     """
     try:
         from django.db.models import Sum, Q
+        from django.utils import timezone
         from .models import FinancialReport, StudentPaymentRecord
+        from .report_snapshot import build_finance_snapshot
+        from .term_finance import TERM_SEQUENCE, normalize_term_key
 
         report = FinancialReport.objects.select_related('generated_by__school').get(id=report_id)
         school = report.generated_by.school
@@ -32,8 +38,24 @@ def generate_financial_report_task(self, report_id: int):
             total_revenue=Sum('amount_paid'),
         )
 
+        term = normalize_term_key(report.academic_term)
+        terms = [term] if term else list(TERM_SEQUENCE)
+        breakdown = {'terms': {}}
+        for term in terms:
+            data = build_finance_snapshot(school, report.academic_year, term).data
+            breakdown['terms'][term] = {
+                'summary': data['summary'],
+                'by_payment_status': data['by_payment_status'],
+                'classes': {
+                    class_id: {key: value for key, value in entry.items() if key != 'students'}
+                    for class_id, entry in data['classes'].items()
+                },
+            }
+
         report.total_revenue = agg['total_revenue'] or 0
-        report.save(update_fields=['total_revenue'])
+        report.breakdown = breakdown
+        report.computed_at = timezone.now()
+        report.save(update_fields=['total_revenue', 'breakdown', 'computed_at'])
 
         logger.info("Financial report %s generated for school %s", report_id, school)
         return report_id
@@ -49,60 +71,25 @@ def generate_financial_report_task(self, report_id: int):
 def bulk_assign_fees_task(self, school_id: int, academic_year: str, academic_term: str):
     """
     Assign school fees to all students for a given academic term.
-    Runs as a background task to avoid blocking the HTTP request.
+    Runs as a background task to avoid blocking the HTTP request. Students are
+    written in committed chunks (BILLING_CHUNK_SIZE), so a retry picks up
+    where a failed run stopped; progress is published as PROGRESS task state.
     """
     try:
-        from django.db import transaction
         from users.models import School
-        from academics.models import Student
-        from datetime import date
-        from .models import SchoolFees, StudentFee, FeeType
-        from .fee_calculator import build_school_fee_breakdown
+        from .billing_service import assign_term_student_fees
 
         school = School.objects.get(id=school_id)
-        fee_structures = SchoolFees.objects.filter(
-            school=school,
-            academic_year=academic_year,
-            academic_term=academic_term,
-        )
 
-        students = Student.objects.filter(
-            user__school=school
-        ).select_related('student_class', 'user')
-
-        created_count = 0
-        with transaction.atomic():
-            for student in students:
-                grade_level = student.student_class.grade_level if student.student_class else None
-                if grade_level is None:
-                    continue
-                fee_structure = fee_structures.filter(grade_level=grade_level).first()
-                if not fee_structure:
-                    continue
-                fee_breakdown = build_school_fee_breakdown(student, school)
-                student_amount_due = fee_breakdown['total_school_fee']
-                fee_type, _ = FeeType.objects.get_or_create(
-                    name=fee_structure.grade_name,
-                    school=school,
-                    academic_year=academic_year,
-                    defaults={'amount': student_amount_due},
-                )
-                _, created = StudentFee.objects.get_or_create(
-                    student=student,
-                    fee_type=fee_type,
-                    academic_year=academic_year,
-                    academic_term=academic_term,
-                    defaults={
-                        'amount_due': student_amount_due,
-                        'due_date': fee_structure.date_updated.date() if hasattr(fee_structure, 'date_updated') else date.today(),
-                    },
-                )
-                if created:
-                    created_count += 1
-
-        logger.info("Assigned fees to %d students for %s %s in school %s",
-                    created_count, academic_year, academic_term, school)
-        return created_count
+        def progress(done, total):
+            self.update_state(state='PROGRESS', meta={'done': done, 'total': total})
+
+        report = assign_term_student_fees(school, academic_year, academic_term, progress=progress)
+
+        logger.info("Assigned fees to %d students for %s %s in school %s (%d already assigned, %d skipped)",
+                    report['created'], academic_year, academic_term, school,
+                    report['existing'], report['students_skipped'])
+        return report['created']
 
     except Exception as exc:
         logger.error("Error in bulk_assign_fees_task: %s", exc)
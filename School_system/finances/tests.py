@@ -24,6 +24,7 @@ from rest_framework.test import APITestCase, APIClient
 from users.models import CustomUser, School, SchoolSettings
 from academics.models import Class, Parent, ParentChildLink, Student, Teacher
 from staff.models import Staff, Payroll
+from School_system.testing import QueryCountAssertionsMixin
 from finances.models import (
     AdditionalFee,
     FeeType,
@@ -292,6 +293,29 @@ class StudentPaymentRecordModelTest(TestCase):
         with self.assertRaises(ValidationError):
             record.full_clean()
 
+    def test_outstanding_fees_query_count_independent_of_student_count(self):
+        """Test that the batched outstanding-fee lookup loads the school once, not per student."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from finances.fee_calculator import get_outstanding_fees_for_students
+
+        SchoolFees.objects.create(
+            school=self.school, grade_level=self.cls.grade_level, grade_name=self.cls.name,
+            tuition_fee=Decimal("500.00"), levy_fee=Decimal("0.00"), sports_fee=Decimal("0.00"),
+            computer_fee=Decimal("0.00"), other_fees=Decimal("0.00"),
+            academic_year="2026", academic_term="term_1",
+        )
+        make_student(self.school, self.cls, username="spr_student2", student_number="SPR002")
+        make_student(self.school, self.cls, username="spr_student3", student_number="SPR003")
+        students = Student.objects.select_related("user", "student_class")
+
+        with CaptureQueriesContext(connection) as one:
+            get_outstanding_fees_for_students(students.filter(id=self.student.id))
+        with CaptureQueriesContext(connection) as three:
+            outstanding = get_outstanding_fees_for_students(students.filter(student_class=self.cls))
+        self.assertEqual(len(one), len(three))
+        self.assertEqual(set(outstanding.values()), {Decimal("500.00")})
+
 
 # ---------------------------------------------------------------------------
 # API tests — Student Fees list
@@ -355,7 +379,7 @@ class StudentFeeAPITest(APITestCase):
 # API tests — Payment Records
 # ---------------------------------------------------------------------------
 
-class PaymentRecordAPITest(APITestCase):
+class PaymentRecordAPITest(QueryCountAssertionsMixin, APITestCase):
 
     """Represents PaymentRecordAPITest."""
     def setUp(self):
@@ -595,6 +619,49 @@ class PaymentRecordAPITest(APITestCase):
         response_forbidden = self.client.delete(f"{self.url}{restricted_record.id}/")
         self.assertEqual(response_forbidden.status_code, status.HTTP_403_FORBIDDEN)
 
+    def test_list_payment_records_query_count_does_not_grow_with_records(self):
+        from finances.fee_calculator import get_unpaid_additional_fees_for_record
+
+        added = []
+
+        def add_record():
+            idx = len(added) + 1
+            student = make_student(self.school, self.cls, username=f"pr_qc{idx}", student_number=f"PRQ{idx:03d}")
+            record = StudentPaymentRecord.objects.create(
+                student=student, school=self.school, payment_type="school_fees", payment_plan="one_term",
+                academic_year="2026", academic_term="term_1", total_amount_due=Decimal("500.00"),
+                amount_paid=Decimal("100.00"), payment_status="partial", recorded_by=self.admin,
+            )
+            AdditionalFee.objects.create(
+                school=self.school, student=student, fee_name=f"Trip {idx}", amount=Decimal("25.00"),
+                academic_year="2026", academic_term="term_1", created_by=self.admin,
+            )
+            added.append(record)
+
+        add_record()
+        AdditionalFee.objects.create(
+            school=self.school, student_class=self.cls, fee_name="Class levy",
+            amount=Decimal("10.00"), academic_year="2026", academic_term="term_1", created_by=self.admin,
+        )
+        self.client.force_authenticate(user=self.admin)
+
+        def fetch():
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertQueryCountStable(fetch, lambda: [add_record() for _ in range(3)])
+
+        rows = {row["id"]: row for row in get_list(self.client.get(self.url).data)}
+        for record in added:
+            expected = get_unpaid_additional_fees_for_record(record)
+            self.assertEqual(
+                [fee["name"] for fee in rows[record.id]["additional_fees_list"]],
+                [fee.fee_name for fee in expected],
+            )
+            self.assertEqual(rows[record.id]["total_amount_due"], 535.0)
+            self.assertEqual(rows[record.id]["balance"], 435.0)
+            self.assertTrue(rows[record.id]["invoice_number"].startswith("INV-"))
+
 
 # ---------------------------------------------------------------------------
 # API tests — Bulk fee CSV import
@@ -647,7 +714,7 @@ class BulkFeeImportAPITest(APITestCase):
             "academic_term": "Term 1",
         }])
         self.client.force_authenticate(user=self.admin)
-        with patch("academics.views.requests.post", return_value=self._mock_worker_ok(created=1)):
+        with patch("academics.views.outbound.post", return_value=self._mock_worker_ok(created=1)):
             response = self.client.post(
                 self.url,
                 {"import_type": "fees", "file": csv_file},
@@ -667,7 +734,7 @@ class BulkFeeImportAPITest(APITestCase):
             "academic_term": "Term 1",
         }])
         self.client.force_authenticate(user=self.accountant)
-        with patch("academics.views.requests.post", return_value=self._mock_worker_ok(created=1)):
+        with patch("academics.views.outbound.post", return_value=self._mock_worker_ok(created=1)):
             response = self.client.post(
                 self.url,
                 {"import_type": "fees", "file": csv_file},
@@ -685,7 +752,7 @@ class BulkFeeImportAPITest(APITestCase):
             "academic_term": "Term 1",
         }])
         self.client.force_authenticate(user=self.admin)
-        with patch("academics.views.requests.post", return_value=self._mock_worker_ok(created=0, errors=[{"row": 2, "error": "Student not found"}])):
+        with patch("academics.views.outbound.post", return_value=self._mock_worker_ok(created=0, errors=[{"row": 2, "error": "Student not found"}])):
             response = self.client.post(
                 self.url,
                 {"import_type": "fees", "file": csv_file},
@@ -916,6 +983,78 @@ class FinanceSummaryAndExpensesAPITest(APITestCase):
         self.assertEqual(float(response.data["term_total_expenses"]), 7480.0)
         self.assertEqual(float(response.data["term_profit"]), 2520.0)
 
+    def test_finance_summary_serves_snapshot_until_a_payment_changes(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self.client.force_authenticate(user=self.accountant)
+        first = self.client.get("/api/v1/finances/summary/")
+        self.assertEqual(first.data["term_collected_revenue"], Decimal("650.00"))
+        self.assertEqual(first.data["term_partial_students"], 1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            cached = self.client.get("/api/v1/finances/summary/")
+        self.assertEqual(cached.data["computed_at"], first.data["computed_at"])
+        self.assertFalse(any("academics_student" in q["sql"] for q in ctx.captured_queries))
+
+        record = StudentPaymentRecord.objects.get(student=self.student)
+        record.amount_paid = Decimal("1000.00")
+        record.payment_status = "paid"
+        record.save()
+        fresh = self.client.get("/api/v1/finances/summary/")
+        self.assertEqual(fresh.data["term_collected_revenue"], Decimal("1000.00"))
+        self.assertEqual(fresh.data["term_paid_students"], 1)
+
+        class_report = self.client.get(f"/api/v1/finances/payment-records/class-report/?class_id={self.cls.id}")
+        report = class_report.data["reports"][0]
+        self.assertEqual(report["paid_count"], 1)
+        self.assertEqual(report["computed_at"], fresh.data["computed_at"])
+
+    def test_class_fees_report_rebuilds_only_its_class_after_a_payment(self):
+        from finances.models import FinanceSnapshot
+
+        other_cls = make_class(self.school, name="Form 2B")
+        make_student(self.school, other_cls, username="fin_sum_other", student_number="FINSUM002")
+        self.client.force_authenticate(user=self.accountant)
+        self.client.get("/api/v1/finances/summary/")
+        school_snapshot = FinanceSnapshot.objects.get(school=self.school, scope="")
+
+        record = StudentPaymentRecord.objects.get(student=self.student)
+        record.amount_paid = Decimal("1000.00")
+        record.payment_status = "paid"
+        record.save()
+        response = self.client.get(f"/api/v1/finances/payment-records/class-report/?class_id={self.cls.id}")
+
+        report = response.data["reports"][0]
+        self.assertEqual((report["paid_count"], report["total_students"]), (1, 1))
+        class_snapshot = FinanceSnapshot.objects.get(school=self.school, scope=f"class:{self.cls.id}")
+        self.assertEqual(list(class_snapshot.data["classes"]), [str(self.cls.id)])
+        self.assertEqual(report["computed_at"], class_snapshot.computed_at)
+        school_snapshot.refresh_from_db()
+        self.assertLess(school_snapshot.computed_at, class_snapshot.computed_at)
+
+    def test_financial_report_task_stores_breakdown(self):
+        from finances.models import FinancialReport
+        from finances.tasks import generate_financial_report_task
+
+        report = FinancialReport.objects.create(
+            title="Term 1", report_type="quarterly", academic_year="2026", academic_term="term_1",
+            total_revenue=Decimal("0"), generated_by=self.accountant,
+        )
+        generate_financial_report_task.apply(args=(report.id,))
+
+        report.refresh_from_db()
+        self.assertIsNotNone(report.computed_at)
+        term = report.breakdown["terms"]["term_1"]
+        self.assertEqual(Decimal(term["summary"]["expected"]), Decimal("1000.00"))
+        self.assertEqual(Decimal(term["summary"]["collected"]), Decimal("650.00"))
+        self.assertEqual(term["classes"][str(self.cls.id)]["partial"], 1)
+        self.assertNotIn("students", term["classes"][str(self.cls.id)])
+        self.assertEqual(
+            term["by_payment_status"],
+            [{"payment_status": "partial", "records": 1, "amount_due": "1000.00", "amount_paid": "650.00"}],
+        )
+
 
 class PaymentTransactionRecordingAPITest(APITestCase):
     """Ensures local and PayNow payments both create transaction ledger rows."""
@@ -1132,6 +1271,120 @@ class SchoolFeeInvoiceBootstrapTest(APITestCase):
         self.assertEqual(record.total_amount_due, Decimal("130.00"))
 
 
+class BulkTermInvoicingTest(TestCase):
+    """School-wide three-term billing: dry run, bounded queries and idempotent re-runs."""
+
+    def setUp(self):
+        self.school = make_school("Bulk Billing School")
+        self.admin = make_user(self.school, "bulk_bill_admin", role="admin")
+        self.cls = make_class(self.school, name="Form 4A", grade_level=4)
+        self.other_cls = make_class(self.school, name="Form 5A", grade_level=5)   # no fee structure
+        self.students = [
+            make_student(self.school, self.cls, username=f"bulk_bill_{i}", student_number=f"BB{i:03d}")
+            for i in range(6)
+        ]
+        make_student(self.school, self.other_cls, username="bulk_bill_unbilled", student_number="BB999")
+        self.fee = SchoolFees.objects.create(
+            school=self.school, grade_level=4, grade_name="Form 4",
+            tuition_fee=Decimal("100.00"), levy_fee=Decimal("0.00"), sports_fee=Decimal("0.00"),
+            computer_fee=Decimal("0.00"), other_fees=Decimal("0.00"), boarding_fee=Decimal("0.00"),
+            transport_fee=Decimal("20.00"), academic_year="2026", academic_term="term_1",
+            currency="USD", created_by=self.admin,
+        )
+        parent = Parent.objects.create(user=make_user(self.school, "bulk_bill_parent", role="parent"))
+        ParentChildLink.objects.create(parent=parent, student=self.students[0], is_confirmed=True)
+        TransportFeePreference.objects.create(
+            parent=parent, student=self.students[0], include_transport_fee=True,
+        )
+
+    def test_dry_run_reports_without_writing(self):
+        from finances.billing_service import bill_three_terms_for_school
+
+        report = bill_three_terms_for_school(self.school, "2026", dry_run=True)
+
+        self.assertEqual(report["students"], 7)
+        self.assertEqual(report["students_skipped"], 1)
+        self.assertEqual((report["records_created"], report["invoices_created"]), (18, 18))
+        self.assertEqual(report["amount_billed"], Decimal("1860.00"))
+        self.assertFalse(StudentPaymentRecord.objects.exists())
+        self.assertFalse(Invoice.objects.exists())
+
+    def test_billing_uses_a_fixed_number_of_queries_per_chunk(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from finances.billing_service import bill_three_terms_for_school
+
+        with CaptureQueriesContext(connection) as ctx:
+            report = bill_three_terms_for_school(self.school, "2026", recorded_by=self.admin, chunk_size=3)
+
+        # fee rows + students, then per chunk of 3: links, preferences, records,
+        # invoices, bulk inserts, plus savepoints.
+        self.assertLessEqual(len(ctx.captured_queries), 20)
+        self.assertEqual(report["touched"], 18)
+        records = StudentPaymentRecord.objects.filter(school=self.school, payment_type="school_fees")
+        self.assertEqual(records.count(), 18)
+        self.assertEqual(
+            set(records.filter(student=self.students[0]).values_list("total_amount_due", flat=True)),
+            {Decimal("120.00")},
+        )
+        self.assertEqual(Invoice.objects.filter(payment_record__in=records).count(), 18)
+
+    def test_rerun_refreshes_unpaid_terms_and_is_idempotent(self):
+        from finances.billing_service import bill_three_terms_for_school
+
+        bill_three_terms_for_school(self.school, "2026")
+        paid = StudentPaymentRecord.objects.get(student=self.students[1], academic_term="term_1")
+        paid.amount_paid = Decimal("100.00")
+        paid.payment_status = "paid"
+        paid.save(update_fields=["amount_paid", "payment_status", "date_updated"])
+        self.fee.tuition_fee = Decimal("150.00")
+        self.fee.save()
+
+        report = bill_three_terms_for_school(self.school, "2026")
+
+        self.assertEqual(report["records_created"], 0)
+        self.assertEqual(report["records_updated"], 17)
+        self.assertEqual(report["records_frozen"], 1)
+        paid.refresh_from_db()
+        self.assertEqual(paid.total_amount_due, Decimal("100.00"))
+        invoice = Invoice.objects.get(payment_record=paid)
+        self.assertTrue(invoice.is_paid)
+        self.assertEqual(invoice.amount_paid, Decimal("100.00"))
+        self.assertEqual(
+            Invoice.objects.get(payment_record__student=self.students[2], payment_record__academic_term="term_2").total_amount,
+            Decimal("150.00"),
+        )
+
+        again = bill_three_terms_for_school(self.school, "2026")
+        self.assertEqual((again["touched"], again["invoices_created"], again["invoices_updated"]), (0, 0, 0))
+
+    def test_bulk_assign_fees_task_writes_chunks_and_skips_existing(self):
+        from finances.tasks import bulk_assign_fees_task
+
+        existing_type = FeeType.objects.create(
+            name="Form 4", school=self.school, academic_year="2026", amount=Decimal("100.00"),
+        )
+        StudentFee.objects.create(
+            student=self.students[5], fee_type=existing_type, amount_due=Decimal("100.00"),
+            due_date=datetime.date(2026, 1, 15), academic_year="2026", academic_term="term_1",
+        )
+        states = []
+        with self.settings(BILLING_CHUNK_SIZE=2), \
+                patch.object(bulk_assign_fees_task, "update_state", side_effect=lambda **kw: states.append(kw["meta"])):
+            created = bulk_assign_fees_task.apply(args=(self.school.id, "2026", "term_1")).get()
+
+        self.assertEqual(created, 5)
+        self.assertEqual(FeeType.objects.filter(school=self.school).count(), 1)
+        fees = StudentFee.objects.filter(fee_type=existing_type, academic_term="term_1")
+        self.assertEqual(fees.count(), 6)
+        self.assertEqual(fees.get(student=self.students[0]).amount_due, Decimal("120.00"))
+        self.assertEqual(fees.get(student=self.students[1]).amount_due, Decimal("100.00"))
+        self.assertEqual(states[-1], {"done": 7, "total": 7})
+        self.assertGreater(len(states), 1)
+
+        self.assertEqual(bulk_assign_fees_task.apply(args=(self.school.id, "2026", "term_1")).get(), 0)
+
+
 class ParentTransportPreferenceSyncTest(APITestCase):
     def setUp(self):
         self.client = APIClient()
@@ -40,6 +40,7 @@ from .fee_calculator import (
     build_school_fee_breakdown,
     get_additional_fees_for_student,
     get_unpaid_additional_fees_for_record,
+    get_unpaid_additional_fees_for_records,
     get_transport_opt_in,
 )
 from .billing_service import (
@@ -50,6 +51,9 @@ from .billing_service import (
     ensure_three_term_invoices_for_school,
     recalculate_student_school_fee_records,
 )
+from .report_snapshot import get_finance_snapshot
+from School_system.pagination import KeysetPagination
+from School_system.serializer_prefetch import PrefetchPlanViewMixin
 from .term_finance import (
     TERM_SEQUENCE,
     normalize_term_key,
@@ -792,44 +796,14 @@ def finance_summary_view(request):
         year=year,
     ).aggregate(total=Sum('net_salary'))['total'] or Decimal('0')
 
-    selected_terms = [term_key]
-    students = list(
-        Student.objects.filter(
-            user__school=school,
-            user__is_active=True,
-        ).select_related('student_class')
-    )
-    expected_map, collected_map = _student_term_financials(
-        students=students,
-        school=school,
-        academic_year=current_year,
-        terms=selected_terms,
-    )
-
-    term_expected_revenue = Decimal('0')
-    term_collected_revenue = Decimal('0')
-    term_paid_students = 0
-    term_partial_students = 0
-    term_unpaid_students = 0
-    for student in students:
-        student_expected = Decimal('0')
-        student_collected = Decimal('0')
-        for term in selected_terms:
-            student_expected += expected_map.get((student.id, term), Decimal('0'))
-            student_collected += collected_map.get((student.id, term), Decimal('0'))
-
-        term_expected_revenue += student_expected
-        term_collected_revenue += student_collected
-
-        student_balance = student_expected - student_collected
-        if student_expected <= 0:
-            continue
-        if student_balance <= 0:
-            term_paid_students += 1
-        elif student_collected > 0:
-            term_partial_students += 1
-        else:
-            term_unpaid_students += 1
+    refresh = str(request.query_params.get('refresh', '')).strip().lower() in ('1', 'true', 'yes', 'on')
+    snapshot = get_finance_snapshot(school, current_year, term_key, refresh=refresh)
+    summary = snapshot.data['summary']
+    term_expected_revenue = Decimal(summary['expected'])
+    term_collected_revenue = Decimal(summary['collected'])
+    term_paid_students = summary['paid']
+    term_partial_students = summary['partial']
+    term_unpaid_students = summary['unpaid']
 
     term_revenue = term_expected_revenue if term_expected_revenue > 0 else term_collected_revenue
     term_outstanding_revenue = max(Decimal('0'), term_revenue - term_collected_revenue)
@@ -878,6 +852,7 @@ def finance_summary_view(request):
         'term_unpaid_students': term_unpaid_students,
         'monthly_paid_count': paid_count,
         'monthly_unpaid_count': unpaid_count,
+        'computed_at': snapshot.computed_at,
     })
 
 
@@ -1221,9 +1196,11 @@ def get_all_grades(request):
     return Response({'grades': grade_list})
 
 
-class StudentPaymentRecordListCreateView(generics.ListCreateAPIView):
+class StudentPaymentRecordListCreateView(PrefetchPlanViewMixin, generics.ListCreateAPIView):
     """Represents StudentPaymentRecordListCreateView."""
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-date_created', '-id')
 
     def get_serializer_class(self):
         """Return serializer class."""
@@ -1300,7 +1277,7 @@ class StudentPaymentRecordListCreateView(generics.ListCreateAPIView):
             logger.error("Fee assignment email notification failed: %s", exc)
 
 
-class StudentPaymentRecordDetailView(generics.RetrieveUpdateDestroyAPIView):
+class StudentPaymentRecordDetailView(PrefetchPlanViewMixin, generics.RetrieveUpdateDestroyAPIView):
     """Represents StudentPaymentRecordDetailView."""
     serializer_class = StudentPaymentRecordSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -1444,12 +1421,12 @@ def class_fees_report(request):
     if not selected_terms:
         return Response({'error': 'At least one valid term is required.'}, status=status.HTTP_400_BAD_REQUEST)
 
-    expected_map, collected_map = _student_term_financials(
-        students=students,
-        school=request.user.school,
-        academic_year=academic_year,
-        terms=selected_terms,
-    )
+    refresh = str(request.query_params.get('refresh', '')).strip().lower() in ('1', 'true', 'yes', 'on')
+    snapshots = [
+        get_finance_snapshot(request.user.school, academic_year, term, refresh=refresh, class_id=cls.id)
+        for term in selected_terms
+    ]
+    rows = [snapshot.data['classes'].get(str(cls.id), {}).get('students', {}) for snapshot in snapshots]
     
     paid_count = 0
     partial_count = 0
@@ -1461,9 +1438,10 @@ def class_fees_report(request):
     for student in students:
         student_due = Decimal('0')
         student_paid = Decimal('0')
-        for term in selected_terms:
-            student_due += expected_map.get((student.id, term), Decimal('0'))
-            student_paid += collected_map.get((student.id, term), Decimal('0'))
+        for term_rows in rows:
+            due, paid = term_rows.get(str(student.id), ('0', '0'))
+            student_due += Decimal(due)
+            student_paid += Decimal(paid)
         student_balance = max(Decimal('0'), student_due - student_paid)
 
         if student_due <= 0:
@@ -1504,6 +1482,7 @@ def class_fees_report(request):
         'total_collected': float(total_collected),
         'total_outstanding': float(max(Decimal('0'), total_due - total_collected)),
         'students': student_data,
+        'computed_at': min(snapshot.computed_at for snapshot in snapshots),
     }
     
     return Response({'reports': [report]})
@@ -2123,75 +2102,110 @@ class AdditionalFeeDetailView(generics.RetrieveUpdateDestroyAPIView):
         return AdditionalFee.objects.none()
 
 
-def _record_total_due(record):
-    return compute_record_totals(record)['total_due']
-
-
 def _record_balance(record):
     return compute_record_totals(record)['balance']
 
 
-def _ensure_invoice_snapshot_for_record(record):
-    """Ensure at least one invoice exists for a payment record and keep it in sync."""
-    total_due = _record_total_due(record)
-    if total_due <= 0:
-        return None
-
-    invoice = (
-        Invoice.objects
-        .filter(payment_record=record, school=record.school)
-        .order_by('-issue_date', '-id')
-        .first()
-    )
+def _apply_invoice_snapshot(record, totals, invoice):
+    """
+    Bring a record's snapshot invoice in line with its totals, without saving.
 
-    if not invoice:
-        return Invoice.objects.create(
+    Returns (invoice, changed_fields): a new unsaved Invoice (changed_fields
+    None) when the record has none yet, otherwise the given invoice updated
+    in place with the list of fields that moved.
+    """
+    paid_amount = to_decimal(record.amount_paid)
+    record_is_paid = totals['balance'] <= 0
+    if invoice is None:
+        return Invoice(
             student=record.student,
             school=record.school,
             invoice_number=f"INV-{uuid.uuid4().hex[:8].upper()}",
-            total_amount=total_due,
-            amount_paid=to_decimal(record.amount_paid),
+            total_amount=totals['total_due'],
+            amount_paid=paid_amount,
             due_date=record.due_date or (date.today() + timedelta(days=30)),
-            is_paid=_record_balance(record) <= 0,
+            is_paid=record_is_paid,
             payment_record=record,
             notes=(
                 f"Snapshot invoice for {record.get_payment_type_display()} "
                 f"{record.academic_year} {_record_terms_label(record)}"
             ),
-        )
+        ), None
 
-    changed_fields = []
-    paid_amount = to_decimal(record.amount_paid)
-    record_is_paid = _record_balance(record) <= 0
-    desired_due_date = record.due_date or invoice.due_date or (date.today() + timedelta(days=30))
-
-    if invoice.total_amount != total_due:
-        invoice.total_amount = total_due
-        changed_fields.append('total_amount')
-    if invoice.amount_paid != paid_amount:
-        invoice.amount_paid = paid_amount
-        changed_fields.append('amount_paid')
-    if invoice.is_paid != record_is_paid:
-        invoice.is_paid = record_is_paid
-        changed_fields.append('is_paid')
-    if invoice.due_date != desired_due_date:
-        invoice.due_date = desired_due_date
-        changed_fields.append('due_date')
-
-    if changed_fields:
+    desired = {
+        'total_amount': totals['total_due'],
+        'amount_paid': paid_amount,
+        'is_paid': record_is_paid,
+        'due_date': record.due_date or invoice.due_date or (date.today() + timedelta(days=30)),
+    }
+    changed = [field for field, value in desired.items() if getattr(invoice, field) != value]
+    for field in changed:
+        setattr(invoice, field, desired[field])
+    return invoice, changed
+
+
+def _ensure_invoice_snapshot_for_record(record):
+    """Ensure at least one invoice exists for a payment record and keep it in sync."""
+    totals = compute_record_totals(record)
+    if totals['total_due'] <= 0:
+        return None
+
+    latest = (
+        Invoice.objects
+        .filter(payment_record=record, school=record.school)
+        .order_by('-issue_date', '-id')
+        .first()
+    )
+    invoice, changed_fields = _apply_invoice_snapshot(record, totals, latest)
+    if changed_fields is None:
+        invoice.save()
+    elif changed_fields:
         invoice.save(update_fields=changed_fields)
     return invoice
 
 
 def _ensure_invoice_snapshots_for_school(school):
-    """Backfill/sync invoice snapshots so paid and unpaid records are visible in invoice lists."""
-    records = (
+    """
+    Backfill/sync invoice snapshots so paid and unpaid records are visible in invoice lists.
+
+    Same rules as _ensure_invoice_snapshot_for_record, but additional fees and
+    latest invoices are read for every record at once and the writes batched,
+    so list requests do not pay several queries per payment record.
+    """
+    records = list(
         StudentPaymentRecord.objects
         .filter(school=school)
         .select_related('student', 'school')
     )
+    if not records:
+        return
+    fees_by_record = get_unpaid_additional_fees_for_records(records)
+    latest_invoice = {}
+    for invoice in Invoice.objects.filter(payment_record__in=records, school=school).order_by('-issue_date', '-id'):
+        latest_invoice.setdefault(invoice.payment_record_id, invoice)
+
+    to_create = []
+    to_update = []
+    update_fields = set()
     for record in records:
-        _ensure_invoice_snapshot_for_record(record)
+        totals = compute_record_totals(record, additional_fees=fees_by_record[record.pk])
+        if totals['total_due'] <= 0:
+            continue
+        invoice, changed = _apply_invoice_snapshot(record, totals, latest_invoice.get(record.pk))
+        if changed is None:
+            to_create.append(invoice)
+        elif changed:
+            to_update.append(invoice)
+            update_fields.update(changed)
+
+    if to_create:
+        Invoice.objects.bulk_create(to_create)
+    if to_update:
+        Invoice.objects.bulk_update(to_update, sorted(update_fields), batch_size=500)
+    if to_create or to_update:
+        # bulk writes skip Invoice.save(), which drops the cached dashboard counters.
+        from users.school_stats import invalidate_school_stats
+        invalidate_school_stats(school.id)
 
 
 def _sync_invoice_with_record(invoice, record):
@@ -0,0 +1,156 @@
+"""
+Admin analytics payload built from grouped queries.
+
+The admin analytics screen used to issue two queries per chart day, load every
+Result row per subject into Python and count each class's students
+separately. The same payload now comes from five set-based queries, whatever
+the size of the school:
+
+    1. overview counters and fee totals (one row of scalar subqueries)
+    2. attendance per day for the last 30 days (from AttendanceDailyRollup)
+    3. the subjects shown on the chart
+    4. score averages and student counts per subject (GROUP BY subject)
+    5. classes with annotated student counts
+
+    from users.analytics import get_admin_analytics
+    payload = get_admin_analytics(school)
+
+Responses are cached per school and day for ADMIN_ANALYTICS_CACHE_SECONDS.
+`python manage.py benchmark_admin_analytics` seeds a large school and reports
+query count and wall time.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Case, Count, DecimalField, F, FloatField, IntegerField, Q, Sum, When
+from django.utils import timezone
+
+from .school_stats import scalar_aggregate
+
+logger = logging.getLogger(__name__)
+
+SUBJECT_CHART_LIMIT = 15
+
+
+def _rate(part, total):
+    return round((part / total * 100), 1) if total > 0 else 0
+
+
+def compute_admin_analytics(school, now=None):
+    """Build the admin analytics payload for a school."""
+    from academics.attendance_rollups import school_daily_attendance
+    from academics.models import Class, Result, Student, Subject, Teacher
+    from finances.models import StudentPaymentRecord
+    from .models import School
+
+    now = now or timezone.now()
+    today = now.date()
+    money = DecimalField(max_digits=14, decimal_places=2)
+    records = StudentPaymentRecord.objects.filter(school=school)
+
+    overview = School.objects.filter(pk=school.pk).values(
+        total_students=scalar_aggregate(Student.objects.filter(user__school=school), Count('id'), IntegerField()),
+        total_teachers=scalar_aggregate(Teacher.objects.filter(user__school=school), Count('id'), IntegerField()),
+        total_classes=scalar_aggregate(Class.objects.filter(school=school), Count('id'), IntegerField()),
+        total_subjects=scalar_aggregate(Subject.objects.filter(school=school), Count('id'), IntegerField()),
+        total_fees_due=scalar_aggregate(records, Sum('total_amount_due'), money),
+        total_fees_paid=scalar_aggregate(records, Sum('amount_paid'), money),
+    ).get()
+
+    # Attendance per day over the last 30 days, from the daily class rollup;
+    # the 7-day chart is a slice of it.
+    by_day = {
+        day: {'total': counts['total'], 'present': counts['present'] + counts['late']}
+        for day, counts in school_daily_attendance(school, (now - timedelta(days=30)).date()).items()
+    }
+    total_records = sum(row['total'] for row in by_day.values())
+    present_count = sum(row['present'] for row in by_day.values())
+    attendance_by_day = []
+    for i in range(6, -1, -1):
+        day = today - timedelta(days=i)
+        row = by_day.get(day, {'total': 0, 'present': 0})
+        attendance_by_day.append({
+            'date': day.isoformat(),
+            'total': row['total'],
+            'present': row['present'],
+            'rate': _rate(row['present'], row['total']),
+        })
+
+    total_fees_due = overview['total_fees_due'] or 0
+    total_fees_paid = overview['total_fees_paid'] or 0
+    collection_rate = round((float(total_fees_paid) / float(total_fees_due) * 100), 1) if total_fees_due > 0 else 0
+
+    # Subject performance: average of score/max_score (rows with max_score <= 0
+    # are excluded from the average but still count as a student with results).
+    subjects = list(
+        Subject.objects.filter(school=school).order_by('id').values('id', 'name', 'code')[:SUBJECT_CHART_LIMIT]
+    )
+    subject_stats = {
+        row['subject_id']: row
+        for row in Result.objects.filter(
+            subject_id__in=[s['id'] for s in subjects], student__user__school=school,
+        ).order_by().values('subject_id').annotate(
+            average=Avg(Case(
+                When(max_score__gt=0, then=F('score') * 100.0 / F('max_score')),
+                output_field=FloatField(),
+            )),
+            student_count=Count('student', distinct=True),
+        )
+    }
+    subject_performance = [
+        {
+            'name': subject['name'],
+            'code': subject['code'],
+            'average': round(subject_stats[subject['id']]['average'] or 0, 1),
+            'student_count': subject_stats[subject['id']]['student_count'],
+        }
+        for subject in subjects if subject['id'] in subject_stats
+    ]
+    subject_performance.sort(key=lambda x: x['average'], reverse=True)
+
+    class_distribution = [
+        {'name': row['name'], 'student_count': row['student_count']}
+        for row in Class.objects.filter(school=school).annotate(
+            student_count=Count('students', filter=Q(students__is_transferred=False)),
+        ).values('name', 'student_count')
+    ]
+
+    return {
+        'overview': {
+            'total_students': overview['total_students'],
+            'total_teachers': overview['total_teachers'],
+            'total_classes': overview['total_classes'],
+            'total_subjects': overview['total_subjects'],
+            'attendance_rate': _rate(present_count, total_records),
+            'fee_collection_rate': collection_rate,
+            'total_fees_due': float(total_fees_due),
+            'total_fees_paid': float(total_fees_paid),
+        },
+        'attendance_by_day': attendance_by_day,
+        'subject_performance': subject_performance,
+        'class_distribution': class_distribution,
+    }
+
+
+def get_admin_analytics(school):
+    """Return the cached analytics payload for a school, computing it on a miss."""
+    ttl = int(getattr(settings, 'ADMIN_ANALYTICS_CACHE_SECONDS', 300) or 0)
+    if not ttl:
+        return compute_admin_analytics(school)
+    # The day is part of the key so the 7-day chart rolls over at midnight.
+    key = f'admin_analytics:{school.pk}:{timezone.now().date().isoformat()}'
+    try:
+        payload = cache.get(key)
+    except Exception as exc:
+        logger.warning("Admin analytics cache read failed for %s: %s", key, exc)
+        payload = None
+    if payload is None:
+        payload = compute_admin_analytics(school)
+        try:
+            cache.set(key, payload, ttl)
+        except Exception as exc:
+            logger.warning("Admin analytics cache write failed for %s: %s", key, exc)
+    return payload
@@ -0,0 +1,250 @@
+"""
+Short-TTL authentication context cache.
+
+Every authenticated API call used to load the user row, check the token
+blacklist and (for parents) walk school.settings, and HR/accountant requests
+also loaded their permission profile and page grant. Those lookups are now
+served from Django's cache (Redis when REDIS_URL is set):
+
+    auth:user:<id>          {'user': {id, is_active, role, school_id, password_stamp},
+                             'tokens': {sha256(token): is_blacklisted}}
+    auth:school:<id>        {'parent_login_blocked': bool}
+    auth:perms:<role>:<id>  {'is_root': bool, 'pages': {page_key: (can_read, can_write)}} | None
+
+Only the fields authentication needs are cached, never the pickled user row.
+Requests get a CachedUser that answers those fields directly and loads the
+full row once, on first access to anything else.
+
+Entries live for AUTH_CONTEXT_CACHE_SECONDS (0 disables the cache). Writers
+invalidate explicitly: CustomUser.save()/delete() (password changes and
+deactivation included), bulk activation, SchoolSettings.save(), logout and the
+HR/accountant permission endpoints. Without a shared cache backend, other processes may serve a
+stale entry for at most the TTL.
+"""
+
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject, empty
+
+logger = logging.getLogger(__name__)
+
+
+def _ttl():
+    return int(getattr(settings, 'AUTH_CONTEXT_CACHE_SECONDS', 60) or 0)
+
+
+def _user_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def _school_key(school_id):
+    return f'auth:school:{school_id}'
+
+
+def _perms_key(role, user_id):
+    return f'auth:perms:{role}:{user_id}'
+
+
+def _token_hash(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def _cache_get(key):
+    try:
+        return cache.get(key)
+    except Exception as exc:
+        logger.warning("Auth cache read failed for %s: %s", key, exc)
+        return None
+
+
+def _cache_set(key, value):
+    try:
+        cache.set(key, value, _ttl())
+    except Exception as exc:
+        logger.warning("Auth cache write failed for %s: %s", key, exc)
+
+
+def _cache_delete(*keys):
+    try:
+        cache.delete_many(keys)
+    except Exception as exc:
+        logger.warning("Auth cache delete failed for %s: %s", keys, exc)
+
+
+def _stamp(password_hash):
+    return hashlib.sha256((password_hash or '').encode('utf-8')).hexdigest()[:16]
+
+
+def password_stamp(user):
+    """Short digest of the user's password hash; changes whenever the password does."""
+    return _stamp(user.password)
+
+
+class CachedUser(SimpleLazyObject):
+    """
+    request.user for cached authentication.
+
+    id/pk, is_active, role and school_id come from the cache entry; any other
+    attribute loads the full CustomUser row (once per request).
+    """
+
+    def __init__(self, fields):
+        user_id = fields['id']
+
+        def _load():
+            from django.contrib.auth import get_user_model
+            return get_user_model().objects.get(id=user_id)
+
+        super().__init__(_load)
+        self.__dict__['_auth_fields'] = fields
+
+    def __getattr__(self, name):
+        if self._wrapped is empty:
+            fields = self.__dict__['_auth_fields']
+            if name in fields:
+                return fields[name]
+            if name == 'pk':
+                return fields['id']
+        return super().__getattr__(name)
+
+    @property
+    def is_authenticated(self):
+        return True
+
+    @property
+    def is_anonymous(self):
+        return False
+
+    @property
+    def password_stamp(self):
+        if self._wrapped is empty:
+            return self.__dict__['_auth_fields']['password_stamp']
+        return password_stamp(self._wrapped)
+
+
+def _load_user_entry(user_id):
+    from django.contrib.auth import get_user_model
+    row = get_user_model().objects.values('id', 'is_active', 'role', 'school_id', 'password').get(id=user_id)
+    row['password_stamp'] = _stamp(row.pop('password'))
+    return {'user': row, 'tokens': {}}
+
+
+def get_cached_user(user_id):
+    """Return a CachedUser for user_id (raises User.DoesNotExist). Each call returns a fresh copy."""
+    if not _ttl():
+        return CachedUser(_load_user_entry(user_id)['user'])
+    entry = _cache_get(_user_key(user_id))
+    if entry is None:
+        entry = _load_user_entry(user_id)
+        _cache_set(_user_key(user_id), entry)
+    return CachedUser(entry['user'])
+
+
+def get_token_user(user_id, token):
+    """
+    Return (CachedUser, is_blacklisted) for an access token.
+
+    The blacklist verdict is kept inside the user's entry so it is dropped
+    whenever the user row changes.
+    """
+    from .models import BlacklistedToken
+
+    if not _ttl():
+        user = CachedUser(_load_user_entry(user_id)['user'])
+        return user, BlacklistedToken.objects.filter(token=token).exists()
+
+    key = _user_key(user_id)
+    entry = _cache_get(key)
+    dirty = entry is None
+    if entry is None:
+        entry = _load_user_entry(user_id)
+    digest = _token_hash(token)
+    blacklisted = entry['tokens'].get(digest)
+    if blacklisted is None:
+        blacklisted = BlacklistedToken.objects.filter(token=token).exists()
+        entry['tokens'][digest] = blacklisted
+        dirty = True
+    if dirty:
+        _cache_set(key, entry)
+    return CachedUser(entry['user']), blacklisted
+
+
+def get_school_auth_flags(school_id):
+    """Return the school flags auth needs ({'parent_login_blocked': bool})."""
+    def _load():
+        from .models import SchoolSettings
+        blocked = SchoolSettings.objects.filter(school_id=school_id).values_list(
+            'parent_login_blocked', flat=True,
+        ).first()
+        return {'parent_login_blocked': bool(blocked)}
+
+    if not _ttl():
+        return _load()
+    flags = _cache_get(_school_key(school_id))
+    if flags is None:
+        flags = _load()
+        _cache_set(_school_key(school_id), flags)
+    return flags
+
+
+def _load_staff_permissions(role, user_id):
+    from .models import (
+        AccountantPagePermission, AccountantPermissionProfile, HRPagePermission, HRPermissionProfile,
+    )
+    if role == 'hr':
+        profile_model, page_model, root_field = HRPermissionProfile, HRPagePermission, 'is_root_boss'
+    else:
+        profile_model, page_model, root_field = AccountantPermissionProfile, AccountantPagePermission, 'is_root_head'
+    profile = profile_model.objects.filter(user_id=user_id).values('id', root_field).first()
+    if not profile:
+        return None
+    return {
+        'is_root': bool(profile[root_field]),
+        'pages': {
+            page_key: (can_read, can_write)
+            for page_key, can_read, can_write in page_model.objects.filter(
+                profile_id=profile['id'],
+            ).values_list('page_key', 'can_read', 'can_write')
+        },
+    }
+
+
+def get_staff_permissions(role, user_id):
+    """Return the HR ('hr') or accountant ('accountant') permission map for a user, or None."""
+    if not _ttl():
+        return _load_staff_permissions(role, user_id)
+    key = _perms_key(role, user_id)
+    perms = _cache_get(key)
+    if perms is None:
+        # Cache "no profile" as well, so HR/accountants without one don't hit the DB each request.
+        perms = _load_staff_permissions(role, user_id) or {'missing': True}
+        _cache_set(key, perms)
+    return None if perms.get('missing') else perms
+
+
+def invalidate_user_auth(user_id):
+    """Drop the cached user row, token verdicts and permission maps for a user."""
+    if user_id:
+        _cache_delete(_user_key(user_id), _perms_key('hr', user_id), _perms_key('accountant', user_id))
+
+
+def invalidate_users_auth(user_ids):
+    keys = []
+    for user_id in user_ids:
+        keys += [_user_key(user_id), _perms_key('hr', user_id), _perms_key('accountant', user_id)]
+    if keys:
+        _cache_delete(*keys)
+
+
+def invalidate_staff_permissions(user_id):
+    """Drop cached HR/accountant page permissions after an admin edits them."""
+    if user_id:
+        _cache_delete(_perms_key('hr', user_id), _perms_key('accountant', user_id))
+
+
+def invalidate_school_auth(school_id):
+    if school_id:
+        _cache_delete(_school_key(school_id))
@@ -10,7 +10,8 @@ via trusted headers:
     X-User-School-ID: <int>
 
 This authentication class reads those headers and resolves the Django User
-object with a single DB query (cached in-process per request).
+object from the short-TTL auth cache (users/auth_cache.py), so a warm request
+does no auth queries.
 
 If X-Gateway-Auth is not present, it falls back to the original
 JWTAuthentication so Django can also run standalone without the gateway.
@@ -20,6 +21,8 @@ from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from django.contrib.auth import get_user_model
 
+from .auth_cache import get_cached_user
+
 User = get_user_model()
 
 
@@ -38,7 +41,7 @@ class GatewayAuthentication(BaseAuthentication):
                 return None
 
             try:
-                user = User.objects.get(id=int(user_id))
+                user = get_cached_user(int(user_id))
                 return (user, None)
             except (User.DoesNotExist, ValueError):
                 raise AuthenticationFailed("User from gateway header not found.")
@@ -0,0 +1,85 @@
+"""
+Benchmark the admin analytics payload against a seeded large school.
+
+Seeds one school (classes, students, teachers, subjects, results, 30 days of
+attendance with its rollups, payment records) inside a transaction, reports
+query count and wall time for a cold computation and a cached read, then rolls
+everything back.
+
+Usage:
+    python manage.py benchmark_admin_analytics
+    python manage.py benchmark_admin_analytics --students 5000 --results-per-student 20
+    python manage.py benchmark_admin_analytics --school-id 3   # existing school, nothing seeded
+"""
+
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from School_system.benchmarking import seed_large_school
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Report query count and wall time of the admin analytics payload for a large school."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--school-id", type=int, default=None, help="Benchmark an existing school instead of seeding one.")
+        parser.add_argument("--students", type=int, default=2000)
+        parser.add_argument("--classes", type=int, default=40)
+        parser.add_argument("--subjects", type=int, default=15)
+        parser.add_argument("--results-per-student", type=int, default=10)
+        parser.add_argument("--days", type=int, default=30, help="Days of attendance to seed.")
+        parser.add_argument("--repeat", type=int, default=3, help="Cold runs to average.")
+
+    def handle(self, *args, **options):
+        from users.models import School
+
+        try:
+            with transaction.atomic():
+                if options["school_id"]:
+                    try:
+                        school = School.objects.get(id=options["school_id"])
+                    except School.DoesNotExist:
+                        raise CommandError(f"School {options['school_id']} not found")
+                else:
+                    started = time.perf_counter()
+                    school = seed_large_school(
+                        students=options["students"],
+                        classes=options["classes"],
+                        subjects=options["subjects"],
+                        results_per_student=options["results_per_student"],
+                        days=options["days"],
+                    )
+                    self.stdout.write(f"Seeded school {school.id} in {time.perf_counter() - started:.1f}s")
+                self._run(school, options["repeat"])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _measure(self, func, school):
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            func(school)
+            elapsed = time.perf_counter() - started
+        return len(ctx.captured_queries), elapsed * 1000
+
+    def _run(self, school, repeat):
+        from users.analytics import compute_admin_analytics, get_admin_analytics
+
+        cold = [self._measure(compute_admin_analytics, school) for _ in range(max(1, repeat))]
+        cache.clear()
+        self._measure(get_admin_analytics, school)
+        warm = self._measure(get_admin_analytics, school)
+
+        queries = cold[0][0]
+        avg_ms = sum(ms for _, ms in cold) / len(cold)
+        self.stdout.write(self.style.SUCCESS("Admin analytics benchmark"))
+        self.stdout.write(f"- cold: {queries} queries, {avg_ms:.1f} ms (avg of {len(cold)})")
+        self.stdout.write(f"- cached: {warm[0]} queries, {warm[1]:.2f} ms")
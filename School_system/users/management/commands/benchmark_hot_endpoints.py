@@ -0,0 +1,111 @@
+"""
+Query-count, latency and peak-memory regression benchmarks for the hot endpoints.
+
+Seeds a deterministic school per profile (small/medium/large = 200/2,000/10,000
+learners with results, attendance and fees) inside a transaction, measures
+dashboard stats, the at-risk page, the class fees report, report card
+generation, class attendance marking and a bulk import, compares them with the
+stored baselines for the current database vendor, then rolls everything back.
+Exits non-zero when any scenario regresses.
+
+Usage:
+    python manage.py benchmark_hot_endpoints                         # small profile
+    python manage.py benchmark_hot_endpoints --profile small --profile medium
+    python manage.py benchmark_hot_endpoints --scenario report_card --repeat 5
+    python manage.py benchmark_hot_endpoints --update-baselines      # record current numbers
+    python manage.py benchmark_hot_endpoints --no-time               # queries and memory only (noisy CI hosts)
+
+Run it against Postgres by pointing DATABASE_URL at a Postgres database; its
+baselines are kept separately from SQLite's.
+"""
+
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from School_system.benchmarking import (
+    BASELINE_FILE, PROFILES, SCENARIOS, compare_to_baselines, load_baselines, run_scenarios, save_baselines,
+    seed_benchmark_school,
+)
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Benchmark the hot endpoints and fail when they regress past the stored baselines."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profile", action="append", choices=sorted(PROFILES), help="Repeatable; default small.")
+        parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="Repeatable; default all.")
+        parser.add_argument("--repeat", type=int, default=3, help="Timed runs per scenario (median is kept).")
+        parser.add_argument("--baseline-file", default=str(BASELINE_FILE))
+        parser.add_argument("--update-baselines", action="store_true", help="Store these results as the new baselines.")
+        parser.add_argument("--time-tolerance", type=float, default=0.5, help="Allowed wall-time growth (0.5 = +50%%).")
+        parser.add_argument("--memory-tolerance", type=float, default=0.25, help="Allowed peak-memory growth.")
+        parser.add_argument("--query-slack", type=int, default=0, help="Extra queries allowed per scenario.")
+        parser.add_argument("--no-time", action="store_true", help="Do not fail on wall-time regressions.")
+        parser.add_argument("--output", default=None, help="Also write the measurements to this JSON file.")
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        profiles = options["profile"] or ["small"]
+        baselines = load_baselines(options["baseline_file"])
+        results = {}
+        regressions = []
+
+        for profile in profiles:
+            try:
+                with transaction.atomic():
+                    started = time.perf_counter()
+                    bench = seed_benchmark_school(profile)
+                    self.stdout.write(f"Seeded {profile} school ({PROFILES[profile]['students']} students) "
+                                      f"in {time.perf_counter() - started:.1f}s")
+                    results[profile] = run_scenarios(bench, names=options["scenario"], repeat=options["repeat"])
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+            stored = baselines.get(vendor, {}).get(profile, {})
+            self._report(profile, results[profile], stored)
+            regressions += [
+                f"[{profile}] {message}"
+                for message in compare_to_baselines(
+                    results[profile], stored,
+                    time_tolerance=options["time_tolerance"],
+                    memory_tolerance=options["memory_tolerance"],
+                    query_slack=options["query_slack"],
+                    check_time=not options["no_time"],
+                )
+            ]
+
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                json.dump({vendor: results}, fh, indent=2, sort_keys=True)
+
+        if options["update_baselines"]:
+            for profile, measurements in results.items():
+                baselines.setdefault(vendor, {}).setdefault(profile, {}).update(measurements)
+            save_baselines(baselines, options["baseline_file"])
+            self.stdout.write(self.style.SUCCESS(f"Baselines updated in {options['baseline_file']}"))
+            return
+
+        if regressions:
+            raise CommandError("Benchmark regressions:\n" + "\n".join(f"- {message}" for message in regressions))
+        self.stdout.write(self.style.SUCCESS("No regressions against the stored baselines."))
+
+    def _report(self, profile, measurements, stored):
+        self.stdout.write(self.style.SUCCESS(f"Hot endpoint benchmark ({connection.vendor}, {profile})"))
+        for name, current in measurements.items():
+            baseline = stored.get(name)
+            line = (f"- {name}: {current['queries']} queries, {current['wall_ms']:.1f} ms, "
+                    f"{current['peak_kib']:.0f} KiB peak")
+            if baseline:
+                line += (f"  (baseline {baseline['queries']} queries, {baseline['wall_ms']:.1f} ms, "
+                         f"{baseline['peak_kib']:.0f} KiB)")
+            else:
+                line += "  (no baseline)"
+            self.stdout.write(line)
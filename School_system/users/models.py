@@ -111,6 +111,11 @@ class School(models.Model):
     def __str__(self):
         return f"{self.name} ({self.code})"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .school_stats import invalidate_school_stats
+        invalidate_school_stats(self.pk)
+
     @property
     def supports_boarding(self):
         return self.accommodation_type in ('boarding', 'both')
@@ -173,6 +178,21 @@ class CustomUser(AbstractUser):
         if not self.phone_number:
             self.phone_number = None
         super().save(*args, **kwargs)
+        from .auth_cache import invalidate_user_auth
+        invalidate_user_auth(self.pk)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'is_active', 'role', 'school'} & set(update_fields):
+            from .school_stats import invalidate_school_stats
+            invalidate_school_stats(self.school_id)
+
+    def delete(self, *args, **kwargs):
+        user_id, school_id = self.pk, self.school_id
+        result = super().delete(*args, **kwargs)
+        from .auth_cache import invalidate_user_auth
+        from .school_stats import invalidate_school_stats
+        invalidate_user_auth(user_id)
+        invalidate_school_stats(school_id)
+        return result
 
     @property
     def full_name(self):
@@ -347,6 +367,11 @@ class SchoolSettings(models.Model):
         help_text='Date from which period-level bunk detection rules apply.',
     )
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .auth_cache import invalidate_school_auth
+        invalidate_school_auth(self.school_id)
+
     def __str__(self):
         return f"Settings for {self.school.name}"
 
@@ -502,10 +527,16 @@ class AuditLog(models.Model):
     changes = models.JSONField(default=dict)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     response_status = models.IntegerField(null=True, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Set explicitly by the buffered audit writer so the row keeps the request time.
+    timestamp = models.DateTimeField(default=timezone.now, editable=False, db_index=True)
 
     class Meta:
         ordering = ['-timestamp']
+        # Keyset pagination orders on (timestamp, id), per school and platform-wide.
+        indexes = [
+            models.Index(fields=['school', '-timestamp', '-id']),
+            models.Index(fields=['-timestamp', '-id']),
+        ]
 
     def __str__(self):
         user_str = self.user.full_name if self.user else 'System'
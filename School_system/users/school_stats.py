@@ -0,0 +1,119 @@
+"""
+Per-school dashboard counters.
+
+The admin dashboard used to run about ten COUNT/SUM queries per load. The
+snapshot is now built with two queries (conditional aggregation over the
+school's users, plus one row of scalar subqueries for everything else) and
+cached per school:
+
+    from users.school_stats import get_school_stats, invalidate_school_stats
+    stats = get_school_stats(school)      # dict of counters
+    invalidate_school_stats(school.id)    # after a relevant write
+
+Model saves/deletes for users, students, parents, classes, subjects,
+invoices and payment records invalidate the snapshot; anything else
+(bulk .update(), M2M link changes) is picked up within
+SCHOOL_STATS_CACHE_SECONDS.
+"""
+
+import logging
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, IntegerField, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+logger = logging.getLogger(__name__)
+
+STAFF_ROLES = ['admin', 'hr', 'accountant', 'security', 'cleaner', 'librarian']
+
+
+def _cache_key(school_id):
+    return f'school_stats:{school_id}'
+
+
+def scalar_aggregate(queryset, aggregate, output_field):
+    """Wrap an aggregate over `queryset` as a scalar subquery (0 when empty)."""
+    inner = queryset.order_by().annotate(_one=Value(1)).values('_one').annotate(value=aggregate).values('value')
+    return Coalesce(Subquery(inner, output_field=output_field), Value(0), output_field=output_field)
+
+
+def compute_school_stats(school):
+    """Compute the dashboard counters for a school with two queries."""
+    from academics.models import Class, Parent, Student, Subject
+    from finances.models import Invoice, StudentPaymentRecord
+    from .models import CustomUser, School
+
+    active_student = Q(is_active=True, student__isnull=False, student__is_transferred=False)
+    user_counts = CustomUser.objects.filter(school=school).aggregate(
+        total_students=Count('id', filter=active_student),
+        boarding_students=Count('id', filter=active_student & Q(student__residence_type='boarding')),
+        day_students=Count('id', filter=active_student & Q(student__residence_type='day')),
+        total_teachers=Count('id', filter=Q(role='teacher', is_active=True)),
+        total_staff=Count('id', filter=Q(role__in=STAFF_ROLES, is_active=True)),
+    )
+
+    # Parents created by admin, self-registered parents linked to the school,
+    # and parents of the school's students. IN-subqueries instead of joins
+    # avoid the row fan-out that previously needed distinct().
+    parents = Parent.objects.filter(
+        Q(user__school=school)
+        | Q(pk__in=Parent.schools.through.objects.filter(school=school).values('parent_id'))
+        | Q(pk__in=Parent.children.through.objects.filter(
+            student_id__in=Student.objects.including_transferred().filter(user__school=school).values('id'),
+        ).values('parent_id'))
+    )
+    money = DecimalField(max_digits=14, decimal_places=2)
+    school_invoices = Invoice.objects.filter(student__user__school=school)
+    row = School.objects.filter(pk=school.pk).values(
+        total_parents=scalar_aggregate(parents, Count('id'), IntegerField()),
+        total_classes=scalar_aggregate(Class.objects.filter(school=school), Count('id'), IntegerField()),
+        total_subjects=scalar_aggregate(Subject.objects.filter(school=school), Count('id'), IntegerField()),
+        pending_invoices=scalar_aggregate(school_invoices.filter(is_paid=False), Count('id'), IntegerField()),
+        record_revenue=scalar_aggregate(
+            StudentPaymentRecord.objects.filter(school=school), Sum('amount_paid'), money,
+        ),
+        invoice_revenue=scalar_aggregate(school_invoices.filter(is_paid=True), Sum('amount_paid'), money),
+    ).get()
+
+    return {
+        **user_counts,
+        'total_parents': row['total_parents'],
+        'total_classes': row['total_classes'],
+        'total_subjects': row['total_subjects'],
+        'pending_invoices': row['pending_invoices'],
+        # Use payment records as primary source, but fall back to paid invoices
+        # when legacy/snapshot data has invoice payments without synced records.
+        'total_revenue': max(Decimal(row['record_revenue'] or 0), Decimal(row['invoice_revenue'] or 0)),
+    }
+
+
+def get_school_stats(school):
+    """Return the cached dashboard counters for a school, computing them on a miss."""
+    ttl = int(getattr(settings, 'SCHOOL_STATS_CACHE_SECONDS', 60) or 0)
+    if not ttl:
+        return compute_school_stats(school)
+    key = _cache_key(school.pk)
+    try:
+        stats = cache.get(key)
+    except Exception as exc:
+        logger.warning("School stats cache read failed for %s: %s", key, exc)
+        stats = None
+    if stats is None:
+        stats = compute_school_stats(school)
+        try:
+            cache.set(key, stats, ttl)
+        except Exception as exc:
+            logger.warning("School stats cache write failed for %s: %s", key, exc)
+    return stats
+
+
+def invalidate_school_stats(school_id):
+    """Drop the cached dashboard counters for a school."""
+    if not school_id:
+        return
+    try:
+        cache.delete(_cache_key(school_id))
+    except Exception as exc:
+        logger.warning("School stats cache delete failed for %s: %s", school_id, exc)
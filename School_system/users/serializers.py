@@ -11,6 +11,8 @@ from .models import (
     AccountantPermissionProfile, AccountantPagePermission,
 )
 from academics.models import Parent
+from .auth_cache import invalidate_staff_permissions
+from School_system.serializer_prefetch import PrefetchPlanMixin, prefetched_all
 import random
 import secrets
 import string
@@ -87,8 +89,13 @@ class SchoolRegistrationSerializer(serializers.Serializer):
         }
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(PrefetchPlanMixin, serializers.ModelSerializer):
     """Represents UserSerializer."""
+    select_related_plan = ('school', 'staff', 'hr_permission_profile', 'accountant_permission_profile')
+    prefetch_related_plan = (
+        'hr_permission_profile__page_permissions',
+        'accountant_permission_profile__page_permissions',
+    )
     full_name = serializers.CharField(read_only=True)
     school_name = serializers.SerializerMethodField()
     school_code = serializers.SerializerMethodField()
@@ -188,7 +195,7 @@ class UserSerializer(serializers.ModelSerializer):
         profile = getattr(obj, 'hr_permission_profile', None)
         if not profile:
             return {}
-        perms = HRPagePermission.objects.filter(profile=profile)
+        perms = prefetched_all(profile, 'page_permissions')
         return {
             p.page_key: {'read': bool(p.can_read), 'write': bool(p.can_write)}
             for p in perms
@@ -206,7 +213,7 @@ class UserSerializer(serializers.ModelSerializer):
         profile = getattr(obj, 'accountant_permission_profile', None)
         if not profile:
             return {}
-        perms = AccountantPagePermission.objects.filter(profile=profile)
+        perms = prefetched_all(profile, 'page_permissions')
         return {
             p.page_key: {'read': bool(p.can_read), 'write': bool(p.can_write)}
             for p in perms
@@ -485,6 +492,7 @@ class ManagedUserSerializer(serializers.ModelSerializer):
             Parent.objects.get_or_create(user=user)
 
         self._sync_role_based_permissions(user, is_create=True)
+        invalidate_staff_permissions(user.id)
         self._ensure_staff_record(user, {
             'salary': salary,
             'hire_date': hire_date,
@@ -517,6 +525,7 @@ class ManagedUserSerializer(serializers.ModelSerializer):
             Parent.objects.get_or_create(user=instance)
 
         self._sync_role_based_permissions(instance, old_role=old_role, is_create=False)
+        invalidate_staff_permissions(instance.id)
         self._ensure_staff_record(instance, {
             'salary': salary,
             'hire_date': hire_date,
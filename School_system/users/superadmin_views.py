@@ -35,6 +35,9 @@ from users.models import (
     SuperadminSupportTicket,
 )
 from users.token import JWTAuthentication
+from users.auth_cache import invalidate_users_auth, password_stamp
+from users.school_stats import invalidate_school_stats
+from School_system.pagination import paginate_keyset, wants_keyset
 
 logger = logging.getLogger(__name__)
 
@@ -205,7 +208,7 @@ def superadmin_login(request):
         return Response({"error": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
 
     user.clear_login_failures()
-    payload = {"user_id": user.id, "role": user.role}
+    payload = {"user_id": user.id, "role": user.role, "pwd": password_stamp(user)}
     access_token = JWTAuthentication.generate_token(payload)
     refresh_token = JWTAuthentication.generate_refresh_token(payload)
 
@@ -658,7 +661,12 @@ def update_school_profile(request, school_id):
             pending_ids = [student.id for student in pending_students]
             if pending_ids:
                 Student.objects.filter(id__in=pending_ids).update(pending_activation_due_to_limit=False)
-                CustomUser.objects.filter(student__id__in=pending_ids).update(is_active=True)
+                activated_user_ids = list(
+                    CustomUser.objects.filter(student__id__in=pending_ids).values_list("id", flat=True)
+                )
+                CustomUser.objects.filter(id__in=activated_user_ids).update(is_active=True)
+                invalidate_users_auth(activated_user_ids)
+                invalidate_school_stats(school.id)
                 activated_count = len(pending_ids)
 
     if activated_count > 0:
@@ -745,7 +753,10 @@ def superadmin_audit_logs(request):
     if date_to:
         qs = qs.filter(timestamp__date__lte=date_to)
 
-    page_qs, page_meta = _paginate_queryset(request, qs, default_page_size=50)
+    if wants_keyset(request):
+        page_qs, page_meta = paginate_keyset(request, qs, ("-timestamp", "-id"), default_page_size=50)
+    else:
+        page_qs, page_meta = _paginate_queryset(request, qs, default_page_size=50)
     payload = [
         {
             "id": log.id,
@@ -894,6 +905,8 @@ def superadmin_system_health(request):
         return Response({"error": "Access denied"}, status=status.HTTP_403_FORBIDDEN)
 
     from django.db import connection
+    from School_system.audit_buffer import audit_log_buffer
+    from School_system.outbound_http import outbound
     from users.models import BlacklistedToken
 
     db_ok = True
@@ -916,6 +929,8 @@ def superadmin_system_health(request):
             "superadmin_secret_key_set": secret_set,
             "celery_configured": celery_configured,
             "blacklisted_tokens": BlacklistedToken.objects.count(),
+            "audit_log_buffer": audit_log_buffer.stats(),
+            "outbound_http": outbound.stats(),
         }
     )
 
@@ -16,7 +16,7 @@ from decimal import Decimal
 from unittest.mock import patch
 
 from django.contrib.auth.hashers import check_password
-from django.test import TestCase, override_settings
+from django.test import TestCase, TransactionTestCase, override_settings
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 
@@ -597,6 +597,35 @@ class SuperadminEndpointsTest(APITestCase):
         self.assertTrue(response.data.get("total", 0) >= 3)
         self.assertEqual(len(response.data.get("results", [])), 2)
 
+    def test_superadmin_audit_logs_keyset_pages_through_ties(self):
+        from django.utils import timezone
+        stamp = timezone.now()
+        for idx in range(5):
+            AuditLog.objects.create(
+                user=self.superadmin, school=self.school, action="UPDATE",
+                model_name="School", object_repr=f"keyset-{idx}", timestamp=stamp,
+            )
+        seen = []
+        cursor = ""
+        while True:
+            response = self.client.get(
+                f"/api/v1/auth/superadmin/audit-logs/?model_name=School&page_size=2&with_total=1&cursor={cursor}"
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("page", response.data)
+            self.assertEqual(response.data["total"], 5)
+            self.assertFalse(response.data["total_is_estimate"])
+            seen.extend(row["id"] for row in response.data["results"])
+            if not response.data["has_next"]:
+                break
+            cursor = response.data["next_cursor"]
+        # Same timestamp everywhere: the id tie-breaker keeps pages disjoint and complete.
+        self.assertEqual(seen, sorted(seen, reverse=True))
+        self.assertEqual(len(set(seen)), 5)
+
+        bad = self.client.get("/api/v1/auth/superadmin/audit-logs/?cursor=not-a-cursor")
+        self.assertEqual(bad.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_superadmin_locked_accounts_and_unlock(self):
         locked_user = make_user(self.school, "locked_u", role="admin")
         from django.utils import timezone
@@ -727,6 +756,309 @@ class LogoutViewTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
 
+# ---------------------------------------------------------------------------
+# Buffered audit writer
+# ---------------------------------------------------------------------------
+
+@override_settings(AUDIT_LOG_ASYNC=True, AUDIT_LOG_FLUSH_INTERVAL=3600, AUDIT_LOG_BATCH_SIZE=100)
+class AuditLogBufferTest(TestCase):
+
+    """Represents AuditLogBufferTest."""
+    def setUp(self):
+        """Execute setUp."""
+        from School_system.audit_buffer import AuditLogBuffer
+        self.school = make_school()
+        self.admin = make_user(self.school, "buffer_admin", role="admin")
+        self.buffer = AuditLogBuffer()
+        # Flushed explicitly below instead of by the background thread.
+        self.buffer._ensure_writer = lambda: None
+
+    def _entry(self, object_id):
+        """Build an AuditLog row dict."""
+        from django.utils import timezone
+        return {
+            "user_id": self.admin.id, "school_id": self.school.id, "action": "CREATE",
+            "model_name": "students", "object_id": str(object_id), "timestamp": timezone.now(),
+        }
+
+    def test_entries_are_written_in_one_batch_on_flush(self):
+        """Test that queued entries are persisted together on flush."""
+        for i in range(3):
+            self.buffer.log(self._entry(i))
+        self.assertEqual(AuditLog.objects.filter(school=self.school).count(), 0)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.buffer.flush(), 3)
+        self.assertEqual(AuditLog.objects.filter(school=self.school).count(), 3)
+        self.assertEqual(self.buffer.stats()["written"], 3)
+
+    def test_full_buffer_drops_and_counts_entries(self):
+        """Test that entries beyond AUDIT_LOG_MAX_PENDING are dropped and counted."""
+        with override_settings(AUDIT_LOG_MAX_PENDING=2):
+            for i in range(5):
+                self.buffer.log(self._entry(i))
+        self.assertEqual(self.buffer.stats(), {"pending": 2, "written": 0, "dropped": 3, "failed": 0})
+        self.buffer.shutdown()
+        self.assertEqual(AuditLog.objects.filter(school=self.school).count(), 2)
+
+    def test_timestamp_is_preserved(self):
+        """Test that the request time survives the delayed insert."""
+        import datetime
+        entry = self._entry(7)
+        entry["timestamp"] -= datetime.timedelta(minutes=5)
+        self.buffer.log(entry)
+        self.buffer.flush()
+        self.assertEqual(AuditLog.objects.get(school=self.school, object_id="7").timestamp, entry["timestamp"])
+
+    @override_settings(AUDIT_LOG_ASYNC=False)
+    def test_sync_mode_writes_immediately(self):
+        """Test that AUDIT_LOG_ASYNC=False writes on the request path."""
+        self.buffer.log(self._entry(1))
+        self.assertEqual(AuditLog.objects.filter(school=self.school).count(), 1)
+        self.assertEqual(self.buffer.stats()["pending"], 0)
+
+    def test_middleware_queues_instead_of_writing(self):
+        """Test that AuditMiddleware defers the insert to the buffer."""
+        from School_system import middleware
+        self.client.force_login(self.admin)
+        with patch.object(middleware, "audit_log_buffer", self.buffer):
+            self.client.post("/api/v1/auth/logout/", {}, content_type="application/json")
+        self.assertEqual(AuditLog.objects.filter(model_name="auth").count(), 0)
+        self.buffer.flush()
+        log = AuditLog.objects.get(model_name="auth")
+        self.assertEqual(log.user_id, self.admin.id)
+        self.assertEqual(log.object_repr, "/api/v1/auth/logout/")
+
+
+@override_settings(AUDIT_LOG_ASYNC=True, AUDIT_LOG_FLUSH_INTERVAL=3600, AUDIT_LOG_BATCH_SIZE=100)
+class AuditLogBufferFailureTest(TransactionTestCase):
+
+    """Batch failures run outside a test transaction, as on the writer thread."""
+    def setUp(self):
+        """Execute setUp."""
+        from School_system.audit_buffer import AuditLogBuffer
+        self.school = make_school()
+        self.admin = make_user(self.school, "buffer_fail_admin", role="admin")
+        self.buffer = AuditLogBuffer()
+        self.buffer._ensure_writer = lambda: None
+
+    def test_one_invalid_entry_does_not_drop_the_batch(self):
+        """Test that only the bad row is lost when a batch insert fails."""
+        from django.utils import timezone
+        for i in range(4):
+            self.buffer.log({
+                "user_id": self.admin.id, "school_id": self.school.id,
+                "action": None if i == 2 else "CREATE",
+                "model_name": "students", "object_id": str(i), "timestamp": timezone.now(),
+            })
+        with self.assertLogs("School_system.audit_buffer", level="WARNING") as logs:
+            self.assertEqual(self.buffer.flush(), 3)
+
+        self.assertEqual(
+            sorted(AuditLog.objects.filter(school=self.school).values_list("object_id", flat=True)),
+            ["0", "1", "3"],
+        )
+        self.assertEqual(self.buffer.stats(), {"pending": 0, "written": 3, "dropped": 0, "failed": 1})
+        self.assertTrue(any("object_id=2" in line for line in logs.output))
+
+
+# ---------------------------------------------------------------------------
+# Outbound HTTP transport
+# ---------------------------------------------------------------------------
+
+@override_settings(OUTBOUND_HTTP_BREAKER_THRESHOLD=2, OUTBOUND_HTTP_BREAKER_COOLDOWN=60)
+class OutboundHTTPTest(TestCase):
+
+    """Represents OutboundHTTPTest."""
+    def setUp(self):
+        """Execute setUp."""
+        from School_system.outbound_http import OutboundHTTP
+        self.transport = OutboundHTTP()
+        self.url = "http://go-services.test/api/v1/services/email/send"
+
+    def _response(self, status_code):
+        """Build a bare requests.Response."""
+        import requests
+        response = requests.Response()
+        response.status_code = status_code
+        return response
+
+    def test_one_pooled_session_per_host(self):
+        """Test that calls to the same host reuse one session."""
+        host = self.transport._host(self.url)
+        self.assertIs(self.transport._host("http://GO-SERVICES.test/other"), host)
+        self.assertIsNot(self.transport._host("https://api.resend.com/emails"), host)
+
+    def test_breaker_opens_after_consecutive_failures_and_short_circuits(self):
+        """Test that the breaker opens and skips the host without a network call."""
+        import requests
+        from School_system.outbound_http import CircuitOpenError
+
+        session = self.transport._host(self.url).session
+        with patch.object(session, "request", side_effect=requests.ConnectTimeout("down")) as send:
+            for _ in range(2):
+                with self.assertRaises(requests.ConnectTimeout):
+                    self.transport.post(self.url, json={}, timeout=5)
+            with self.assertRaises(CircuitOpenError):
+                self.transport.post(self.url, json={}, timeout=5)
+        self.assertEqual(send.call_count, 2)
+        stats = self.transport.stats()["http://go-services.test"]
+        self.assertEqual((stats["state"], stats["failures"], stats["short_circuited"]), ("open", 2, 1))
+
+    def test_server_errors_count_as_failures(self):
+        """Test that 5xx responses trip the breaker but 4xx do not."""
+        session = self.transport._host(self.url).session
+        with patch.object(session, "request", return_value=self._response(400)):
+            self.transport.post(self.url)
+            self.transport.post(self.url)
+        self.assertEqual(self.transport.stats()["http://go-services.test"]["state"], "closed")
+        with patch.object(session, "request", return_value=self._response(503)):
+            self.transport.post(self.url)
+            self.transport.post(self.url)
+        self.assertEqual(self.transport.stats()["http://go-services.test"]["state"], "open")
+
+    def test_half_open_trial_closes_breaker_on_success(self):
+        """Test that after the cooldown one trial request closes the breaker."""
+        host = self.transport._host(self.url)
+        with patch.object(host.session, "request", return_value=self._response(500)):
+            self.transport.post(self.url)
+            self.transport.post(self.url)
+        host.opened_at -= 61
+        with patch.object(host.session, "request", return_value=self._response(202)) as send:
+            self.assertEqual(self.transport.post(self.url).status_code, 202)
+        send.assert_called_once()
+        self.assertEqual(self.transport.stats()["http://go-services.test"]["state"], "closed")
+
+    def test_map_preserves_order(self):
+        """Test that map returns results in input order."""
+        self.assertEqual(self.transport.map(lambda n: n * n, range(20), max_workers=4), [n * n for n in range(20)])
+
+    def test_email_falls_back_to_resend_when_go_circuit_is_open(self):
+        """Test that an open Go circuit skips straight to the Resend fallback."""
+        import email_service
+        from School_system.outbound_http import CircuitOpenError
+
+        calls = []
+
+        def fake_post(url, **kwargs):
+            calls.append(url)
+            if "go-services" in url:
+                raise CircuitOpenError("open")
+            return self._response(200)
+
+        with override_settings(GO_SERVICES_URL="http://go-services.test", RESEND_API_KEY="key"), \
+                patch.object(email_service.outbound, "post", side_effect=fake_post):
+            self.assertTrue(email_service._send(["parent@example.com"], "Hi", "<p>Hi</p>"))
+        self.assertEqual(calls, ["http://go-services.test/api/v1/services/email/send", "https://api.resend.com/emails"])
+
+
+# ---------------------------------------------------------------------------
+# Auth context cache
+# ---------------------------------------------------------------------------
+
+class AuthContextCacheTest(APITestCase):
+
+    """Represents AuthContextCacheTest."""
+    def setUp(self):
+        """Execute setUp."""
+        from django.core.cache import cache
+        from users.token import JWTAuthentication
+        cache.clear()
+        self.school = make_school()
+        self.admin = make_user(self.school, "cache_admin", role="admin")
+        self.parent = make_user(self.school, "cache_parent", role="parent")
+        self.auth = JWTAuthentication()
+
+    def _request(self, user):
+        """Build a bearer-token request for user."""
+        from django.test import RequestFactory
+        from users.token import JWTAuthentication
+        token = JWTAuthentication.generate_token({"user_id": str(user.id)})
+        return token, RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_repeat_authentication_is_served_from_cache(self):
+        """Test that a second authenticate with the same token runs no queries."""
+        _, request = self._request(self.admin)
+        user, _ = self.auth.authenticate(request)
+        self.assertEqual(user.id, self.admin.id)
+        with self.assertNumQueries(0):
+            user, _ = self.auth.authenticate(request)
+        self.assertEqual(user.id, self.admin.id)
+
+    def test_logout_rejects_cached_token(self):
+        """Test that logout blacklists a token already in the cache."""
+        from rest_framework.exceptions import AuthenticationFailed
+        token, request = self._request(self.admin)
+        self.auth.authenticate(request)
+        response = self.client.post("/api/v1/auth/logout/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate(request)
+
+    def test_user_save_invalidates_cached_user(self):
+        """Test that saving a user is visible on the next request."""
+        _, request = self._request(self.admin)
+        self.auth.authenticate(request)
+        self.admin.first_name = "Renamed"
+        self.admin.save()
+        user, _ = self.auth.authenticate(request)
+        self.assertEqual(user.first_name, "Renamed")
+
+    def test_cache_holds_only_auth_fields(self):
+        """Test that the cached entry is a small dict, not the pickled user row."""
+        from django.core.cache import cache
+        _, request = self._request(self.admin)
+        user, _ = self.auth.authenticate(request)
+        entry = cache.get(f"auth:user:{self.admin.id}")
+        self.assertEqual(set(entry["user"]), {"id", "is_active", "role", "school_id", "password_stamp"})
+        with self.assertNumQueries(0):
+            self.assertEqual((user.pk, user.role, user.school_id), (self.admin.id, "admin", self.school.id))
+        with self.assertNumQueries(1):
+            self.assertEqual(user.username, "cache_admin")
+
+    def test_password_change_and_deactivation_revoke_cached_tokens(self):
+        """Test that tokens issued before a password change or deactivation stop working."""
+        from django.core.cache import cache
+        from rest_framework.exceptions import AuthenticationFailed
+        from users.auth_cache import password_stamp
+        from users.token import JWTAuthentication
+        from django.test import RequestFactory
+
+        token = JWTAuthentication.generate_token({"user_id": str(self.admin.id), "pwd": password_stamp(self.admin)})
+        request = RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.auth.authenticate(request)
+        self.admin.set_password("a-new-password")
+        self.admin.save()
+        self.assertIsNone(cache.get(f"auth:user:{self.admin.id}"))
+        with self.assertRaisesMessage(AuthenticationFailed, "revoked"):
+            self.auth.authenticate(request)
+
+        _, request = self._request(self.parent)
+        self.auth.authenticate(request)
+        self.parent.is_active = False
+        self.parent.save(update_fields=["is_active"])
+        with self.assertRaisesMessage(AuthenticationFailed, "disabled"):
+            self.auth.authenticate(request)
+
+    def test_logout_deletes_cached_entry(self):
+        """Test that logout drops the user's cache entry."""
+        from django.core.cache import cache
+        token, request = self._request(self.admin)
+        self.auth.authenticate(request)
+        self.client.post("/api/v1/auth/logout/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertIsNone(cache.get(f"auth:user:{self.admin.id}"))
+
+    def test_school_settings_save_blocks_cached_parent(self):
+        """Test that blocking parent logins applies to already-cached parents."""
+        from rest_framework.exceptions import AuthenticationFailed
+        _, request = self._request(self.parent)
+        self.auth.authenticate(request)
+        school_settings, _ = SchoolSettings.objects.get_or_create(school=self.school)
+        school_settings.parent_login_blocked = True
+        school_settings.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate(request)
+
+
 # ---------------------------------------------------------------------------
 # API tests — Profile
 # ---------------------------------------------------------------------------
@@ -1002,6 +1334,186 @@ class DashboardStatsRevenueTest(APITestCase):
         self.assertEqual(float(response.data["total_revenue"]), 450.0)
 
 
+class DashboardStatsSnapshotTest(APITestCase):
+    """Dashboard counters come from one cached per-school snapshot."""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from academics.models import Class, Parent, Student, Subject
+        from finances.models import Invoice
+
+        cache.clear()
+        self.client = APIClient()
+        self.school = make_school()
+        other_school = make_school("Other School")
+        self.admin = make_user(self.school, "snap_admin", role="admin")
+        make_user(self.school, "snap_hr", role="hr")
+        make_user(self.school, "snap_teacher", role="teacher")
+        inactive_teacher = make_user(self.school, "snap_teacher_off", role="teacher")
+        inactive_teacher.is_active = False
+        inactive_teacher.save()
+        self.url = "/api/v1/auth/dashboard/stats/"
+
+        self.cls = Class.objects.create(name="Form 2A", grade_level=2, academic_year="2026", school=self.school)
+        Subject.objects.create(name="Maths", code="M1", school=self.school)
+        Subject.objects.create(name="Art", code="A1", school=self.school).delete()
+
+        students = []
+        for i, residence in enumerate(["boarding", "day", "day"]):
+            students.append(Student.objects.create(
+                user=make_user(self.school, f"snap_student{i}", role="student"),
+                student_class=self.cls, residence_type=residence, admission_date=date(2026, 1, 10),
+            ))
+        transferred = make_user(self.school, "snap_transferred", role="student")
+        Student.objects.create(user=transferred, student_class=self.cls, admission_date=date(2026, 1, 10), is_transferred=True)
+
+        # One parent per linkage route, plus one parent reachable by two routes.
+        Parent.objects.create(user=make_user(self.school, "snap_parent_own", role="parent"))
+        linked = Parent.objects.create(user=make_user(other_school, "snap_parent_linked", role="parent"))
+        linked.schools.add(self.school)
+        via_child = Parent.objects.create(user=make_user(other_school, "snap_parent_child", role="parent"))
+        via_child.children.add(students[0])
+        both = Parent.objects.create(user=make_user(other_school, "snap_parent_both", role="parent"))
+        both.schools.add(self.school)
+        both.children.add(students[1])
+        Parent.objects.create(user=make_user(other_school, "snap_parent_elsewhere", role="parent"))
+
+        Invoice.objects.create(
+            student=students[0], invoice_number="INV-SNAP-1", total_amount=Decimal("100.00"),
+            due_date=date(2026, 3, 31), school=self.school,
+        )
+        self.students = students
+
+    def test_counters_match_expected_values(self):
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        expected = {
+            "total_students": 3, "boarding_students": 1, "day_students": 2,
+            "total_teachers": 1, "total_staff": 2, "total_parents": 4,
+            "total_classes": 1, "total_subjects": 1, "pending_invoices": 1,
+        }
+        for key, value in expected.items():
+            self.assertEqual(response.data[key], value, key)
+        self.assertEqual(float(response.data["total_revenue"]), 0.0)
+        self.assertEqual(response.data["school_name"], self.school.name)
+
+    def test_snapshot_uses_two_queries_and_is_cached(self):
+        from users.school_stats import compute_school_stats, get_school_stats
+
+        with self.assertNumQueries(2):
+            compute_school_stats(self.school)
+        get_school_stats(self.school)
+        with self.assertNumQueries(0):
+            get_school_stats(self.school)
+
+    def test_writes_invalidate_snapshot(self):
+        from academics.models import Student
+        from finances.models import StudentPaymentRecord
+        from users.school_stats import get_school_stats
+
+        self.assertEqual(get_school_stats(self.school)["total_students"], 3)
+        Student.objects.create(
+            user=make_user(self.school, "snap_student_new", role="student"),
+            student_class=self.cls, admission_date=date(2026, 2, 1),
+        )
+        self.assertEqual(get_school_stats(self.school)["total_students"], 4)
+
+        user = self.students[2].user
+        user.is_active = False
+        user.save(update_fields=["is_active"])
+        self.assertEqual(get_school_stats(self.school)["total_students"], 3)
+
+        StudentPaymentRecord.objects.create(
+            student=self.students[0], school=self.school, academic_year="2026",
+            total_amount_due=Decimal("100.00"), amount_paid=Decimal("80.00"),
+        )
+        self.assertEqual(get_school_stats(self.school)["total_revenue"], Decimal("80.00"))
+
+
+class AdminAnalyticsTest(APITestCase):
+    """Admin analytics payload is built from grouped queries and cached."""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from School_system.benchmarking import seed_large_school
+
+        cache.clear()
+        self.client = APIClient()
+        self.school = seed_large_school(students=30, classes=3, teachers=3, subjects=4, results_per_student=4, days=10)
+        self.admin = make_user(self.school, "analytics_admin", role="admin")
+        self.url = "/api/v1/auth/analytics/"
+
+    def test_payload_totals(self):
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        overview = response.data["overview"]
+        self.assertEqual(overview["total_students"], 30)
+        self.assertEqual(overview["total_teachers"], 3)
+        self.assertEqual(overview["total_subjects"], 4)
+        self.assertEqual(overview["total_fees_due"], 15000.0)
+        self.assertEqual(sum(c["student_count"] for c in response.data["class_distribution"]), 30)
+        self.assertEqual(len(response.data["attendance_by_day"]), 7)
+        self.assertTrue(all(day["total"] == 30 for day in response.data["attendance_by_day"]))
+        averages = [s["average"] for s in response.data["subject_performance"]]
+        self.assertEqual(len(averages), 4)
+        self.assertEqual(averages, sorted(averages, reverse=True))
+
+    def test_query_count_is_constant_and_response_cached(self):
+        from users.analytics import compute_admin_analytics, get_admin_analytics
+
+        with self.assertNumQueries(5):
+            compute_admin_analytics(self.school)
+        get_admin_analytics(self.school)
+        with self.assertNumQueries(0):
+            get_admin_analytics(self.school)
+
+    def test_non_admin_forbidden(self):
+        teacher = make_user(self.school, "analytics_teacher", role="teacher")
+        self.client.force_authenticate(user=teacher)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class HotEndpointBenchmarkTest(TestCase):
+    """Hot endpoint benchmark scenarios run against a seeded school and flag regressions."""
+
+    def setUp(self):
+        from School_system.benchmarking import seed_benchmark_school
+
+        self.bench = seed_benchmark_school(
+            'small', students=30, classes=3, teachers=3, subjects=4, results_per_student=4, days=5,
+        )
+
+    def test_every_scenario_measures_and_rolls_back(self):
+        from academics.models import ClassAttendance, Subject
+        from School_system.benchmarking import SCENARIOS, run_scenarios
+
+        subjects = Subject.objects.filter(school=self.bench.school).count()
+        attendance = ClassAttendance.objects.filter(class_assigned=self.bench.target_class).count()
+        measurements = run_scenarios(self.bench, repeat=1)
+
+        self.assertEqual(list(measurements), list(SCENARIOS))
+        for name, measurement in measurements.items():
+            self.assertGreater(measurement["queries"], 0, name)
+            self.assertGreaterEqual(measurement["wall_ms"], 0, name)
+        self.assertEqual(Subject.objects.filter(school=self.bench.school).count(), subjects)
+        self.assertEqual(ClassAttendance.objects.filter(class_assigned=self.bench.target_class).count(), attendance)
+
+    def test_compare_flags_query_growth_but_not_timing_noise(self):
+        from School_system.benchmarking import compare_to_baselines
+
+        baseline = {"report_card": {"queries": 13, "wall_ms": 30.0, "peak_kib": 470.0}}
+        noisy = {"report_card": {"queries": 13, "wall_ms": 34.0, "peak_kib": 600.0}}
+        self.assertEqual(compare_to_baselines(noisy, baseline), [])
+
+        regressed = {"report_card": {"queries": 14, "wall_ms": 90.0, "peak_kib": 470.0}}
+        self.assertEqual(len(compare_to_baselines(regressed, baseline)), 2)
+        self.assertEqual(len(compare_to_baselines(regressed, baseline, check_time=False)), 1)
+        self.assertEqual(compare_to_baselines(regressed, {}), [])
+
+
 # ---------------------------------------------------------------------------
 # API tests — Audit Logs
 # ---------------------------------------------------------------------------
@@ -9,7 +9,7 @@ import copy
 
 import logging
 
-from .models import BlacklistedToken
+from .auth_cache import get_school_auth_flags, get_token_user
 logger = logging.getLogger(__name__)
 
 User = get_user_model()
@@ -80,29 +80,28 @@ class JWTAuthentication(BaseAuthentication):
             # Verify the token
             self.verify_token(payload, token_type='access_token')
 
-            if BlacklistedToken.objects.filter(token=token).exists():
-                raise AuthenticationFailed("Token has been blacklisted.")
-
             # Extract user ID from payload
             user_id = payload.get('user_id')
             if not user_id:
                 #logger.debug("No user ID found in token payload.")
                 raise AuthenticationFailed("Token missing user ID.")
 
-            # Look up user by ID
-            user = User.objects.get(id=user_id)
+            # User row + blacklist verdict come from the short-TTL auth cache.
+            user, blacklisted = get_token_user(user_id, token)
+            if blacklisted:
+                raise AuthenticationFailed("Token has been blacklisted.")
+            if not user.is_active:
+                raise AuthenticationFailed("User account is disabled.")
+            # Tokens carry the password stamp they were issued under; a password change revokes them.
+            if payload.get('pwd') and payload['pwd'] != user.password_stamp:
+                raise AuthenticationFailed("Token has been revoked.")
 
             if user.role == 'parent' and user.school_id:
-                try:
-                    if user.school.settings.parent_login_blocked:
-                        raise AuthenticationFailed('parent_login_blocked')
-                except AuthenticationFailed:
-                    raise
-                except Exception:
-                    pass
+                if get_school_auth_flags(user.school_id)['parent_login_blocked']:
+                    raise AuthenticationFailed('parent_login_blocked')
 
             return (user, token)
 
-        except (InvalidTokenError, ExpiredSignatureError, User.DoesNotExist, jwt.DecodeError) as e:
+        except (InvalidTokenError, ExpiredSignatureError, User.DoesNotExist, ValueError, jwt.DecodeError) as e:
             # If there's an error, log it
             raise AuthenticationFailed(f"Invalid Token: {str(e)}")
@@ -3,7 +3,7 @@ import logging
 from django.conf import settings
 from django.contrib.auth import authenticate
 from django.contrib.auth.hashers import make_password
-from django.db import models, transaction
+from django.db import transaction
 from django.db.models import Q
 from django.utils import timezone
 from rest_framework import generics, status, permissions
@@ -31,7 +31,9 @@ from .serializers import (
     ManagedUserSerializer
 )
 from .token import JWTAuthentication
+from .auth_cache import invalidate_staff_permissions, invalidate_user_auth, password_stamp
 from academics.models import Student
+from School_system.pagination import paginate_keyset, wants_keyset
 
 
 def _check_rate_limit(request, group='api', rate='10/m'):
@@ -128,7 +130,7 @@ class UserRegistrationView(generics.CreateAPIView):
         if user.student_number:
             extra_fields['student_number'] = user.student_number
 
-        access_token = JWTAuthentication.generate_token(payload={"user_id": str(user.id)})
+        access_token = JWTAuthentication.generate_token(payload={"user_id": str(user.id), "pwd": password_stamp(user)})
 
         return Response({
             'user': {**user_data, **extra_fields},
@@ -263,7 +265,7 @@ def login_view(request):
                     user_data = UserSerializer(user).data
                     if user.student_number:
                         user_data['student_number'] = user.student_number
-                    access_token = JWTAuthentication.generate_token(payload={"user_id": str(user.id)})
+                    access_token = JWTAuthentication.generate_token(payload={"user_id": str(user.id), "pwd": password_stamp(user)})
                     try:
                         AuditLog.objects.create(
                             user=user, school=user.school, action='LOGIN',
@@ -285,7 +287,7 @@ def login_view(request):
                     user_data = UserSerializer(user).data
                     if user.student_number:
                         user_data['student_number'] = user.student_number
-                    access_token = JWTAuthentication.generate_token(payload={"user_id": str(user.id)})
+                    access_token = JWTAuthentication.generate_token(payload={"user_id": str(user.id), "pwd": password_stamp(user)})
                     try:
                         AuditLog.objects.create(
                             user=user, school=user.school, action='LOGIN',
@@ -308,7 +310,7 @@ def login_view(request):
     if user.student_number:
         user_data['student_number'] = user.student_number
 
-    access_token = JWTAuthentication.generate_token(payload={"user_id": str(user.id)})
+    access_token = JWTAuthentication.generate_token(payload={"user_id": str(user.id), "pwd": password_stamp(user)})
 
     # Log the login event
     try:
@@ -341,7 +343,7 @@ def whatsapp_pin_verification(request):
     serializer = WhatsAppPinVerificationSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.validated_data['user']
-        access_token = JWTAuthentication.generate_token(payload={"user_id": str(user.id)})
+        access_token = JWTAuthentication.generate_token(payload={"user_id": str(user.id), "pwd": password_stamp(user)})
 
         return Response({
             'user': UserSerializer(user).data,
@@ -360,6 +362,7 @@ def logout_view(request):
             token = auth_header.split(' ')[1]
             from .models import BlacklistedToken
             BlacklistedToken.objects.create(token=token)
+        invalidate_user_auth(request.user.id)
         try:
             AuditLog.objects.create(
                 user=request.user,
@@ -582,46 +585,13 @@ class UserDetailView(generics.RetrieveUpdateAPIView):
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def dashboard_stats_view(request):
-    from academics.models import Class, Subject, Parent, Student
-    from finances.models import Invoice, StudentPaymentRecord
+    from .school_stats import get_school_stats
 
     school = request.user.school
 
     if school:
-        student_qs = Student.objects.filter(user__school=school, user__is_active=True)
-        total_students = student_qs.count()
-        boarding_students = student_qs.filter(residence_type='boarding').count()
-        day_students = student_qs.filter(residence_type='day').count()
         stats = {
-            'total_students': total_students,
-            'boarding_students': boarding_students,
-            'day_students': day_students,
-            'total_teachers': CustomUser.objects.filter(role='teacher', is_active=True, school=school).count(),
-            # Include parents created by admin and self-registered parents linked to this school.
-            'total_parents': Parent.objects.filter(
-                Q(user__school=school) |
-                Q(schools=school) |
-                Q(children__user__school=school)
-            ).distinct().count(),
-            'total_staff': CustomUser.objects.filter(
-                role__in=['admin', 'hr', 'accountant', 'security', 'cleaner', 'librarian'],
-                is_active=True,
-                school=school
-            ).count(),
-            'total_classes': Class.objects.filter(school=school).count(),
-            'total_subjects': Subject.objects.filter(school=school).count(),
-            'pending_invoices': Invoice.objects.filter(is_paid=False, student__user__school=school).count(),
-            # Use payment records as primary source, but fall back to paid invoices
-            # when legacy/snapshot data has invoice payments without synced records.
-            'total_revenue': max(
-                StudentPaymentRecord.objects.filter(
-                    school=school
-                ).aggregate(total=models.Sum('amount_paid'))['total'] or 0,
-                Invoice.objects.filter(
-                    student__user__school=school,
-                    is_paid=True,
-                ).aggregate(total=models.Sum('amount_paid'))['total'] or 0,
-            ),
+            **get_school_stats(school),
             'school_type': school.school_type,
             'school_accommodation_type': school.accommodation_type,
             'school_name': school.name,
@@ -772,6 +742,7 @@ def hr_permission_update_view(request, user_id):
 
         if to_create:
             HRPagePermission.objects.bulk_create(to_create)
+    invalidate_staff_permissions(hr_user.id)
 
     return Response({'message': 'HR permissions updated successfully'})
 
@@ -859,6 +830,7 @@ def accountant_permission_update_view(request, user_id):
 
         if to_create:
             AccountantPagePermission.objects.bulk_create(to_create)
+    invalidate_staff_permissions(acct_user.id)
 
     return Response({'message': 'Accountant permissions updated successfully'})
 
@@ -1519,7 +1491,12 @@ def audit_logs_view(request):
     if to_date:
         logs = logs.filter(timestamp__date__lte=to_date)
 
-    logs = logs.order_by('-timestamp')[:500]
+    # ?cursor= pages through the full history; without it the latest 500 are returned.
+    page_meta = {}
+    if wants_keyset(request):
+        logs, page_meta = paginate_keyset(request, logs, ('-timestamp', '-id'), default_page_size=50)
+    else:
+        logs = logs.order_by('-timestamp')[:500]
 
     data = [
         {
@@ -1536,7 +1513,7 @@ def audit_logs_view(request):
         }
         for log in logs
     ]
-    return Response({'results': data, 'count': len(data)})
+    return Response({'results': data, 'count': len(data), **page_meta})
 
 
 # ---------------------------------------------------------------
@@ -1711,82 +1688,11 @@ def admin_analytics(request):
         return Response({'error': 'Admin only'}, status=status.HTTP_403_FORBIDDEN)
 
     school = request.user.school
-    from academics.models import Student, Teacher, Class, Result, Attendance, Subject
-    from finances.models import StudentPaymentRecord
-    from django.db.models import Sum
-    from datetime import timedelta
-
-    now = timezone.now()
-    thirty_days_ago = now - timedelta(days=30)
-
-    total_students = Student.objects.filter(user__school=school).count()
-    total_teachers = Teacher.objects.filter(user__school=school).count()
-    total_classes = Class.objects.filter(school=school).count()
-    total_subjects = Subject.objects.filter(school=school, is_deleted=False).count()
-
-    # Attendance (last 30 days)
-    recent_attendance = Attendance.objects.filter(student__user__school=school, date__gte=thirty_days_ago.date())
-    total_records = recent_attendance.count()
-    present_count = recent_attendance.filter(status__in=['present', 'late']).count()
-    attendance_rate = round((present_count / total_records * 100), 1) if total_records > 0 else 0
-
-    # Attendance by day (last 7 days)
-    attendance_by_day = []
-    for i in range(6, -1, -1):
-        day = (now - timedelta(days=i)).date()
-        day_records = Attendance.objects.filter(student__user__school=school, date=day)
-        total = day_records.count()
-        present = day_records.filter(status__in=['present', 'late']).count()
-        attendance_by_day.append({
-            'date': day.isoformat(),
-            'total': total,
-            'present': present,
-            'rate': round((present / total * 100), 1) if total > 0 else 0,
-        })
-
-    # Fee collection (same data source as dashboard card to keep values aligned)
-    record_qs = StudentPaymentRecord.objects.filter(school=school)
-    total_fees_due = record_qs.aggregate(total=Sum('total_amount_due'))['total'] or 0
-    total_fees_paid = record_qs.aggregate(total=Sum('amount_paid'))['total'] or 0
-    collection_rate = round((float(total_fees_paid) / float(total_fees_due) * 100), 1) if total_fees_due > 0 else 0
-
-    # Subject performance
-    subject_performance = []
-    for subject in Subject.objects.filter(school=school, is_deleted=False)[:15]:
-        results = Result.objects.filter(subject=subject, student__user__school=school)
-        if results.exists():
-            avg = 0
-            count = 0
-            for r in results:
-                if r.max_score > 0:
-                    avg += (r.score / r.max_score * 100)
-                    count += 1
-            subject_performance.append({
-                'name': subject.name,
-                'code': subject.code,
-                'average': round(avg / count, 1) if count > 0 else 0,
-                'student_count': results.values('student').distinct().count(),
-            })
-    subject_performance.sort(key=lambda x: x['average'], reverse=True)
-
-    # Class distribution
-    class_distribution = [{'name': c.name, 'student_count': c.students.count()} for c in Class.objects.filter(school=school)]
+    if not school:
+        return Response({'error': 'No school associated with user'}, status=status.HTTP_400_BAD_REQUEST)
 
-    return Response({
-        'overview': {
-            'total_students': total_students,
-            'total_teachers': total_teachers,
-            'total_classes': total_classes,
-            'total_subjects': total_subjects,
-            'attendance_rate': attendance_rate,
-            'fee_collection_rate': collection_rate,
-            'total_fees_due': float(total_fees_due),
-            'total_fees_paid': float(total_fees_paid),
-        },
-        'attendance_by_day': attendance_by_day,
-        'subject_performance': subject_performance,
-        'class_distribution': class_distribution,
-    })
+    from .analytics import get_admin_analytics
+    return Response(get_admin_analytics(school))
 
 
 # ---------------------------------------------------------------
@@ -1948,7 +1854,7 @@ def two_fa_verify_otp_view(request):
             defaults={'user_agent': ua[:500], 'device_name': device_name, 'verified': True}
         )
 
-    access_token = JWTAuthentication.generate_token(payload={"user_id": str(user.id)})
+    access_token = JWTAuthentication.generate_token(payload={"user_id": str(user.id), "pwd": password_stamp(user)})
     user_data = UserSerializer(user).data
     if user.student_number:
         user_data['student_number'] = user.student_number
@@ -2032,7 +1938,7 @@ def two_fa_verify_backup_view(request):
             defaults={'user_agent': ua[:500], 'device_name': parse_user_agent(ua), 'verified': True}
         )
 
-    access_token = JWTAuthentication.generate_token(payload={"user_id": str(user.id)})
+    access_token = JWTAuthentication.generate_token(payload={"user_id": str(user.id), "pwd": password_stamp(user)})
     user_data = UserSerializer(user).data
     if user.student_number:
         user_data['student_number'] = user.student_number
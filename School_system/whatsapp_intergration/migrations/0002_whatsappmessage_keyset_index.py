@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('whatsapp_intergration', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='whatsappmessage',
+            index=models.Index(fields=['-timestamp', '-id'], name='whatsapp_in_timesta_b0cf86_idx'),
+        ),
+    ]
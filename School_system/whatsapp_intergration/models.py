@@ -55,6 +55,12 @@ class WhatsAppMessage(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
     
+    class Meta:
+        """Represents Meta."""
+        indexes = [
+            models.Index(fields=['-timestamp', '-id']),
+        ]
+    
     def __str__(self):
         """Return a human-readable string representation."""
         return f"{self.whatsapp_user.phone_number} - {self.direction} ({self.timestamp})"
@@ -21,14 +21,14 @@ def send_whatsapp_message_task(self, to_phone: str, message_text: str):
     Delegates to Go service (goroutine-based) if available, falls back to direct API call.
     """
     try:
-        import requests
+        from School_system.outbound_http import outbound
         from .models import WhatsAppUser, WhatsAppMessage
 
         # ── Delegate to Go Services if available ──
         go_services_url = os.environ.get('GO_SERVICES_URL', '')
         if go_services_url:
             try:
-                resp = requests.post(
+                resp = outbound.post(
                     f"{go_services_url}/api/v1/services/whatsapp/send",
                     headers={
                         "Content-Type": "application/json",
@@ -76,7 +76,7 @@ def send_whatsapp_message_task(self, to_phone: str, message_text: str):
             'text': {'body': message_text},
         }
 
-        response = requests.post(url, headers=headers, json=data, timeout=15)
+        response = outbound.post(url, headers=headers, json=data, timeout=15)
         response.raise_for_status()
 
         # Log the outgoing message
@@ -10,6 +10,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 
 logger = logging.getLogger(__name__)
+from School_system.pagination import KeysetPagination
 from .models import WhatsAppUser, WhatsAppSession, WhatsAppMessage, WhatsAppPayment, WhatsAppMenu
 from .serializers import (
     WhatsAppUserSerializer, WhatsAppSessionSerializer, WhatsAppMessageSerializer,
@@ -61,6 +62,8 @@ class WhatsAppMessageListView(generics.ListAPIView):
     queryset = WhatsAppMessage.objects.all()
     serializer_class = WhatsAppMessageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-timestamp', '-id')
 
     def get_queryset(self):
         """Return queryset."""
@@ -118,6 +118,93 @@ func sendViaResend(cfg Config, to []string, subject, html string) {
 	}
 }
 
+// resendBatchLimit is the maximum number of messages Resend accepts per batch call.
+const resendBatchLimit = 100
+
+// emailBatchMessage is one fully rendered email inside a batch request.
+type emailBatchMessage struct {
+	To      []string `json:"to"`
+	Subject string   `json:"subject"`
+	HTML    string   `json:"html"`
+}
+
+// emailBatchRequest is the JSON body accepted by POST /api/v1/services/email/batch
+type emailBatchRequest struct {
+	Messages []emailBatchMessage `json:"messages"`
+}
+
+// EmailBatchHandler handles POST /api/v1/services/email/batch
+// Used by Django's announcement fan-out to ship up to 100 per-recipient
+// messages in one call. Unlike /send it forwards synchronously to the Resend
+// batch endpoint so the caller can record delivery progress and retry.
+func EmailBatchHandler() http.HandlerFunc {
+	cfg := LoadConfig()
+
+	return func(w http.ResponseWriter, r *http.Request) {
+		var req emailBatchRequest
+		if err := json.NewDecoder(r.Body).Decode(&req); err != nil {
+			writeJSON(w, http.StatusBadRequest, map[string]string{"error": "Invalid request body."})
+			return
+		}
+		if len(req.Messages) == 0 || len(req.Messages) > resendBatchLimit {
+			writeJSON(w, http.StatusBadRequest, map[string]string{
+				"error": fmt.Sprintf("messages must contain 1 to %d emails.", resendBatchLimit),
+			})
+			return
+		}
+		for _, m := range req.Messages {
+			if len(m.To) == 0 || m.Subject == "" || m.HTML == "" {
+				writeJSON(w, http.StatusBadRequest, map[string]string{"error": "Each message needs to, subject and html."})
+				return
+			}
+		}
+
+		if err := sendBatchViaResend(cfg, req.Messages); err != nil {
+			writeJSON(w, http.StatusBadGateway, map[string]string{"error": err.Error()})
+			return
+		}
+		writeJSON(w, http.StatusOK, map[string]string{
+			"message": fmt.Sprintf("Sent %d email(s).", len(req.Messages)),
+		})
+	}
+}
+
+// sendBatchViaResend calls the Resend batch API with up to 100 messages.
+func sendBatchViaResend(cfg Config, messages []emailBatchMessage) error {
+	if cfg.ResendAPIKey == "" {
+		return fmt.Errorf("RESEND_API_KEY not configured")
+	}
+
+	payload := make([]map[string]interface{}, 0, len(messages))
+	for _, m := range messages {
+		payload = append(payload, map[string]interface{}{
+			"from":    cfg.ResendFromEmail,
+			"to":      m.To,
+			"subject": m.Subject,
+			"html":    m.HTML,
+		})
+	}
+	body, _ := json.Marshal(payload)
+
+	req, _ := http.NewRequest("POST", "https://api.resend.com/emails/batch", bytes.NewReader(body))
+	req.Header.Set("Authorization", "Bearer "+cfg.ResendAPIKey)
+	req.Header.Set("Content-Type", "application/json")
+
+	client := &http.Client{Timeout: 30 * time.Second}
+	resp, err := client.Do(req)
+	if err != nil {
+		return fmt.Errorf("resend batch request failed: %v", err)
+	}
+	defer resp.Body.Close()
+
+	if resp.StatusCode != 200 && resp.StatusCode != 201 {
+		respBody, _ := io.ReadAll(resp.Body)
+		return fmt.Errorf("resend batch error %d: %s", resp.StatusCode, string(respBody[:min(300, len(respBody))]))
+	}
+	log.Printf("Email batch of %d sent", len(messages))
+	return nil
+}
+
 // sendPaymentReceivedEmail builds and sends a payment confirmation email.
 // Called from paynow.go callback handler.
 func sendPaymentReceivedEmail(cfg Config, parentEmail, parentName, schoolName, studentName, className, amount, reference string) {
@@ -41,6 +41,7 @@ func main() {
 
 	// ── Email (internal — called by Django/Celery) ──
 	mux.HandleFunc("POST /api/v1/services/email/send", EmailSendHandler())
+	mux.HandleFunc("POST /api/v1/services/email/batch", EmailBatchHandler())
 
 	// ── WhatsApp (internal — called by Django/Celery) ──
 	mux.HandleFunc("POST /api/v1/services/whatsapp/send", WhatsAppSendHandler())
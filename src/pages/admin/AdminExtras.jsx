@@ -18,6 +18,7 @@ export default function AdminExtras() {
   
   const [timetableStats, setTimetableStats] = useState(null);
   const [generating, setGenerating] = useState(false);
+  const [timetableJob, setTimetableJob] = useState(null);
   
   const [schoolFees, setSchoolFees] = useState([]);
   const [schoolType, setSchoolType] = useState('combined');
@@ -106,25 +107,59 @@ export default function AdminExtras() {
     setMessage(null);
     
     try {
-      const result = await apiService.generateTimetable({
+      const job = await apiService.generateTimetable({
         academic_year: currentAcademicYear,
         clear_existing: true
       });
-      
-      if (result.success) {
-        setMessage({ type: 'success', text: `${result.message} (${result.entries_count} entries created)` });
-        const stats = await apiService.getTimetableStats();
-        setTimetableStats(stats);
-      } else {
-        setMessage({ type: 'error', text: result.message });
-      }
+      setTimetableJob(job);
     } catch (error) {
       setMessage({ type: 'error', text: error.message || 'Failed to generate timetable' });
-    } finally {
       setGenerating(false);
     }
   };
 
+  const handleCancelTimetableJob = async () => {
+    if (!timetableJob) return;
+    try {
+      setTimetableJob(await apiService.cancelTimetableJob(timetableJob.id));
+    } catch (error) {
+      setMessage({ type: 'error', text: error.message || 'Failed to cancel timetable generation' });
+    }
+  };
+
+  // Generation runs as a background job; poll it until it finishes.
+  useEffect(() => {
+    if (!timetableJob) return undefined;
+
+    if (!['queued', 'running'].includes(timetableJob.status)) {
+      if (timetableJob.status === 'done') {
+        const unplaced = timetableJob.score?.unplaced || 0;
+        setMessage({
+          type: 'success',
+          text: `Successfully generated timetable with ${timetableJob.entries_count} entries` +
+            (unplaced ? ` (${unplaced} periods could not be placed)` : ''),
+        });
+        apiService.getTimetableStats().then(setTimetableStats).catch(() => {});
+      } else if (timetableJob.status === 'cancelled') {
+        setMessage({ type: 'error', text: 'Timetable generation was cancelled. Existing timetables were kept.' });
+      } else {
+        setMessage({ type: 'error', text: timetableJob.errors?.[0]?.error || 'Failed to generate timetable' });
+      }
+      setGenerating(false);
+      return undefined;
+    }
+
+    const timer = setTimeout(async () => {
+      try {
+        setTimetableJob(await apiService.getTimetableJob(timetableJob.id));
+      } catch {
+        // Retry on the next tick with the last known state.
+        setTimetableJob({ ...timetableJob });
+      }
+    }, 2000);
+    return () => clearTimeout(timer);
+  }, [timetableJob]);
+
   const handleFeeSubmit = async (e) => {
     e.preventDefault();
     setLoading(true);
@@ -598,6 +633,11 @@ export default function AdminExtras() {
                 <>
                   <i className="fas fa-spinner fa-spin mr-2"></i>
                   Generating Timetables...
+                  {timetableJob?.progress_total > 0 && (
+                    <span className="ml-1">
+                      ({timetableJob.phase} {timetableJob.progress_done}/{timetableJob.progress_total})
+                    </span>
+                  )}
                 </>
               ) : (
                 <>
@@ -606,6 +646,16 @@ export default function AdminExtras() {
                 </>
               )}
             </button>
+
+            {generating && timetableJob && !timetableJob.cancel_requested && (
+              <button
+                onClick={handleCancelTimetableJob}
+                className="w-full mt-3 py-2 rounded-lg font-semibold text-red-600 border border-red-300 hover:bg-red-50 transition"
+              >
+                <i className="fas fa-times mr-2"></i>
+                Cancel Generation
+              </button>
+            )}
           </div>
         )}
 
@@ -33,7 +33,7 @@ export default function ParentDashboard() {
     try {
       setLoading(true);
       const [childrenData, complaintsData, announcementsData] = await Promise.all([
-        apiService.getParentChildren(),
+        apiService.getParentOverview(),
         apiService.fetchComplaints(),
         apiService.fetchAnnouncements(),
       ]);
@@ -45,11 +45,7 @@ export default function ParentDashboard() {
       if (childrenData.length > 0) {
         const defaultChild = childrenData.find(c => c.is_confirmed) || childrenData[0];
         setSelectedChild(defaultChild);
-        
-        if (defaultChild) {
-          const statsData = await apiService.getParentDashboardStats(defaultChild.id);
-          setStats(statsData);
-        }
+        setStats(defaultChild?.stats || null);
       }
     } catch (error) {
       console.error("Error loading dashboard:", error);
@@ -97,18 +93,11 @@ export default function ParentDashboard() {
     }
   };
 
-  const handleChildChange = async (childId) => {
+  const handleChildChange = (childId) => {
     const child = children.find(c => c.id === parseInt(childId));
     setSelectedChild(child);
-    
-    if (child) {
-      try {
-        const statsData = await apiService.getParentDashboardStats(child.id);
-        setStats(statsData);
-      } catch (error) {
-        console.error("Error loading child stats:", error);
-      }
-    }
+    // The overview already carries every child's stats; no refetch needed.
+    setStats(child?.stats || null);
   };
 
   const formatDate = formatDateShort;
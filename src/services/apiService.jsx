@@ -411,6 +411,7 @@ const apiService = {
   getStudentAnnouncements: () => request("/students/announcements/", "GET"),
 
   getParentChildren: () => request("/parents/children/", "GET"),
+  getParentOverview: () => request("/parents/overview/", "GET"),
   getAvailableChildren: () => request("/parents/children/available/", "GET"),
   searchStudents: (params) => {
     const queryParams = new URLSearchParams();
@@ -630,6 +631,8 @@ const apiService = {
 
   // Timetable generation endpoints
   generateTimetable: (data = {}) => request("/academics/timetables/generate/", "POST", data),
+  getTimetableJob: (jobId) => request(`/academics/timetables/jobs/${jobId}/`, "GET"),
+  cancelTimetableJob: (jobId) => request(`/academics/timetables/jobs/${jobId}/cancel/`, "POST"),
   getTimetableStats: () => request("/academics/timetables/stats/", "GET"),
 
   // School management (SaaS multi-tenant)